@@ -0,0 +1,238 @@
+"""
+Answer cache in front of the dialogue pipeline.
+
+Players ask the same NPC the same questions, and the answer only changes
+with the world. Answers are kept per (npc_id, normalized question,
+world version). Only answers the router marked history_independent are
+stored (see Dialogue.nodes.answer_cache), so a cached answer never depends
+on the conversation it was first given in and the key needs no history. A lookup first tries the exact key,
+then (with a similarity threshold set) the most similar cached question of
+the same NPC and world version, as long as both questions mention the same
+world entities. Entries expire after a TTL and the cache is size-bounded.
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from config import ANSWER_CACHE_ENABLED, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL_SECONDS
+from utils.lru import LRUCache, is_missing
+from World.graph_store import get_world_graph
+from World.store import get_world_store
+
+
+MATCH_EXACT = "exact"
+MATCH_SIMILAR = "similar"
+
+_NON_WORD_PATTERN = re.compile(r"[^\w\s']+")
+
+
+def normalize_question(text: str) -> str:
+    """
+    Lowercase, punctuation dropped, whitespace collapsed:
+    "Who owns  the Crooked Tavern?" -> "who owns the crooked tavern".
+    """
+    return " ".join(_NON_WORD_PATTERN.sub(" ", text.lower()).split())
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    question: str
+    response: str
+    entities: FrozenSet[str]
+    embedding: Optional[np.ndarray]
+    created_at: float
+
+
+@dataclass(frozen=True)
+class AnswerHit:
+    response: str
+    match: str
+    similarity: float
+    age_seconds: float
+    cached_question: str
+
+
+class AnswerCache:
+    """
+    Exact and similarity lookup of earlier answers; see the module docstring.
+
+    `embed` maps texts to vectors (default: the world store's query
+    embeddings) and `mentions` maps a text to the entity ids it names
+    (default: the world store's alias matching).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_SIZE,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY,
+        embed: Optional[Callable[[List[str]], List[Any]]] = None,
+        mentions: Optional[Callable[[str], List[str]]] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._embed = embed
+        self._mentions = mentions
+        self._cache = LRUCache(max_entries, on_evict=self._unindex)
+        # (npc_id, world_version) -> exact keys, for the similarity scan
+        self._buckets: Dict[Tuple[str, int], List[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+
+    @staticmethod
+    def world_version() -> int:
+        version_fn = getattr(get_world_graph(), "world_version", None)
+        return int(version_fn()) if version_fn else 0
+
+    @staticmethod
+    def _key(npc_id: str, question: str, world_version: int) -> Tuple[str, str, int]:
+        return (npc_id, question, world_version)
+
+    def _embedding(self, question: str) -> Optional[np.ndarray]:
+        if self.similarity_threshold <= 0:
+            return None
+        embed = self._embed or getattr(get_world_store(), "embed_queries", None)
+        if embed is None:
+            return None
+        vector = np.asarray(embed([question])[0], dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _entities(self, question: str) -> FrozenSet[str]:
+        mentions = self._mentions or get_world_store().find_entity_mentions
+        return frozenset(mentions(question))
+
+    def _unindex(self, key: Hashable, _entry: Any) -> None:
+        with self._lock:
+            bucket = self._buckets.get((key[0], key[2]))
+            if bucket and key in bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del self._buckets[(key[0], key[2])]
+
+    def _live(self, key: Hashable, entry: CachedAnswer, now: float) -> bool:
+        if self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds:
+            self._cache.pop(key)
+            self._unindex(key, entry)
+            with self._lock:
+                self.expired += 1
+            return False
+        return True
+
+    def lookup(self, npc_id: str, question: str, world_version: Optional[int] = None) -> Optional[AnswerHit]:
+        version = self.world_version() if world_version is None else world_version
+        normalized = normalize_question(question)
+        now = time.time()
+        key = self._key(npc_id, normalized, version)
+        entry = self._cache.get(key)
+        if not is_missing(entry) and self._live(key, entry, now):
+            with self._lock:
+                self.exact_hits += 1
+            return AnswerHit(entry.response, MATCH_EXACT, 1.0, now - entry.created_at, entry.question)
+
+        hit = self._similar(npc_id, normalized, version, now)
+        with self._lock:
+            if hit is None:
+                self.misses += 1
+            else:
+                self.similar_hits += 1
+        return hit
+
+    def _similar(self, npc_id: str, normalized: str, version: int, now: float) -> Optional[AnswerHit]:
+        with self._lock:
+            keys = list(self._buckets.get((npc_id, version), []))
+        if not keys:
+            return None
+        embedding = self._embedding(normalized)
+        if embedding is None:
+            return None
+        entities = self._entities(normalized)
+        best: Optional[Tuple[float, Hashable, CachedAnswer]] = None
+        for key in keys:
+            entry = self._cache.get(key)
+            if is_missing(entry) or entry.embedding is None or entry.entities != entities:
+                continue
+            similarity = float(np.dot(embedding, entry.embedding))
+            if similarity >= self.similarity_threshold and (best is None or similarity > best[0]):
+                best = (similarity, key, entry)
+        if best is None or not self._live(best[1], best[2], now):
+            return None
+        similarity, _key, entry = best
+        return AnswerHit(entry.response, MATCH_SIMILAR, similarity, now - entry.created_at, entry.question)
+
+    def store(self, npc_id: str, question: str, response: str, world_version: Optional[int] = None) -> None:
+        """
+        Cache a history-independent answer (callers check the router flag).
+        """
+        version = self.world_version() if world_version is None else world_version
+        normalized = normalize_question(question)
+        embedding = self._embedding(normalized)
+        entry = CachedAnswer(
+            question=normalized,
+            response=response,
+            entities=self._entities(normalized) if embedding is not None else frozenset(),
+            embedding=embedding,
+            created_at=time.time(),
+        )
+        key = self._key(npc_id, normalized, version)
+        self._cache.put(key, entry)
+        with self._lock:
+            bucket = self._buckets.setdefault((npc_id, version), [])
+            if key not in bucket:
+                bucket.append(key)
+            self.stores += 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "stores": self.stores,
+                "evictions": self._cache.evictions,
+            }
+
+
+_ANSWER_CACHE_INSTANCE: Optional[AnswerCache] = None
+_ANSWER_CACHE_LOCK = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """
+    The process-wide answer cache, or None when ANSWER_CACHE_ENABLED is off
+    and none was set.
+    """
+    global _ANSWER_CACHE_INSTANCE
+    if _ANSWER_CACHE_INSTANCE is None and ANSWER_CACHE_ENABLED:
+        with _ANSWER_CACHE_LOCK:
+            if _ANSWER_CACHE_INSTANCE is None:
+                _ANSWER_CACHE_INSTANCE = AnswerCache()
+    return _ANSWER_CACHE_INSTANCE
+
+
+def set_answer_cache(cache: Optional[AnswerCache]) -> None:
+    """
+    Use `cache` for all turns (e.g. to enable caching without the config
+    flag). Passing None goes back to the ANSWER_CACHE_ENABLED default.
+    """
+    global _ANSWER_CACHE_INSTANCE
+    _ANSWER_CACHE_INSTANCE = cache
@@ -0,0 +1,284 @@
+"""
+Batch dialogue turns: many NPCs answering against the same world state
+(crowd scenes, simulation ticks).
+
+run_dialogue_turns shares the work the turns have in common before running
+them concurrently:
+  - routing runs once per distinct routing key (message and recent
+    entities, plus the NPC for messages addressed to "you")
+  - the batch's semantic searches go to the store as one search_many call
+    per k, and entity / neighbor fact lookups are fetched once per batch
+    (graph lookups are already shared through the graph cache)
+Then each turn runs through the graph (retrieval, prompt, LLM) on at most
+`max_concurrency` threads. Results come back in input order.
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Sequence, Tuple, Union
+
+from Dialogue.dialogue_graph import initial_dialogue_state, invoke_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.llm.usage import collect_llm_calls, llm_usage_update
+from Dialogue.memory import ConversationMemory
+from Dialogue.nodes.routing import TURN_PATH_LIGHT, route_turn
+from Dialogue.nodes.vector_retrieval import vector_query_plan
+from World.store import get_world_store, scoped_world_store
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Messages addressed to the NPC route differently per NPC ("What do you sell?").
+SECOND_PERSON_PATTERN = re.compile(r"\b(you|your|yours|yourself|ye|thee|thou|thy)\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class TurnRequest:
+    npc: NPC
+    user_input: str
+    conversation_history: Union[str, ConversationMemory] = ""
+    session_id: str = ""
+
+
+@dataclass(frozen=True)
+class TurnResult:
+    """
+    route_ms is the routing time of the turn's routing group (shared_route is
+    True for the turns that reused it); run_ms is the graph run; total_ms is
+    from the start of the batch until this turn finished.
+    """
+
+    index: int
+    response: str
+    turn_path: str
+    route_ms: float
+    run_ms: float
+    total_ms: float
+    shared_route: bool = False
+    error: str = ""
+
+
+class BatchStore:
+    """
+    Batch-local view of a WorldKnowledgeStore: searches and entity fact
+    lookups are fetched once per batch (concurrent callers of the same key
+    wait for the first), everything else is passed through.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self._memo: Dict[Hashable, Future] = {}
+        self.fetches = 0
+        self.shared = 0
+
+    def __getattr__(self, name: str):
+        return getattr(self._store, name)
+
+    def _fetch_once(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._memo.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._memo[key] = future
+                self.fetches += 1
+            else:
+                self.shared += 1
+        if owner:
+            try:
+                future.set_result(fetch())
+            except Exception as exc:
+                future.set_exception(exc)
+                with self._lock:
+                    self._memo.pop(key, None)
+        return future.result()
+
+    def prefetch_searches(self, queries: Iterable[Tuple[str, int]]) -> int:
+        """
+        Run the distinct (query, k) pairs not fetched yet as one search_many
+        call per k. Returns the number of search_many calls made. A failed
+        call is logged and its queries are left to search() (one call per
+        turn), so it does not fail the batch.
+        """
+        pending: Dict[int, List[str]] = {}
+        with self._lock:
+            for query, n_results in queries:
+                key = ("search", query, n_results)
+                if key in self._memo or query in pending.get(n_results, []):
+                    continue
+                pending.setdefault(n_results, []).append(query)
+        for n_results, texts in pending.items():
+            try:
+                results = self._store.search_many(texts, n_results=n_results)
+            except Exception as exc:
+                LOGGER.warning("Batch search_many of %d queries failed (%s); searching per turn", len(texts), exc)
+                continue
+            for text, hits in zip(texts, results):
+                future = Future()
+                future.set_result(hits)
+                with self._lock:
+                    self._memo.setdefault(("search", text, n_results), future)
+        return len(pending)
+
+    def search(self, query: str, n_results: int = 5) -> List[Dict[str, str]]:
+        return list(
+            self._fetch_once(("search", query, n_results), lambda: self._store.search(query, n_results=n_results))
+        )
+
+    def facts_for_entity(self, entity_id: str, limit: int = 3) -> List[Dict[str, str]]:
+        return list(
+            self._fetch_once(
+                ("facts", entity_id, limit), lambda: self._store.facts_for_entity(entity_id, limit=limit)
+            )
+        )
+
+
+def routing_key(request: TurnRequest, recent_entities: Sequence[str]) -> Tuple:
+    """
+    Turns with the same key get the same routing. The query spec does not
+    name the NPC's location (location bias is just NEAR_NPC), so only
+    messages addressed to the NPC are keyed by NPC.
+    """
+    text = " ".join(request.user_input.lower().split())
+    addressee = request.npc.entity_id if SECOND_PERSON_PATTERN.search(text) else ""
+    return (text, tuple(recent_entities), addressee)
+
+
+def _timed(fn: Callable[..., Any], *args) -> Tuple[Any, float, float]:
+    """
+    (result, elapsed ms, perf_counter at finish).
+    """
+    started = time.perf_counter()
+    result = fn(*args)
+    finished = time.perf_counter()
+    return result, (finished - started) * 1000.0, finished
+
+
+def _route_turn(npc: NPC, user_input: str, recent_entities: List[str], deadline: float) -> Dict[str, Any]:
+    """
+    route_turn, with the routing LLM calls as the turn's route_query llm_usage.
+    """
+    with collect_llm_calls() as calls:
+        routing = route_turn(npc, user_input, recent_entities, deadline)
+    return {**routing, "llm_usage": llm_usage_update("route_query", calls)}
+
+
+def run_dialogue_turns(
+    graph,
+    requests: Sequence[TurnRequest],
+    max_concurrency: int = 8,
+) -> List[TurnResult]:
+    """
+    Run many dialogue turns as one batch.
+
+    Args:
+        graph: The compiled dialogue graph
+        requests: One TurnRequest per NPC turn. Requests that share a
+            ConversationMemory are not ordered relative to each other.
+        max_concurrency: Max turns (and router calls) in flight at once
+
+    Returns:
+        One TurnResult per request, in input order. A failed turn has an
+        empty response and `error` set; it does not fail the batch.
+    """
+    batch_started = time.perf_counter()
+    store = BatchStore(get_world_store())
+    states = [
+        initial_dialogue_state(request.npc, request.user_input, request.conversation_history, request.session_id)
+        for request in requests
+    ]
+    errors: Dict[int, str] = {}
+    route_ms: Dict[int, float] = {}
+    shared_route: Dict[int, bool] = {}
+    run_ms: Dict[int, float] = {}
+    finished_ms: Dict[int, float] = {}
+
+    with scoped_world_store(store), ThreadPoolExecutor(
+        max_workers=max(1, max_concurrency), thread_name_prefix="dialogue-batch"
+    ) as pool:
+        groups: Dict[Tuple, List[int]] = {}
+        for index, (request, state) in enumerate(zip(requests, states)):
+            groups.setdefault(routing_key(request, state["recent_entities"]), []).append(index)
+        route_futures = {
+            key: pool.submit(
+                copy_context().run,
+                _timed,
+                _route_turn,
+                requests[indices[0]].npc,
+                requests[indices[0]].user_input,
+                states[indices[0]]["recent_entities"],
+                states[indices[0]]["deadline"],
+            )
+            for key, indices in groups.items()
+        }
+        for key, indices in groups.items():
+            try:
+                routing, elapsed, _finished = route_futures[key].result()
+            except Exception as exc:
+                LOGGER.warning("Batch routing failed for %r: %s", requests[indices[0]].user_input, exc)
+                errors.update({index: f"routing failed: {exc}" for index in indices})
+                continue
+            for position, index in enumerate(indices):
+                # The routing calls are paid once, by the first turn of the group
+                states[index].update(routing if position == 0 else {**routing, "llm_usage": {}})
+                route_ms[index] = elapsed
+                shared_route[index] = position > 0
+
+        searches = []
+        for index, state in enumerate(states):
+            if index in errors or state["turn_path"] == TURN_PATH_LIGHT:
+                continue
+            if not state["query_spec"].get("needs_retrieval", True):
+                continue
+            query_text, _entity_names, semantic_limit = vector_query_plan(state["query_spec"], state["user_input"])
+            searches.append((query_text, semantic_limit))
+        search_calls = store.prefetch_searches(searches)
+
+        run_futures = {
+            index: pool.submit(
+                copy_context().run,
+                _timed,
+                invoke_dialogue_turn,
+                graph,
+                state,
+                requests[index].conversation_history,
+            )
+            for index, state in enumerate(states)
+            if index not in errors
+        }
+        results: Dict[int, Dict[str, Any]] = {}
+        for index, future in run_futures.items():
+            try:
+                results[index], run_ms[index], finished = future.result()
+                finished_ms[index] = (finished - batch_started) * 1000.0
+            except Exception as exc:
+                LOGGER.warning("Batch turn %d failed: %s", index, exc)
+                errors[index] = str(exc)
+
+    LOGGER.info(
+        "Batch of %d turns: %d routing groups, %d search_many calls, %d shared fetches",
+        len(requests),
+        len(groups),
+        search_calls,
+        store.shared,
+    )
+    batch_ms = (time.perf_counter() - batch_started) * 1000.0
+    return [
+        TurnResult(
+            index=index,
+            response=results[index]["formatted_response"] if index in results else "",
+            turn_path=results[index].get("turn_path", "") if index in results else "",
+            route_ms=route_ms.get(index, 0.0),
+            run_ms=run_ms.get(index, 0.0),
+            total_ms=finished_ms.get(index, batch_ms),
+            shared_route=shared_route.get(index, False),
+            error=errors.get(index, ""),
+        )
+        for index in range(len(requests))
+    ]
@@ -0,0 +1,145 @@
+"""
+Per-turn deadlines and graceful degradation.
+
+A turn gets an absolute deadline (time.monotonic() seconds) in
+DialogueState when it starts. Each node checks how much of it is left
+before doing optional or slow work, and takes a cheaper path when time runs
+low; every cheaper path taken is recorded in the state's degradations:
+  - local_routing:        keyword router instead of the LLM router
+  - local_graph_routing:  keyword edge types instead of the graph router
+  - skip_graph_paths:     no connecting-path search between two entities
+  - truncate_graph:       graph traversal stopped early, keeping the facts so far
+  - shrink_k:             fewer semantic hits and entity facts
+  - skip_neighbor_facts:  no fact expansion for graph neighbors
+  - cap_history:          only the newest history blocks in the prompt
+  - llm_timeout:          the answer call ran out of time; a fallback line is used
+Time for the answer call (answer_reserve_ms) is kept back from every stage
+before it, so a slow router cannot use it up. The thresholds are a
+DeadlinePolicy, built from config by default (see set_deadline_policy).
+"""
+
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from config import (
+    DEADLINE_ANSWER_RESERVE_MS,
+    DEADLINE_GRAPH_ROUTER_MS,
+    DEADLINE_HISTORY_BLOCKS,
+    DEADLINE_RETRIEVAL_MS,
+    DEADLINE_ROUTER_MS,
+    DEADLINE_SHRUNK_K,
+    TURN_DEADLINE_MS,
+)
+
+
+LOCAL_ROUTING = "local_routing"
+LOCAL_GRAPH_ROUTING = "local_graph_routing"
+SKIP_GRAPH_PATHS = "skip_graph_paths"
+TRUNCATE_GRAPH = "truncate_graph"
+SHRINK_K = "shrink_k"
+SKIP_NEIGHBOR_FACTS = "skip_neighbor_facts"
+CAP_HISTORY = "cap_history"
+LLM_TIMEOUT = "llm_timeout"
+
+
+@dataclass(frozen=True)
+class DeadlinePolicy:
+    """
+    Turn budget and the spare time (past the answer reserve) each stage
+    needs to run in full; see the Turn Deadline section of config.py.
+    """
+
+    turn_ms: float = TURN_DEADLINE_MS
+    answer_reserve_ms: float = DEADLINE_ANSWER_RESERVE_MS
+    router_ms: float = DEADLINE_ROUTER_MS
+    graph_router_ms: float = DEADLINE_GRAPH_ROUTER_MS
+    retrieval_ms: float = DEADLINE_RETRIEVAL_MS
+    shrunk_k: int = DEADLINE_SHRUNK_K
+    history_blocks: int = DEADLINE_HISTORY_BLOCKS
+
+
+_POLICY_INSTANCE: Optional[DeadlinePolicy] = None
+
+
+def get_deadline_policy() -> DeadlinePolicy:
+    global _POLICY_INSTANCE
+    if _POLICY_INSTANCE is None:
+        _POLICY_INSTANCE = DeadlinePolicy()
+    return _POLICY_INSTANCE
+
+
+def set_deadline_policy(policy: Optional[DeadlinePolicy]) -> None:
+    """
+    Use `policy` for turns started from now on. Passing None restores the
+    config defaults.
+    """
+    global _POLICY_INSTANCE
+    _POLICY_INSTANCE = policy
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised before a call that has no time left to run in.
+    """
+
+
+def merge_degradations(current: List[str], update: List[str]) -> List[str]:
+    """
+    Reducer for degradations: parallel branches each add theirs, in order,
+    without duplicates.
+    """
+    merged = list(current or [])
+    for name in update or []:
+        if name not in merged:
+            merged.append(name)
+    return merged
+
+
+def turn_deadline(budget_ms: Optional[float] = None) -> float:
+    """
+    Deadline for a turn starting now, budget_ms (default: the policy's
+    turn_ms) from now; 0.0 (no deadline) if the budget is <= 0.
+    """
+    if budget_ms is None:
+        budget_ms = get_deadline_policy().turn_ms
+    if budget_ms <= 0:
+        return 0.0
+    return time.monotonic() + budget_ms / 1000.0
+
+
+def remaining_ms(deadline: float) -> float:
+    """
+    Milliseconds until the deadline (negative once passed); infinite
+    without a deadline.
+    """
+    if not deadline:
+        return float("inf")
+    return (deadline - time.monotonic()) * 1000.0
+
+
+def spare_ms(deadline: float, reserve_ms: Optional[float] = None) -> float:
+    """
+    Time left for work before the answer call: remaining_ms minus the
+    answer reserve (default: the policy's).
+    """
+    if reserve_ms is None:
+        reserve_ms = get_deadline_policy().answer_reserve_ms
+    return remaining_ms(deadline) - reserve_ms
+
+
+def call_timeout(deadline: float, reserve_ms: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout in seconds for a blocking call that must finish `reserve_ms`
+    (default: the answer reserve) before the deadline; None without a
+    deadline.
+
+    Raises:
+        DeadlineExceeded: If there is no time left for the call
+    """
+    if not deadline:
+        return None
+    left_ms = spare_ms(deadline, reserve_ms)
+    if left_ms <= 0:
+        raise DeadlineExceeded(f"no time left for the call ({left_ms:.0f}ms)")
+    return left_ms / 1000.0
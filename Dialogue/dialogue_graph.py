@@ -3,15 +3,29 @@ Main dialogue graph orchestration.
 Composes individual nodes into a complete dialogue processing pipeline.
 """
 
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
 from langgraph.graph import StateGraph, START, END
+from Dialogue.deadline import turn_deadline
+from Dialogue.memory import ConversationMemory
+from Dialogue.metrics import record_degradations, record_turn_latency
+from Dialogue.llm.usage import merge_llm_usage
+from Dialogue.prefetch import Prefetcher
+from Dialogue.prompt_builder import split_history
+from Dialogue.profiling import end_turn_profile, profiled, profiling, start_turn_profile
 from Dialogue.state import DialogueState
+from Dialogue.trace import end_trace_turn, new_trace_turn
+from Dialogue.nodes.answer_cache import cache_answer, lookup_cached_answer, select_after_lookup
 from Dialogue.nodes.context import load_npc_context
-from Dialogue.nodes.prompt import build_prompt
+from Dialogue.nodes.prompt import build_light_prompt, build_prompt
+from Dialogue.nodes.routing import TURN_PATH_FULL, route_user_query, select_retrieval_nodes
 from Dialogue.nodes.graph_retrieval import retrieve_graph_knowledge
-from Dialogue.nodes.vector_retrieval import retrieve_vector_knowledge
+from Dialogue.nodes.vector_retrieval import expand_neighbor_facts, retrieve_vector_knowledge
 from Dialogue.nodes.llm import call_llm
 from Dialogue.nodes.format import format_response
 from Dialogue.entities.npc import NPC
+from utils.spans import NODE, TurnSpans, collect_spans, traced
 
 
 def create_dialogue_graph():
@@ -21,45 +35,73 @@ def create_dialogue_graph():
     Graph structure:
         START
           ↓
+        lookup_cached_answer (Answer cache; a hit goes straight to format_response)
+          ↓ miss
         load_npc_context     (Format NPC into system prompt)
           ↓
-        retrieve_graph_knowledge (Fetch graph facts)
-          ƒ+""
-        retrieve_vector_knowledge (Fetch vector facts)
-          ƒ+""
-        build_prompt         (Construct full prompt)
-          ↓
-        call_llm             (Call LLM API)
+        route_query          (Query spec, graph query spec, turn_path)
+          ↓ turn_path
+          ├─ light ──→ build_light_prompt (Short prompt, no facts) ─┐
+          ├─ vector ─→ retrieve_vector_knowledge ─┐                  │
+          └─ full ───→ retrieve_graph_knowledge ──┤                  │
+                       retrieve_vector_knowledge ─┤                  │
+                                                  ↓                  │
+        expand_neighbor_facts (Join: facts for graph neighbors)      │
+          ↓                                                          │
+        build_prompt         (Construct full prompt)                 │
+          ↓                                                          │
+        call_llm ←───────────────────────────────────────────────────┘
           ↓
         format_response      (Post-process response)
           ↓
+        cache_answer         (Cache history-independent answers)
+          ↓
         END
     
-    Future extensibility notes:
-    - Add conditional routing for error handling
-    - Add audit trail tracking node before format_response
+    On the full path the two retrieval branches run concurrently and the
+    join runs once after both have finished.
     
     Returns:
         A compiled LangGraph that processes dialogue turns.
     """
     graph = StateGraph(DialogueState)
     
-    # Add nodes in logical order
-    graph.add_node("load_npc", load_npc_context)
-    graph.add_node("retrieve_graph_knowledge", retrieve_graph_knowledge)
-    graph.add_node("retrieve_vector_knowledge", retrieve_vector_knowledge)
-    graph.add_node("build_prompt", build_prompt)
-    graph.add_node("call_llm", call_llm)
-    graph.add_node("format_response", format_response)
+    # Add nodes in logical order; each runs in a timing span (utils.spans)
+    nodes = [
+        ("lookup_cached_answer", lookup_cached_answer),
+        ("load_npc", load_npc_context),
+        ("route_query", route_user_query),
+        ("retrieve_graph_knowledge", retrieve_graph_knowledge),
+        ("retrieve_vector_knowledge", retrieve_vector_knowledge),
+        ("expand_neighbor_facts", expand_neighbor_facts),
+        ("build_prompt", build_prompt),
+        ("build_light_prompt", build_light_prompt),
+        ("call_llm", call_llm),
+        ("format_response", format_response),
+        ("cache_answer", cache_answer),
+    ]
+    for name, node in nodes:
+        graph.add_node(name, profiled(traced(NODE, name)(node)))
     
-    # Define edges (linear for now, can add conditionals later)
-    graph.add_edge(START, "load_npc")
-    graph.add_edge("load_npc", "retrieve_graph_knowledge")
-    graph.add_edge("retrieve_graph_knowledge", "retrieve_vector_knowledge")
-    graph.add_edge("retrieve_vector_knowledge", "build_prompt")
+    graph.add_edge(START, "lookup_cached_answer")
+    graph.add_conditional_edges("lookup_cached_answer", select_after_lookup, ["load_npc", "format_response"])
+    graph.add_edge("load_npc", "route_query")
+    graph.add_conditional_edges(
+        "route_query",
+        select_retrieval_nodes,
+        ["build_light_prompt", "retrieve_graph_knowledge", "retrieve_vector_knowledge"],
+    )
+    # The join has an edge from each branch rather than waiting on both, so
+    # it also runs when only the vector branch was taken. When both branches
+    # run they finish in the same superstep and the join still runs once.
+    graph.add_edge("retrieve_graph_knowledge", "expand_neighbor_facts")
+    graph.add_edge("retrieve_vector_knowledge", "expand_neighbor_facts")
+    graph.add_edge("expand_neighbor_facts", "build_prompt")
     graph.add_edge("build_prompt", "call_llm")
+    graph.add_edge("build_light_prompt", "call_llm")
     graph.add_edge("call_llm", "format_response")
-    graph.add_edge("format_response", END)
+    graph.add_edge("format_response", "cache_answer")
+    graph.add_edge("cache_answer", END)
     
     # Compile the graph
     return graph.compile()
@@ -69,41 +111,41 @@ def get_dialogue_graph_mermaid() -> str:
     """
     Return a Mermaid diagram of the current dialogue graph.
     """
-    return "\n".join(
-        [
-            "flowchart TD",
-            "  START([START]) --> load_npc",
-            "  load_npc --> retrieve_graph_knowledge",
-            "  retrieve_graph_knowledge --> retrieve_vector_knowledge",
-            "  retrieve_vector_knowledge --> build_prompt",
-            "  build_prompt --> call_llm",
-            "  call_llm --> format_response",
-            "  format_response --> END([END])",
-        ]
-    )
+    return create_dialogue_graph().get_graph().draw_mermaid()
 
 
-def run_dialogue_turn(graph, npc: NPC, user_input: str, conversation_history: str = "") -> str:
+def initial_dialogue_state(
+    npc: NPC,
+    user_input: str,
+    conversation_history: Union[str, ConversationMemory] = "",
+    session_id: str = "",
+    deadline_ms: Optional[float] = None,
+) -> DialogueState:
     """
-    Run a single dialogue turn through the graph.
-    
-    Args:
-        graph: The compiled dialogue graph
-        npc: The NPC character
-        user_input: User's message
-        conversation_history: Previous conversation (for context)
-        
-    Returns:
-        The NPC's formatted response
+    Graph input for one turn. A ConversationMemory is rendered into the
+    history block, and its turns become history_blocks; a string is used
+    as-is and split into blocks at its turn boundaries. The turn deadline is deadline_ms
+    from now (default: the deadline policy's turn_ms; 0 for none).
     """
-    initial_state: DialogueState = {
+    memory = conversation_history if isinstance(conversation_history, ConversationMemory) else None
+    history_blocks = memory.blocks() if memory else split_history(conversation_history)
+    return {
+        "session_id": session_id,
+        "turn_id": new_trace_turn(),
         "npc": npc,
         "user_input": user_input,
-        "conversation_history": conversation_history,
+        "conversation_history": "".join(history_blocks),
+        "history_blocks": history_blocks,
+        "memory_tokens": memory.token_counts() if memory else {},
+        "deadline": turn_deadline(deadline_ms),
+        "degradations": [],
         "system_prompt": "",
         "full_prompt": "",
+        "prompt_budget": {},
         "raw_response": "",
         "formatted_response": "",
+        "llm_usage": {},
+        "retrieval_hits": {},
         "retrieval_results": [],
         "query_spec": {},
         "graph_facts": [],
@@ -111,8 +153,124 @@ def run_dialogue_turn(graph, npc: NPC, user_input: str, conversation_history: st
         "graph_neighbor_ids": [],
         "npc_node_facts": [],
         "recent_entities": [],
+        "turn_path": "",
+        "answer_cache": {},
     }
+
+
+def run_dialogue_turn(
+    graph,
+    npc: NPC,
+    user_input: str,
+    conversation_history: Union[str, ConversationMemory] = "",
+    session_id: str = "",
+    prefetcher: Optional[Prefetcher] = None,
+) -> str:
+    """
+    Run a single dialogue turn through the graph.
+    
+    Args:
+        graph: The compiled dialogue graph
+        npc: The NPC character
+        user_input: User's message
+        conversation_history: A ConversationMemory (rendered into the prompt,
+            and the new turn is appended to it), or a pre-rendered history string
+        session_id: Server session the turn belongs to, if any
+        prefetcher: Warms caches for the next turn once this one finishes
+        
+    Returns:
+        The NPC's formatted response
+    """
+    initial_state = initial_dialogue_state(npc, user_input, conversation_history, session_id)
+    return invoke_dialogue_turn(graph, initial_state, conversation_history, prefetcher)["formatted_response"]
+
+
+def invoke_dialogue_turn(
+    graph,
+    initial_state: DialogueState,
+    conversation_history: Union[str, ConversationMemory] = "",
+    prefetcher: Optional[Prefetcher] = None,
+) -> DialogueState:
+    """
+    Run the graph on a prepared initial state, record the turn latency and,
+    if a ConversationMemory is given, append the turn to it.
     
-    result = graph.invoke(initial_state)
-    return result["formatted_response"]
+    Returns:
+        The final graph state
+    """
+    if prefetcher is not None:
+        prefetcher.cancel()
+    profile = start_turn_profile(initial_state.get("turn_id", ""))
+    started = time.perf_counter()
+    with collect_spans() as spans, profiling(profile):
+        result = graph.invoke(initial_state)
+    latency_ms = (time.perf_counter() - started) * 1000.0
+    record_turn_latency(result.get("turn_path") or TURN_PATH_FULL, latency_ms)
+    end_trace_turn(
+        initial_state.get("turn_id", ""),
+        latency_ms,
+        spans.waterfall(),
+        initial_state.get("session_id", ""),
+        result.get("llm_usage"),
+    )
+    end_turn_profile(profile, latency_ms, initial_state.get("session_id", ""))
+    record_degradations(result.get("degradations", []))
+    if isinstance(conversation_history, ConversationMemory):
+        conversation_history.add_turn(initial_state["user_input"], result["formatted_response"])
+    if prefetcher is not None:
+        prefetcher.schedule(result)
+    return result
+
 
+def stream_dialogue_turn(
+    graph,
+    npc: NPC,
+    user_input: str,
+    conversation_history: Union[str, ConversationMemory] = "",
+    session_id: str = "",
+    prefetcher: Optional[Prefetcher] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run a dialogue turn, yielding (node_name, update) as each node finishes.
+    
+    The response is the formatted_response in the format_response update.
+    Latency and memory are recorded as in run_dialogue_turn once the last
+    node has run.
+    """
+    initial_state = initial_dialogue_state(npc, user_input, conversation_history, session_id)
+    
+    if prefetcher is not None:
+        prefetcher.cancel()
+    profile = start_turn_profile(initial_state["turn_id"])
+    started = time.perf_counter()
+    turn_path = TURN_PATH_FULL
+    response = ""
+    final_state: Dict[str, Any] = {}
+    degradations = []
+    llm_usage: Dict[str, Dict[str, float]] = {}
+    spans = TurnSpans()
+    chunks = graph.stream(initial_state, stream_mode="updates")
+    while True:
+        # Spans and the profile cover only the graph running, not our yields
+        with collect_spans(spans), profiling(profile):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        for node_name, update in chunk.items():
+            update = update or {}
+            turn_path = update.get("turn_path") or turn_path
+            if "formatted_response" in update:
+                response = update["formatted_response"]
+            final_state.update(update)
+            degradations.extend(update.get("degradations", []))
+            llm_usage = merge_llm_usage(llm_usage, update.get("llm_usage", {}))
+            yield node_name, update
+    latency_ms = (time.perf_counter() - started) * 1000.0
+    record_turn_latency(turn_path, latency_ms)
+    end_trace_turn(initial_state["turn_id"], latency_ms, spans.waterfall(), session_id, llm_usage)
+    end_turn_profile(profile, latency_ms, session_id)
+    record_degradations(degradations)
+    if isinstance(conversation_history, ConversationMemory):
+        conversation_history.add_turn(user_input, response)
+    if prefetcher is not None:
+        prefetcher.schedule(final_state)
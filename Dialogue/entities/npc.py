@@ -1,5 +1,19 @@
 # NPC entity (minimal; details live in the graph + facts)
 class NPC:
-    def __init__(self, entity_id: str, name: str):
+    def __init__(self, entity_id: str, name: str, context_cache=None):
         self.entity_id = entity_id
         self.name = name
+        # NPCContextCache this NPC resolves its context through; None means
+        # the shared process-wide cache.
+        self.context_cache = context_cache
+
+    def context(self):
+        """
+        Cached NPCContext (entity, system prompt, node facts, location) for
+        the current world version.
+        """
+        if self.context_cache is None:
+            from Dialogue.entities.npc_context import get_npc_context_cache
+
+            self.context_cache = get_npc_context_cache()
+        return self.context_cache.get(self)
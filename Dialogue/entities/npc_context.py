@@ -0,0 +1,138 @@
+"""
+Per-NPC context that is stable between turns.
+
+Resolving the NPC's graph entity, rendering its profile into a system prompt
+and collecting its node facts only change when the world does, so they are
+built once per (entity_id, world version) and kept in a bounded LRU shared
+by every NPC. Deployments with thousands of NPCs keep only the recently
+active ones resident.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from config import NPC_CONTEXT_CACHE_SIZE
+from Dialogue.prompts.system_prompt import get_npc_system_prompt
+from utils.lru import LRUCache, is_missing
+from World.graph_store import GraphEntity, get_world_graph
+from World.verbalize import NPC_PROFILE_KEYS, get_fact_verbalizer
+
+
+@dataclass(frozen=True)
+class NPCContext:
+    entity_id: str
+    world_version: int
+    entity: Optional[GraphEntity]
+    system_prompt: str
+    node_facts: List[Dict[str, str]] = field(default_factory=list)
+    location: str = ""
+
+
+class NPCContextCache:
+    """
+    LRU of NPCContext keyed by (entity_id, world version).
+
+    Entries from an older world version are never served: the key changes
+    when the version does, and the stale entries age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = NPC_CONTEXT_CACHE_SIZE, graph=None):
+        self._graph = graph
+        self._cache = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def graph(self):
+        return self._graph if self._graph is not None else get_world_graph()
+
+    def _world_version(self) -> int:
+        version_fn = getattr(self.graph, "world_version", None)
+        return int(version_fn()) if version_fn else 0
+
+    @staticmethod
+    def _key_id(npc) -> str:
+        return getattr(npc, "entity_id", "") or getattr(npc, "name", "")
+
+    def get(self, npc) -> NPCContext:
+        version = self._world_version()
+        key: Tuple[str, int] = (self._key_id(npc), version)
+        context = self._cache.get(key)
+        if not is_missing(context):
+            with self._lock:
+                self.hits += 1
+            return context
+
+        context = self._build(npc, version)
+        self._cache.put(key, context)
+        with self._lock:
+            self.misses += 1
+        return context
+
+    def _build(self, npc, version: int) -> NPCContext:
+        graph = self.graph
+        entity = graph.get_entity(getattr(npc, "entity_id", "")) or graph.get_entity_by_name(
+            getattr(npc, "name", "")
+        )
+        if entity:
+            verbalizer = get_fact_verbalizer()
+            npc_profile = verbalizer.npc_profile(entity)
+            node_facts = verbalizer.entity_facts(entity, keys=NPC_PROFILE_KEYS)
+            location = str(entity.properties.get("location") or "")
+        else:
+            npc_profile = f"Character Profile: {getattr(npc, 'name', '')}"
+            node_facts = []
+            location = ""
+        return NPCContext(
+            entity_id=entity.entity_id if entity else self._key_id(npc),
+            world_version=version,
+            entity=entity,
+            system_prompt=get_npc_system_prompt(npc_profile),
+            node_facts=node_facts,
+            location=location,
+        )
+
+    def invalidate(self, entity_id: Optional[str] = None) -> None:
+        """
+        Drop one NPC's contexts (all versions), or everything when no id is given.
+        """
+        if entity_id is None:
+            self._cache.clear()
+            return
+        for key, _context in self._cache.items():
+            if key[0] == entity_id:
+                self._cache.pop(key)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "entries": len(self._cache),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "evictions": self._cache.evictions,
+        }
+
+
+_NPC_CONTEXT_CACHE_INSTANCE: Optional[NPCContextCache] = None
+
+
+def get_npc_context_cache() -> NPCContextCache:
+    global _NPC_CONTEXT_CACHE_INSTANCE
+    if _NPC_CONTEXT_CACHE_INSTANCE is None:
+        _NPC_CONTEXT_CACHE_INSTANCE = NPCContextCache()
+    return _NPC_CONTEXT_CACHE_INSTANCE
+
+
+def npc_context_for(npc) -> NPCContext:
+    """
+    Context for `npc` via its own cache handle, or the shared cache for
+    NPC-like objects that have none.
+    """
+    if hasattr(npc, "context"):
+        return npc.context()
+    return get_npc_context_cache().get(npc)
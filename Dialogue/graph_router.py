@@ -1,6 +1,8 @@
 import json
+import re
 from typing import Dict, List
 
+from Dialogue.deadline import call_timeout
 from Dialogue.graph_router_models import GraphQuerySpec, GraphIntent
 from Dialogue.llm.provider import LLMProvider
 
@@ -75,14 +77,19 @@ def route_graph_query(
     user_text: str,
     entities: List[Dict[str, str]],
     available_edge_types: List[str],
+    deadline: float = 0.0,
 ) -> GraphQuerySpec:
+    """
+    Route with the LLM. With a turn deadline each call only waits until the
+    answer reserve; raises TimeoutError when routing cannot finish in time.
+    """
     prompt = (
         f"{GRAPH_SYSTEM_PROMPT}\n\n"
         f"{GRAPH_DEV_PROMPT}\n\n"
         f"{_build_user_block(user_text, entities, available_edge_types)}"
     )
 
-    raw = LLMProvider.generate(prompt)
+    raw = LLMProvider.generate(prompt, timeout=call_timeout(deadline))
     json_blob = _extract_json(raw)
     if json_blob:
         try:
@@ -95,7 +102,7 @@ def route_graph_query(
         "Your previous output was invalid JSON. Output ONLY valid JSON.\n\n"
         f"{_build_user_block(user_text, entities, available_edge_types)}"
     )
-    raw_retry = LLMProvider.generate(retry_prompt)
+    raw_retry = LLMProvider.generate(retry_prompt, timeout=call_timeout(deadline))
     json_blob = _extract_json(raw_retry)
     if json_blob:
         try:
@@ -104,3 +111,53 @@ def route_graph_query(
             pass
 
     return _fallback_spec()
+
+
+# Keyword rules for route_graph_query_locally, checked in order.
+LOCAL_GRAPH_RULES = (
+    (
+        re.compile(r"\b(owns?|owner|owned|belongs?|inherit(ed|s)?)\b", re.IGNORECASE),
+        GraphIntent.OWNERSHIP,
+        ["OWNS", "OWNED", "INHERITED_FROM"],
+    ),
+    (
+        re.compile(r"\b(sister|brother|father|mother|son|daughter|uncle|aunt|family|related|kin)\b", re.IGNORECASE),
+        GraphIntent.RELATIONSHIP,
+        ["KINSHIP"],
+    ),
+    (
+        re.compile(r"\b(member|members|works? for|serves?|leads?|leader)\b", re.IGNORECASE),
+        GraphIntent.MEMBERSHIP,
+        ["OPERATES_IN", "INVOLVED_IN"],
+    ),
+    (
+        re.compile(r"\b(why|caused?|because|led to)\b", re.IGNORECASE),
+        GraphIntent.CAUSALITY,
+        ["CAUSES", "INVOLVED_IN", "HAPPENED_AT"],
+    ),
+    (
+        re.compile(r"\b(where|located|find|road|route|sail)\b", re.IGNORECASE),
+        GraphIntent.LOCATION,
+        ["LOCATED_IN", "OPERATES_IN", "CONNECTS"],
+    ),
+)
+
+
+def route_graph_query_locally(
+    user_text: str,
+    entities: List[Dict[str, str]],
+    available_edge_types: List[str],
+) -> GraphQuerySpec:
+    """
+    Pick graph intent and edge types from keyword rules instead of the LLM.
+    Without a named entity there is nothing to traverse from.
+    """
+    if entities:
+        for pattern, graph_intent, edge_types in LOCAL_GRAPH_RULES:
+            if pattern.search(user_text):
+                return GraphQuerySpec(
+                    graph_intent=graph_intent,
+                    edge_types=[edge for edge in edge_types if edge in available_edge_types],
+                    reason="local keyword routing",
+                )
+    return GraphQuerySpec(graph_intent=GraphIntent.NONE, edge_types=[], reason="local keyword routing")
@@ -1,10 +1,47 @@
+"""
+Live trace viewer (`python main.py --live-viewer`).
+
+Endpoints:
+    GET /                   viewer page; ?node=a,b and ?session=... filter it
+    GET /stream             Server-Sent Events: a "trace" event per trace event
+                            as soon as the trace writer has written it, "missed"
+                            when events were evicted before this client got them
+                            (?since=<id> or Last-Event-ID, ?node=, ?session=)
+    GET /events?since=<id>  the same events as one JSON batch, for polling
+    GET /state?id=<id>      full state after one trace event
+    GET /metrics            turn, span and token metrics in the Prometheus
+                            text format (Dialogue.metrics)
+
+Each request is handled on its own thread. Stream threads wait on the trace
+writer, collect events for STREAM_COALESCE_SECONDS and send the JSON lines
+the writer already encoded, so viewers cost the dialogue threads little
+more than one notify per written batch. A turn's turn_spans event is drawn
+as a waterfall of its node, LLM, vector and graph-store spans. Responses over
+GZIP_MIN_BYTES, and streams, are gzipped for clients that accept it.
+"""
+
+import gzip
 import json
+import logging
 import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Set
 from urllib.parse import parse_qs, urlparse
 
-from Dialogue.trace import get_events_since, trace_enabled
+from Dialogue.metrics import prometheus_text
+from Dialogue.trace import get_events_since, get_trace_event, get_trace_sink, trace_enabled
+from Dialogue.trace_reader import lookup_state
+
 
+LOGGER = logging.getLogger(__name__)
+
+GZIP_MIN_BYTES = 1024
+# A stream with nothing to send writes an SSE comment this often, to notice closed clients
+KEEPALIVE_SECONDS = 15.0
+# Once woken, a stream waits this long for more events, so a busy trace is sent in batches
+STREAM_COALESCE_SECONDS = 0.05
 
 HTML_PAGE = """<!doctype html>
 <html>
@@ -19,74 +56,263 @@ HTML_PAGE = """<!doctype html>
       .time { color: #94a3b8; font-size: 12px; }
       pre { white-space: pre-wrap; word-break: break-word; background: #0b1220; padding: 8px; border-radius: 6px; }
       .state-key { color: #facc15; }
+      .changed { color: #94a3b8; font-size: 12px; }
+      button { background: #334155; color: #e2e8f0; border: 0; padding: 4px 8px; border-radius: 4px; cursor: pointer; }
+      input { background: #0b1220; color: #e2e8f0; border: 1px solid #334155; padding: 4px; border-radius: 4px; }
+      form { margin-bottom: 12px; }
+      .span-row { display: flex; align-items: center; font-size: 12px; height: 18px; }
+      .span-name { width: 260px; flex: none; overflow: hidden; white-space: nowrap; text-overflow: ellipsis; }
+      .span-track { position: relative; flex: 1; height: 12px; }
+      .span-bar { position: absolute; height: 12px; border-radius: 2px; min-width: 1px; }
+      .span-node { background: #38bdf8; } .span-llm { background: #f472b6; }
+      .span-vector { background: #a3e635; } .span-graph { background: #facc15; }
+      .span-ms { width: 80px; flex: none; text-align: right; color: #94a3b8; }
     </style>
   </head>
   <body>
     <h1>World Dialogue Trace Viewer</h1>
+    <form>
+      <input name="node" placeholder="nodes (comma-separated)">
+      <input name="session" placeholder="session id">
+      <button type="submit">Filter</button>
+      <span id="status" class="changed"></span>
+    </form>
     <div id="events"></div>
     <script>
-      let lastId = 0;
+      const MAX_RENDERED = 500;
       const eventsEl = document.getElementById("events");
+      const statusEl = document.getElementById("status");
+      const params = new URLSearchParams(location.search);
+      for (const name of ["node", "session"]) {
+        document.querySelector(`input[name=${name}]`).value = params.get(name) || "";
+      }
+
+      function prepend(element) {
+        eventsEl.prepend(element);
+        while (eventsEl.children.length > MAX_RENDERED) {
+          eventsEl.lastChild.remove();
+        }
+      }
+
+      function renderWaterfall(event) {
+        const wrapper = document.createElement("div");
+        wrapper.className = "event";
+        const session = event.session_id ? ` · session ${event.session_id}` : "";
+        wrapper.innerHTML = `
+          <div class="node">turn ${event.turn_id} · ${event.latency_ms.toFixed(1)}ms</div>
+          <div class="time">${new Date(event.timestamp * 1000).toLocaleTimeString()}${session}</div>
+        `;
+        const total = Math.max(event.latency_ms, ...event.spans.map((s) => s.start_ms + s.duration_ms));
+        const depth = {};
+        for (const s of event.spans) {
+          depth[s.id] = s.parent in depth ? depth[s.parent] + 1 : 0;
+          const attrs = Object.entries(s.attrs).map(([k, v]) => `${k}=${v}`).join(" ");
+          const row = document.createElement("div");
+          row.className = "span-row";
+          row.title = `${s.kind} ${s.name} ${attrs}`;
+          row.innerHTML = `
+            <div class="span-name" style="padding-left: ${depth[s.id] * 12}px">${s.kind} · ${s.name}</div>
+            <div class="span-track"><div class="span-bar span-${s.kind}"
+              style="left: ${(100 * s.start_ms / total).toFixed(2)}%; width: ${(100 * s.duration_ms / total).toFixed(2)}%"></div></div>
+            <div class="span-ms">${s.duration_ms.toFixed(2)}ms</div>
+          `;
+          wrapper.appendChild(row);
+        }
+        prepend(wrapper);
+      }
 
       function renderEvent(event) {
+        if (event.spans) {
+          renderWaterfall(event);
+          return;
+        }
         const wrapper = document.createElement("div");
         wrapper.className = "event";
         const time = new Date(event.timestamp * 1000).toLocaleTimeString();
+        const delta = event.delta || event.state || {};
+        const label = event.keyframe === false ? `changed: ${Object.keys(delta).join(", ") || "nothing"}` : "full state";
+        const session = event.session_id ? ` · session ${event.session_id}` : "";
         wrapper.innerHTML = `
           <div class="node">${event.node}</div>
-          <div class="time">${time}</div>
-          <pre>${JSON.stringify(event.state, null, 2)}</pre>
+          <div class="time">${time} · turn ${event.turn_id || "-"}${session}</div>
+          <div class="changed">${label}</div>
+          <pre>${JSON.stringify(delta, null, 2)}</pre>
         `;
-        eventsEl.prepend(wrapper);
+        if (event.keyframe === false) {
+          const button = document.createElement("button");
+          button.textContent = "Show full state";
+          button.onclick = async () => {
+            const resp = await fetch(`/state?id=${event.id}`);
+            const state = await resp.json();
+            wrapper.querySelector("pre").textContent = resp.ok ? JSON.stringify(state, null, 2) : state.error;
+            button.remove();
+          };
+          wrapper.appendChild(button);
+        }
+        prepend(wrapper);
       }
 
-      async function poll() {
-        const resp = await fetch(`/events?since=${lastId}`);
-        const data = await resp.json();
-        data.events.forEach(renderEvent);
-        lastId = data.next_id;
-        setTimeout(poll, 1000);
-      }
-
-      poll();
+      const source = new EventSource(`/stream?${params}`);
+      source.addEventListener("trace", (message) => renderEvent(JSON.parse(message.data)));
+      source.addEventListener("missed", (message) => {
+        const notice = document.createElement("div");
+        notice.className = "changed";
+        notice.textContent = `${JSON.parse(message.data).missed} events not shown (evicted from the trace buffer; see trace.jsonl)`;
+        prepend(notice);
+      });
+      source.onopen = () => { statusEl.textContent = "live"; };
+      source.onerror = () => { statusEl.textContent = "reconnecting..."; };
     </script>
   </body>
 </html>
 """
 
 
+class EventFilter:
+    """
+    Which trace events a client asked for (?node=a,b&session=...).
+    """
+
+    def __init__(self, params: Dict[str, List[str]]):
+        nodes = ",".join(params.get("node", []))
+        self.nodes: Set[str] = {node.strip() for node in nodes.split(",") if node.strip()}
+        self.session = params.get("session", [""])[0].strip()
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.nodes and event.get("node") not in self.nodes:
+            return False
+        if self.session and event.get("session_id", "") != self.session:
+            return False
+        return True
+
+
+class _GzipStream:
+    """
+    Gzip over a response stream, flushed (Z_SYNC_FLUSH) on every write so
+    each SSE batch reaches the browser right away.
+    """
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def write(self, data: bytes) -> None:
+        self._wfile.write(self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._wfile.flush()
+
+
+class _PlainStream:
+    def __init__(self, wfile):
+        self._wfile = wfile
+
+    def write(self, data: bytes) -> None:
+        self._wfile.write(data)
+        self._wfile.flush()
+
+
+class TraceViewerServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
 class TraceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
     def do_GET(self):
-        if self.path.startswith("/events"):
-            if not trace_enabled():
-                self._send_json({"events": [], "next_id": 0})
-                return
-            parsed = urlparse(self.path)
-            params = parse_qs(parsed.query)
-            since = int(params.get("since", ["0"])[0])
-            events, next_id = get_events_since(since)
-            self._send_json({"events": events, "next_id": next_id})
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        try:
+            if parsed.path == "/stream":
+                self._stream(params)
+            elif parsed.path == "/events":
+                self._events(params)
+            elif parsed.path == "/state":
+                self._state(params)
+            elif parsed.path == "/metrics":
+                self._send_body(prometheus_text().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+            else:
+                self._send_body(HTML_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+        except (BrokenPipeError, ConnectionResetError):
+            LOGGER.debug("Trace viewer client went away")
+
+    def log_message(self, format, *args):  # noqa: N802
+        return
+
+    def _accepts_gzip(self) -> bool:
+        return "gzip" in self.headers.get("Accept-Encoding", "")
+
+    def _events(self, params: Dict[str, List[str]]) -> None:
+        if not trace_enabled():
+            self._send_json({"events": [], "next_id": 0, "missed": 0})
+            return
+        since = int(params.get("since", ["0"])[0])
+        events, next_id, missed = get_events_since(since)
+        event_filter = EventFilter(params)
+        events = [event for event in events if event_filter.matches(event)]
+        self._send_json({"events": events, "next_id": next_id, "missed": missed})
+
+    def _state(self, params: Dict[str, List[str]]) -> None:
+        state = lookup_state(get_trace_event, int(params.get("id", ["0"])[0]))
+        if state is None:
+            self._send_json({"error": "event no longer buffered"}, status=404)
             return
+        self._send_json(state)
 
+    def _stream(self, params: Dict[str, List[str]]) -> None:
+        last_id = int(self.headers.get("Last-Event-ID") or params.get("since", ["0"])[0])
+        event_filter = EventFilter(params)
+        compress = self._accepts_gzip()
         self.send_response(200)
-        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Connection", "close")
         self.end_headers()
-        self.wfile.write(HTML_PAGE.encode("utf-8"))
+        self.close_connection = True
+        out = _GzipStream(self.wfile) if compress else _PlainStream(self.wfile)
 
-    def log_message(self, format, *args):  # noqa: N802
-        return
+        sink = get_trace_sink()
+        while True:
+            current = get_trace_sink()
+            if current is not sink:
+                # Tracing was restarted: event ids start over
+                sink, last_id = current, 0
+            if sink is None:
+                out.write(b": tracing off\n\n")
+                time.sleep(KEEPALIVE_SECONDS)
+                continue
+            if not sink.wait_for_events(last_id, KEEPALIVE_SECONDS):
+                out.write(b": keepalive\n\n")
+                continue
+            time.sleep(STREAM_COALESCE_SECONDS)
+            entries, last_id, missed = sink.entries_since(last_id)
+            chunks = []
+            if missed:
+                chunks.append(f"event: missed\ndata: {json.dumps({'missed': missed})}\n\n")
+            for event, line in entries:
+                if event_filter.matches(event):
+                    chunks.append(f"id: {event['id']}\nevent: trace\ndata: {line.rstrip()}\n\n")
+            if chunks:
+                out.write("".join(chunks).encode("utf-8"))
 
-    def _send_json(self, payload):
-        body = json.dumps(payload).encode("utf-8")
-        self.send_response(200)
-        self.send_header("Content-Type", "application/json")
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        self._send_body(json.dumps(payload).encode("utf-8"), "application/json", status)
+
+    def _send_body(self, body: bytes, content_type: str, status: int = 200) -> None:
+        compressed = len(body) >= GZIP_MIN_BYTES and self._accepts_gzip()
+        if compressed:
+            body = gzip.compress(body, compresslevel=6)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
         self.send_header("Content-Length", str(len(body)))
         self.end_headers()
         self.wfile.write(body)
 
 
-def start_trace_server(port: int = 8765) -> HTTPServer:
-    server = HTTPServer(("127.0.0.1", port), TraceHandler)
+def start_trace_server(port: int = 8765, host: str = "127.0.0.1") -> TraceViewerServer:
+    server = TraceViewerServer((host, port), TraceHandler)
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
     return server
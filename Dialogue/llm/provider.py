@@ -5,34 +5,88 @@ Currently supports:
   - LM Studio (local OpenAI-compatible API)
 """
 
+import dataclasses
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Optional
 try:
+    import httpx
     from google import genai
+    from google.genai import types as genai_types
 except ImportError:  # pragma: no cover
     genai = None
 import requests
 import json
+from Dialogue.llm.usage import LLMResult, LLMUsage, record_llm_call
+from Dialogue.tokens import estimate_tokens
 from config import (
     LLM_PROVIDER,
     Vertex_API_KEY,
     LMSTUDIO_HOST,
     LMSTUDIO_PORT,
     LMSTUDIO_MODEL,
+    LMSTUDIO_TIMEOUT_SECONDS,
 )
+from utils.ids import text_digest
+from utils.spans import LLM, current_span_name, span
+
+
+class LLMTimeout(TimeoutError):
+    """Raised when a generate() call with a timeout does not finish in time."""
+
+
+LLM_EXECUTOR_WORKERS = 32
+_LLM_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LLM_EXECUTOR_LOCK = threading.Lock()
+# One per worker; held from submit until the call returns, even if its caller gave up
+_LLM_EXECUTOR_SLOTS = threading.BoundedSemaphore(LLM_EXECUTOR_WORKERS)
+
+
+def _llm_executor() -> ThreadPoolExecutor:
+    """
+    Threads for calls made with a timeout to providers that cannot time out
+    their own requests (see BaseLLMProvider.supports_timeout). A call that
+    times out keeps its thread until the provider returns.
+    """
+    global _LLM_EXECUTOR
+    if _LLM_EXECUTOR is None:
+        with _LLM_EXECUTOR_LOCK:
+            if _LLM_EXECUTOR is None:
+                _LLM_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_EXECUTOR_WORKERS, thread_name_prefix="llm-call")
+    return _LLM_EXECUTOR
 
 
 class BaseLLMProvider(ABC):
     """Abstract base class for LLM providers."""
+
+    # True if complete() bounds the request itself by its `timeout` (raising LLMTimeout)
+    supports_timeout = False
     
     @abstractmethod
     def generate(self, prompt: str) -> str:
         """Generate a response from a prompt."""
         pass
 
+    def complete(self, prompt: str, timeout: Optional[float] = None) -> LLMResult:
+        """
+        Generate a response with its usage. Providers whose backend reports
+        token counts override this; the default estimates them from the text
+        and ignores `timeout` (LLMProvider runs such calls on a worker thread
+        to bound them).
+        """
+        text = self.generate(prompt)
+        return LLMResult(
+            text=text,
+            usage=LLMUsage(prompt_tokens=estimate_tokens(prompt), completion_tokens=estimate_tokens(text or "")),
+        )
+
 
 class GoogleLLMProvider(BaseLLMProvider):
     """Google Generative AI provider."""
+
+    supports_timeout = True
     
     def __init__(self, model_name: str = "gemini-2.0-flash", api_key: Optional[str] = None):
         """
@@ -53,18 +107,43 @@ class GoogleLLMProvider(BaseLLMProvider):
     
     def generate(self, prompt: str) -> str:
         """Generate a response from Google Generative AI."""
+        return self.complete(prompt).text
+
+    def complete(self, prompt: str, timeout: Optional[float] = None) -> LLMResult:
+        """
+        Generate a response with the token counts from the response's
+        usage_metadata. `timeout` (seconds) bounds the HTTP request.
+        """
+        config = None
+        if timeout is not None:
+            config = genai_types.GenerateContentConfig(
+                http_options=genai_types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+            )
         try:
             response = self.client.models.generate_content(
                 model=self.model_name,
                 contents=prompt,
+                config=config,
             )
-            return response.text
+        except httpx.TimeoutException:
+            raise LLMTimeout(f"Google LLM call did not finish within {timeout:.2f}s")
         except Exception as e:
             raise Exception(f"Google LLM generation failed: {e}")
+        text = response.text
+        metadata = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(metadata, "prompt_token_count", None)
+        completion_tokens = getattr(metadata, "candidates_token_count", None)
+        if prompt_tokens is None and completion_tokens is None:
+            usage = LLMUsage(prompt_tokens=estimate_tokens(prompt), completion_tokens=estimate_tokens(text or ""))
+        else:
+            usage = LLMUsage(prompt_tokens=prompt_tokens or 0, completion_tokens=completion_tokens or 0, reported=True)
+        return LLMResult(text=text, usage=usage)
 
 
 class LMStudioLLMProvider(BaseLLMProvider):
     """LM Studio local LLM provider (OpenAI-compatible API)."""
+
+    supports_timeout = True
     
     def __init__(
         self,
@@ -87,6 +166,16 @@ class LMStudioLLMProvider(BaseLLMProvider):
     
     def generate(self, prompt: str) -> str:
         """Generate a response from LM Studio."""
+        return self.complete(prompt).text
+
+    def complete(self, prompt: str, timeout: Optional[float] = None) -> LLMResult:
+        """
+        Generate a response with the token counts from the OpenAI-style
+        `usage` field and, when the server reports them (llama.cpp
+        `timings`), its prompt and generation times. `timeout` (seconds,
+        at most LMSTUDIO_TIMEOUT_SECONDS) bounds the request; the response
+        is not streamed, so the read timeout covers the whole generation.
+        """
         try:
             payload = {
                 "model": self.model,
@@ -101,12 +190,12 @@ class LMStudioLLMProvider(BaseLLMProvider):
             response = requests.post(
                 self.api_url,
                 json=payload,
-                timeout=60,
+                timeout=LMSTUDIO_TIMEOUT_SECONDS if timeout is None else min(timeout, LMSTUDIO_TIMEOUT_SECONDS),
             )
             response.raise_for_status()
             
             result = response.json()
-            return result["choices"][0]["message"]["content"]
+            text = result["choices"][0]["message"]["content"]
         
         except requests.exceptions.ConnectionError:
             raise Exception(
@@ -114,10 +203,27 @@ class LMStudioLLMProvider(BaseLLMProvider):
                 f"Make sure LM Studio is running and configured to listen on port {self.port}."
             )
         except requests.exceptions.Timeout:
+            if timeout is not None:
+                raise LLMTimeout(f"LM Studio call did not finish within {timeout:.2f}s")
             raise Exception("LM Studio request timed out. Model may be processing a large prompt.")
         except Exception as e:
             raise Exception(f"LM Studio generation failed: {e}")
 
+        usage = result.get("usage") or {}
+        if "prompt_tokens" in usage or "completion_tokens" in usage:
+            llm_usage = LLMUsage(
+                prompt_tokens=usage.get("prompt_tokens") or 0,
+                completion_tokens=usage.get("completion_tokens") or 0,
+                reported=True,
+            )
+        else:
+            llm_usage = LLMUsage(prompt_tokens=estimate_tokens(prompt), completion_tokens=estimate_tokens(text or ""))
+        timings = result.get("timings") or {}
+        server_ms = None
+        if "prompt_ms" in timings or "predicted_ms" in timings:
+            server_ms = float(timings.get("prompt_ms") or 0.0) + float(timings.get("predicted_ms") or 0.0)
+        return LLMResult(text=text, usage=llm_usage, server_ms=server_ms)
+
 
 class LLMProvider:
     """Factory class for creating the appropriate LLM provider."""
@@ -149,15 +255,123 @@ class LLMProvider:
         return cls._instance
     
     @classmethod
-    def generate(cls, prompt: str) -> str:
+    def set_provider(cls, provider: Optional[BaseLLMProvider]) -> None:
+        """
+        Use `provider` for all subsequent calls instead of the configured one.
+        Passing None restores the LLM_PROVIDER default on the next call.
+        """
+        cls._instance = provider
+    
+    @classmethod
+    def generate(cls, prompt: str, timeout: Optional[float] = None) -> str:
         """
         Generate a response using the configured provider.
         
         Args:
             prompt: The full prompt to send to the LLM
+            timeout: Seconds to wait for the response; None waits for the
+                provider's own timeout
             
         Returns:
             The LLM's response text
+            
+        Raises:
+            LLMTimeout: If the response did not arrive within `timeout`
+        
+        Same as complete(prompt, timeout).text.
+        """
+        return cls.complete(prompt, timeout).text
+    
+    @classmethod
+    def complete(cls, prompt: str, timeout: Optional[float] = None) -> LLMResult:
+        """
+        Generate a response using the configured provider, with its usage
+        and timing.
+        
+        Args:
+            prompt: The full prompt to send to the LLM
+            timeout: Seconds to wait for the response; None waits for the
+                provider's own timeout
+            
+        Returns:
+            An LLMResult; wall_ms is the provider call's own duration
+            
+        Raises:
+            LLMTimeout: If the response did not arrive within `timeout`
+        
+        Providers that support it get `timeout` themselves and cancel the
+        request when it runs out. Others run on the llm-call pool and are
+        abandoned (left to finish) on timeout; when every pool thread is
+        held by such a call, a new call fails at once instead of queueing
+        behind them.
+        
+        The call is timed as an "llm" span named after the node it is made
+        from, with the prompt and completion token counts (reported by the
+        backend, else estimated: usage_estimated), the backend and network
+        time when the backend reports its own, the cost, the prompt digest
+        and the response (what Dialogue.llm.replay serves back). The result
+        also goes to the enclosing collect_llm_calls() block, if any; so
+        does a timed-out call, with estimated prompt usage (see
+        Dialogue.llm.usage).
         """
         provider = cls.get_provider()
-        return provider.generate(prompt)
+        started = time.perf_counter()
+        with span(
+            LLM,
+            current_span_name() or "other",
+            prompt_tokens=estimate_tokens(prompt),
+            prompt_sha=text_digest(prompt),
+        ) as attrs:
+            try:
+                if timeout is None or provider.supports_timeout:
+                    result = _timed_complete(provider, prompt, timeout)
+                else:
+                    result = _complete_on_pool(provider, prompt, timeout)
+            except LLMTimeout:
+                # The backend may still have processed (and billed) the prompt
+                timed_out = LLMResult(
+                    text="",
+                    usage=LLMUsage(prompt_tokens=estimate_tokens(prompt)),
+                    wall_ms=(time.perf_counter() - started) * 1000.0,
+                    timed_out=True,
+                )
+                _annotate_span(attrs, timed_out)
+                record_llm_call(timed_out)
+                raise
+            _annotate_span(attrs, result)
+            attrs["response"] = result.text
+        record_llm_call(result)
+        return result
+
+
+def _annotate_span(attrs: dict, result: LLMResult) -> None:
+    attrs["prompt_tokens"] = result.usage.prompt_tokens
+    attrs["completion_tokens"] = result.usage.completion_tokens
+    attrs["usage_estimated"] = not result.usage.reported
+    attrs["cost_usd"] = result.usage.cost_usd()
+    if result.server_ms is not None:
+        attrs["server_ms"] = result.server_ms
+        attrs["network_ms"] = result.network_ms
+    if result.timed_out:
+        attrs["timed_out"] = True
+
+
+def _timed_complete(provider: BaseLLMProvider, prompt: str, timeout: Optional[float] = None) -> LLMResult:
+    started = time.perf_counter()
+    result = provider.complete(prompt, timeout)
+    return dataclasses.replace(result, wall_ms=(time.perf_counter() - started) * 1000.0)
+
+
+def _complete_on_pool(provider: BaseLLMProvider, prompt: str, timeout: float) -> LLMResult:
+    if not _LLM_EXECUTOR_SLOTS.acquire(blocking=False):
+        raise LLMTimeout("no free LLM worker (every one is held by a call that timed out)")
+    try:
+        future = _llm_executor().submit(_timed_complete, provider, prompt)
+    except BaseException:
+        _LLM_EXECUTOR_SLOTS.release()
+        raise
+    future.add_done_callback(lambda _future: _LLM_EXECUTOR_SLOTS.release())
+    try:
+        return future.result(timeout=max(0.0, timeout))
+    except FutureTimeoutError:
+        raise LLMTimeout(f"LLM call did not finish within {timeout:.2f}s")
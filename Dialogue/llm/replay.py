@@ -0,0 +1,130 @@
+"""
+Deterministic LLM provider that replays responses recorded in a trace.
+
+A traced turn's turn_spans event holds every LLM call of the turn: the
+prompt digest, the response and the call duration (see
+LLMProvider.generate). ReplayLLMProvider serves those responses back by
+prompt digest, so a recorded conversation set can be run again offline
+with the same prompts producing the same answers. A prompt recorded more
+than once gets its recorded responses in order, cycling.
+
+Replay latency is set by ReplayLatency: the recorded call durations
+(scaled), a fixed model (base plus per-token costs), or none.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from Dialogue.llm.provider import BaseLLMProvider
+from Dialogue.tokens import estimate_tokens
+from Dialogue.trace_reader import read_events
+from utils.ids import text_digest
+from utils.spans import LLM
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReplayMiss(KeyError):
+    """Raised when a prompt has no recorded response and there is no fallback."""
+
+
+@dataclass(frozen=True)
+class ReplayLatency:
+    """
+    How long a replayed call takes. With `recorded`, the original call's
+    duration times `scale`; otherwise base_ms plus per-token costs (token
+    counts estimated from the prompt and the response).
+    """
+
+    recorded: bool = False
+    scale: float = 1.0
+    base_ms: float = 0.0
+    ms_per_prompt_token: float = 0.0
+    ms_per_completion_token: float = 0.0
+
+    def delay_ms(self, prompt: str, response: str, recorded_ms: float) -> float:
+        if self.recorded:
+            return recorded_ms * self.scale
+        return (
+            self.base_ms
+            + self.ms_per_prompt_token * estimate_tokens(prompt)
+            + self.ms_per_completion_token * estimate_tokens(response)
+        )
+
+
+def load_recorded_calls(trace_path: str) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Prompt digest -> [(response, duration_ms), ...] in recorded order, from
+    the turn_spans events of a trace file and its rotated predecessors.
+    """
+    calls: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+    for event in read_events(trace_path):
+        for span in event.get("spans", []):
+            attrs = span.get("attrs", {})
+            if span.get("kind") != LLM or "prompt_sha" not in attrs or attrs.get("response") is None:
+                continue
+            calls[attrs["prompt_sha"]].append((attrs["response"], span.get("duration_ms", 0.0)))
+    return dict(calls)
+
+
+class ReplayLLMProvider(BaseLLMProvider):
+    """
+    Serves recorded responses by prompt digest. Prompts that were never
+    recorded go to `fallback` if given (and are counted as misses), else
+    raise ReplayMiss.
+    """
+
+    def __init__(
+        self,
+        calls: Dict[str, List[Tuple[str, float]]],
+        latency: Optional[ReplayLatency] = None,
+        fallback: Optional[BaseLLMProvider] = None,
+    ):
+        self.calls = calls
+        self.latency = latency or ReplayLatency()
+        self.fallback = fallback
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_trace(
+        cls,
+        trace_path: str,
+        latency: Optional[ReplayLatency] = None,
+        fallback: Optional[BaseLLMProvider] = None,
+    ) -> "ReplayLLMProvider":
+        calls = load_recorded_calls(trace_path)
+        if not calls:
+            LOGGER.warning("No recorded LLM calls in %s (was it traced with every turn sampled?)", trace_path)
+        return cls(calls, latency, fallback)
+
+    def generate(self, prompt: str) -> str:
+        digest = text_digest(prompt)
+        with self._lock:
+            recorded = self.calls.get(digest)
+            if recorded:
+                position = self._positions[digest]
+                self._positions[digest] = position + 1
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not recorded:
+            if self.fallback is None:
+                raise ReplayMiss(f"no recorded response for prompt {digest}")
+            return self.fallback.generate(prompt)
+        response, recorded_ms = recorded[position % len(recorded)]
+        delay_ms = self.latency.delay_ms(prompt, response, recorded_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"prompts": len(self.calls), "hits": self.hits, "misses": self.misses}
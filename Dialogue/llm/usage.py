@@ -0,0 +1,133 @@
+"""
+LLM call results and per-turn usage accounting.
+
+Providers return an LLMResult: the text, token usage (as reported by the
+backend, or estimated from the text when it reports none), the wall time
+of the call and, when the backend reports it, the time it spent on the
+request itself (server_ms), so the rest is time on the network and in
+queues.
+
+A call that times out still gets a result, flagged timed_out, with the
+prompt tokens estimated and no completion: the backend may have processed
+(and billed) the prompt, but what it generated is unknown.
+
+Nodes that call the LLM wrap their work in collect_llm_calls() and add
+llm_usage_update(node, calls) to their state update; the llm_usage state
+field sums these per node through the merge_llm_usage reducer.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from config import LLM_COMPLETION_COST_PER_MTOK, LLM_PROMPT_COST_PER_MTOK
+
+
+@dataclass(frozen=True)
+class LLMUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # False when the backend reported no usage and the counts are estimates
+    reported: bool = False
+
+    def cost_usd(self) -> float:
+        return (
+            self.prompt_tokens * LLM_PROMPT_COST_PER_MTOK + self.completion_tokens * LLM_COMPLETION_COST_PER_MTOK
+        ) / 1_000_000
+
+
+@dataclass(frozen=True)
+class LLMResult:
+    """
+    One LLM call: the text, its usage, the call's wall time and the
+    backend's own time for it (None if not reported). A timed-out call has
+    no text and estimated usage.
+    """
+
+    text: str
+    usage: LLMUsage = LLMUsage()
+    wall_ms: float = 0.0
+    server_ms: Optional[float] = None
+    timed_out: bool = False
+
+    @property
+    def network_ms(self) -> Optional[float]:
+        """
+        Wall time not spent by the backend on the request (network, queueing), if known.
+        """
+        if self.server_ms is None:
+            return None
+        return max(0.0, self.wall_ms - self.server_ms)
+
+
+# Results of the LLM calls made in the current context (see collect_llm_calls)
+_CALLS: ContextVar[Optional[List[LLMResult]]] = ContextVar("llm_calls", default=None)
+
+
+@contextmanager
+def collect_llm_calls() -> Iterator[List[LLMResult]]:
+    """
+    Collect the results of the LLM calls that finish inside the block.
+    """
+    calls: List[LLMResult] = []
+    token = _CALLS.set(calls)
+    try:
+        yield calls
+    finally:
+        _CALLS.reset(token)
+
+
+def record_llm_call(result: LLMResult) -> None:
+    calls = _CALLS.get()
+    if calls is not None:
+        calls.append(result)
+
+
+def llm_usage_update(node: str, calls: List[LLMResult]) -> Dict[str, Dict[str, float]]:
+    """
+    The llm_usage state update for the calls a node made: {node: totals},
+    or {} if it made none.
+    """
+    if not calls:
+        return {}
+    totals = {
+        "calls": len(calls),
+        "prompt_tokens": sum(call.usage.prompt_tokens for call in calls),
+        "completion_tokens": sum(call.usage.completion_tokens for call in calls),
+        "estimated_calls": sum(1 for call in calls if not call.usage.reported),
+        "timed_out_calls": sum(1 for call in calls if call.timed_out),
+        "wall_ms": sum(call.wall_ms for call in calls),
+        "cost_usd": sum(call.usage.cost_usd() for call in calls),
+    }
+    timed = [call for call in calls if call.server_ms is not None]
+    if timed:
+        totals["server_ms"] = sum(call.server_ms for call in timed)
+        totals["network_ms"] = sum(call.network_ms for call in timed)
+    return {node: totals}
+
+
+def merge_llm_usage(
+    current: Dict[str, Dict[str, float]],
+    update: Dict[str, Dict[str, float]],
+) -> Dict[str, Dict[str, float]]:
+    """
+    Reducer for llm_usage: per-node totals, summed.
+    """
+    merged = {node: dict(totals) for node, totals in (current or {}).items()}
+    for node, totals in (update or {}).items():
+        node_totals = merged.setdefault(node, {})
+        for key, value in totals.items():
+            node_totals[key] = node_totals.get(key, 0) + value
+    return merged
+
+
+def llm_usage_totals(usage: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """
+    Turn totals across nodes.
+    """
+    totals: Dict[str, float] = {}
+    for node_totals in (usage or {}).values():
+        for key, value in node_totals.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
@@ -0,0 +1,232 @@
+"""
+Bounded conversation memory with a rolling summary.
+
+Turns are stored as a structured list. The most recent turns are rendered
+verbatim; older turns are folded, a batch at a time, into a summary that an
+LLM refreshes in the background, so the history block in the prompt stays
+roughly constant in size however long the session runs.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from config import MEMORY_SUMMARY_BATCH, MEMORY_SUMMARY_MAX_TOKENS, MEMORY_VERBATIM_TURNS
+from Dialogue.llm.provider import LLMProvider
+from Dialogue.tokens import get_token_counter
+
+
+LOGGER = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a player and "
+    "{npc_name}, a character in a fantasy world. Update the summary with the new "
+    "exchanges. Keep names, facts the player learned, promises made and open "
+    "questions. Write plain prose, at most {max_words} words. Output only the summary."
+)
+
+
+@dataclass(frozen=True)
+class ConversationTurn:
+    user: str
+    response: str
+    tokens: int
+
+
+Summarizer = Callable[[str, str, List[ConversationTurn]], str]
+
+
+def format_turn(npc_name: str, turn: ConversationTurn) -> str:
+    return f"Human: {turn.user}\n{npc_name}: {turn.response}\n\n"
+
+
+def llm_summarizer(npc_name: str, previous_summary: str, turns: List[ConversationTurn]) -> str:
+    """
+    Fold `turns` into `previous_summary` with the configured LLM. The
+    summary budget is in tokens; the model is asked for words, converted by
+    the counter the summary is truncated with.
+    """
+    max_words = get_token_counter().words(MEMORY_SUMMARY_MAX_TOKENS)
+    exchanges = "".join(format_turn(npc_name, turn) for turn in turns)
+    prompt = (
+        f"{SUMMARY_PROMPT.format(npc_name=npc_name, max_words=max_words)}\n\n"
+        f"CURRENT SUMMARY:\n{previous_summary or 'None.'}\n\n"
+        f"NEW EXCHANGES:\n{exchanges}"
+        "UPDATED SUMMARY:"
+    )
+    return LLMProvider.generate(prompt)
+
+
+def _extractive_summary(previous_summary: str, turns: List[ConversationTurn]) -> str:
+    questions = "; ".join(turn.user for turn in turns)
+    return f"{previous_summary} Earlier the player asked: {questions}.".strip()
+
+
+_SUMMARY_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_SUMMARY_EXECUTOR_LOCK = threading.Lock()
+
+
+def _summary_executor() -> ThreadPoolExecutor:
+    global _SUMMARY_EXECUTOR
+    if _SUMMARY_EXECUTOR is None:
+        with _SUMMARY_EXECUTOR_LOCK:
+            if _SUMMARY_EXECUTOR is None:
+                _SUMMARY_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="memory-summary"
+                )
+    return _SUMMARY_EXECUTOR
+
+
+class ConversationMemory:
+    """
+    History for one conversation.
+
+    Rendered history = summary + turns waiting to be summarized + the last
+    `max_verbatim_turns` turns. Waiting turns are capped at two batches so a
+    slow summarizer cannot make the prompt grow; they are still folded in
+    once it catches up.
+    """
+
+    def __init__(
+        self,
+        npc_name: str = "NPC",
+        max_verbatim_turns: int = MEMORY_VERBATIM_TURNS,
+        summary_batch: int = MEMORY_SUMMARY_BATCH,
+        summary_max_tokens: int = MEMORY_SUMMARY_MAX_TOKENS,
+        summarizer: Optional[Summarizer] = None,
+        background: bool = True,
+    ):
+        self.npc_name = npc_name
+        self.max_verbatim_turns = max(0, max_verbatim_turns)
+        self.summary_batch = max(1, summary_batch)
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer or llm_summarizer
+        self.background = background
+        self._counter = get_token_counter()
+        self._lock = threading.Lock()
+        self._verbatim: List[ConversationTurn] = []
+        self._pending: List[ConversationTurn] = []
+        self._summary = ""
+        self._future: Optional[Future] = None
+        self._summarizing = False
+        self._generation = 0
+        self.total_turns = 0
+        self.summarized_turns = 0
+
+    @property
+    def summary(self) -> str:
+        with self._lock:
+            return self._summary
+
+    @property
+    def turns(self) -> List[ConversationTurn]:
+        """
+        Turns not yet folded into the summary, oldest first.
+        """
+        with self._lock:
+            return list(self._pending) + list(self._verbatim)
+
+    def add_turn(self, user: str, response: str) -> ConversationTurn:
+        turn = ConversationTurn(
+            user=user,
+            response=response,
+            tokens=self._counter.count(format_turn(self.npc_name, ConversationTurn(user, response, 0))),
+        )
+        with self._lock:
+            self._verbatim.append(turn)
+            self.total_turns += 1
+            while len(self._verbatim) > self.max_verbatim_turns:
+                self._pending.append(self._verbatim.pop(0))
+        self._maybe_summarize()
+        return turn
+
+    def _maybe_summarize(self) -> None:
+        with self._lock:
+            if self._summarizing or len(self._pending) < self.summary_batch:
+                return
+            self._summarizing = True
+            batch = list(self._pending[: self.summary_batch])
+            previous = self._summary
+            generation = self._generation
+        if self.background:
+            self._future = _summary_executor().submit(self._fold, previous, batch, generation)
+        else:
+            self._fold(previous, batch, generation)
+
+    def _fold(self, previous: str, batch: List[ConversationTurn], generation: int) -> None:
+        try:
+            summary = self.summarizer(self.npc_name, previous, batch)
+        except Exception as exc:
+            LOGGER.warning("Conversation summary failed (%s); keeping an extractive summary", exc)
+            summary = _extractive_summary(previous, batch)
+        summary = self._counter.truncate((summary or "").strip(), self.summary_max_tokens, keep="tail")
+        with self._lock:
+            self._summarizing = False
+            # A clear() while summarizing makes this batch obsolete.
+            if generation == self._generation:
+                self._summary = summary
+                # Only appends happen while summarizing, so the batch is still the prefix.
+                del self._pending[: len(batch)]
+                self.summarized_turns += len(batch)
+        self._maybe_summarize()
+
+    def _rendered_parts(self):
+        with self._lock:
+            pending = self._pending[-2 * self.summary_batch :]
+            return self._summary, pending, list(self._verbatim)
+
+    def blocks(self) -> List[str]:
+        """
+        History for the prompt as whole units: the summary (if any), then
+        one block per turn, oldest first. The prompt budget keeps or drops
+        whole blocks.
+        """
+        summary, pending, verbatim = self._rendered_parts()
+        blocks = []
+        if summary:
+            blocks.append(f"CONVERSATION SUMMARY:\n{summary}\n\n")
+        blocks.extend(format_turn(self.npc_name, turn) for turn in pending + verbatim)
+        return blocks
+
+    def render(self) -> str:
+        """
+        History block for the prompt.
+        """
+        return "".join(self.blocks())
+
+    def token_counts(self) -> Dict[str, int]:
+        summary, pending, verbatim = self._rendered_parts()
+        summary_tokens = self._counter.count(summary)
+        pending_tokens = sum(turn.tokens for turn in pending)
+        verbatim_tokens = sum(turn.tokens for turn in verbatim)
+        return {
+            "turns": self.total_turns,
+            "summarized_turns": self.summarized_turns,
+            "summary_tokens": summary_tokens,
+            "pending_tokens": pending_tokens,
+            "verbatim_tokens": verbatim_tokens,
+            "history_tokens": summary_tokens + pending_tokens + verbatim_tokens,
+        }
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until queued summaries have been folded in.
+        """
+        while True:
+            future = self._future
+            if future is None:
+                return
+            future.result(timeout=timeout)
+            if future is self._future:
+                return
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._verbatim = []
+            self._pending = []
+            self._summary = ""
+            self.total_turns = 0
+            self.summarized_turns = 0
@@ -0,0 +1,141 @@
+"""
+In-process latency metrics for dialogue turns.
+
+Turn latencies are recorded per turn path (light / vector / full, see
+Dialogue.nodes.routing) into fixed-bucket histograms, so the distribution
+can be reported without keeping every sample. Degradations taken to meet
+turn deadlines (see Dialogue.deadline) are counted by name.
+
+prometheus_text() renders these, the timing span histograms and LLM token,
+time and cost totals (utils.spans) and the trace writer counters in the Prometheus text
+format, for the live viewer's /metrics endpoint.
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from Dialogue.trace import trace_enabled, trace_stats
+from utils.histogram import LatencyHistogram
+from utils.spans import LLM, span_histograms, span_totals
+
+
+_TURN_LATENCY: Dict[str, LatencyHistogram] = {}
+_TURN_LATENCY_LOCK = threading.Lock()
+_DEGRADATIONS: Counter = Counter()
+_DEGRADED_TURNS = 0
+
+
+def record_turn_latency(turn_path: str, value_ms: float) -> None:
+    with _TURN_LATENCY_LOCK:
+        histogram = _TURN_LATENCY.get(turn_path)
+        if histogram is None:
+            histogram = _TURN_LATENCY[turn_path] = LatencyHistogram()
+    histogram.record(value_ms)
+
+
+def turn_latency_summary() -> Dict[str, Dict[str, float]]:
+    """
+    Latency distribution per turn path, e.g. {"light": {"p50_ms": ...}}.
+    """
+    with _TURN_LATENCY_LOCK:
+        histograms = dict(_TURN_LATENCY)
+    return {path: histogram.summary() for path, histogram in sorted(histograms.items())}
+
+
+def reset_turn_latency() -> None:
+    global _DEGRADED_TURNS
+    with _TURN_LATENCY_LOCK:
+        _TURN_LATENCY.clear()
+        _DEGRADATIONS.clear()
+        _DEGRADED_TURNS = 0
+
+
+def record_degradations(names: Iterable[str]) -> None:
+    global _DEGRADED_TURNS
+    names = list(names)
+    if not names:
+        return
+    with _TURN_LATENCY_LOCK:
+        _DEGRADATIONS.update(names)
+        _DEGRADED_TURNS += 1
+
+
+def degradation_summary() -> Dict[str, int]:
+    """
+    Turns that degraded ("turns") and how often each degradation was taken.
+    """
+    with _TURN_LATENCY_LOCK:
+        return {"turns": _DEGRADED_TURNS, **dict(sorted(_DEGRADATIONS.items()))}
+
+
+def _labels(**labels: str) -> str:
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return ",".join(pairs)
+
+
+def _histogram_lines(metric: str, labels: str, histogram: LatencyHistogram) -> List[str]:
+    lines = []
+    for bound, count in histogram.cumulative():
+        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+        lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
+    lines.append(f"{metric}_sum{{{labels}}} {histogram.total_ms:.3f}")
+    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+def prometheus_text() -> str:
+    """
+    All in-process metrics in the Prometheus text exposition format (0.0.4).
+    """
+    lines = [
+        "# HELP dialogue_turn_latency_milliseconds Dialogue turn latency by turn path.",
+        "# TYPE dialogue_turn_latency_milliseconds histogram",
+    ]
+    with _TURN_LATENCY_LOCK:
+        turn_histograms = sorted(_TURN_LATENCY.items())
+        degradations = sorted(_DEGRADATIONS.items())
+        degraded_turns = _DEGRADED_TURNS
+    for path, histogram in turn_histograms:
+        lines.extend(_histogram_lines("dialogue_turn_latency_milliseconds", _labels(path=path), histogram))
+
+    lines.append("# HELP dialogue_span_duration_milliseconds Duration of timed work (graph nodes, LLM, vector and graph-store calls).")
+    lines.append("# TYPE dialogue_span_duration_milliseconds histogram")
+    for (kind, name), histogram in span_histograms().items():
+        lines.extend(_histogram_lines("dialogue_span_duration_milliseconds", _labels(kind=kind, name=name), histogram))
+
+    llm_totals = [(name, attr, total) for (kind, name, attr), total in span_totals().items() if kind == LLM]
+    lines.append("# HELP dialogue_llm_tokens_total LLM tokens by calling node (backend-reported, else estimated).")
+    lines.append("# TYPE dialogue_llm_tokens_total counter")
+    for name, attr, total in llm_totals:
+        if attr.endswith("_tokens"):
+            lines.append(f"dialogue_llm_tokens_total{{{_labels(name=name, type=attr[: -len('_tokens')])}}} {total:g}")
+    lines.append("# HELP dialogue_llm_time_milliseconds_total LLM call time by calling node, on the backend (server) and not (network), for backends that report it.")
+    lines.append("# TYPE dialogue_llm_time_milliseconds_total counter")
+    for name, attr, total in llm_totals:
+        if attr in ("server_ms", "network_ms"):
+            lines.append(f"dialogue_llm_time_milliseconds_total{{{_labels(name=name, part=attr[: -len('_ms')])}}} {total:g}")
+    lines.append("# HELP dialogue_llm_cost_usd_total LLM cost in USD by calling node, at the configured token prices.")
+    lines.append("# TYPE dialogue_llm_cost_usd_total counter")
+    for name, attr, total in llm_totals:
+        if attr == "cost_usd":
+            lines.append(f"dialogue_llm_cost_usd_total{{{_labels(name=name)}}} {total:g}")
+
+    lines.append("# HELP dialogue_degraded_turns_total Turns that degraded to meet their deadline.")
+    lines.append("# TYPE dialogue_degraded_turns_total counter")
+    lines.append(f"dialogue_degraded_turns_total {degraded_turns}")
+    lines.append("# HELP dialogue_degradations_total Degradations taken to meet turn deadlines.")
+    lines.append("# TYPE dialogue_degradations_total counter")
+    for name, count in degradations:
+        lines.append(f"dialogue_degradations_total{{{_labels(name=name)}}} {count}")
+
+    if trace_enabled():
+        stats = trace_stats()
+        lines.append("# HELP dialogue_trace_events_total Trace events by outcome.")
+        lines.append("# TYPE dialogue_trace_events_total counter")
+        for outcome in ("submitted", "written", "dropped"):
+            lines.append(f"dialogue_trace_events_total{{{_labels(outcome=outcome)}}} {stats.get(outcome, 0)}")
+    return "\n".join(lines) + "\n"
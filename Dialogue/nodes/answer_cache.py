@@ -0,0 +1,91 @@
+"""
+Answer cache nodes for the dialogue graph.
+Serve a cached answer before any other work, and cache new answers once the
+turn is done (see Dialogue.answer_cache).
+"""
+
+import logging
+from typing import Any, Dict
+
+from Dialogue.answer_cache import get_answer_cache
+from Dialogue.nodes.routing import TURN_PATH_CACHED
+from Dialogue.state import DialogueState
+from Dialogue.trace import record_trace
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _npc_id(npc) -> str:
+    return getattr(npc, "entity_id", "") or getattr(npc, "name", "")
+
+
+def lookup_cached_answer(state: DialogueState) -> Dict[str, Any]:
+    """
+    Node: Look the question up in the answer cache.
+
+    On a hit the cached answer becomes raw_response and the turn goes
+    straight to format_response: no routing, retrieval or LLM call. The
+    match (exact / similar), similarity and age are recorded in answer_cache.
+    """
+    cache = get_answer_cache()
+    npc = state.get("npc")
+    if cache is None or npc is None:
+        update = {"answer_cache": {"enabled": False, "hit": False}}
+        record_trace("lookup_cached_answer", {**state, **update})
+        return update
+
+    world_version = cache.world_version()
+    hit = cache.lookup(_npc_id(npc), state.get("user_input", ""), world_version)
+    if hit is None:
+        update = {"answer_cache": {"enabled": True, "hit": False, "world_version": world_version}}
+    else:
+        LOGGER.info("Answer cache %s hit (similarity=%.3f, age=%.0fs)", hit.match, hit.similarity, hit.age_seconds)
+        update = {
+            "raw_response": hit.response,
+            "turn_path": TURN_PATH_CACHED,
+            "answer_cache": {
+                "enabled": True,
+                "hit": True,
+                "match": hit.match,
+                "similarity": hit.similarity,
+                "age_seconds": hit.age_seconds,
+                "cached_question": hit.cached_question,
+                "world_version": world_version,
+            },
+        }
+    record_trace("lookup_cached_answer", {**state, **update})
+    return update
+
+
+def select_after_lookup(state: DialogueState) -> str:
+    """
+    Conditional edge after lookup_cached_answer.
+    """
+    return "format_response" if state.get("answer_cache", {}).get("hit") else "load_npc"
+
+
+def cache_answer(state: DialogueState) -> Dict[str, Any]:
+    """
+    Node: Cache the turn's answer.
+
+    Only answers the router marked history_independent are cached, and only
+    from turns that ran in full (no deadline degradations, no LLM error).
+    """
+    cache = get_answer_cache()
+    cache_state = dict(state.get("answer_cache") or {})
+    response = state.get("formatted_response", "")
+    cacheable = (
+        cache is not None
+        and cache_state.get("enabled")
+        and not cache_state.get("hit")
+        and state.get("query_spec", {}).get("history_independent", False)
+        and not state.get("degradations")
+        and response
+        and not state.get("raw_response", "").startswith("[Error")
+    )
+    if cacheable:
+        cache.store(_npc_id(state.get("npc")), state.get("user_input", ""), response, cache_state["world_version"])
+    update = {"answer_cache": {**cache_state, "stored": bool(cacheable)}}
+    record_trace("cache_answer", {**state, **update})
+    return update
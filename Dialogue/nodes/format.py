@@ -3,11 +3,13 @@ Response formatting nodes for the dialogue graph.
 Post-processes LLM responses for presentation.
 """
 
+from typing import Any, Dict
+
 from Dialogue.state import DialogueState
 from Dialogue.trace import record_trace
 
 
-def format_response(state: DialogueState) -> DialogueState:
+def format_response(state: DialogueState) -> Dict[str, Any]:
     """
     Node: Format the raw response for presentation.
     
@@ -23,11 +25,11 @@ def format_response(state: DialogueState) -> DialogueState:
         state: Current dialogue state with raw_response populated
         
     Returns:
-        Updated state with formatted_response populated
+        State update with formatted_response
     """
     raw_response = state.get("raw_response", "")
     formatted = raw_response.strip()
     
-    state["formatted_response"] = formatted
-    record_trace("format_response", state)
-    return state
+    update = {"formatted_response": formatted}
+    record_trace("format_response", {**state, **update})
+    return update
@@ -4,75 +4,100 @@ Fetches graph facts and neighbor entity ids for later vector expansion.
 """
 
 import logging
+from typing import Any, Dict
 
-from Dialogue.graph_router import route_graph_query
-from Dialogue.router import route_query
+from Dialogue.deadline import SKIP_GRAPH_PATHS, TRUNCATE_GRAPH, get_deadline_policy, spare_ms
+from Dialogue.graph_router_models import GraphQuerySpec
+from Dialogue.nodes.routing import PATH_INTENTS
+from Dialogue.retrieval_settings import get_retrieval_settings
+from Dialogue.router_models import QuerySpec
 from Dialogue.state import DialogueState
 from Dialogue.trace import record_trace
 from World.graph_store import get_world_graph
 from World.store import get_world_store
+from World.verbalize import get_fact_verbalizer
 
 
 LOGGER = logging.getLogger(__name__)
 
-AVAILABLE_EDGE_TYPES = [
-    "KINSHIP",
-    "INHERITED_FROM",
-    "OWNS",
-    "OWNED",
-    "LOCATED_IN",
-    "OPERATES_IN",
-    "CONNECTS",
-    "INVOLVED_IN",
-    "HAPPENED_AT",
-    "CAUSES",
-]
-
-
-def retrieve_graph_knowledge(state: DialogueState) -> DialogueState:
-    user_input = state.get("user_input", "")
-    npc = state.get("npc")
-    graph = get_world_graph()
-    npc_entity = None
-    if npc:
-        npc_entity = graph.get_entity(getattr(npc, "entity_id", "")) or graph.get_entity_by_name(
-            getattr(npc, "name", "")
-        )
-    npc_context = {
-        "npc_id": getattr(npc, "entity_id", getattr(npc, "name", "unknown")).lower().replace(" ", "_")
-        if npc
-        else "unknown",
-        "npc_name": getattr(npc, "name", "") if npc else "",
-        "npc_location": "",
-        "world_date": "",
-    }
-    if npc_entity and npc_entity.properties.get("location"):
-        npc_context["npc_location"] = str(npc_entity.properties.get("location"))
 
-    store = get_world_store()
-    world_hints = store.world_hints()
-    recent_entities = state.get("recent_entities", [])
-    query_spec = route_query(user_input, npc_context, world_hints, recent_entities)
-    state["query_spec"] = query_spec.model_dump()
-    LOGGER.info("Router intent=%s query='%s'", query_spec.intent, query_spec.query_text)
-
-    graph_spec = route_graph_query(
-        user_input,
-        [entity.model_dump() for entity in query_spec.entities],
-        AVAILABLE_EDGE_TYPES,
+def _wants_paths(query_spec, graph_spec) -> bool:
+    return len(query_spec.entities) >= 2 and (
+        query_spec.intent in PATH_INTENTS or graph_spec.graph_intent != graph_spec.graph_intent.NONE
     )
-    state["graph_query_spec"] = graph_spec.model_dump()
-    LOGGER.info(
-        "Graph router intent=%s edges=%s",
-        graph_spec.graph_intent,
-        ",".join(graph_spec.edge_types),
+
+
+def _connecting_path_facts(graph, store, query_spec, graph_spec, edge_types):
+    """
+    Facts for the shortest paths between the first two entities a query names.
+
+    Only runs for relationship/comparison questions or when the graph router
+    asked for a traversal. If the router's edge types do not connect the two
+    entities, the search is retried over all edge types.
+    """
+    if not _wants_paths(query_spec, graph_spec):
+        return [], set()
+    named_ids = []
+    for entity_id in store.resolve_entity_ids([entity.name for entity in query_spec.entities]):
+        if entity_id not in named_ids:
+            named_ids.append(entity_id)
+    if len(named_ids) < 2:
+        return [], set()
+
+    settings = get_retrieval_settings()
+    source_id, target_id = named_ids[0], named_ids[1]
+    paths = graph.find_paths(
+        source_id, target_id, edge_types, max_depth=settings.path_max_depth, k=settings.path_limit
     )
+    if not paths and edge_types:
+        paths = graph.find_paths(
+            source_id, target_id, None, max_depth=settings.path_max_depth, k=settings.path_limit
+        )
+    LOGGER.info("Graph paths %s -> %s: %d", source_id, target_id, len(paths))
+
+    verbalizer = get_fact_verbalizer()
+    path_entity_ids = set()
+    facts = []
+    for path in paths:
+        facts.append(verbalizer.path_fact(path))
+        for edge in path:
+            path_entity_ids.update((edge.source_id, edge.target_id))
+    return facts, path_entity_ids
+
+
+def retrieve_graph_knowledge(state: DialogueState) -> Dict[str, Any]:
+    """
+    Node: Traverse the world graph for the routed query.
+
+    Runs in parallel with retrieve_vector_knowledge. Produces graph_facts and
+    graph_neighbor_ids; the neighbor ids are expanded into vector facts by
+    expand_neighbor_facts once both branches finish. Short on time, the
+    connecting-path search is skipped, and the traversal stops (keeping the
+    facts found so far) once the answer reserve is reached.
+    """
+    npc = state.get("npc")
+    graph = get_world_graph()
+    store = get_world_store()
+    query_spec = QuerySpec.model_validate(state["query_spec"])
+    graph_spec = GraphQuerySpec.model_validate(state["graph_query_spec"])
 
-    if graph_spec.graph_intent == graph_spec.graph_intent.NONE:
-        state["graph_facts"] = []
-        state["graph_neighbor_ids"] = []
-        return state
     edge_types = graph_spec.edge_types or None
+    deadline = state.get("deadline", 0.0)
+    degradations = []
+    short_on_time = spare_ms(deadline) < get_deadline_policy().retrieval_ms
+    if short_on_time and _wants_paths(query_spec, graph_spec):
+        LOGGER.info("Graph path search skipped (turn deadline)")
+        path_facts, path_entity_ids = [], set()
+        degradations.append(SKIP_GRAPH_PATHS)
+    else:
+        path_facts, path_entity_ids = _connecting_path_facts(
+            graph, store, query_spec, graph_spec, edge_types
+        )
+
+    if graph_spec.graph_intent == graph_spec.graph_intent.NONE and not path_facts:
+        update = {"graph_facts": [], "graph_neighbor_ids": [], "degradations": degradations}
+        record_trace("retrieve_graph_knowledge", {**state, **update})
+        return update
 
     entity_names = [entity.name for entity in query_spec.entities]
     subject_entity = query_spec.subject_entity or ""
@@ -85,48 +110,60 @@ def retrieve_graph_knowledge(state: DialogueState) -> DialogueState:
     entity_ids = store.resolve_entity_ids(filtered_entity_names)
     if not entity_ids and npc is not None:
         entity_ids = store.resolve_entity_ids([getattr(npc, "name", "")])
-    neighbor_entity_ids = set()
+    verbalizer = get_fact_verbalizer()
+    # Ordered (a dict, not a set) so facts come out in edge order in every process
+    neighbor_entity_ids: Dict[str, None] = {}
     graph_facts = []
+    seen_fact_ids = set()
 
+    def add_fact(fact):
+        if fact["id"] in seen_fact_ids:
+            return
+        seen_fact_ids.add(fact["id"])
+        graph_facts.append(fact)
+
+    for fact in path_facts:
+        add_fact(fact)
+
+    def out_of_time() -> bool:
+        if spare_ms(deadline) > 0:
+            return False
+        if TRUNCATE_GRAPH not in degradations:
+            LOGGER.info("Graph traversal truncated (turn deadline)")
+            degradations.append(TRUNCATE_GRAPH)
+        return True
+
+    if graph_spec.graph_intent == graph_spec.graph_intent.NONE:
+        entity_ids = []
     for entity_id in entity_ids:
+        if out_of_time():
+            break
         edges = graph.get_neighbors(entity_id, edge_types=edge_types, depth=1)
         for edge in edges:
-            source = graph.get_entity(edge.source_id)
-            target = graph.get_entity(edge.target_id)
-            source_name = source.name if source else edge.source_id
-            target_name = target.name if target else edge.target_id
-            relation = edge.type.lower().replace("_", " ")
-            props = edge.properties
-            if props:
-                prop_text = ", ".join(f"{key}={value}" for key, value in props.items())
-                graph_facts.append(
-                    f"{source_name} {relation} {target_name} ({prop_text})"
-                )
-            else:
-                graph_facts.append(f"{source_name} {relation} {target_name}")
-            neighbor_entity_ids.add(edge.target_id)
+            add_fact(verbalizer.edge_fact(edge))
+            neighbor_entity_ids.setdefault(edge.target_id)
 
     for neighbor_id in neighbor_entity_ids:
+        if out_of_time():
+            break
         neighbor = graph.get_entity(neighbor_id)
         if not neighbor:
             continue
-        props = neighbor.properties or {}
-        for key, value in props.items():
-            if value in (None, "", [], {}):
-                continue
-            if isinstance(value, list):
-                value_text = ", ".join(str(item) for item in value)
-            else:
-                value_text = str(value)
-            graph_facts.append(f"{neighbor.name} {key} {value_text}")
-
-    state["graph_facts"] = graph_facts
-    state["graph_neighbor_ids"] = list(neighbor_entity_ids)
+        for fact in verbalizer.entity_facts(neighbor, keys=list(neighbor.properties or {})):
+            add_fact(fact)
+
+    update = {
+        "graph_facts": graph_facts,
+        "graph_neighbor_ids": list(neighbor_entity_ids) + sorted(path_entity_ids.difference(neighbor_entity_ids)),
+        "degradations": degradations,
+    }
     if graph_facts:
         LOGGER.info("Graph facts=%d", len(graph_facts))
         LOGGER.debug("Graph facts detail:")
         for fact in graph_facts:
-            LOGGER.debug("  - %s", fact)
+            LOGGER.debug("  - (%s) %s", fact["id"], fact["text"])
+    if hasattr(graph, "stats"):
+        LOGGER.debug("Graph cache %s", graph.stats())
 
-    record_trace("retrieve_graph_knowledge", state)
-    return state
+    record_trace("retrieve_graph_knowledge", {**state, **update})
+    return update
@@ -3,40 +3,60 @@ LLM nodes for the dialogue graph.
 Handles calling the language model.
 """
 
+import logging
+from typing import Any, Dict
+
+from config import DEADLINE_FALLBACK_RESPONSE
+from Dialogue.deadline import LLM_TIMEOUT, call_timeout
 from Dialogue.state import DialogueState
 from Dialogue.llm.provider import LLMProvider
+from Dialogue.llm.usage import collect_llm_calls, llm_usage_update
 from Dialogue.trace import record_trace
 
 
-def call_llm(state: DialogueState) -> DialogueState:
+LOGGER = logging.getLogger(__name__)
+
+
+def call_llm(state: DialogueState) -> Dict[str, Any]:
     """
     Node: Call the LLM with the full prompt.
     
     This node invokes the language model to generate a response based on the
     constructed prompt. The LLM provider handles all API interactions and
-    supports multiple backends (Google, LM Studio, etc).
+    supports multiple backends (Google, LM Studio, etc). The call may run
+    until the turn deadline; past it, the NPC gives DEADLINE_FALLBACK_RESPONSE.
     
     Args:
         state: Current dialogue state with full_prompt populated
         
     Returns:
-        Updated state with raw_response populated
+        State update with raw_response and the call's llm_usage (also
+        when it timed out)
         
     Raises:
         Exception: If the LLM call fails
     """
-    try:
-        full_prompt = state.get("full_prompt", "")
-        if not full_prompt:
-            raise ValueError("full_prompt is required but empty")
-        
-        # Use the factory to get the configured provider
-        response = LLMProvider.generate(full_prompt)
-        state["raw_response"] = response
-        
-    except Exception as e:
-        # Store error in response for graceful handling
-        state["raw_response"] = f"[Error generating response: {str(e)}]"
+    with collect_llm_calls() as calls:
+        try:
+            full_prompt = state.get("full_prompt", "")
+            if not full_prompt:
+                raise ValueError("full_prompt is required but empty")
+            
+            # Use the factory to get the configured provider
+            result = LLMProvider.complete(
+                full_prompt, timeout=call_timeout(state.get("deadline", 0.0), reserve_ms=0.0)
+            )
+            update = {"raw_response": result.text}
+            
+        except TimeoutError as e:
+            LOGGER.warning("Answer call out of time: %s", e)
+            update = {"raw_response": DEADLINE_FALLBACK_RESPONSE, "degradations": [LLM_TIMEOUT]}
+            
+        except Exception as e:
+            # Store error in response for graceful handling
+            update = {"raw_response": f"[Error generating response: {str(e)}]"}
+    # A timed-out call is counted too (see Dialogue.llm.usage)
+    update["llm_usage"] = llm_usage_update("call_llm", calls)
     
-    record_trace("call_llm", state)
-    return state
+    record_trace("call_llm", {**state, **update})
+    return update
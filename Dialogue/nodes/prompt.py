@@ -3,11 +3,40 @@ Prompt building nodes for the dialogue graph.
 Constructs the full prompt from various sources.
 """
 
+import logging
+from typing import Any, Dict, List, Tuple
+
+from Dialogue.deadline import CAP_HISTORY, get_deadline_policy, spare_ms
+from Dialogue.prompt_builder import BudgetSection, PromptBudgeter, history_ranks, split_history
+from Dialogue.prompts.system_prompt import get_npc_light_system_prompt
 from Dialogue.state import DialogueState
 from Dialogue.trace import record_trace
 
 
-def build_prompt(state: DialogueState) -> DialogueState:
+LOGGER = logging.getLogger(__name__)
+
+# NPC node facts kept in the light (smalltalk) prompt.
+LIGHT_PROMPT_KEYS = ("location", "profession", "traits")
+
+
+def _history_blocks(state: DialogueState) -> Tuple[List[str], List[str]]:
+    """
+    (history blocks, degradations). Each block is the summary or one whole
+    turn. Once the turn has less time left than the answer reserve, only
+    the newest policy.history_blocks are kept so the answer call gets a
+    shorter prompt.
+    """
+    blocks = state.get("history_blocks")
+    if blocks is None:
+        blocks = split_history(state.get("conversation_history", ""))
+    keep = get_deadline_policy().history_blocks
+    if len(blocks) > keep and spare_ms(state.get("deadline", 0.0)) < 0:
+        LOGGER.info("History capped at %d of %d blocks (turn deadline)", keep, len(blocks))
+        return blocks[len(blocks) - keep :], [CAP_HISTORY]
+    return blocks, []
+
+
+def build_prompt(state: DialogueState) -> Dict[str, Any]:
     """
     Node: Build the full prompt from system prompt, history, and user input.
     
@@ -16,52 +45,104 @@ def build_prompt(state: DialogueState) -> DialogueState:
     - Conversation history (previous exchanges)
     - User input (current message)
     
-    Future extensibility: This is where knowledge retrieval results would be injected.
+    Sections are fitted to PROMPT_TOKEN_BUDGET by the prompt budgeter; the
+    applied budget is recorded in prompt_budget. Short on time, the history
+    is capped to its newest blocks.
     
     Args:
         state: Current dialogue state
         
     Returns:
-        Updated state with full_prompt populated
+        State update with full_prompt and prompt_budget
     """
     system_prompt = state.get("system_prompt", "")
-    history = state.get("conversation_history", "")
     user_input = state.get("user_input", "")
     retrieval_results = state.get("retrieval_results", [])
     graph_facts = state.get("graph_facts", [])
     npc_node_facts = state.get("npc_node_facts", [])
-    
-    # Build full prompt
-    full_prompt = f"""{system_prompt}"""
 
-    facts_lines = []
-    for fact in retrieval_results:
-        fact_id = fact.get("id", "unknown")
-        text = fact.get("text", "")
-        if text:
-            facts_lines.append(f"- ({fact_id}) {text}")
+    # Retrieval results arrive in rank order. Query graph facts outrank the
+    # NPC's own node facts, which mostly repeat the profile in the system
+    # prompt, but the node facts are still listed first.
+    facts_lines = [
+        f"- ({fact.get('id', 'unknown')}) {fact.get('text', '')}"
+        for fact in retrieval_results
+        if fact.get("text", "")
+    ]
+    combined_graph = list(npc_node_facts or []) + list(graph_facts or [])
+    graph_lines = [
+        f"- ({fact.get('id', 'unknown')}) {fact.get('text', '')}" for fact in combined_graph
+    ]
+    node_count = len(npc_node_facts or [])
+    graph_ranks = [
+        len(graph_facts or []) + index if index < node_count else index - node_count
+        for index in range(len(graph_lines))
+    ]
+    history_blocks, degradations = _history_blocks(state)
 
-    if facts_lines:
-        facts_block = "\n".join(facts_lines)
-    else:
-        facts_block = "None."
+    fitted = PromptBudgeter().fit(
+        f"{system_prompt}\n\nWORLD FACTS:\n\n\nGRAPH FACTS:\n\nHuman: \nAI:",
+        [
+            BudgetSection("world_facts", facts_lines),
+            BudgetSection("graph_facts", graph_lines, ranks=graph_ranks),
+            BudgetSection("history", history_blocks, ranks=history_ranks(history_blocks), contiguous=True),
+            BudgetSection("user_input", [user_input], truncate=True),
+        ],
+    )
+    facts_block = "\n".join(fitted.items["world_facts"]) or "None."
+    graph_block = "\n".join(fitted.items["graph_facts"]) or "None."
+    history = "".join(fitted.items["history"])
+    user_input = "".join(fitted.items["user_input"])
 
+    full_prompt = f"{system_prompt}"
     full_prompt += f"\n\nWORLD FACTS:\n{facts_block}"
-
-    combined_graph = list(npc_node_facts or [])
-    combined_graph.extend(graph_facts or [])
-    if combined_graph:
-        graph_block = "\n".join(f"- {fact}" for fact in combined_graph)
-    else:
-        graph_block = "None."
-
     full_prompt += f"\n\nGRAPH FACTS:\n{graph_block}"
-    
     if history:
         full_prompt += f"\n\n{history}"
-    
     full_prompt += f"\nHuman: {user_input}\nAI:"
+
+    update = {"full_prompt": full_prompt, "prompt_budget": fitted.report, "degradations": degradations}
+    record_trace("build_prompt", {**state, **update})
+    return update
+
+
+def build_light_prompt(state: DialogueState) -> Dict[str, Any]:
+    """
+    Node: Build a short prompt for smalltalk and no-retrieval turns.
+    
+    Uses a brief system prompt with a few profile facts and no WORLD FACTS
+    or GRAPH FACTS blocks.
     
-    state["full_prompt"] = full_prompt
-    record_trace("build_prompt", state)
-    return state
+    Args:
+        state: Current dialogue state
+        
+    Returns:
+        State update with full_prompt
+    """
+    npc = state.get("npc")
+    npc_name = getattr(npc, "name", "") if npc else ""
+    profile_lines = [
+        fact.get("text", "")
+        for fact in state.get("npc_node_facts", []) or []
+        if fact.get("id", "").rsplit(".", 1)[-1] in LIGHT_PROMPT_KEYS
+    ]
+    system_prompt = get_npc_light_system_prompt(npc_name, profile_lines)
+    history_blocks, degradations = _history_blocks(state)
+    fitted = PromptBudgeter().fit(
+        f"{system_prompt}\nHuman: \nAI:",
+        [
+            BudgetSection("history", history_blocks, ranks=history_ranks(history_blocks), contiguous=True),
+            BudgetSection("user_input", [state.get("user_input", "")], truncate=True),
+        ],
+    )
+    history = "".join(fitted.items["history"])
+    user_input = "".join(fitted.items["user_input"])
+
+    full_prompt = system_prompt
+    if history:
+        full_prompt += f"\n{history}"
+    full_prompt += f"\nHuman: {user_input}\nAI:"
+
+    update = {"full_prompt": full_prompt, "prompt_budget": fitted.report, "degradations": degradations}
+    record_trace("build_light_prompt", {**state, **update})
+    return update
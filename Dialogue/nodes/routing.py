@@ -0,0 +1,165 @@
+"""
+Routing node for the dialogue graph.
+Turns the user message into the query spec and graph query spec that the
+retrieval branches run from, and picks the turn path:
+  - light:  smalltalk / no retrieval, straight to the light prompt
+  - vector: vector retrieval only, the graph branch is skipped
+  - full:   graph and vector retrieval in parallel
+Turns answered from the answer cache never reach routing; they are
+recorded with turn_path "cached".
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from Dialogue.deadline import LOCAL_GRAPH_ROUTING, LOCAL_ROUTING, get_deadline_policy, spare_ms
+from Dialogue.entities.npc_context import npc_context_for
+from Dialogue.graph_router import route_graph_query, route_graph_query_locally
+from Dialogue.graph_router_models import GraphIntent, GraphQuerySpec
+from Dialogue.llm.usage import collect_llm_calls, llm_usage_update
+from Dialogue.router import route_query, route_query_locally
+from Dialogue.router_models import Intent, QuerySpec
+from Dialogue.state import DialogueState
+from Dialogue.trace import record_trace
+from World.store import get_world_store
+
+
+LOGGER = logging.getLogger(__name__)
+
+AVAILABLE_EDGE_TYPES = [
+    "KINSHIP",
+    "INHERITED_FROM",
+    "OWNS",
+    "OWNED",
+    "LOCATED_IN",
+    "OPERATES_IN",
+    "CONNECTS",
+    "INVOLVED_IN",
+    "HAPPENED_AT",
+    "CAUSES",
+]
+
+TURN_PATH_LIGHT = "light"
+TURN_PATH_VECTOR = "vector"
+TURN_PATH_FULL = "full"
+TURN_PATH_CACHED = "cached"
+
+# Intents that look for connecting paths between two named entities, even
+# when the graph router chose no traversal (see graph_retrieval).
+PATH_INTENTS = {Intent.ASK_RELATIONSHIP, Intent.ASK_COMPARISON}
+
+
+def choose_turn_path(query_spec: QuerySpec, graph_spec: GraphQuerySpec) -> str:
+    if query_spec.intent == Intent.SMALLTALK or not query_spec.needs_retrieval:
+        return TURN_PATH_LIGHT
+    if graph_spec.graph_intent != GraphIntent.NONE:
+        return TURN_PATH_FULL
+    if query_spec.intent in PATH_INTENTS and len(query_spec.entities) >= 2:
+        return TURN_PATH_FULL
+    return TURN_PATH_VECTOR
+
+
+def select_retrieval_nodes(state: DialogueState) -> List[str]:
+    """
+    Conditional edge after route_query: the nodes to run for turn_path.
+    """
+    turn_path = state.get("turn_path", TURN_PATH_FULL)
+    if turn_path == TURN_PATH_LIGHT:
+        return ["build_light_prompt"]
+    if turn_path == TURN_PATH_VECTOR:
+        return ["retrieve_vector_knowledge"]
+    return ["retrieve_graph_knowledge", "retrieve_vector_knowledge"]
+
+
+def route_turn(npc, user_input: str, recent_entities: List[str], deadline: float = 0.0) -> Dict[str, Any]:
+    """
+    Route one message: query_spec, graph_query_spec, turn_path and the
+    degradations taken. Each router falls back to its keyword version when
+    the turn deadline leaves it too little time or its LLM call times out.
+    """
+    npc_context = {
+        "npc_id": getattr(npc, "entity_id", getattr(npc, "name", "unknown")).lower().replace(" ", "_")
+        if npc
+        else "unknown",
+        "npc_name": getattr(npc, "name", "") if npc else "",
+        "npc_location": "",
+        "world_date": "",
+    }
+    if npc:
+        context = npc_context_for(npc)
+        npc_context["npc_location"] = context.location
+
+    store = get_world_store()
+    world_hints = store.world_hints()
+    policy = get_deadline_policy()
+    degradations = []
+    query_spec = None
+    if spare_ms(deadline) >= policy.router_ms:
+        try:
+            query_spec = route_query(user_input, npc_context, world_hints, recent_entities, deadline=deadline)
+        except TimeoutError as exc:
+            LOGGER.warning("Router out of time (%s); routing locally", exc)
+    if query_spec is None:
+        query_spec = route_query_locally(user_input, npc_context, world_hints, recent_entities)
+        degradations.append(LOCAL_ROUTING)
+    LOGGER.info("Router intent=%s query='%s'", query_spec.intent, query_spec.query_text)
+
+    if query_spec.intent == Intent.SMALLTALK or not query_spec.needs_retrieval:
+        # The light path never traverses the graph; skip the second LLM call.
+        graph_spec = GraphQuerySpec(graph_intent=GraphIntent.NONE, edge_types=[], reason="no retrieval")
+    else:
+        entities = [entity.model_dump() for entity in query_spec.entities]
+        graph_spec = None
+        if spare_ms(deadline) >= policy.graph_router_ms:
+            try:
+                graph_spec = route_graph_query(user_input, entities, AVAILABLE_EDGE_TYPES, deadline=deadline)
+            except TimeoutError as exc:
+                LOGGER.warning("Graph router out of time (%s); routing locally", exc)
+        if graph_spec is None:
+            graph_spec = route_graph_query_locally(user_input, entities, AVAILABLE_EDGE_TYPES)
+            degradations.append(LOCAL_GRAPH_ROUTING)
+    LOGGER.info(
+        "Graph router intent=%s edges=%s",
+        graph_spec.graph_intent,
+        ",".join(graph_spec.edge_types),
+    )
+
+    turn_path = choose_turn_path(query_spec, graph_spec)
+    LOGGER.info("Turn path=%s", turn_path)
+
+    return {
+        "query_spec": query_spec.model_dump(),
+        "graph_query_spec": graph_spec.model_dump(),
+        "turn_path": turn_path,
+        "degradations": degradations,
+    }
+
+
+def route_user_query(state: DialogueState) -> Dict[str, Any]:
+    """
+    Node: Route the user message for retrieval.
+
+    Produces query_spec (intent, entities, query text) and graph_query_spec
+    (graph intent and edge types) for the graph and vector branches, and
+    turn_path, which select_retrieval_nodes uses to pick the next nodes.
+    A turn that arrives already routed (see Dialogue.batch) keeps its routing.
+    Short on time, the keyword routers stand in for the LLM ones (see
+    Dialogue.deadline).
+    """
+    if state.get("query_spec") and state.get("turn_path"):
+        update = {
+            "query_spec": state["query_spec"],
+            "graph_query_spec": state.get("graph_query_spec", {}),
+            "turn_path": state["turn_path"],
+        }
+    else:
+        with collect_llm_calls() as calls:
+            update = route_turn(
+                state.get("npc"),
+                state.get("user_input", ""),
+                state.get("recent_entities", []),
+                state.get("deadline", 0.0),
+            )
+        update = {**update, "llm_usage": llm_usage_update("route_query", calls)}
+    record_trace("route_query", {**state, **update})
+    return update
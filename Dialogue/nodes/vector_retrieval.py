@@ -1,10 +1,14 @@
 """
-Vector retrieval node for world knowledge.
-Fetches semantic and entity-linked facts from the vector store.
+Vector retrieval nodes for world knowledge.
+Fetch semantic and entity-linked facts from the vector store, then join them
+with facts for the graph neighbors.
 """
 
 import logging
+from typing import Any, Dict, List, Tuple
 
+from Dialogue.deadline import SHRINK_K, SKIP_NEIGHBOR_FACTS, get_deadline_policy, spare_ms
+from Dialogue.retrieval_settings import get_retrieval_settings
 from Dialogue.state import DialogueState
 from Dialogue.trace import record_trace
 from World.store import get_world_store
@@ -27,33 +31,51 @@ def _log_hits(label: str, hits: list[dict]) -> None:
         LOGGER.debug("  - %s | %s | score=%s | %s", hit_id, entity, score, text)
 
 
-def retrieve_vector_knowledge(state: DialogueState) -> DialogueState:
+def vector_query_plan(query_spec: Dict[str, Any], user_input: str) -> Tuple[str, List[str], int]:
+    """
+    (semantic query text, entity names to fetch facts for, semantic k) for a
+    routed query. A question about one subject leans on its entity facts and
+    needs fewer semantic hits.
+    """
+    settings = get_retrieval_settings()
+    query_text = query_spec.get("query_text") or user_input
+    subject_entity = query_spec.get("subject_entity", "")
+    if subject_entity:
+        return query_text, [subject_entity], settings.subject_semantic_k
+    return query_text, [entity.get("name") for entity in query_spec.get("entities", [])], settings.semantic_k
+
+
+def retrieve_vector_knowledge(state: DialogueState) -> Dict[str, Any]:
+    """
+    Node: Fetch semantic and entity-linked facts for the routed query.
+
+    Runs in parallel with retrieve_graph_knowledge; neither lookup depends on
+    graph traversal. Results go into retrieval_hits for expand_neighbor_facts.
+    Short on time, fewer semantic hits and entity facts are fetched.
+    """
     user_input = state.get("user_input", "")
     query_spec = state.get("query_spec", {})
     if not query_spec.get("needs_retrieval", True):
         LOGGER.info("Vector retrieval skipped (needs_retrieval=false)")
-        state["retrieval_results"] = []
-        return state
-
-    query_text = query_spec.get("query_text") or user_input
+        return {"retrieval_hits": {"semantic": [], "entity": []}}
+
+    query_text, entity_names, semantic_limit = vector_query_plan(query_spec, user_input)
+    facts_limit = get_retrieval_settings().entity_facts
+    degradations = []
+    policy = get_deadline_policy()
+    if spare_ms(state.get("deadline", 0.0)) < policy.retrieval_ms:
+        semantic_limit = min(semantic_limit, policy.shrunk_k)
+        facts_limit = policy.shrunk_k
+        degradations.append(SHRINK_K)
+        LOGGER.info("Vector retrieval k shrunk to %d (turn deadline)", policy.shrunk_k)
 
     store = get_world_store()
     semantic_hits = []
 
-    subject_entity = query_spec.get("subject_entity", "")
-    if subject_entity:
-        entity_names = [subject_entity]
-    else:
-        entity_names = [entity.get("name") for entity in query_spec.get("entities", [])]
-
     entity_hits = []
-    for entity_id in store.resolve_entity_ids(entity_names):
-        entity_hits.extend(store.facts_for_entity(entity_id, limit=3))
-
-    if subject_entity:
-        semantic_limit = 2
-    else:
-        semantic_limit = 5
+    if facts_limit > 0:
+        for entity_id in store.resolve_entity_ids(entity_names):
+            entity_hits.extend(store.facts_for_entity(entity_id, limit=facts_limit))
 
     if semantic_limit > 0:
         semantic_hits = store.search(query_text, n_results=semantic_limit)
@@ -64,14 +86,47 @@ def retrieve_vector_knowledge(state: DialogueState) -> DialogueState:
         LOGGER.info("Vector entity-linked hits=%d", len(entity_hits))
         _log_hits("Vector entity-linked", entity_hits)
 
+    update = {"retrieval_hits": {"semantic": semantic_hits, "entity": entity_hits}, "degradations": degradations}
+    record_trace("retrieve_vector_knowledge", {**state, **update})
+    return update
+
+
+def expand_neighbor_facts(state: DialogueState) -> Dict[str, Any]:
+    """
+    Node: Join the graph and vector branches.
+
+    Fetches facts for the graph neighbors found by retrieve_graph_knowledge,
+    then merges them with the semantic and entity-linked hits into
+    retrieval_results. Short on time, the neighbor facts are skipped.
+    """
+    query_spec = state.get("query_spec", {})
+    if not query_spec.get("needs_retrieval", True):
+        update = {"retrieval_results": [], "recent_entities": []}
+        record_trace("expand_neighbor_facts", {**state, **update})
+        return update
+
+    store = get_world_store()
+    hits = state.get("retrieval_hits", {})
+    semantic_hits = hits.get("semantic", [])
+    entity_hits = hits.get("entity", [])
+
     related_hits = []
-    for neighbor_id in state.get("graph_neighbor_ids", []):
-        related_hits.extend(store.facts_for_entity(neighbor_id, limit=2))
+    degradations = []
+    neighbor_ids = state.get("graph_neighbor_ids", [])
+    if neighbor_ids and spare_ms(state.get("deadline", 0.0)) < get_deadline_policy().retrieval_ms:
+        LOGGER.info("Neighbor facts skipped for %d neighbors (turn deadline)", len(neighbor_ids))
+        neighbor_ids = []
+        degradations.append(SKIP_NEIGHBOR_FACTS)
+    neighbor_limit = get_retrieval_settings().neighbor_facts
+    if neighbor_limit <= 0:
+        neighbor_ids = []
+    for neighbor_id in neighbor_ids:
+        related_hits.extend(store.facts_for_entity(neighbor_id, limit=neighbor_limit))
     if related_hits:
         LOGGER.info("Vector neighbor hits=%d", len(related_hits))
         _log_hits("Vector neighbor", related_hits)
 
-    if subject_entity:
+    if query_spec.get("subject_entity", ""):
         combined = entity_hits + related_hits + semantic_hits
     else:
         combined = semantic_hits + entity_hits + related_hits
@@ -86,8 +141,6 @@ def retrieve_vector_knowledge(state: DialogueState) -> DialogueState:
             deduped.append(hit)
         combined = deduped
 
-    state["retrieval_results"] = combined
-
     if LOGGER.isEnabledFor(logging.DEBUG):
         print_retrieval_results(combined)
 
@@ -96,7 +149,12 @@ def retrieve_vector_knowledge(state: DialogueState) -> DialogueState:
         name = hit.get("entity_name")
         if name and name not in recent_entities:
             recent_entities.append(name)
-    state["recent_entities"] = recent_entities
 
-    record_trace("retrieve_vector_knowledge", state)
-    return state
+    update = {
+        "retrieval_hits": {"neighbor": related_hits},
+        "retrieval_results": combined,
+        "recent_entities": recent_entities,
+        "degradations": degradations,
+    }
+    record_trace("expand_neighbor_facts", {**state, **update})
+    return update
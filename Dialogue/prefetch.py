@@ -0,0 +1,147 @@
+"""
+Speculative prefetch between turns.
+
+While the player reads a reply the process is idle, and the next turn
+usually follows up on something the last answer mentioned. After a turn the
+Prefetcher warms, for the turn's recent entities and graph neighbors:
+  - the graph cache: each entity and its unfiltered one-hop neighbors
+    (filtered one-hop lookups are then served from that entry)
+  - the store cache: entity facts at the limits the retrieval nodes use
+  - the search and query-embedding caches for the entity names, which is
+    what a follow-up like "Who is Rowan?" routes to
+Work stops once the prefetch has used its CPU budget (thread time), or as
+soon as cancel() is called because the next input arrived.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from config import PREFETCH_CPU_BUDGET_MS, PREFETCH_MAX_ENTITIES
+from Dialogue.retrieval_settings import get_retrieval_settings
+from World.graph_store import get_world_graph
+from World.store import get_world_store
+
+
+LOGGER = logging.getLogger(__name__)
+
+_PREFETCH_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_PREFETCH_EXECUTOR_LOCK = threading.Lock()
+
+
+def _prefetch_executor() -> ThreadPoolExecutor:
+    global _PREFETCH_EXECUTOR
+    if _PREFETCH_EXECUTOR is None:
+        with _PREFETCH_EXECUTOR_LOCK:
+            if _PREFETCH_EXECUTOR is None:
+                _PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+    return _PREFETCH_EXECUTOR
+
+
+class Prefetcher:
+    """
+    Prefetch for one conversation. schedule() after a turn, cancel() when
+    the next input arrives; a new schedule() cancels the previous prefetch.
+    """
+
+    def __init__(
+        self,
+        cpu_budget_ms: float = PREFETCH_CPU_BUDGET_MS,
+        max_entities: int = PREFETCH_MAX_ENTITIES,
+    ):
+        self.cpu_budget_ms = cpu_budget_ms
+        self.max_entities = max_entities
+        self._lock = threading.Lock()
+        self._cancelled: Optional[threading.Event] = None
+        self._future: Optional[Future] = None
+        self._stats = {
+            "scheduled": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "over_budget": 0,
+            "warmed": 0,
+            "cpu_ms": 0.0,
+        }
+
+    def schedule(self, state: Dict[str, Any]) -> None:
+        """
+        Start warming the caches for a finished turn's entities.
+        """
+        self.cancel()
+        names = list(state.get("recent_entities") or [])
+        neighbor_ids = list(state.get("graph_neighbor_ids") or [])
+        if not names and not neighbor_ids:
+            return
+        cancelled = threading.Event()
+        with self._lock:
+            self._cancelled = cancelled
+            self._stats["scheduled"] += 1
+        self._future = _prefetch_executor().submit(self._run, names, neighbor_ids, cancelled)
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancelled is not None:
+                self._cancelled.set()
+                self._cancelled = None
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        future = self._future
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _steps(self, names: List[str], neighbor_ids: List[str]) -> List[Callable[[], Any]]:
+        """
+        Warm-up calls, most likely to pay off first: recent entities before
+        graph neighbors, graph and fact lookups before searches.
+        """
+        graph = get_world_graph()
+        store = get_world_store()
+        settings = get_retrieval_settings()
+        # The fact limits of retrieve_vector_knowledge (entity hits) and expand_neighbor_facts
+        fact_limits = [limit for limit in (settings.entity_facts, settings.neighbor_facts) if limit > 0]
+        entity_ids = []
+        for entity_id in store.resolve_entity_ids(names) + neighbor_ids:
+            if entity_id not in entity_ids:
+                entity_ids.append(entity_id)
+        entity_ids = entity_ids[: self.max_entities]
+
+        steps: List[Callable[[], Any]] = []
+        for entity_id in entity_ids:
+            steps.append(lambda entity_id=entity_id: graph.get_entity(entity_id))
+            steps.append(lambda entity_id=entity_id: graph.get_neighbors(entity_id, edge_types=None, depth=1))
+            for limit in fact_limits:
+                steps.append(lambda entity_id=entity_id, limit=limit: store.facts_for_entity(entity_id, limit=limit))
+        search_names = [name for name in names if name][: self.max_entities]
+        if search_names:
+            steps.append(lambda: store.search_many(search_names, n_results=settings.subject_semantic_k))
+        return steps
+
+    def _run(self, names: List[str], neighbor_ids: List[str], cancelled: threading.Event) -> None:
+        started = time.thread_time()
+        budget = self.cpu_budget_ms / 1000.0
+        outcome = "completed"
+        warmed = 0
+        try:
+            for step in self._steps(names, neighbor_ids):
+                if cancelled.is_set():
+                    outcome = "cancelled"
+                    break
+                if time.thread_time() - started > budget:
+                    outcome = "over_budget"
+                    break
+                try:
+                    step()
+                    warmed += 1
+                except Exception as exc:
+                    LOGGER.debug("Prefetch step failed: %s", exc)
+        finally:
+            with self._lock:
+                self._stats[outcome] += 1
+                self._stats["warmed"] += warmed
+                self._stats["cpu_ms"] += (time.thread_time() - started) * 1000.0
@@ -0,0 +1,426 @@
+"""
+Per-turn CPU and memory profiling.
+
+A profiled turn runs under cProfile and, optionally, tracemalloc. Its
+report is written to PROFILE_DIR as two files named after the trace turn
+id: <turn_id>.pstats (load with pstats, snakeviz, ...) and <turn_id>.txt
+(latency, the top functions by cumulative time and the top allocation
+sites by memory allocated during the turn and still held at its end).
+
+Turns are sampled like traces (Dialogue.trace): 1 in N turns, and/or every
+turn slower than a threshold. A turn's latency is only known at its end,
+so with a threshold every turn is profiled and only the slow ones are
+written; keep N large (or the threshold off) for always-on use.
+
+Before Python 3.12, cProfile only sees the thread it is enabled in, and
+LangGraph runs nodes on worker threads, so each node (wrapped with
+`profiled`) profiles its own thread and the turn merges them. From 3.12,
+cProfile runs on sys.monitoring: one profiler sees every thread and only
+one may be active in the process, so a turn claims it for the graph run
+and a turn that overlaps a profiled one gets no CPU profile (and the
+claiming turn's profile includes the other turn's work). A profiler that
+cannot start (another profiling tool is active) never fails the turn; it
+runs unprofiled. LLM calls made with a deadline to a provider that cannot
+time out its own requests run on the LLM executor and show up only as the
+node's wait. tracemalloc is
+process-wide: it runs while at least one profiled turn is open, and turns
+that overlap see each other's allocations.
+
+Reports are formatted and written on a background thread.
+"""
+
+import cProfile
+import functools
+import io
+import itertools
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from config import (
+    PROFILE_DIR,
+    PROFILE_MAX_REPORTS,
+    PROFILE_MEMORY,
+    PROFILE_SAMPLE_EVERY_N,
+    PROFILE_SLOW_TURN_MS,
+    PROFILE_TOP_N,
+)
+
+
+LOGGER = logging.getLogger(__name__)
+
+_PROFILE_ENABLED = False
+_PROFILE_DIR = PROFILE_DIR
+_PROFILE_SAMPLE_EVERY_N = PROFILE_SAMPLE_EVERY_N
+_PROFILE_SLOW_TURN_MS = PROFILE_SLOW_TURN_MS
+_PROFILE_MEMORY = PROFILE_MEMORY
+_PROFILE_TURN_COUNTER = itertools.count()
+_PROFILE_STATS = {"profiled": 0, "written": 0, "discarded": 0}
+_PROFILE_LOCK = threading.Lock()
+# Base paths of the reports written by this process, oldest first
+_PROFILE_REPORTS: Deque[str] = deque()
+_PROFILE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_PROFILE_LAST_WRITE: Optional[Future] = None
+# Profile of the turn running in the current context (propagates to LangGraph's worker threads)
+_ACTIVE_PROFILE: ContextVar[Optional["TurnProfile"]] = ContextVar("active_turn_profile", default=None)
+
+# Open profiled turns that use tracemalloc, and whether it was started for them
+_TRACEMALLOC_USERS = 0
+_TRACEMALLOC_STARTED = False
+_TRACEMALLOC_LOCK = threading.Lock()
+# The profiler's own allocations (and a report being written for an earlier turn) are left out
+_TRACEMALLOC_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+SAMPLED = "sampled"
+SLOW = "slow"
+
+# From 3.12 cProfile profiles every thread and only one profiler may be active (see module docstring)
+_PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+_PROCESS_PROFILER_LOCK = threading.Lock()
+
+
+def _start_profiler() -> Optional[cProfile.Profile]:
+    """
+    An enabled cProfile.Profile, or None if another profiling tool is active.
+    """
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError as exc:
+        LOGGER.debug("Turn runs unprofiled: %s", exc)
+        return None
+    return profile
+
+
+def _acquire_tracemalloc() -> None:
+    global _TRACEMALLOC_USERS, _TRACEMALLOC_STARTED
+    with _TRACEMALLOC_LOCK:
+        if _TRACEMALLOC_USERS == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _TRACEMALLOC_STARTED = True
+        _TRACEMALLOC_USERS += 1
+        tracemalloc.reset_peak()
+
+
+def _release_tracemalloc() -> None:
+    global _TRACEMALLOC_USERS, _TRACEMALLOC_STARTED
+    with _TRACEMALLOC_LOCK:
+        _TRACEMALLOC_USERS -= 1
+        if _TRACEMALLOC_USERS == 0 and _TRACEMALLOC_STARTED:
+            tracemalloc.stop()
+            _TRACEMALLOC_STARTED = False
+
+
+class TurnProfile:
+    """
+    CPU profiles (one per thread stretch) and tracemalloc snapshots of one
+    turn. `reason` is SAMPLED (always written) or SLOW (written only if the
+    turn reaches the slow threshold).
+    """
+
+    def __init__(self, turn_id: str, reason: str, memory: bool = False):
+        self.turn_id = turn_id
+        self.reason = reason
+        self.started = time.time()
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._snapshot_before: Optional[tracemalloc.Snapshot] = None
+        self._release = None
+        if memory:
+            _acquire_tracemalloc()
+            # Released by finish(), or when an abandoned turn's profile is collected
+            self._release = weakref.finalize(self, _release_tracemalloc)
+            self._snapshot_before = tracemalloc.take_snapshot()
+
+    @contextmanager
+    def run(self) -> Iterator[None]:
+        """
+        Profile the turn's own block. From 3.12 this claims the process-wide
+        profiler, which then also sees the node threads; if another turn
+        holds it, the block runs unprofiled.
+        """
+        if not _PROCESS_WIDE_PROFILER:
+            with self.thread():
+                yield
+            return
+        if not _PROCESS_PROFILER_LOCK.acquire(blocking=False):
+            yield
+            return
+        try:
+            with self._profiled():
+                yield
+        finally:
+            _PROCESS_PROFILER_LOCK.release()
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        """
+        Profile the current thread for the duration of the block, unless a
+        profiler (this turn's or any other) is already active on it. From
+        3.12 a no-op: the profiler claimed by run() covers every thread.
+        """
+        if _PROCESS_WIDE_PROFILER or sys.getprofile() is not None:
+            yield
+            return
+        with self._profiled():
+            yield
+
+    @contextmanager
+    def _profiled(self) -> Iterator[None]:
+        profile = _start_profiler()
+        if profile is None:
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Stop memory tracking; returns what the report is built from.
+        """
+        snapshot_after = None
+        peak_bytes = 0
+        if self._release is not None:
+            if self._release.alive:
+                snapshot_after = tracemalloc.take_snapshot()
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+            self._release()
+        with self._lock:
+            profiles = list(self._profiles)
+        return {
+            "profiles": profiles,
+            "snapshot_before": self._snapshot_before,
+            "snapshot_after": snapshot_after,
+            "peak_bytes": peak_bytes,
+        }
+
+    def discard(self) -> None:
+        if self._release is not None:
+            self._release()
+
+
+def enable_profiling(
+    output_dir: str = PROFILE_DIR,
+    sample_every_n: Optional[int] = None,
+    slow_turn_ms: Optional[float] = None,
+    memory: Optional[bool] = None,
+) -> None:
+    """
+    Start profiling turns into output_dir. sample_every_n / slow_turn_ms /
+    memory default to PROFILE_SAMPLE_EVERY_N / PROFILE_SLOW_TURN_MS /
+    PROFILE_MEMORY; an every_n of 0 profiles only slow turns.
+    """
+    global _PROFILE_ENABLED, _PROFILE_DIR, _PROFILE_SAMPLE_EVERY_N, _PROFILE_SLOW_TURN_MS, _PROFILE_MEMORY
+    os.makedirs(output_dir, exist_ok=True)
+    _PROFILE_DIR = output_dir
+    _PROFILE_SAMPLE_EVERY_N = PROFILE_SAMPLE_EVERY_N if sample_every_n is None else sample_every_n
+    _PROFILE_SLOW_TURN_MS = PROFILE_SLOW_TURN_MS if slow_turn_ms is None else slow_turn_ms
+    _PROFILE_MEMORY = PROFILE_MEMORY if memory is None else memory
+    _PROFILE_ENABLED = True
+
+
+def disable_profiling(timeout: float = 10.0) -> None:
+    """
+    Stop profiling new turns; reports already queued are written before this returns.
+    """
+    global _PROFILE_ENABLED
+    _PROFILE_ENABLED = False
+    flush_profiles(timeout)
+
+
+def flush_profiles(timeout: float = 10.0) -> bool:
+    write = _PROFILE_LAST_WRITE
+    if write is None:
+        return True
+    try:
+        write.result(timeout=timeout)
+    except Exception:
+        return write.done()
+    return True
+
+
+def profiling_enabled() -> bool:
+    return _PROFILE_ENABLED
+
+
+def profiling_stats() -> Dict[str, Any]:
+    with _PROFILE_LOCK:
+        return {**_PROFILE_STATS, "dir": _PROFILE_DIR}
+
+
+def start_turn_profile(turn_id: str) -> Optional[TurnProfile]:
+    """
+    A TurnProfile for this turn if it is one of the 1 in N, or a candidate
+    for the slow-turn check; None if the turn is not profiled.
+    """
+    if not _PROFILE_ENABLED:
+        return None
+    every_n = _PROFILE_SAMPLE_EVERY_N
+    if every_n > 0 and next(_PROFILE_TURN_COUNTER) % every_n == 0:
+        reason = SAMPLED
+    elif _PROFILE_SLOW_TURN_MS > 0:
+        reason = SLOW
+    else:
+        return None
+    with _PROFILE_LOCK:
+        _PROFILE_STATS["profiled"] += 1
+    return TurnProfile(turn_id, reason, memory=_PROFILE_MEMORY)
+
+
+@contextmanager
+def profiling(profile: Optional[TurnProfile]) -> Iterator[None]:
+    """
+    Run the block as part of `profile`'s turn: the current thread is
+    profiled, and so is every `profiled` node run from this context. A
+    turn that raises is discarded. No-op for None.
+    """
+    if profile is None:
+        yield
+        return
+    token = _ACTIVE_PROFILE.set(profile)
+    try:
+        with profile.run():
+            yield
+    except BaseException:
+        profile.discard()
+        raise
+    finally:
+        _ACTIVE_PROFILE.reset(token)
+
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Decorator for graph nodes: when the calling turn is profiled, profile
+    the node's thread while it runs.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _ACTIVE_PROFILE.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        with profile.thread():
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def end_turn_profile(profile: Optional[TurnProfile], latency_ms: float, session_id: str = "") -> None:
+    """
+    Queue the turn's report, or drop it if the turn was only a slow-turn
+    candidate and was not slow.
+    """
+    global _PROFILE_LAST_WRITE
+    if profile is None:
+        return
+    if profile.reason == SLOW and latency_ms < _PROFILE_SLOW_TURN_MS:
+        profile.discard()
+        with _PROFILE_LOCK:
+            _PROFILE_STATS["discarded"] += 1
+        return
+    data = profile.finish()
+    header = {
+        "turn_id": profile.turn_id,
+        "session_id": session_id,
+        "reason": profile.reason,
+        "latency_ms": latency_ms,
+        "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(profile.started)),
+    }
+    _PROFILE_LAST_WRITE = _profile_executor().submit(_write_report, _PROFILE_DIR, header, data)
+
+
+def _profile_executor() -> ThreadPoolExecutor:
+    global _PROFILE_EXECUTOR
+    if _PROFILE_EXECUTOR is None:
+        with _PROFILE_LOCK:
+            if _PROFILE_EXECUTOR is None:
+                _PROFILE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-writer")
+    return _PROFILE_EXECUTOR
+
+
+def _cpu_section(profiles: List[cProfile.Profile], pstats_path: str) -> List[str]:
+    if not profiles:
+        return ["(no CPU profile: another profiler was active)"]
+    stats = pstats.Stats(profiles[0])
+    for profile in profiles[1:]:
+        stats.add(profile)
+    stats.dump_stats(pstats_path)
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+    return [f"Top functions by cumulative time ({os.path.basename(pstats_path)}):", out.getvalue().strip()]
+
+
+def _memory_section(
+    before: Optional[tracemalloc.Snapshot],
+    after: Optional[tracemalloc.Snapshot],
+    peak_bytes: int,
+) -> List[str]:
+    if after is None:
+        return []
+    after = after.filter_traces(_TRACEMALLOC_FILTERS)
+    if before is not None:
+        differences = after.compare_to(before.filter_traces(_TRACEMALLOC_FILTERS), "lineno")
+        differences = [stat for stat in differences if stat.size_diff > 0]
+    else:
+        differences = after.statistics("lineno")
+    lines = [
+        f"Top allocations held at the end of the turn (traced peak {peak_bytes / 1024:.1f} KiB, process-wide):",
+    ]
+    for stat in differences[:PROFILE_TOP_N]:
+        lines.append(f"  {stat}")
+    return lines
+
+
+def _write_report(directory: str, header: Dict[str, Any], data: Dict[str, Any]) -> str:
+    base_path = os.path.join(directory, header["turn_id"])
+    try:
+        lines = [
+            " ".join(
+                f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in header.items()
+            ),
+            "",
+        ]
+        lines.extend(_cpu_section(data["profiles"], base_path + ".pstats"))
+        lines.append("")
+        lines.extend(_memory_section(data["snapshot_before"], data["snapshot_after"], data["peak_bytes"]))
+        with open(base_path + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines).rstrip() + "\n")
+    except Exception:
+        LOGGER.exception("Failed to write the profile of turn %s", header["turn_id"])
+        return base_path
+
+    with _PROFILE_LOCK:
+        _PROFILE_STATS["written"] += 1
+        _PROFILE_REPORTS.append(base_path)
+        expired = []
+        while PROFILE_MAX_REPORTS > 0 and len(_PROFILE_REPORTS) > PROFILE_MAX_REPORTS:
+            expired.append(_PROFILE_REPORTS.popleft())
+    for path in expired:
+        for suffix in (".pstats", ".txt"):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
+    return base_path
@@ -1 +1,165 @@
-# build prompts from world truth
\ No newline at end of file
+"""
+Token-budgeted prompt assembly.
+
+The prompt has a fixed part (system prompt and template text) and variable
+sections (world facts, graph facts, history, user input). Each section gets
+a share of what is left of the total budget; items are kept in rank order
+until the section's allowance runs out, so the lowest-ranked items are the
+first to go. Fact sections are packed greedily (a long item that does not
+fit is skipped and shorter ones after it may still be kept); the history
+is contiguous, so a dropped turn never leaves a gap among the kept ones. Allowance a section does not use is handed to sections that
+overflowed, in section order.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from config import PROMPT_BUDGET_SHARES, PROMPT_TOKEN_BUDGET
+from Dialogue.tokens import TokenCounter, get_token_counter
+
+
+@dataclass
+class BudgetSection:
+    """
+    Items of one prompt section, in display order.
+
+    ranks[i] is the importance of items[i] (0 = most important); by default
+    items are ranked in display order. With truncate=True an item that does
+    not fit is cut down instead of dropped (used for the user input). With
+    contiguous=True the first item that does not fit ends the section, so
+    lower-ranked items are dropped even if they would fit (used for the
+    history).
+    """
+
+    name: str
+    items: List[str]
+    ranks: Optional[List[int]] = None
+    truncate: bool = False
+    contiguous: bool = False
+
+
+@dataclass
+class BudgetResult:
+    items: Dict[str, List[str]] = field(default_factory=dict)
+    report: Dict[str, object] = field(default_factory=dict)
+
+
+class PromptBudgeter:
+    def __init__(
+        self,
+        total_tokens: int = PROMPT_TOKEN_BUDGET,
+        shares: Optional[Dict[str, float]] = None,
+        counter: Optional[TokenCounter] = None,
+    ):
+        self.total_tokens = total_tokens
+        self.shares = dict(shares or PROMPT_BUDGET_SHARES)
+        self.counter = counter or get_token_counter()
+
+    def fit(self, fixed_text: str, sections: List[BudgetSection]) -> BudgetResult:
+        fixed_tokens = self.counter.count(fixed_text)
+        available = max(0, self.total_tokens - fixed_tokens)
+        share_total = sum(self.shares.get(section.name, 0.0) for section in sections) or 1.0
+
+        costs = {section.name: self._costs(section, available) for section in sections}
+        allowances = {
+            section.name: int(available * self.shares.get(section.name, 0.0) / share_total)
+            for section in sections
+        }
+        # Hand allowance a section cannot use to the ones that need more.
+        slack = sum(max(0, allowances[name] - sum(item_costs)) for name, item_costs in costs.items())
+        for section in sections:
+            needed = sum(costs[section.name]) - allowances[section.name]
+            if needed > 0 and slack > 0:
+                extra = min(needed, slack)
+                allowances[section.name] += extra
+                slack -= extra
+
+        result = BudgetResult()
+        section_reports = {}
+        used_total = 0
+        for section in sections:
+            kept, used, dropped, truncated = self._fit_section(
+                section, costs[section.name], allowances[section.name]
+            )
+            result.items[section.name] = kept
+            used_total += used
+            section_reports[section.name] = {
+                "budget": allowances[section.name],
+                "used": used,
+                "items": len(kept),
+                "dropped": dropped,
+                "truncated": truncated,
+            }
+        result.report = {
+            "total": self.total_tokens,
+            "fixed": fixed_tokens,
+            "prompt_tokens": fixed_tokens + used_total,
+            "sections": section_reports,
+        }
+        return result
+
+    @staticmethod
+    def _rank_order(section: BudgetSection) -> List[int]:
+        ranks = section.ranks if section.ranks is not None else list(range(len(section.items)))
+        return sorted(range(len(section.items)), key=lambda index: ranks[index])
+
+    def _costs(self, section: BudgetSection, limit: int) -> List[int]:
+        """
+        Token cost per item. Counting stops once the section exceeds `limit`
+        (the whole available budget): lower-ranked items can never be kept,
+        so they are given a cost of limit + 1 instead of being tokenized.
+        """
+        costs = [limit + 1] * len(section.items)
+        running = 0
+        for index in self._rank_order(section):
+            costs[index] = self.counter.count(section.items[index])
+            running += costs[index]
+            if running > limit:
+                break
+        return costs
+
+    def _fit_section(self, section: BudgetSection, costs: List[int], allowance: int):
+        order = self._rank_order(section)
+        keep = {}
+        used = 0
+        truncated = 0
+        for index in order:
+            cost = costs[index]
+            if used + cost <= allowance:
+                keep[index] = section.items[index]
+                used += cost
+            elif section.truncate and allowance - used > 0:
+                keep[index] = self.counter.truncate(section.items[index], allowance - used, keep="head")
+                used = allowance
+                truncated += 1
+            elif section.contiguous:
+                break
+        kept = [keep[index] for index in range(len(section.items)) if index in keep]
+        return kept, used, len(section.items) - len(kept), truncated
+
+
+# A new history block starts at a blank line followed by the summary header or a player line
+HISTORY_BLOCK_START = re.compile(r"\n\n(?=CONVERSATION SUMMARY:\n|Human: )")
+
+
+def split_history(history: str) -> List[str]:
+    """
+    History blocks (summary, then one block per turn) of a rendered history
+    string. Blank lines inside a reply or the summary do not start a block.
+    Used for plain-string histories; a ConversationMemory gives its blocks
+    directly (ConversationMemory.blocks).
+    """
+    return [f"{block.strip(chr(10))}\n\n" for block in HISTORY_BLOCK_START.split(history) if block.strip()]
+
+
+def history_ranks(blocks: List[str]) -> List[int]:
+    """
+    Ranks for a contiguous history section: the summary block first (it is
+    short and the only record of the folded turns), then turns newest
+    first, so the turns kept are always the most recent run.
+    """
+    ranks = list(range(len(blocks), 0, -1))
+    if blocks and blocks[0].startswith("CONVERSATION SUMMARY:"):
+        ranks[0] = 0
+    return ranks
@@ -2,6 +2,8 @@
 System prompts for NPC dialogue.
 """
 
+from typing import List
+
 
 def get_npc_system_prompt(npc_profile: str) -> str:
     """
@@ -26,3 +28,23 @@ INSTRUCTIONS:
 - If no relevant facts are provided, say you do not know in character
 - If asked about something outside your knowledge or experience, stay in character and respond accordingly (e.g., "I wouldn't know much about that")
 """
+
+
+def get_npc_light_system_prompt(npc_name: str, profile_lines: List[str]) -> str:
+    """
+    Short system prompt for smalltalk turns that need no world knowledge.
+    
+    Args:
+        npc_name: The NPC's name
+        profile_lines: A few short profile facts (location, profession, traits)
+        
+    Returns:
+        A system prompt string
+    """
+    profile = "\n".join(f"- {line}" for line in profile_lines)
+    if profile:
+        profile = f"\n{profile}\n"
+    return f"""You are {npc_name}, a character in a fantasy world.
+{profile}
+Stay in character and reply briefly and naturally to small talk. Do not invent facts about the world.
+"""
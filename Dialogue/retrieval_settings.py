@@ -0,0 +1,52 @@
+"""
+Retrieval sizes: how many semantic hits and facts a turn fetches, and how
+far the connecting-path search goes. Built from config by default;
+benchmarks.retrieval_eval swaps in other settings to compare them (see
+set_retrieval_settings).
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from config import (
+    GRAPH_PATH_LIMIT,
+    GRAPH_PATH_MAX_DEPTH,
+    RETRIEVAL_ENTITY_FACTS,
+    RETRIEVAL_NEIGHBOR_FACTS,
+    RETRIEVAL_SEMANTIC_K,
+    RETRIEVAL_SUBJECT_SEMANTIC_K,
+)
+
+
+@dataclass(frozen=True)
+class RetrievalSettings:
+    """
+    Per-turn retrieval sizes; see the Retrieval and Graph Path Queries
+    sections of config.py.
+    """
+
+    semantic_k: int = RETRIEVAL_SEMANTIC_K
+    subject_semantic_k: int = RETRIEVAL_SUBJECT_SEMANTIC_K
+    entity_facts: int = RETRIEVAL_ENTITY_FACTS
+    neighbor_facts: int = RETRIEVAL_NEIGHBOR_FACTS
+    path_max_depth: int = GRAPH_PATH_MAX_DEPTH
+    path_limit: int = GRAPH_PATH_LIMIT
+
+
+_SETTINGS_INSTANCE: Optional[RetrievalSettings] = None
+
+
+def get_retrieval_settings() -> RetrievalSettings:
+    global _SETTINGS_INSTANCE
+    if _SETTINGS_INSTANCE is None:
+        _SETTINGS_INSTANCE = RetrievalSettings()
+    return _SETTINGS_INSTANCE
+
+
+def set_retrieval_settings(settings: Optional[RetrievalSettings]) -> None:
+    """
+    Use `settings` for turns started from now on. Passing None restores the
+    config defaults.
+    """
+    global _SETTINGS_INSTANCE
+    _SETTINGS_INSTANCE = settings
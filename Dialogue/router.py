@@ -1,8 +1,10 @@
 import json
+import re
 from typing import Dict, List, Optional
 
+from Dialogue.deadline import call_timeout
 from Dialogue.llm.provider import LLMProvider
-from Dialogue.router_models import QuerySpec, Intent, LocationBias, LocationBiasMode
+from Dialogue.router_models import EntityType, ExtractedEntity, QuerySpec, Intent, LocationBias, LocationBiasMode
 
 
 SYSTEM_PROMPT = (
@@ -22,7 +24,10 @@ SYSTEM_PROMPT = (
     "If the subject is ambiguous (e.g., she/he/they/it) and RECENT_ENTITIES are "
     "provided, select the most contextually relevant recent entity as subject_entity. "
     "Set needs_retrieval=false for greetings, chit-chat, or messages that do not "
-    "require world knowledge."
+    "require world knowledge. "
+    "Set history_independent=true only for questions about the world that mean the same "
+    "thing without the earlier conversation (no pronouns or references to what was said "
+    "before); use false for chit-chat and follow-ups."
 )
 
 DEV_PROMPT = """Schema:
@@ -36,48 +41,49 @@ DEV_PROMPT = """Schema:
   "time_window_days": 0,
   "time_constraint_text": "string",
   "location_bias": {"mode": "NEAR_NPC | SPECIFIC_LOCATION | NONE", "location_name": "string"},
-  "answer_format": "BRIEF | NORMAL | DETAILED"
+  "answer_format": "BRIEF | NORMAL | DETAILED",
+  "history_independent": true
 }
 
 Examples:
 Input: Have you heard about any bandit attacks lately?
-Output: {"intent":"ASK_EVENTS","query_text":"bandit attacks","entities":[],"needs_retrieval":true,"subject_entity":"","relationship_term":"","time_window_days":14,"time_constraint_text":"lately","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_EVENTS","query_text":"bandit attacks","entities":[],"needs_retrieval":true,"subject_entity":"","relationship_term":"","time_window_days":14,"time_constraint_text":"lately","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: What happened on the North Road last week?
-Output: {"intent":"ASK_EVENTS","query_text":"what happened on the North Road","entities":[{"name":"North Road","type":"LOCATION"}],"needs_retrieval":true,"subject_entity":"North Road","relationship_term":"","time_window_days":7,"time_constraint_text":"last week","location_bias":{"mode":"SPECIFIC_LOCATION","location_name":"North Road"},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_EVENTS","query_text":"what happened on the North Road","entities":[{"name":"North Road","type":"LOCATION"}],"needs_retrieval":true,"subject_entity":"North Road","relationship_term":"","time_window_days":7,"time_constraint_text":"last week","location_bias":{"mode":"SPECIFIC_LOCATION","location_name":"North Road"},"answer_format":"NORMAL","history_independent":true}
 
 Input: Where can I find Sunleaf?
-Output: {"intent":"ASK_LOCATION","query_text":"find Sunleaf","entities":[{"name":"Sunleaf","type":"ITEM"}],"needs_retrieval":true,"subject_entity":"Sunleaf","relationship_term":"location","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_LOCATION","query_text":"find Sunleaf","entities":[{"name":"Sunleaf","type":"ITEM"}],"needs_retrieval":true,"subject_entity":"Sunleaf","relationship_term":"location","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: What do the Iron Guard do?
-Output: {"intent":"ASK_ENTITY_FACTS","query_text":"Iron Guard role","entities":[{"name":"Iron Guard","type":"ORG"}],"needs_retrieval":true,"subject_entity":"Iron Guard","relationship_term":"role","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_ENTITY_FACTS","query_text":"Iron Guard role","entities":[{"name":"Iron Guard","type":"ORG"}],"needs_retrieval":true,"subject_entity":"Iron Guard","relationship_term":"role","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: What is the Lantern Guild responsible for?
-Output: {"intent":"ASK_ENTITY_FACTS","query_text":"Lantern Guild responsibilities","entities":[{"name":"Lantern Guild","type":"ORG"}],"needs_retrieval":true,"subject_entity":"Lantern Guild","relationship_term":"responsibilities","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_ENTITY_FACTS","query_text":"Lantern Guild responsibilities","entities":[{"name":"Lantern Guild","type":"ORG"}],"needs_retrieval":true,"subject_entity":"Lantern Guild","relationship_term":"responsibilities","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: Who does the Ironwatch report to?
-Output: {"intent":"ASK_RELATIONSHIP","query_text":"Ironwatch chain of command","entities":[{"name":"Ironwatch","type":"ORG"}],"needs_retrieval":true,"subject_entity":"Ironwatch","relationship_term":"chain of command","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_RELATIONSHIP","query_text":"Ironwatch chain of command","entities":[{"name":"Ironwatch","type":"ORG"}],"needs_retrieval":true,"subject_entity":"Ironwatch","relationship_term":"chain of command","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: Who leads the Ironwatch?
-Output: {"intent":"ASK_RELATIONSHIP","query_text":"Ironwatch leader","entities":[{"name":"Ironwatch","type":"ORG"}],"needs_retrieval":true,"subject_entity":"Ironwatch","relationship_term":"leader","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_RELATIONSHIP","query_text":"Ironwatch leader","entities":[{"name":"Ironwatch","type":"ORG"}],"needs_retrieval":true,"subject_entity":"Ironwatch","relationship_term":"leader","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: Who is Captain Voss?
-Output: {"intent":"ASK_ENTITY_FACTS","query_text":"Captain Voss","entities":[{"name":"Captain Voss","type":"NPC"}],"needs_retrieval":true,"subject_entity":"Captain Voss","relationship_term":"","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_ENTITY_FACTS","query_text":"Captain Voss","entities":[{"name":"Captain Voss","type":"NPC"}],"needs_retrieval":true,"subject_entity":"Captain Voss","relationship_term":"","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: Is Port Valor bigger than Grayfall?
-Output: {"intent":"ASK_COMPARISON","query_text":"Port Valor compared to Grayfall","entities":[{"name":"Port Valor","type":"LOCATION"},{"name":"Grayfall","type":"LOCATION"}],"needs_retrieval":true,"subject_entity":"Port Valor","relationship_term":"comparison","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NONE","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_COMPARISON","query_text":"Port Valor compared to Grayfall","entities":[{"name":"Port Valor","type":"LOCATION"},{"name":"Grayfall","type":"LOCATION"}],"needs_retrieval":true,"subject_entity":"Port Valor","relationship_term":"comparison","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NONE","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: How many ships disappeared this season?
-Output: {"intent":"ASK_COUNT","query_text":"ships disappeared this season","entities":[],"needs_retrieval":true,"subject_entity":"","relationship_term":"count","time_window_days":0,"time_constraint_text":"this season","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_COUNT","query_text":"ships disappeared this season","entities":[],"needs_retrieval":true,"subject_entity":"","relationship_term":"count","time_window_days":0,"time_constraint_text":"this season","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: Hi there.
-Output: {"intent":"SMALLTALK","query_text":"hi","entities":[],"needs_retrieval":false,"subject_entity":"","relationship_term":"","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"SMALLTALK","query_text":"hi","entities":[],"needs_retrieval":false,"subject_entity":"","relationship_term":"","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":false}
 
 Input: How old is your sister?
-Output: {"intent":"ASK_RELATIONSHIP","query_text":"sister age","entities":[{"name":"Aldric","type":"NPC"}],"needs_retrieval":true,"subject_entity":"Aldric","relationship_term":"sister","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_RELATIONSHIP","query_text":"sister age","entities":[{"name":"Aldric","type":"NPC"}],"needs_retrieval":true,"subject_entity":"Aldric","relationship_term":"sister","time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 
 Input: Tell me about Prince Theron.
-Output: {"intent":"ASK_ENTITY_FACTS","query_text":"Prince Theron","entities":[{"name":"Prince Theron","type":"NPC"}],"time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL"}
+Output: {"intent":"ASK_ENTITY_FACTS","query_text":"Prince Theron","entities":[{"name":"Prince Theron","type":"NPC"}],"time_window_days":0,"time_constraint_text":"","location_bias":{"mode":"NEAR_NPC","location_name":""},"answer_format":"NORMAL","history_independent":true}
 """
 
 
@@ -143,14 +149,20 @@ def route_query(
     npc_context: Dict[str, str],
     world_hints: Optional[Dict[str, List[str]]] = None,
     recent_entities: Optional[List[str]] = None,
+    deadline: float = 0.0,
 ) -> QuerySpec:
+    """
+    Route with the LLM. With a turn deadline each call only waits until the
+    answer reserve; raises TimeoutError (DeadlineExceeded / LLMTimeout)
+    when routing cannot finish in time.
+    """
     prompt = (
         f"{SYSTEM_PROMPT}\n\n"
         f"{DEV_PROMPT}\n\n"
         f"{_build_user_block(user_text, npc_context, world_hints, recent_entities)}"
     )
 
-    raw = LLMProvider.generate(prompt)
+    raw = LLMProvider.generate(prompt, timeout=call_timeout(deadline))
     json_blob = _extract_json(raw)
     if json_blob:
         try:
@@ -163,7 +175,7 @@ def route_query(
         "Your previous output was invalid JSON. Output ONLY valid JSON.\n\n"
         f"{_build_user_block(user_text, npc_context, world_hints, recent_entities)}"
     )
-    raw_retry = LLMProvider.generate(retry_prompt)
+    raw_retry = LLMProvider.generate(retry_prompt, timeout=call_timeout(deadline))
     json_blob = _extract_json(raw_retry)
     if json_blob:
         try:
@@ -172,3 +184,117 @@ def route_query(
             pass
 
     return _fallback_spec(user_text)
+
+
+# Keyword rules for route_query_locally, checked in order.
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|greetings|well met|thanks|thank you|good (morning|evening|day|night)|bye|farewell)\b",
+    re.IGNORECASE,
+)
+SECOND_PERSON_PATTERN = re.compile(r"\b(you|your|yours|yourself)\b", re.IGNORECASE)
+PRONOUN_PATTERN = re.compile(r"\b(he|she|they|it|him|her|them|his|its|their)\b", re.IGNORECASE)
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(that|those|else|more|again|also|then|what about|and what|the same)\b", re.IGNORECASE
+)
+COMPARISON_PATTERN = re.compile(r"\b(than|compared?|versus|vs)\b", re.IGNORECASE)
+COUNT_PATTERN = re.compile(r"\bhow many\b", re.IGNORECASE)
+HOW_TO_PATTERN = re.compile(r"\bhow (do|can|should|would) (i|we|one)\b", re.IGNORECASE)
+EVENTS_PATTERN = re.compile(r"\b(happen(ed|ing)?|news|lately|recently|rumou?rs?|attacks?)\b", re.IGNORECASE)
+LOCATION_PATTERN = re.compile(r"\b(where|located|find)\b", re.IGNORECASE)
+RELATIONSHIP_PATTERN = re.compile(
+    r"\b(related|relationship|connect(ed|ion)?|between|owns?|owner|owned|leads?|leader|"
+    r"sister|brother|father|mother|son|daughter|uncle|aunt|family|wife|husband)\b",
+    re.IGNORECASE,
+)
+TIME_WINDOWS = (
+    (re.compile(r"\b(lately|recently|these days)\b", re.IGNORECASE), 14),
+    (re.compile(r"\blast week\b", re.IGNORECASE), 7),
+    (re.compile(r"\blast month\b", re.IGNORECASE), 30),
+    (re.compile(r"\btoday\b", re.IGNORECASE), 1),
+    (re.compile(r"\byesterday\b", re.IGNORECASE), 2),
+)
+_HINT_TYPES = (
+    ("org_names", EntityType.ORG),
+    ("location_names", EntityType.LOCATION),
+    ("npc_names", EntityType.NPC),
+    ("item_names", EntityType.ITEM),
+)
+
+
+def _mentioned_entities(user_text: str, world_hints: Optional[Dict[str, List[str]]]) -> List[ExtractedEntity]:
+    """
+    Known names in the message, in order of appearance; a leading "the" is
+    optional ("Crooked Tavern" matches "The Crooked Tavern").
+    """
+    found = []
+    for key, entity_type in _HINT_TYPES:
+        for name in (world_hints or {}).get(key, []):
+            bare = re.sub(r"^the\s+", "", name, flags=re.IGNORECASE)
+            match = re.search(rf"\b{re.escape(bare)}\b", user_text, re.IGNORECASE)
+            if bare and match:
+                found.append((match.start(), ExtractedEntity(name=name, type=entity_type)))
+    found.sort(key=lambda item: item[0])
+    entities = []
+    for _position, entity in found:
+        if entity.name not in [existing.name for existing in entities]:
+            entities.append(entity)
+    return entities
+
+
+def route_query_locally(
+    user_text: str,
+    npc_context: Dict[str, str],
+    world_hints: Optional[Dict[str, List[str]]] = None,
+    recent_entities: Optional[List[str]] = None,
+) -> QuerySpec:
+    """
+    Route without the LLM, from keyword rules and the known names in
+    world_hints. Coarser than route_query (no query rewriting, first match
+    wins), but takes microseconds; used when a turn is short on time.
+    """
+    entities = _mentioned_entities(user_text, world_hints)
+    npc_name = npc_context.get("npc_name", "")
+    asks_about_npc = SECOND_PERSON_PATTERN.search(user_text) and RELATIONSHIP_PATTERN.search(user_text)
+    if not entities and npc_name and asks_about_npc:
+        entities = [ExtractedEntity(name=npc_name, type=EntityType.NPC)]
+    follows_up = bool(FOLLOW_UP_PATTERN.search(user_text))
+    if not entities and PRONOUN_PATTERN.search(user_text):
+        follows_up = True
+        if recent_entities:
+            entities = [ExtractedEntity(name=recent_entities[0], type=EntityType.UNKNOWN)]
+
+    if GREETING_PATTERN.search(user_text) and not entities:
+        intent = Intent.SMALLTALK
+    elif COMPARISON_PATTERN.search(user_text) and len(entities) >= 2:
+        intent = Intent.ASK_COMPARISON
+    elif COUNT_PATTERN.search(user_text):
+        intent = Intent.ASK_COUNT
+    elif HOW_TO_PATTERN.search(user_text):
+        intent = Intent.ASK_HOW_TO
+    elif RELATIONSHIP_PATTERN.search(user_text):
+        intent = Intent.ASK_RELATIONSHIP
+    elif LOCATION_PATTERN.search(user_text):
+        intent = Intent.ASK_LOCATION
+    elif EVENTS_PATTERN.search(user_text):
+        intent = Intent.ASK_EVENTS
+    else:
+        intent = Intent.ASK_ENTITY_FACTS
+
+    time_window_days, time_constraint_text = 0, ""
+    for pattern, days in TIME_WINDOWS:
+        match = pattern.search(user_text)
+        if match:
+            time_window_days, time_constraint_text = days, match.group(0)
+            break
+
+    return QuerySpec(
+        intent=intent,
+        query_text=user_text,
+        entities=entities,
+        needs_retrieval=intent != Intent.SMALLTALK,
+        subject_entity=entities[0].name if entities else "",
+        time_window_days=time_window_days,
+        time_constraint_text=time_constraint_text,
+        location_bias=LocationBias(mode=LocationBiasMode.NEAR_NPC, location_name=""),
+        history_independent=intent != Intent.SMALLTALK and not follows_up,
+    )
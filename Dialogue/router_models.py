@@ -69,6 +69,8 @@ class QuerySpec(BaseModel):
     time_constraint_text: str = ""
     location_bias: LocationBias
     answer_format: AnswerFormat = AnswerFormat.NORMAL
+    # The answer does not depend on earlier turns (see Dialogue.answer_cache)
+    history_independent: bool = False
 
     @field_validator("query_text", "time_constraint_text")
     @classmethod
@@ -0,0 +1,316 @@
+"""
+HTTP / WebSocket API for multi-player dialogue (`python main.py --serve`).
+
+Endpoints (JSON bodies):
+    GET    /health                      server and session counts
+    GET    /sessions                    open sessions
+    POST   /sessions                    {"entity_id": ..., "name": ...} -> new session
+    GET    /sessions/{id}               session details
+    DELETE /sessions/{id}               close a session
+    POST   /sessions/{id}/turn          {"message": ...} -> {"response": ...}
+    POST   /sessions/{id}/turn/stream   same, as Server-Sent Events: one "node"
+                                        event per finished graph node, then "done"
+    GET    /sessions/{id}/ws            WebSocket: send {"message": ...}, receive
+                                        {"type": "node", ...} frames then
+                                        {"type": "response", ...}
+
+Each request is handled on its own thread; see Dialogue.sessions for how
+sessions share the graph and stores.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import struct
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import SERVER_HOST, SERVER_PORT
+from Dialogue.sessions import SessionManager, SessionNotFound
+from Dialogue.trace import serialize_state
+
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_WS_TEXT = 0x1
+_WS_CLOSE = 0x8
+_WS_PING = 0x9
+_WS_PONG = 0xA
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class DialogueHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The socketserver default of 5 resets connections under a burst of players.
+    request_queue_size = 256
+
+    def __init__(self, address: Tuple[str, int], manager: SessionManager):
+        super().__init__(address, DialogueRequestHandler)
+        self.manager = manager
+
+
+class DialogueRequestHandler(BaseHTTPRequestHandler):
+    server: DialogueHTTPServer
+
+    @property
+    def manager(self) -> SessionManager:
+        return self.server.manager
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):  # noqa: N802
+        return
+
+    def _dispatch(self, method: str) -> None:
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        try:
+            if parts == ["health"] and method == "GET":
+                self._send_json({"status": "ok", **self.manager.stats()})
+            elif parts == ["sessions"] and method == "GET":
+                self._send_json({"sessions": [session.describe() for session in self.manager.list_sessions()]})
+            elif parts == ["sessions"] and method == "POST":
+                self._create_session()
+            elif len(parts) == 2 and parts[0] == "sessions" and method == "GET":
+                self._send_json(self.manager.get(parts[1]).describe())
+            elif len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+                if not self.manager.close(parts[1]):
+                    raise SessionNotFound(parts[1])
+                self._send_json({"closed": parts[1]})
+            elif parts[:1] == ["sessions"] and parts[2:] == ["turn"] and method == "POST":
+                self._turn(parts[1])
+            elif parts[:1] == ["sessions"] and parts[2:] == ["turn", "stream"] and method == "POST":
+                self._stream_turn(parts[1])
+            elif parts[:1] == ["sessions"] and parts[2:] == ["ws"] and method == "GET":
+                self._websocket(parts[1])
+            else:
+                raise RequestError(404, f"No route for {method} {self.path}")
+        except SessionNotFound as exc:
+            self._send_error(404, f"Unknown session: {exc.args[0]}")
+        except RequestError as exc:
+            self._send_error(exc.status, str(exc))
+        except ValueError as exc:
+            self._send_error(400, str(exc))
+        except Exception as exc:
+            LOGGER.exception("Request %s %s failed", method, self.path)
+            self._send_error(500, f"Internal error: {exc}")
+
+    # ----- JSON endpoints -----
+
+    def _create_session(self) -> None:
+        body = self._read_json()
+        session = self.manager.create(
+            entity_id=str(body.get("entity_id", "")), name=str(body.get("name", ""))
+        )
+        self._send_json(session.describe(), status=201)
+
+    def _turn(self, session_id: str) -> None:
+        message = self._read_message()
+        started = time.perf_counter()
+        session, response = self.manager.run_turn(session_id, message)
+        self._send_json(
+            {
+                "session_id": session.session_id,
+                "response": response,
+                "turn": session.turns,
+                "latency_ms": round((time.perf_counter() - started) * 1000.0, 1),
+            }
+        )
+
+    def _stream_turn(self, session_id: str) -> None:
+        message = self._read_message()
+        self.manager.get(session_id)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.close_connection = True
+        started = time.perf_counter()
+        response = ""
+        try:
+            for node_name, update in self.manager.stream_turn(session_id, message):
+                response = update.get("formatted_response", response)
+                self._send_event("node", {"node": node_name, "update": serialize_state(update)})
+            self._send_event(
+                "done",
+                {"response": response, "latency_ms": round((time.perf_counter() - started) * 1000.0, 1)},
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            LOGGER.info("Stream client for session %s went away", session_id)
+        except Exception as exc:
+            LOGGER.exception("Streaming turn for session %s failed", session_id)
+            self._send_event("error", {"error": str(exc)})
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, "Request body too large")
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw or b"{}")
+        except json.JSONDecodeError as exc:
+            raise RequestError(400, f"Invalid JSON: {exc}")
+        if not isinstance(body, dict):
+            raise RequestError(400, "Expected a JSON object")
+        return body
+
+    def _read_message(self) -> str:
+        return _message_from(self._read_json())
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str) -> None:
+        try:
+            self._send_json({"error": message}, status=status)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_event(self, event: str, payload: Dict[str, Any]) -> None:
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    # ----- WebSocket (RFC 6455, text frames only) -----
+
+    def _websocket(self, session_id: str) -> None:
+        self.manager.get(session_id)
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        if self.headers.get("Upgrade", "").lower() != "websocket" or not key:
+            raise RequestError(400, "Expected a WebSocket upgrade")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest())
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept.decode("ascii"))
+        self.end_headers()
+        self.close_connection = True
+
+        close_code = 1000
+        try:
+            while True:
+                frame = self._ws_read_message()
+                if frame is None:
+                    break
+                try:
+                    message = _message_from(json.loads(frame))
+                    started = time.perf_counter()
+                    response = ""
+                    for node_name, update in self.manager.stream_turn(session_id, message):
+                        response = update.get("formatted_response", response)
+                        self._ws_send_json({"type": "node", "node": node_name, "update": serialize_state(update)})
+                    self._ws_send_json(
+                        {
+                            "type": "response",
+                            "response": response,
+                            "latency_ms": round((time.perf_counter() - started) * 1000.0, 1),
+                        }
+                    )
+                except SessionNotFound:
+                    self._ws_send_json({"type": "error", "error": "Session closed"})
+                    break
+                except (ValueError, RequestError) as exc:
+                    self._ws_send_json({"type": "error", "error": str(exc)})
+                except (BrokenPipeError, ConnectionResetError):
+                    raise
+                except Exception as exc:
+                    # The 101 is already sent; an HTTP 500 from _dispatch would corrupt the stream
+                    LOGGER.exception("WebSocket turn for session %s failed", session_id)
+                    self._ws_send_json({"type": "error", "error": str(exc)})
+                    close_code = 1011
+                    break
+            self._ws_send_frame(_WS_CLOSE, struct.pack("!H", close_code))
+        except (BrokenPipeError, ConnectionResetError):
+            LOGGER.info("WebSocket client for session %s went away", session_id)
+
+    def _ws_read_message(self) -> Optional[str]:
+        """
+        Next text message (reassembling fragments), or None once the client
+        closes. Pings are answered in between.
+        """
+        fragments = []
+        while True:
+            header = self.rfile.read(2)
+            if len(header) < 2:
+                return None
+            fin, opcode = header[0] & 0x80, header[0] & 0x0F
+            masked, length = header[1] & 0x80, header[1] & 0x7F
+            if length == 126:
+                (length,) = struct.unpack("!H", self.rfile.read(2))
+            elif length == 127:
+                (length,) = struct.unpack("!Q", self.rfile.read(8))
+            if length > MAX_BODY_BYTES:
+                self._ws_send_frame(_WS_CLOSE, struct.pack("!H", 1009))
+                return None
+            mask = self.rfile.read(4) if masked else b""
+            payload = self.rfile.read(length)
+            if mask:
+                payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+            if opcode == _WS_CLOSE:
+                return None
+            if opcode == _WS_PING:
+                self._ws_send_frame(_WS_PONG, payload)
+                continue
+            if opcode == _WS_PONG:
+                continue
+            fragments.append(payload)
+            if fin:
+                return b"".join(fragments).decode("utf-8")
+
+    def _ws_send_frame(self, opcode: int, payload: bytes) -> None:
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+
+    def _ws_send_json(self, payload: Dict[str, Any]) -> None:
+        self._ws_send_frame(_WS_TEXT, json.dumps(payload).encode("utf-8"))
+
+
+def _message_from(body: Any) -> str:
+    message = body.get("message") if isinstance(body, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError("Expected a non-empty \"message\"")
+    return message.strip()
+
+
+def create_dialogue_server(
+    host: str = SERVER_HOST,
+    port: int = SERVER_PORT,
+    manager: Optional[SessionManager] = None,
+) -> DialogueHTTPServer:
+    """
+    Build the server (port 0 picks a free port) and start the idle-session
+    reaper. Call serve_forever() on the result to handle requests.
+    """
+    if manager is None:
+        manager = SessionManager()
+    manager.start_reaper()
+    return DialogueHTTPServer((host, port), manager)
@@ -0,0 +1,205 @@
+"""
+Dialogue sessions for the multi-player server.
+
+A session is one player talking to one NPC: it owns the NPC and the
+ConversationMemory. The compiled graph, the world stores and the NPC
+context cache are process-wide and shared by every session. Turns within a
+session run one at a time (so history stays in order); turns in different
+sessions run concurrently.
+
+Sessions idle for longer than `idle_seconds` are closed by a reaper thread,
+and the least recently active session is closed when `max_sessions` is
+exceeded.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import MAX_SESSIONS, PREFETCH_ENABLED, SESSION_IDLE_SECONDS
+from Dialogue.dialogue_graph import create_dialogue_graph, run_dialogue_turn, stream_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.memory import ConversationMemory
+from Dialogue.prefetch import Prefetcher
+from utils.lru import LRUCache, is_missing
+from World.graph_store import get_world_graph
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+@dataclass
+class DialogueSession:
+    session_id: str
+    npc: NPC
+    memory: ConversationMemory
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.monotonic)
+    turns: int = 0
+    prefetcher: Optional[Prefetcher] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def touch(self) -> None:
+        self.last_active = time.monotonic()
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_active
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "npc": {"entity_id": self.npc.entity_id, "name": self.npc.name},
+            "created_at": self.created_at,
+            "idle_seconds": round(self.idle_seconds(), 1),
+            "turns": self.turns,
+            "memory": self.memory.token_counts(),
+        }
+
+
+class SessionManager:
+    def __init__(
+        self,
+        graph=None,
+        idle_seconds: float = SESSION_IDLE_SECONDS,
+        max_sessions: int = MAX_SESSIONS,
+        prefetch: bool = PREFETCH_ENABLED,
+    ):
+        self.graph = graph if graph is not None else create_dialogue_graph()
+        self.idle_seconds = idle_seconds
+        self.prefetch = prefetch
+        self._sessions = LRUCache(max_sessions, on_evict=self._on_evict)
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.created = 0
+        self.evicted = 0
+
+    def _on_evict(self, session_id: str, session: DialogueSession) -> None:
+        self._release(session)
+        self.evicted += 1
+        LOGGER.info("Session %s evicted (max sessions reached)", session_id)
+
+    def create(self, entity_id: str = "", name: str = "") -> DialogueSession:
+        """
+        Open a session with the NPC named by `entity_id` or `name`.
+
+        Raises ValueError if neither resolves to a world entity.
+        """
+        graph = get_world_graph()
+        entity = (entity_id and graph.get_entity(entity_id)) or (name and graph.get_entity_by_name(name))
+        if not entity:
+            raise ValueError(f"Unknown NPC: {entity_id or name!r}")
+        npc = NPC(entity_id=entity.entity_id, name=name or entity.name)
+        session = DialogueSession(
+            session_id=uuid.uuid4().hex,
+            npc=npc,
+            memory=ConversationMemory(npc_name=npc.name),
+            prefetcher=Prefetcher() if self.prefetch else None,
+        )
+        self._sessions.put(session.session_id, session)
+        self.created += 1
+        return session
+
+    def get(self, session_id: str) -> DialogueSession:
+        session = self._sessions.get(session_id)
+        if is_missing(session):
+            raise SessionNotFound(session_id)
+        return session
+
+    def close(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id)
+        if session is None:
+            return False
+        self._release(session)
+        return True
+
+    @staticmethod
+    def _release(session: DialogueSession) -> None:
+        if session.prefetcher is not None:
+            session.prefetcher.cancel()
+
+    def list_sessions(self) -> List[DialogueSession]:
+        return [session for _session_id, session in self._sessions.items()]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def run_turn(self, session_id: str, user_input: str) -> Tuple[DialogueSession, str]:
+        session = self.get(session_id)
+        with session.lock:
+            session.touch()
+            response = run_dialogue_turn(
+                self.graph,
+                session.npc,
+                user_input,
+                session.memory,
+                session_id=session.session_id,
+                prefetcher=session.prefetcher,
+            )
+            session.turns += 1
+            session.touch()
+        return session, response
+
+    def stream_turn(self, session_id: str, user_input: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield (node_name, update) pairs for one turn. The session stays
+        locked until the generator is exhausted or closed.
+        """
+        session = self.get(session_id)
+        with session.lock:
+            session.touch()
+            yield from stream_dialogue_turn(
+                self.graph,
+                session.npc,
+                user_input,
+                session.memory,
+                session_id=session.session_id,
+                prefetcher=session.prefetcher,
+            )
+            session.turns += 1
+            session.touch()
+
+    def evict_idle(self) -> int:
+        """
+        Close sessions idle for longer than `idle_seconds`. Sessions with a
+        turn in progress are left alone.
+        """
+        closed = 0
+        for session_id, session in self._sessions.items():
+            if session.idle_seconds() > self.idle_seconds and not session.lock.locked():
+                self._sessions.pop(session_id)
+                self._release(session)
+                closed += 1
+        if closed:
+            self.evicted += closed
+            LOGGER.info("Closed %d idle session(s)", closed)
+        return closed
+
+    def start_reaper(self, interval: Optional[float] = None) -> None:
+        if self._reaper is not None:
+            return
+        interval = interval or max(1.0, min(60.0, self.idle_seconds / 4))
+
+        def reap() -> None:
+            while not self._stop.wait(interval):
+                self.evict_idle()
+
+        self._reaper = threading.Thread(target=reap, name="session-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "open": len(self._sessions),
+            "created": self.created,
+            "evicted": self.evicted,
+            "max_sessions": self._sessions.max_entries,
+        }
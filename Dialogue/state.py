@@ -3,8 +3,23 @@ State definitions for the dialogue graph.
 Defines the structure of data flowing through the dialogue system.
 """
 
-from typing import TypedDict, List, Dict, Any
+from typing import Annotated, TypedDict, List, Dict, Any
+from Dialogue.deadline import merge_degradations
 from Dialogue.entities.npc import NPC
+from Dialogue.llm.usage import merge_llm_usage
+
+
+def merge_retrieval_hits(
+    current: Dict[str, List[Dict[str, str]]],
+    update: Dict[str, List[Dict[str, str]]],
+) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Reducer for retrieval_hits: parallel branches each add their own sources
+    (semantic, entity, neighbor) without overwriting the others.
+    """
+    merged = dict(current or {})
+    merged.update(update or {})
+    return merged
 
 
 class DialogueContext(TypedDict):
@@ -37,26 +52,47 @@ class DialogueState(TypedDict):
     - response: LLM response data
     """
     # Context (set at start)
+    # Server session the turn belongs to; empty for the CLI (see Dialogue.sessions)
+    session_id: str
+    # Id of this turn in trace events; also decides whether it is traced (see Dialogue.trace)
+    turn_id: str
     npc: NPC
     user_input: str
     conversation_history: str
+    # The history as whole blocks (summary, then one per turn) for the prompt budget
+    history_blocks: List[str]
+    # Token counts of the rendered history (see Dialogue.memory), if a memory is used
+    memory_tokens: Dict[str, int]
+    # Turn deadline (time.monotonic() seconds, 0.0 = none) and the cheaper
+    # paths nodes took to meet it (see Dialogue.deadline)
+    deadline: float
+    degradations: Annotated[List[str], merge_degradations]
     
     # Prompts (built during processing)
     system_prompt: str
     full_prompt: str
+    # Token budget applied per prompt section (see Dialogue.prompt_builder)
+    prompt_budget: Dict[str, Any]
     
     # Response (generated and formatted)
     raw_response: str
     formatted_response: str
+    # LLM calls per node: tokens, wall/server/network ms and cost (see Dialogue.llm.usage)
+    llm_usage: Annotated[Dict[str, Dict[str, float]], merge_llm_usage]
 
     # Retrieval (Phase 1 RAG)
+    retrieval_hits: Annotated[Dict[str, List[Dict[str, str]]], merge_retrieval_hits]
     retrieval_results: List[Dict[str, str]]
     query_spec: Dict[str, Any]
-    graph_facts: List[str]
+    graph_facts: List[Dict[str, str]]
     graph_query_spec: Dict[str, Any]
     graph_neighbor_ids: List[str]
-    npc_node_facts: List[str]
+    npc_node_facts: List[Dict[str, str]]
     recent_entities: List[str]
+    # light | vector | full | cached (see Dialogue.nodes.routing)
+    turn_path: str
+    # Answer cache lookup / store for the turn (see Dialogue.nodes.answer_cache)
+    answer_cache: Dict[str, Any]
     
     # Extensible fields for future phases
     # retrieval_results: Optional[List[str]]  # For knowledge retrieval
@@ -0,0 +1,121 @@
+"""
+Token counting for prompt budgeting and memory reporting.
+
+If TOKENIZER_PATH points at a tokenizer.json (Hugging Face `tokenizers`
+format), counts are exact for that model. Otherwise every count in the
+package is one estimate, estimate_tokens(): CHARS_PER_TOKEN characters per
+token, the usual ratio for English text under BPE vocabularies. Counting
+words or punctuation runs instead undercounts subword tokens by a quarter or
+more, so a budget set in tokens would overrun the model's window.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Optional
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # pragma: no cover
+    Tokenizer = None
+
+from config import TOKENIZER_PATH
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Characters per token, the usual ratio for English BPE vocabularies; the one factor behind every estimate
+CHARS_PER_TOKEN = 4
+# Words per token, same source; for asking a model for a length set in tokens (exact counts)
+WORDS_PER_TOKEN = 0.75
+# Characters per word with its trailing space (English averages under 6); the same ask under estimated counts
+CHARS_PER_WORD = 6
+
+# A partial word at either end of an estimated cut
+_HEAD_PARTIAL_WORD = re.compile(r"\w+$")
+_TAIL_PARTIAL_WORD = re.compile(r"^\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count from the text length. This is what TokenCounter counts
+    without a tokenizer, and what metrics on the request path use either
+    way: an exact count takes a millisecond or more on a long prompt and
+    holds the GIL while it runs.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class TokenCounter:
+    def __init__(self, tokenizer_path: str = ""):
+        self._tokenizer = None
+        if tokenizer_path and Tokenizer is not None:
+            try:
+                self._tokenizer = Tokenizer.from_file(tokenizer_path)
+            except Exception as exc:
+                LOGGER.warning("Could not load tokenizer %s (%s); using estimated counts", tokenizer_path, exc)
+
+    @property
+    def exact(self) -> bool:
+        return self._tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+        return estimate_tokens(text)
+
+    def words(self, max_tokens: int) -> int:
+        """
+        Words of English prose that count as at most about `max_tokens`, for
+        asking a model for a length that truncate() will not have to cut.
+        """
+        if self._tokenizer is not None:
+            return int(max_tokens * WORDS_PER_TOKEN)
+        return max_tokens * CHARS_PER_TOKEN // CHARS_PER_WORD
+
+    def truncate(self, text: str, max_tokens: int, keep: str = "tail") -> str:
+        """
+        Cut `text` to at most `max_tokens`, keeping the head or the tail.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        if self._tokenizer is not None:
+            offsets = self._tokenizer.encode(text, add_special_tokens=False).offsets
+            if keep == "head":
+                return text[: offsets[max_tokens - 1][1]]
+            return text[offsets[-max_tokens][0] :]
+        # Estimated counts: cut by length, then drop a word the cut split (unless it is all that is left)
+        limit = max_tokens * CHARS_PER_TOKEN
+        if keep == "head":
+            cut = text[:limit]
+            if text[limit].isalnum() or text[limit] == "_":
+                cut = _HEAD_PARTIAL_WORD.sub("", cut) or cut
+            return cut
+        start = len(text) - limit
+        cut = text[start:]
+        if text[start - 1].isalnum() or text[start - 1] == "_":
+            cut = _TAIL_PARTIAL_WORD.sub("", cut) or cut
+        return cut
+
+
+_COUNTER_INSTANCE: Optional[TokenCounter] = None
+_COUNTER_LOCK = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    global _COUNTER_INSTANCE
+    if _COUNTER_INSTANCE is None:
+        with _COUNTER_LOCK:
+            if _COUNTER_INSTANCE is None:
+                _COUNTER_INSTANCE = TokenCounter(os.getenv("TOKENIZER_PATH", TOKENIZER_PATH))
+    return _COUNTER_INSTANCE
+
+
+def count_tokens(text: str) -> int:
+    return get_token_counter().count(text)
+
@@ -1,31 +1,409 @@
+"""
+Node-level tracing of dialogue turns.
+
+record_trace runs on the request path, so it only hands the node name, a
+timestamp and the state to a TraceSink: a bounded queue drained by one
+writer thread, which serializes the events and appends them in batches to
+trace.jsonl through a long-lived file handle, rotating it by size. When the
+queue is full, events are dropped and counted rather than blocking a turn.
+Serialization is deferred to the writer because nodes pass a fresh
+`{**state, **update}` dict and never mutate state in place.
+
+Events are delta-encoded: the first event of a turn is a keyframe with the
+full state, later ones hold only the keys that differ from the turn's
+previous event. Dialogue.trace_reader rebuilds the full state at any step.
+
+Turns are sampled as a whole: 1 in N turns, and/or every turn slower than a
+threshold. Events of a turn that may still qualify as slow are held until
+end_trace_turn decides. A traced turn ends with a "turn_spans" event holding
+its latency and timing spans (utils.spans).
+"""
+
+import atexit
+import itertools
 import json
+import logging
 import os
+import queue
 import threading
 import time
-from typing import Any, Dict, List, Tuple
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 
+from config import (
+    TRACE_BACKUPS,
+    TRACE_BATCH_SIZE,
+    TRACE_BUFFER_BYTES,
+    TRACE_BUFFER_EVENTS,
+    TRACE_DIR,
+    TRACE_MAX_BYTES,
+    TRACE_QUEUE_SIZE,
+    TRACE_SAMPLE_EVERY_N,
+    TRACE_SLOW_TURN_MS,
+)
+from Dialogue.llm.usage import llm_usage_totals
+from utils.lru import LRUCache, is_missing
+
+
+LOGGER = logging.getLogger(__name__)
 
 _TRACE_ENABLED = False
-_TRACE_EVENTS: List[Dict[str, Any]] = []
+_TRACE_SINK: Optional["TraceSink"] = None
 _TRACE_LOCK = threading.Lock()
-_TRACE_OUTPUT_PATH = ""
-_TRACE_NEXT_ID = 1
+_TRACE_SAMPLE_EVERY_N = TRACE_SAMPLE_EVERY_N
+_TRACE_SLOW_TURN_MS = TRACE_SLOW_TURN_MS
+_TRACE_TURN_COUNTER = itertools.count()
+# turn_id -> _STREAM, _SKIP, or the events held until the turn's latency is known
+_TRACE_TURNS = LRUCache(1024)
+_STREAM = "stream"
+_SKIP = "skip"
+_STOP = object()
+# Node name of the event that closes a traced turn with its timing spans
+TURN_SPANS_NODE = "turn_spans"
+# Turns whose last written state the writer keeps for delta encoding
+_SNAPSHOT_TURNS = 256
+
+
+class TraceEventBuffer:
+    """
+    The most recent trace events, bounded by count and by serialized size.
+
+    Event ids are consecutive (one writer assigns them), so an event lives
+    in slot id % capacity and lookup by id is O(1). Each event is kept with
+    its JSON line, so viewers can send it without encoding it again. Not
+    thread-safe; the sink guards it with its lock.
+    """
+
+    def __init__(self, max_events: int = TRACE_BUFFER_EVENTS, max_bytes: int = TRACE_BUFFER_BYTES):
+        self.capacity = max(1, max_events)
+        self.max_bytes = max_bytes
+        self._slots: List[Optional[Tuple[Dict[str, Any], str]]] = [None] * self.capacity
+        # Oldest kept id and the id after the newest; empty when equal
+        self._first_id = 1
+        self._end_id = 1
+        self.bytes = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._end_id - self._first_id
+
+    def append(self, event: Dict[str, Any], line: str) -> None:
+        if len(self) == 0:
+            self._first_id = event["id"]
+        elif len(self) == self.capacity:
+            self._evict_oldest()
+        self._slots[event["id"] % self.capacity] = (event, line)
+        self._end_id = event["id"] + 1
+        self.bytes += len(line)
+        # The newest event is kept even if it alone is over the byte limit
+        while self.max_bytes and self.bytes > self.max_bytes and len(self) > 1:
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        slot = self._first_id % self.capacity
+        _event, line = self._slots[slot]
+        self._slots[slot] = None
+        self.bytes -= len(line)
+        self._first_id += 1
+        self.evicted += 1
+
+    def get(self, event_id: int) -> Optional[Dict[str, Any]]:
+        if not self._first_id <= event_id < self._end_id:
+            return None
+        return self._slots[event_id % self.capacity][0]
+
+    @property
+    def last_id(self) -> int:
+        return self._end_id - 1
+
+    def entries_since(self, event_id: int) -> Tuple[List[Tuple[Dict[str, Any], str]], int, int]:
+        """
+        ((event, JSON line) after event_id, id of the newest event, events
+        after event_id that were already evicted).
+        """
+        if len(self) == 0:
+            return [], event_id, 0
+        start = max(event_id + 1, self._first_id)
+        missed = max(0, self._first_id - (event_id + 1))
+        entries = [self._slots[event % self.capacity] for event in range(start, self._end_id)]
+        return entries, self._end_id - 1, missed
+
+    def since(self, event_id: int) -> Tuple[List[Dict[str, Any]], int, int]:
+        entries, last_id, missed = self.entries_since(event_id)
+        return [event for event, _line in entries], last_id, missed
+
+
+class TraceSink:
+    """
+    Writes trace events from a background thread.
+
+    submit() only enqueues; the writer thread assigns event ids (so ids are
+    unique and in file order), delta-encodes and serializes, writes up to
+    `batch_size` events per write and rotates the file past `max_bytes`,
+    keeping `backups` rotated files. Each file starts every turn with a
+    keyframe. The latest written events are also kept in a TraceEventBuffer
+    for the live viewer.
+
+    Deltas are taken against the last state the writer saw for the turn, so
+    a dropped event loses that step only; the steps after it still rebuild.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        queue_size: int = TRACE_QUEUE_SIZE,
+        batch_size: int = TRACE_BATCH_SIZE,
+        max_bytes: int = TRACE_MAX_BYTES,
+        backups: int = TRACE_BACKUPS,
+    ):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._file = open(path, "w", encoding="utf-8")
+        self._bytes = 0
+        self._next_id = 1
+        self._snapshots = LRUCache(_SNAPSHOT_TURNS)
+        self._events = TraceEventBuffer()
+        self._lock = threading.Lock()
+        self._written_cond = threading.Condition(self._lock)
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.bytes_written = 0
+        self.cpu_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        node_name: str,
+        turn_id: str,
+        timestamp: float,
+        state: Optional[Dict[str, Any]],
+        fields: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Queue one event; False (and counted as dropped) if the queue is full.
+        An event without a state (e.g. a turn's spans) is written with
+        `fields` as given and takes no part in delta encoding.
+        """
+        try:
+            self._queue.put_nowait((node_name, turn_id, timestamp, state, fields or {}))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until every event submitted so far is written.
+        """
+        deadline = time.monotonic() + timeout
+        with self._written_cond:
+            target = self.submitted
+            while self.written < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._written_cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.flush(timeout)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def events_since(self, event_id: int) -> Tuple[List[Dict[str, Any]], int, int]:
+        with self._lock:
+            return self._events.since(event_id)
+
+    def entries_since(self, event_id: int) -> Tuple[List[Tuple[Dict[str, Any], str]], int, int]:
+        with self._lock:
+            return self._events.entries_since(event_id)
+
+    def wait_for_events(self, event_id: int, timeout: float) -> bool:
+        """
+        Block until an event newer than event_id is buffered (True) or
+        `timeout` seconds pass (False). Only viewer threads wait here; the
+        writer just notifies once per batch.
+        """
+        with self._written_cond:
+            return self._written_cond.wait_for(lambda: self._events.last_id > event_id, timeout)
 
+    def get_event(self, event_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._events.get(event_id)
 
-def enable_trace(output_dir: str = "trace") -> None:
-    global _TRACE_ENABLED, _TRACE_OUTPUT_PATH, _TRACE_NEXT_ID
-    os.makedirs(output_dir, exist_ok=True)
-    _TRACE_OUTPUT_PATH = os.path.join(output_dir, "trace.jsonl")
-    with open(_TRACE_OUTPUT_PATH, "w", encoding="utf-8") as f:
-        f.write("")
-    _TRACE_NEXT_ID = 1
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "queued": self._queue.qsize(),
+                "rotations": self.rotations,
+                "bytes_written": self.bytes_written,
+                "cpu_ms": self.cpu_ms,
+                "buffered": len(self._events),
+                "buffered_bytes": self._events.bytes,
+                "buffer_evicted": self._events.evicted,
+            }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while item is not _STOP and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self._write(batch)
+            if stop:
+                self._file.close()
+                return
+
+    def encode(self, turn_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The state part of an event: a keyframe for the first event of a
+        turn, otherwise the keys changed since the turn's previous event.
+        """
+        previous = self._snapshots.get(turn_id) if turn_id else None
+        if turn_id:
+            self._snapshots.put(turn_id, state)
+        if previous is None or is_missing(previous):
+            return {"keyframe": True, "delta": serialize_state(state)}
+        changed = {
+            key: value
+            for key, value in state.items()
+            if key not in previous or (previous[key] is not value and previous[key] != value)
+        }
+        fields = {"keyframe": False, "delta": serialize_state(changed)}
+        removed = [key for key in previous if key not in state]
+        if removed:
+            fields["removed"] = removed
+        return fields
+
+    def _write(self, batch: List[Tuple[str, str, float, Optional[Dict[str, Any]], Dict[str, Any]]]) -> None:
+        cpu_started = time.thread_time()
+        events = []
+        lines = []
+        for node_name, turn_id, timestamp, state, fields in batch:
+            event = {
+                "id": self._next_id,
+                "turn_id": turn_id,
+                "session_id": state.get("session_id", "") if state is not None else "",
+                "timestamp": timestamp,
+                "node": node_name,
+                **(self.encode(turn_id, state) if state is not None else fields),
+            }
+            self._next_id += 1
+            events.append(event)
+            lines.append(json.dumps(event) + "\n")
+            # Give the GIL back between events, so a turn thread waking up
+            # does not wait out a whole batch of serialization
+            time.sleep(0)
+        payload = "".join(lines)
+        try:
+            self._file.write(payload)
+            self._file.flush()
+            self._bytes += len(payload)
+            if self.max_bytes and self._bytes >= self.max_bytes:
+                self._rotate()
+        except OSError as exc:
+            LOGGER.warning("Trace write failed: %s", exc)
+            # Later deltas would refer to states that never reached the file
+            self._snapshots.clear()
+        cpu_ms = (time.thread_time() - cpu_started) * 1000.0
+        with self._written_cond:
+            for event, line in zip(events, lines):
+                self._events.append(event, line)
+            self.written += len(events)
+            self.bytes_written += len(payload)
+            self.cpu_ms += cpu_ms
+            self._written_cond.notify_all()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._bytes = 0
+        self._snapshots.clear()
+        self.rotations += 1
+
+
+def enable_trace(
+    output_dir: str = TRACE_DIR,
+    sample_every_n: Optional[int] = None,
+    slow_turn_ms: Optional[float] = None,
+    sink: Optional[TraceSink] = None,
+) -> None:
+    """
+    Start tracing to output_dir/trace.jsonl (truncated), replacing any
+    earlier sink. sample_every_n / slow_turn_ms default to
+    TRACE_SAMPLE_EVERY_N / TRACE_SLOW_TURN_MS; an every_n of 0 traces only
+    slow turns.
+    """
+    global _TRACE_ENABLED, _TRACE_SINK, _TRACE_SAMPLE_EVERY_N, _TRACE_SLOW_TURN_MS
+    disable_trace()
+    if sink is None:
+        os.makedirs(output_dir, exist_ok=True)
+        sink = TraceSink(os.path.join(output_dir, "trace.jsonl"))
+    _TRACE_SAMPLE_EVERY_N = TRACE_SAMPLE_EVERY_N if sample_every_n is None else sample_every_n
+    _TRACE_SLOW_TURN_MS = TRACE_SLOW_TURN_MS if slow_turn_ms is None else slow_turn_ms
+    _TRACE_TURNS.clear()
+    _TRACE_SINK = sink
     _TRACE_ENABLED = True
 
 
+def disable_trace() -> None:
+    """
+    Stop tracing; events already recorded are written before this returns.
+    """
+    global _TRACE_ENABLED, _TRACE_SINK
+    _TRACE_ENABLED = False
+    sink, _TRACE_SINK = _TRACE_SINK, None
+    if sink is not None:
+        sink.close()
+
+
+def get_trace_sink() -> Optional[TraceSink]:
+    """
+    The sink trace events currently go to, or None when tracing is off.
+    """
+    return _TRACE_SINK
+
+
+def flush_trace(timeout: float = 5.0) -> bool:
+    sink = _TRACE_SINK
+    return sink.flush(timeout) if sink is not None else True
+
+
 def trace_enabled() -> bool:
     return _TRACE_ENABLED
 
 
+def trace_stats() -> Dict[str, int]:
+    sink = _TRACE_SINK
+    return sink.stats() if sink is not None else {}
+
+
 def _serialize_value(value: Any) -> Any:
     if value is None:
         return None
@@ -39,6 +417,9 @@ def _serialize_value(value: Any) -> Any:
     npc_fields = ["name", "age", "location", "profession", "traits"]
     if all(hasattr(value, field) for field in npc_fields):
         return {field: getattr(value, field) for field in npc_fields}
+    # Entities (NPC) by identity; their __dict__ holds the shared context cache
+    if hasattr(value, "entity_id") and hasattr(value, "name"):
+        return {"entity_id": value.entity_id, "name": value.name}
 
     if hasattr(value, "__dict__"):
         return {key: _serialize_value(val) for key, val in value.__dict__.items()}
@@ -46,33 +427,88 @@ def _serialize_value(value: Any) -> Any:
     return str(value)
 
 
-def _serialize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+def serialize_state(state: Dict[str, Any]) -> Dict[str, Any]:
     return {key: _serialize_value(val) for key, val in state.items()}
 
 
+def new_trace_turn() -> str:
+    """
+    Id for a new turn (the turn_id state field), with its sampling decided:
+    streamed if it is one of the 1 in N, otherwise held for the slow-turn
+    check, or skipped.
+    """
+    turn_id = uuid.uuid4().hex[:12]
+    if not _TRACE_ENABLED:
+        return turn_id
+    every_n = _TRACE_SAMPLE_EVERY_N
+    if every_n > 0 and next(_TRACE_TURN_COUNTER) % every_n == 0:
+        _TRACE_TURNS.put(turn_id, _STREAM)
+    elif _TRACE_SLOW_TURN_MS > 0:
+        _TRACE_TURNS.put(turn_id, [])
+    else:
+        _TRACE_TURNS.put(turn_id, _SKIP)
+    return turn_id
+
+
+def end_trace_turn(
+    turn_id: str,
+    latency_ms: float,
+    spans: Optional[List[Dict[str, Any]]] = None,
+    session_id: str = "",
+    llm_usage: Optional[Dict[str, Dict[str, float]]] = None,
+) -> None:
+    """
+    Write the held events of a turn that turned out slow; drop the rest.
+    A traced turn ends with a "turn_spans" event: its latency and timing
+    spans (utils.spans), for the live viewer's waterfall, and its LLM usage
+    per node and in total (see Dialogue.llm.usage).
+    """
+    sampling = _TRACE_TURNS.pop(turn_id)
+    sink = _TRACE_SINK
+    if sink is None or is_missing(sampling) or sampling == _SKIP:
+        return
+    if isinstance(sampling, list):
+        if latency_ms < _TRACE_SLOW_TURN_MS:
+            return
+        with _TRACE_LOCK:
+            held = list(sampling)
+            sampling.clear()
+        for node_name, timestamp, state in held:
+            sink.submit(node_name, turn_id, timestamp, state)
+    if spans is not None:
+        fields = {"session_id": session_id, "latency_ms": latency_ms, "spans": spans}
+        if llm_usage:
+            fields["llm_usage"] = {"nodes": llm_usage, "total": llm_usage_totals(llm_usage)}
+        sink.submit(TURN_SPANS_NODE, turn_id, time.time(), None, fields)
+
+
 def record_trace(node_name: str, state: Dict[str, Any]) -> None:
     if not _TRACE_ENABLED:
         return
-    global _TRACE_NEXT_ID
-    event = {
-        "id": _TRACE_NEXT_ID,
-        "timestamp": time.time(),
-        "node": node_name,
-        "state": _serialize_state(state),
-    }
-    _TRACE_NEXT_ID += 1
-    with _TRACE_LOCK:
-        _TRACE_EVENTS.append(event)
-        if _TRACE_OUTPUT_PATH:
-            with open(_TRACE_OUTPUT_PATH, "a", encoding="utf-8") as f:
-                f.write(json.dumps(event))
-                f.write("\n")
-
-
-def get_events_since(event_id: int) -> Tuple[List[Dict[str, Any]], int]:
-    with _TRACE_LOCK:
-        if not _TRACE_EVENTS:
-            return [], event_id
-        events = [event for event in _TRACE_EVENTS if event["id"] > event_id]
-        next_id = _TRACE_EVENTS[-1]["id"] if _TRACE_EVENTS else event_id
-        return events, next_id
+    sink = _TRACE_SINK
+    turn_id = state.get("turn_id", "")
+    sampling = _TRACE_TURNS.get(turn_id) if turn_id else _STREAM
+    if is_missing(sampling) or sampling == _SKIP or sink is None:
+        return
+    if isinstance(sampling, list):
+        with _TRACE_LOCK:
+            sampling.append((node_name, time.time(), state))
+        return
+    sink.submit(node_name, turn_id, time.time(), state)
+
+
+def get_events_since(event_id: int) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Buffered events after event_id, the newest event id, and how many events
+    after event_id were evicted from the buffer before they were asked for.
+    """
+    sink = _TRACE_SINK
+    return sink.events_since(event_id) if sink is not None else ([], event_id, 0)
+
+
+def get_trace_event(event_id: int) -> Optional[Dict[str, Any]]:
+    sink = _TRACE_SINK
+    return sink.get_event(event_id) if sink is not None else None
+
+
+atexit.register(disable_trace)
@@ -0,0 +1,171 @@
+"""
+Rebuild full dialogue states from delta-encoded trace events.
+
+Dialogue.trace writes a keyframe (the full state) for the first event of a
+turn and only the changed keys after that. TraceStateBuilder applies events
+in order and keeps the current state of every turn; state_at rebuilds the
+state at one event from a list of events, lookup_state from an event lookup
+(the live viewer's in-memory buffer). Events from before delta encoding (a full "state")
+are read as keyframes, and events without a state (turn_spans) change nothing.
+
+Offline:
+    python -m Dialogue.trace_reader trace/trace.jsonl --event 42
+    python -m Dialogue.trace_reader trace/trace.jsonl --turn 3f2a9c01b7de
+"""
+
+import argparse
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def trace_files(path: str) -> List[str]:
+    """
+    A trace file and its rotated predecessors, oldest first.
+    """
+    rotated = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        rotated.append(f"{path}.{index}")
+        index += 1
+    files = list(reversed(rotated))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_events(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Events from a trace file and its rotated predecessors, in write order.
+    A partly written last line (the writer is mid-flush) is skipped.
+    """
+    for file_path in trace_files(path):
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def _fields(event: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+    if "delta" in event:
+        return bool(event.get("keyframe")), event["delta"]
+    if "state" in event:
+        return True, event["state"]
+    # No state step (a turn's "turn_spans" event): the state is unchanged
+    return False, {}
+
+
+class TraceStateBuilder:
+    """
+    Applies trace events in order and tracks the full state of each turn.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, Any]] = {}
+
+    def apply(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The full state after `event`, or None if the turn's keyframe has not
+        been seen (e.g. it was in a rotated-away file).
+        """
+        turn_id = event.get("turn_id", "")
+        keyframe, delta = _fields(event)
+        if keyframe:
+            state = dict(delta)
+        elif turn_id in self._states:
+            state = {**self._states[turn_id], **delta}
+            for key in event.get("removed", []):
+                state.pop(key, None)
+        else:
+            return None
+        if turn_id:
+            self._states[turn_id] = state
+        return state
+
+
+def rebuild_states(events: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """
+    (event, full state after it) for each event.
+    """
+    builder = TraceStateBuilder()
+    for event in events:
+        yield event, builder.apply(event)
+
+
+def state_at(events: Iterable[Dict[str, Any]], event_id: int) -> Optional[Dict[str, Any]]:
+    """
+    The full state after event `event_id`: its turn's events up to it are
+    replayed, other turns are skipped.
+    """
+    events = list(events)
+    target = next((event for event in events if event.get("id") == event_id), None)
+    if target is None:
+        return None
+    turn_id = target.get("turn_id", "")
+    builder = TraceStateBuilder()
+    state = None
+    for event in events:
+        if event.get("turn_id", "") != turn_id:
+            continue
+        state = builder.apply(event)
+        if event is target:
+            return state
+    return state
+
+
+def lookup_state(get_event: Callable[[int], Optional[Dict[str, Any]]], event_id: int) -> Optional[Dict[str, Any]]:
+    """
+    The full state after event `event_id`, walking back by id to its turn's
+    keyframe. None if an event on the way is no longer available.
+    """
+    target = get_event(event_id)
+    if target is None:
+        return None
+    turn_id = target.get("turn_id", "")
+    chain = [target]
+    cursor = event_id - 1
+    while not _fields(chain[-1])[0]:
+        if cursor < 1:
+            return None
+        event = get_event(cursor)
+        if event is None:
+            return None
+        if event.get("turn_id", "") == turn_id:
+            chain.append(event)
+        cursor -= 1
+    builder = TraceStateBuilder()
+    state = None
+    for event in reversed(chain):
+        state = builder.apply(event)
+    return state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild dialogue states from a trace file")
+    parser.add_argument("path", help="trace.jsonl (rotated .1, .2, ... files are read too)")
+    parser.add_argument("--event", type=int, help="Print the full state after this event id")
+    parser.add_argument("--turn", help="Print the nodes of this turn and the keys each changed")
+    args = parser.parse_args()
+
+    events = list(read_events(args.path))
+    if args.event is not None:
+        print(json.dumps(state_at(events, args.event), indent=2))
+        return
+    for event in events:
+        if args.turn and event.get("turn_id") != args.turn:
+            continue
+        keyframe, delta = _fields(event)
+        if "spans" in event:
+            changed = f"{event['latency_ms']:.1f}ms, {len(event['spans'])} spans"
+        else:
+            changed = "(full state)" if keyframe else ", ".join(sorted(delta))
+        print(f"{event['id']:>6} {event.get('turn_id', ''):<12} {event['node']:<26} {changed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Result cache in front of a world graph backend.
+
+Entity lookups and neighbor traversals are memoized in a bounded LRU. Every
+entry belongs to the world version it was read under; when the backend reports
+a new version the whole cache is dropped, so stale traversals are never served.
+"""
+
+import threading
+import time
+from typing import Dict, Hashable, List, Optional
+
+from utils.lru import LRUCache, is_missing
+
+
+class CachedGraphStore:
+    def __init__(self, backend, max_entries: int = 4096, version_check_interval: float = 0.0):
+        self.backend = backend
+        self.version_check_interval = version_check_interval
+        self._cache = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self._version = self._read_backend_version()
+        self._version_checked_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Misses answered from a cached superset instead of the backend
+        self.derived_hits = 0
+        self._miss_seconds = 0.0
+        self._hit_seconds = 0.0
+
+    def __getattr__(self, name: str):
+        return getattr(self.backend, name)
+
+    def _read_backend_version(self) -> int:
+        version_fn = getattr(self.backend, "world_version", None)
+        return int(version_fn()) if version_fn else 0
+
+    def world_version(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._version_checked_at >= self.version_check_interval
+            if due:
+                self._version_checked_at = now
+        if due:
+            version = self._read_backend_version()
+            with self._lock:
+                if version != self._version:
+                    self._version = version
+                    self.invalidations += 1
+                    self._cache.clear()
+        return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+            self._cache.clear()
+
+    def reload(self) -> None:
+        self.backend.reload()
+        version = self._read_backend_version()
+        with self._lock:
+            self._version = version
+            self._version_checked_at = time.monotonic()
+            self.invalidations += 1
+            self._cache.clear()
+
+    def _cached(self, key: Hashable, loader):
+        version = self.world_version()
+        started = time.perf_counter()
+        value = self._cache.get((version, key))
+        if not is_missing(value):
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.hits += 1
+                self._hit_seconds += elapsed
+            return value
+
+        value = loader()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.misses += 1
+            self._miss_seconds += elapsed
+        self._cache.put((version, key), value)
+        return value
+
+    def get_entity(self, entity_id: str):
+        return self._cached(("entity", entity_id), lambda: self.backend.get_entity(entity_id))
+
+    def get_entity_by_name(self, name: str):
+        key = ("entity_by_name", (name or "").strip().lower())
+        return self._cached(key, lambda: self.backend.get_entity_by_name(name))
+
+    def get_edges(self, subject_id: str, predicate: Optional[str] = None) -> List:
+        edges = self._cached(
+            ("edges", subject_id, predicate),
+            lambda: tuple(self.backend.get_edges(subject_id, predicate)),
+        )
+        return list(edges)
+
+    def get_neighbors(
+        self,
+        entity_id: str,
+        edge_types: Optional[List[str]] = None,
+        depth: int = 1,
+    ) -> List:
+        types_key = tuple(sorted(edge_types)) if edge_types else None
+
+        def load():
+            # One hop over some edge types is the unfiltered hop (e.g. warmed by
+            # the prefetcher) restricted to those types; filter it if cached.
+            if types_key and depth == 1:
+                unfiltered = self._cache.get((self._version, ("neighbors", entity_id, None, 1)))
+                if not is_missing(unfiltered):
+                    with self._lock:
+                        self.derived_hits += 1
+                    return tuple(edge for edge in unfiltered if edge.type in types_key)
+            return tuple(self.backend.get_neighbors(entity_id, edge_types=edge_types, depth=depth))
+
+        edges = self._cached(("neighbors", entity_id, types_key, depth), load)
+        return list(edges)
+
+    def find_paths(
+        self,
+        source_id: str,
+        target_id: str,
+        edge_types: Optional[List[str]] = None,
+        max_depth: int = 4,
+        k: int = 3,
+    ) -> List[List]:
+        types_key = tuple(sorted(edge_types)) if edge_types else None
+        paths = self._cached(
+            ("paths", source_id, target_id, types_key, max_depth, k),
+            lambda: tuple(
+                tuple(path)
+                for path in self.backend.find_paths(
+                    source_id, target_id, edge_types=edge_types, max_depth=max_depth, k=k
+                )
+            ),
+        )
+        return [list(path) for path in paths]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit/miss counters and an estimate of the backend time saved by hits.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss = self._miss_seconds / self.misses if self.misses else 0.0
+            avg_hit = self._hit_seconds / self.hits if self.hits else 0.0
+            return {
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "derived_hits": self.derived_hits,
+                "invalidations": self.invalidations,
+                "evictions": self._cache.evictions,
+                "world_version": self._version,
+                "avg_miss_ms": avg_miss * 1000.0,
+                "avg_hit_ms": avg_hit * 1000.0,
+                "saved_ms": max(0.0, avg_miss - avg_hit) * self.hits * 1000.0,
+            }
@@ -1,9 +1,29 @@
 import json
+import logging
 import os
+import pathlib
+import re
+import sqlite3
+import threading
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-from config import GRAPH_BACKEND, NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
+from config import (
+    GRAPH_BACKEND,
+    GRAPH_CACHE_SIZE,
+    GRAPH_CACHE_VERSION_CHECK_SECONDS,
+    NEO4J_PASSWORD,
+    NEO4J_URI,
+    NEO4J_USER,
+    SQLITE_GRAPH_PATH,
+)
+from utils.spans import GRAPH, traced
+
+
+REL_TYPE_PATTERN = re.compile(r"^[A-Z][A-Z0-9_]*$")
+ENTITY_FIELDS = {"id", "name", "type", "aliases", "description", "tags"}
+
+LOGGER = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -26,10 +46,87 @@ class GraphEdge:
     properties: Dict[str, str] = field(default_factory=dict)
 
 
+def bidirectional_paths(
+    source_id: str,
+    target_id: str,
+    expand: Callable[[List[str]], Dict[str, List[Tuple[str, GraphEdge]]]],
+    max_depth: int,
+    k: int,
+) -> List[List[GraphEdge]]:
+    """
+    Up to k shortest paths between two entities, ignoring edge direction.
+
+    `expand` maps a frontier of entity ids to their (neighbor_id, edge) pairs.
+    The search grows whichever side has the smaller frontier, one full layer
+    at a time, and stops at the first layer where the two sides meet. Edges
+    keep their stored direction in the returned paths.
+    """
+    if k <= 0 or max_depth <= 0 or not source_id or not target_id:
+        return []
+    if source_id == target_id:
+        return []
+
+    dist = ({source_id: 0}, {target_id: 0})
+    parents: Tuple[Dict[str, List[Tuple[str, GraphEdge]]], ...] = ({}, {})
+    frontiers = ([source_id], [target_id])
+    depths = [0, 0]
+
+    meets: List[str] = []
+    while frontiers[0] and frontiers[1] and depths[0] + depths[1] < max_depth:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other = 1 - side
+        depths[side] += 1
+        next_frontier: List[str] = []
+        adjacency = expand(frontiers[side])
+        for current in frontiers[side]:
+            for neighbor_id, edge in adjacency.get(current, []):
+                seen = dist[side].get(neighbor_id)
+                if seen is None:
+                    dist[side][neighbor_id] = depths[side]
+                    parents[side][neighbor_id] = [(current, edge)]
+                    next_frontier.append(neighbor_id)
+                elif seen == depths[side] and neighbor_id in parents[side]:
+                    parents[side][neighbor_id].append((current, edge))
+        frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+
+        # Only nodes added in this layer can be new meeting points; anything
+        # older would have been found by the previous check.
+        candidates = [node for node in next_frontier if node in dist[other]]
+        if candidates:
+            best = min(dist[0][node] + dist[1][node] for node in candidates)
+            meets = [node for node in candidates if dist[0][node] + dist[1][node] == best]
+            break
+
+    def walk(side: int, node: str) -> Iterator[List[GraphEdge]]:
+        # Yields edge lists ordered from the side's root towards `node`.
+        if node not in parents[side]:
+            yield []
+            return
+        for previous, edge in parents[side][node]:
+            for prefix in walk(side, previous):
+                yield prefix + [edge]
+
+    paths: List[List[GraphEdge]] = []
+    for meet in meets:
+        for head in walk(0, meet):
+            for tail in walk(1, meet):
+                paths.append(head + list(reversed(tail)))
+                if len(paths) >= k:
+                    return paths
+    return paths
+
+
 class InMemoryGraphStore:
     def __init__(self, entities_path: str, edges_path: str):
         self.entities_path = entities_path
         self.edges_path = edges_path
+        self.version = 0
+        self.reload()
+
+    def reload(self) -> None:
+        """
+        Re-read the JSON files and bump the world version.
+        """
         self.entities: Dict[str, GraphEntity] = {}
         self.edges: List[GraphEdge] = []
         self._name_index: Dict[str, str] = {}
@@ -38,24 +135,16 @@ class InMemoryGraphStore:
 
         self._load()
         self._build_index()
+        self.version += 1
+
+    def world_version(self) -> int:
+        return self.version
 
     def _load(self) -> None:
         with open(self.entities_path, "r", encoding="utf-8") as f:
             payload = json.load(f)
         for raw in payload.get("entities", []):
-            extra_props = {
-                key: value
-                for key, value in raw.items()
-                if key
-                not in {
-                    "id",
-                    "name",
-                    "type",
-                    "aliases",
-                    "description",
-                    "tags",
-                }
-            }
+            extra_props = {key: value for key, value in raw.items() if key not in ENTITY_FIELDS}
             entity = GraphEntity(
                 entity_id=raw["id"],
                 name=raw["name"],
@@ -88,6 +177,7 @@ class InMemoryGraphStore:
             self._out_edges.setdefault(edge.source_id, []).append(edge)
             self._in_edges.setdefault(edge.target_id, []).append(edge)
 
+    @traced(GRAPH)
     def get_entity_by_name(self, name: str) -> Optional[GraphEntity]:
         if not name:
             return None
@@ -96,15 +186,18 @@ class InMemoryGraphStore:
             return None
         return self.entities.get(entity_id)
 
+    @traced(GRAPH)
     def get_entity(self, entity_id: str) -> Optional[GraphEntity]:
         return self.entities.get(entity_id)
 
+    @traced(GRAPH)
     def get_edges(self, subject_id: str, predicate: Optional[str] = None) -> List[GraphEdge]:
         edges = self._out_edges.get(subject_id, [])
         if not predicate:
             return list(edges)
         return [edge for edge in edges if edge.type == predicate]
 
+    @traced(GRAPH)
     def get_neighbors(
         self,
         entity_id: str,
@@ -132,6 +225,40 @@ class InMemoryGraphStore:
 
         return collected
 
+    def _undirected_adjacency(
+        self,
+        entity_ids: List[str],
+        edge_types: Optional[List[str]] = None,
+    ) -> Dict[str, List[Tuple[str, GraphEdge]]]:
+        adjacency: Dict[str, List[Tuple[str, GraphEdge]]] = {}
+        for entity_id in entity_ids:
+            pairs = []
+            for edge in self._out_edges.get(entity_id, []):
+                if not edge_types or edge.type in edge_types:
+                    pairs.append((edge.target_id, edge))
+            for edge in self._in_edges.get(entity_id, []):
+                if not edge_types or edge.type in edge_types:
+                    pairs.append((edge.source_id, edge))
+            adjacency[entity_id] = pairs
+        return adjacency
+
+    @traced(GRAPH)
+    def find_paths(
+        self,
+        source_id: str,
+        target_id: str,
+        edge_types: Optional[List[str]] = None,
+        max_depth: int = 4,
+        k: int = 3,
+    ) -> List[List[GraphEdge]]:
+        return bidirectional_paths(
+            source_id,
+            target_id,
+            lambda frontier: self._undirected_adjacency(frontier, edge_types),
+            max_depth,
+            k,
+        )
+
 
 class Neo4jGraphStore:
     def __init__(self, uri: str, user: str, password: str):
@@ -142,22 +269,21 @@ class Neo4jGraphStore:
     def close(self) -> None:
         self._driver.close()
 
+    def world_version(self) -> int:
+        """
+        Version number written by neo4j/import_world.py after each import.
+        """
+        query = "MATCH (m:WorldMeta {id: 'world'}) RETURN m.version AS version LIMIT 1"
+        with self._driver.session() as session:
+            result = session.run(query).single()
+            if not result or result["version"] is None:
+                return 0
+            return int(result["version"])
+
     def _row_to_entity(self, row: Dict) -> GraphEntity:
         node = row["e"]
         node_props = dict(node)
-        extra_props = {
-            key: value
-            for key, value in node_props.items()
-            if key
-            not in {
-                "id",
-                "name",
-                "type",
-                "aliases",
-                "description",
-                "tags",
-            }
-        }
+        extra_props = {key: value for key, value in node_props.items() if key not in ENTITY_FIELDS}
         return GraphEntity(
             entity_id=node.get("id", ""),
             name=node.get("name", ""),
@@ -177,12 +303,13 @@ class Neo4jGraphStore:
             properties = {}
         return GraphEdge(
             edge_id=rel.get("id", ""),
-            type=rel.get("type", "RELATED_TO"),
+            type=row.get("rel_type") or "RELATED_TO",
             source_id=row["source_id"],
             target_id=row["target_id"],
             properties=properties,
         )
 
+    @traced(GRAPH)
     def get_entity_by_name(self, name: str) -> Optional[GraphEntity]:
         if not name:
             return None
@@ -199,6 +326,7 @@ class Neo4jGraphStore:
                 return None
             return self._row_to_entity(result)
 
+    @traced(GRAPH)
     def get_entity(self, entity_id: str) -> Optional[GraphEntity]:
         query = "MATCH (e:Entity {id: $id}) RETURN e LIMIT 1"
         with self._driver.session() as session:
@@ -207,25 +335,37 @@ class Neo4jGraphStore:
                 return None
             return self._row_to_entity(result)
 
+    @staticmethod
+    def _rel_pattern(edge_types: Optional[List[str]]) -> Optional[str]:
+        """
+        Build the relationship part of a MATCH for the given edge types.
+
+        Edges are imported with one relationship type per edge type, so the
+        filter goes into the pattern itself (`[r:OWNS|OWNED]`) where Neo4j can
+        use the relationship type store. Returns None if no valid type is left.
+        """
+        if not edge_types:
+            return "[r]"
+        valid = [edge_type for edge_type in edge_types if REL_TYPE_PATTERN.match(edge_type)]
+        if not valid:
+            return None
+        return "[r:" + "|".join(f"`{edge_type}`" for edge_type in valid) + "]"
+
+    @traced(GRAPH)
     def get_edges(self, subject_id: str, predicate: Optional[str] = None) -> List[GraphEdge]:
-        if predicate:
-            query = """
-            MATCH (a:Entity {id: $id})-[r:REL]->(b:Entity)
-            WHERE r.type = $predicate
-            RETURN r, a.id AS source_id, b.id AS target_id
-            """
-            params = {"id": subject_id, "predicate": predicate}
-        else:
-            query = """
-            MATCH (a:Entity {id: $id})-[r:REL]->(b:Entity)
-            RETURN r, a.id AS source_id, b.id AS target_id
-            """
-            params = {"id": subject_id}
+        rel = self._rel_pattern([predicate] if predicate else None)
+        if rel is None:
+            return []
+        query = f"""
+        MATCH (a:Entity {{id: $id}})-{rel}->(b:Entity)
+        RETURN r, type(r) AS rel_type, a.id AS source_id, b.id AS target_id
+        """
 
         with self._driver.session() as session:
-            result = session.run(query, **params)
+            result = session.run(query, id=subject_id)
             return [self._row_to_edge(row) for row in result]
 
+    @traced(GRAPH)
     def get_neighbors(
         self,
         entity_id: str,
@@ -235,24 +375,390 @@ class Neo4jGraphStore:
         if depth <= 0:
             return []
 
-        if edge_types:
-            query = """
-            MATCH (a:Entity {id: $id})-[r:REL]->(b:Entity)
-            WHERE r.type IN $edge_types
-            RETURN r, a.id AS source_id, b.id AS target_id
-            """
-            params = {"id": entity_id, "edge_types": edge_types}
-        else:
-            query = """
-            MATCH (a:Entity {id: $id})-[r:REL]->(b:Entity)
-            RETURN r, a.id AS source_id, b.id AS target_id
-            """
-            params = {"id": entity_id}
+        rel = self._rel_pattern(edge_types)
+        if rel is None:
+            return []
+        query = f"""
+        MATCH (a:Entity {{id: $id}})-{rel}->(b:Entity)
+        RETURN r, type(r) AS rel_type, a.id AS source_id, b.id AS target_id
+        """
 
         with self._driver.session() as session:
-            result = session.run(query, **params)
+            result = session.run(query, id=entity_id)
             return [self._row_to_edge(row) for row in result]
 
+    @traced(GRAPH)
+    def find_paths(
+        self,
+        source_id: str,
+        target_id: str,
+        edge_types: Optional[List[str]] = None,
+        max_depth: int = 4,
+        k: int = 3,
+    ) -> List[List[GraphEdge]]:
+        if k <= 0 or max_depth <= 0 or source_id == target_id:
+            return []
+        rel = self._rel_pattern(edge_types)
+        if rel is None:
+            return []
+        # Variable-length bounds cannot be parameters; max_depth is an int.
+        rel = f"{rel[:-1]}*..{int(max_depth)}]"
+        path_fn = "shortestPath" if k == 1 else "allShortestPaths"
+        query = f"""
+        MATCH (a:Entity {{id: $source_id}}), (b:Entity {{id: $target_id}})
+        MATCH p = {path_fn}((a)-{rel}-(b))
+        RETURN [r IN relationships(p) | {{
+            r: r,
+            rel_type: type(r),
+            source_id: startNode(r).id,
+            target_id: endNode(r).id
+        }}] AS rels
+        LIMIT $k
+        """
+
+        with self._driver.session() as session:
+            result = session.run(query, source_id=source_id, target_id=target_id, k=k)
+            return [[self._row_to_edge(rel_row) for rel_row in row["rels"]] for row in result]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE entities (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    description TEXT NOT NULL,
+    aliases_json TEXT NOT NULL,
+    tags_json TEXT NOT NULL,
+    properties_json TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE aliases (
+    alias TEXT PRIMARY KEY,
+    entity_id TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE edges (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    properties_json TEXT NOT NULL
+);
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Covering indexes: traversals in either direction never touch the table.
+SQLITE_INDEXES = """
+CREATE INDEX idx_edges_source_type ON edges (source_id, type, target_id, id, properties_json);
+CREATE INDEX idx_edges_target_type ON edges (target_id, type, source_id, id, properties_json);
+"""
+
+SQLITE_LOAD_BATCH_SIZE = 5000
+SQLITE_MAX_IN_PARAMS = 500
+
+
+def sqlite_graph_source(entities_path: str, edges_path: str) -> str:
+    """
+    Fingerprint of the JSON world files (size and mtime of each), stored
+    with a built database so a stale one can be detected.
+    """
+    parts = []
+    for path in (entities_path, edges_path):
+        stat = os.stat(path)
+        parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+    return "/".join(parts)
+
+
+def _read_sqlite_meta(db_path: str, key: str) -> Optional[str]:
+    """
+    One meta value through a short-lived read-only connection (raises sqlite3.Error).
+    """
+    conn = sqlite3.connect(f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def sqlite_graph_is_stale(db_path: str, entities_path: str, edges_path: str) -> bool:
+    """
+    True if the database is missing, unreadable, or built from different JSON files.
+    """
+    if not os.path.exists(db_path):
+        return True
+    try:
+        source = _read_sqlite_meta(db_path, "source")
+    except sqlite3.Error:
+        return True
+    return source != sqlite_graph_source(entities_path, edges_path)
+
+
+def build_sqlite_graph(db_path: str, entities_path: str, edges_path: str) -> int:
+    """
+    Build (or rebuild) the SQLite graph database from the JSON world files.
+
+    The JSON is streamed, so the world never has to fit in memory. The new
+    database is written next to the old one and swapped in at the end with a
+    bumped world version and the source files' fingerprint. Returns the new
+    version.
+    """
+    from utils.json_stream import iter_json_array
+
+    version = 0
+    if os.path.exists(db_path):
+        try:
+            version = int(_read_sqlite_meta(db_path, "version") or 0)
+        except sqlite3.Error:
+            version = 0
+    version += 1
+    source = sqlite_graph_source(entities_path, edges_path)
+
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SQLITE_SCHEMA)
+
+        entity_rows = []
+        alias_rows = []
+        for raw in iter_json_array(entities_path, "entities"):
+            extra_props = {key: value for key, value in raw.items() if key not in ENTITY_FIELDS}
+            aliases = raw.get("aliases", [])
+            entity_rows.append(
+                (
+                    raw["id"],
+                    raw["name"],
+                    raw.get("type", "unknown"),
+                    raw.get("description", ""),
+                    json.dumps(aliases),
+                    json.dumps(raw.get("tags", [])),
+                    json.dumps(extra_props),
+                )
+            )
+            for alias in [raw["name"]] + list(aliases):
+                alias_rows.append((alias.lower(), raw["id"]))
+            if len(entity_rows) >= SQLITE_LOAD_BATCH_SIZE:
+                conn.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?)", entity_rows)
+                conn.executemany("INSERT OR REPLACE INTO aliases VALUES (?, ?)", alias_rows)
+                entity_rows, alias_rows = [], []
+        conn.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?)", entity_rows)
+        conn.executemany("INSERT OR REPLACE INTO aliases VALUES (?, ?)", alias_rows)
+
+        edge_rows = []
+        for raw in iter_json_array(edges_path, "edges"):
+            edge_rows.append(
+                (
+                    raw["id"],
+                    raw.get("type", "RELATED_TO"),
+                    raw["source_id"],
+                    raw["target_id"],
+                    json.dumps(raw.get("properties", {})),
+                )
+            )
+            if len(edge_rows) >= SQLITE_LOAD_BATCH_SIZE:
+                conn.executemany("INSERT OR REPLACE INTO edges VALUES (?, ?, ?, ?, ?)", edge_rows)
+                edge_rows = []
+        conn.executemany("INSERT OR REPLACE INTO edges VALUES (?, ?, ?, ?, ?)", edge_rows)
+
+        conn.executescript(SQLITE_INDEXES)
+        conn.execute("INSERT INTO meta VALUES ('version', ?)", (str(version),))
+        conn.execute("INSERT INTO meta VALUES ('source', ?)", (source,))
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return version
+
+
+class SqliteGraphStore:
+    """
+    Graph store backed by an on-disk SQLite file built by build_sqlite_graph().
+
+    Nothing is loaded up front; every lookup is an indexed query, so memory
+    use does not grow with the size of the world.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._uri = f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro"
+        self._local = threading.local()
+
+    def _file_id(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return (0, 0)
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _conn(self) -> sqlite3.Connection:
+        """
+        This thread's connection. A rebuild swaps a new file in, and an open
+        connection keeps reading the old one, so it is reopened when the
+        file changes.
+        """
+        conn = getattr(self._local, "conn", None)
+        file_id = self._file_id()
+        if conn is not None and getattr(self._local, "file_id", None) != file_id:
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            self._local.conn = conn
+            self._local.file_id = file_id
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+            self._local.file_id = None
+
+    def world_version(self) -> int:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    @staticmethod
+    def _row_to_entity(row: Tuple) -> GraphEntity:
+        return GraphEntity(
+            entity_id=row[0],
+            name=row[1],
+            type=row[2],
+            description=row[3],
+            aliases=json.loads(row[4]),
+            tags=json.loads(row[5]),
+            properties=json.loads(row[6]),
+        )
+
+    @staticmethod
+    def _row_to_edge(row: Tuple) -> GraphEdge:
+        return GraphEdge(
+            edge_id=row[0],
+            type=row[1],
+            source_id=row[2],
+            target_id=row[3],
+            properties=json.loads(row[4]),
+        )
+
+    @staticmethod
+    def _type_filter(edge_types: Optional[List[str]]) -> Tuple[str, List[str]]:
+        if not edge_types:
+            return "", []
+        placeholders = ", ".join("?" for _ in edge_types)
+        return f" AND e.type IN ({placeholders})", list(edge_types)
+
+    @traced(GRAPH)
+    def get_entity(self, entity_id: str) -> Optional[GraphEntity]:
+        row = self._conn().execute(
+            "SELECT id, name, type, description, aliases_json, tags_json, properties_json "
+            "FROM entities WHERE id = ?",
+            (entity_id,),
+        ).fetchone()
+        return self._row_to_entity(row) if row else None
+
+    @traced(GRAPH)
+    def get_entity_by_name(self, name: str) -> Optional[GraphEntity]:
+        if not name:
+            return None
+        row = self._conn().execute(
+            "SELECT entity_id FROM aliases WHERE alias = ?",
+            (name.strip().lower(),),
+        ).fetchone()
+        if not row:
+            return None
+        return self.get_entity(row[0])
+
+    @traced(GRAPH)
+    def get_edges(self, subject_id: str, predicate: Optional[str] = None) -> List[GraphEdge]:
+        type_sql, type_params = self._type_filter([predicate] if predicate else None)
+        rows = self._conn().execute(
+            "SELECT e.id, e.type, e.source_id, e.target_id, e.properties_json "
+            f"FROM edges e WHERE e.source_id = ?{type_sql} ORDER BY e.rowid",
+            [subject_id] + type_params,
+        ).fetchall()
+        return [self._row_to_edge(row) for row in rows]
+
+    @traced(GRAPH)
+    def get_neighbors(
+        self,
+        entity_id: str,
+        edge_types: Optional[List[str]] = None,
+        depth: int = 1,
+    ) -> List[GraphEdge]:
+        if depth <= 0:
+            return []
+        type_sql, type_params = self._type_filter(edge_types)
+        # Same semantics as InMemoryGraphStore: every entity first reached
+        # within depth - 1 hops contributes its outgoing edges.
+        query = f"""
+        WITH RECURSIVE reach(node, depth) AS (
+            SELECT ?, 0
+            UNION
+            SELECT e.target_id, r.depth + 1
+            FROM reach r JOIN edges e ON e.source_id = r.node{type_sql}
+            WHERE r.depth + 1 < ?
+        ),
+        nodes(node, depth) AS (
+            SELECT node, MIN(depth) FROM reach GROUP BY node
+        )
+        SELECT e.id, e.type, e.source_id, e.target_id, e.properties_json
+        FROM nodes n JOIN edges e ON e.source_id = n.node{type_sql}
+        ORDER BY n.depth, e.rowid
+        """
+        params = [entity_id] + type_params + [depth] + type_params
+        rows = self._conn().execute(query, params).fetchall()
+        return [self._row_to_edge(row) for row in rows]
+
+    def _undirected_adjacency(
+        self,
+        entity_ids: List[str],
+        edge_types: Optional[List[str]] = None,
+    ) -> Dict[str, List[Tuple[str, GraphEdge]]]:
+        type_sql, type_params = self._type_filter(edge_types)
+        adjacency: Dict[str, List[Tuple[str, GraphEdge]]] = {entity_id: [] for entity_id in entity_ids}
+        conn = self._conn()
+        for start in range(0, len(entity_ids), SQLITE_MAX_IN_PARAMS):
+            batch = entity_ids[start : start + SQLITE_MAX_IN_PARAMS]
+            placeholders = ", ".join("?" for _ in batch)
+            query = f"""
+            SELECT e.id, e.type, e.source_id, e.target_id, e.properties_json
+            FROM edges e WHERE e.source_id IN ({placeholders}){type_sql}
+            UNION ALL
+            SELECT e.id, e.type, e.source_id, e.target_id, e.properties_json
+            FROM edges e WHERE e.target_id IN ({placeholders}){type_sql}
+            """
+            params = batch + type_params + batch + type_params
+            for row in conn.execute(query, params):
+                edge = self._row_to_edge(row)
+                if edge.source_id in adjacency:
+                    adjacency[edge.source_id].append((edge.target_id, edge))
+                if edge.target_id in adjacency:
+                    adjacency[edge.target_id].append((edge.source_id, edge))
+        return adjacency
+
+    @traced(GRAPH)
+    def find_paths(
+        self,
+        source_id: str,
+        target_id: str,
+        edge_types: Optional[List[str]] = None,
+        max_depth: int = 4,
+        k: int = 3,
+    ) -> List[List[GraphEdge]]:
+        return bidirectional_paths(
+            source_id,
+            target_id,
+            lambda frontier: self._undirected_adjacency(frontier, edge_types),
+            max_depth,
+            k,
+        )
+
 
 _GRAPH_INSTANCE: Optional[object] = None
 
@@ -260,12 +766,40 @@ _GRAPH_INSTANCE: Optional[object] = None
 def get_world_graph():
     global _GRAPH_INSTANCE
     if _GRAPH_INSTANCE is None:
+        from World.graph_cache import CachedGraphStore
+
         backend = os.getenv("GRAPH_BACKEND", GRAPH_BACKEND).lower()
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        entities_path = os.path.join(base_dir, "data", "entities.json")
+        edges_path = os.path.join(base_dir, "data", "edges.json")
         if backend == "neo4j":
-            _GRAPH_INSTANCE = Neo4jGraphStore(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+            store = Neo4jGraphStore(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+            # Asking Neo4j for the version is a round trip, so only do it
+            # every few seconds rather than on every lookup.
+            version_check_interval = GRAPH_CACHE_VERSION_CHECK_SECONDS
+        elif backend == "sqlite":
+            db_path = SQLITE_GRAPH_PATH or os.path.join(base_dir, "data", "world_graph.sqlite3")
+            if sqlite_graph_is_stale(db_path, entities_path, edges_path):
+                if os.path.exists(db_path):
+                    LOGGER.warning("%s was built from other world JSON files; rebuilding it", db_path)
+                build_sqlite_graph(db_path, entities_path, edges_path)
+            store = SqliteGraphStore(db_path)
+            version_check_interval = GRAPH_CACHE_VERSION_CHECK_SECONDS
         else:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            entities_path = os.path.join(base_dir, "data", "entities.json")
-            edges_path = os.path.join(base_dir, "data", "edges.json")
-            _GRAPH_INSTANCE = InMemoryGraphStore(entities_path, edges_path)
+            store = InMemoryGraphStore(entities_path, edges_path)
+            version_check_interval = 0.0
+        _GRAPH_INSTANCE = CachedGraphStore(
+            store,
+            max_entries=GRAPH_CACHE_SIZE,
+            version_check_interval=version_check_interval,
+        )
     return _GRAPH_INSTANCE
+
+
+def set_world_graph(graph: Optional[object]) -> None:
+    """
+    Replace the process-wide graph store. Passing None makes the next
+    get_world_graph() build the configured backend again.
+    """
+    global _GRAPH_INSTANCE
+    _GRAPH_INSTANCE = graph
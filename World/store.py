@@ -1,11 +1,16 @@
 import json
 import os
 import re
-from typing import Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
 
 import chromadb
 from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
 
+from config import QUERY_EMBEDDING_CACHE_SIZE, STORE_CACHE_SIZE
+from utils.lru import LRUCache, is_missing
+from utils.spans import VECTOR, traced
 from World.models import Entity, Fact
 
 
@@ -15,17 +20,25 @@ class WorldKnowledgeStore:
     Loads entities and facts from JSON and supports semantic search.
     """
 
-    def __init__(self, data_path: str, persist_dir: str):
+    def __init__(
+        self,
+        data_path: str,
+        persist_dir: str,
+        embedding_function=None,
+        embedding_cache_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+    ):
         self.data_path = data_path
         self.persist_dir = persist_dir
         self.entities: Dict[str, Entity] = {}
         self.facts: Dict[str, Fact] = {}
         self._alias_patterns: Dict[str, re.Pattern] = {}
+        # Query text -> embedding, so repeated (or prefetched) queries skip the model
+        self._query_embeddings = LRUCache(embedding_cache_size)
 
         self._load_data()
 
         self._client = chromadb.PersistentClient(path=self.persist_dir)
-        self._embedding_fn = DefaultEmbeddingFunction()
+        self._embedding_fn = embedding_function or DefaultEmbeddingFunction()
         self._collection = self._client.get_or_create_collection(
             name="world_facts",
             embedding_function=self._embedding_fn,
@@ -141,35 +154,68 @@ class WorldKnowledgeStore:
                 }
             )
 
-        if ids:
-            self._collection.add(ids=ids, documents=documents, metadatas=metadatas)
+        # Chroma rejects adds larger than its max batch size
+        batch_size = self._client.get_max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            self._collection.add(ids=ids[start:end], documents=documents[start:end], metadatas=metadatas[start:end])
 
     def search(self, query: str, n_results: int = 5) -> List[Dict[str, str]]:
-        if not query.strip():
-            return []
+        return self.search_many([query], n_results=n_results)[0]
+
+    @traced(VECTOR, "search")
+    def search_many(self, queries: List[str], n_results: int = 5) -> List[List[Dict[str, str]]]:
+        """
+        Search several queries in one collection query (one embedding batch,
+        one round trip). Returns a hit list per query, in order; blank
+        queries get no hits.
+        """
+        results_by_query: List[List[Dict[str, str]]] = [[] for _ in queries]
+        positions = [idx for idx, query in enumerate(queries) if query.strip()]
+        if not positions:
+            return results_by_query
 
         results = self._collection.query(
-            query_texts=[query],
+            query_embeddings=self.embed_queries([queries[idx] for idx in positions]),
             n_results=n_results,
             include=["documents", "metadatas", "distances"],
         )
 
-        hits = []
-        for idx, fact_id in enumerate(results["ids"][0]):
-            hits.append(
-                {
-                    "id": fact_id,
-                    "text": results["documents"][0][idx],
-                    "entity_id": results["metadatas"][0][idx]["entity_id"],
-                    "entity_name": results["metadatas"][0][idx]["entity_name"],
-                    "type": results["metadatas"][0][idx]["type"],
-                    "source": results["metadatas"][0][idx]["source"],
-                    "tags": results["metadatas"][0][idx]["tags"],
-                    "score": str(results["distances"][0][idx]),
-                }
-            )
-
-        return hits
+        for row, position in enumerate(positions):
+            hits = []
+            for idx, fact_id in enumerate(results["ids"][row]):
+                hits.append(
+                    {
+                        "id": fact_id,
+                        "text": results["documents"][row][idx],
+                        "entity_id": results["metadatas"][row][idx]["entity_id"],
+                        "entity_name": results["metadatas"][row][idx]["entity_name"],
+                        "type": results["metadatas"][row][idx]["type"],
+                        "source": results["metadatas"][row][idx]["source"],
+                        "tags": results["metadatas"][row][idx]["tags"],
+                        "score": str(results["distances"][row][idx]),
+                    }
+                )
+            results_by_query[position] = hits
+
+        return results_by_query
+
+    def embed_queries(self, texts: List[str]) -> List:
+        """
+        Embeddings for query texts, computing only the ones not cached (in
+        one call to the embedding function).
+        """
+        embeddings = [self._query_embeddings.get(text) for text in texts]
+        missing = [idx for idx, embedding in enumerate(embeddings) if is_missing(embedding)]
+        if missing:
+            computed = self._embedding_fn([texts[idx] for idx in missing])
+            for idx, embedding in zip(missing, computed):
+                self._query_embeddings.put(texts[idx], embedding)
+                embeddings[idx] = embedding
+        return embeddings
+
+    def clear_query_embeddings(self) -> None:
+        self._query_embeddings.clear()
 
     def find_entity_mentions(self, text: str) -> List[str]:
         if not text.strip():
@@ -208,14 +254,47 @@ class WorldKnowledgeStore:
 
 
 _STORE_INSTANCE: Optional[WorldKnowledgeStore] = None
+# Store used instead of the process-wide one in the current context (see scoped_world_store)
+_STORE_OVERRIDE: ContextVar[Optional[WorldKnowledgeStore]] = ContextVar("world_store_override", default=None)
 
 
 def get_world_store(reset_index: bool = False) -> WorldKnowledgeStore:
     global _STORE_INSTANCE
+    override = _STORE_OVERRIDE.get()
+    if override is not None:
+        return override
     if _STORE_INSTANCE is None:
         base_dir = os.path.dirname(os.path.abspath(__file__))
         data_path = os.path.join(base_dir, "data", "world_facts.json")
         persist_dir = os.path.join(base_dir, "chroma")
-        _STORE_INSTANCE = WorldKnowledgeStore(data_path, persist_dir)
-        _STORE_INSTANCE.build_index(reset=reset_index)
+        store = WorldKnowledgeStore(data_path, persist_dir)
+        store.build_index(reset=reset_index)
+        if STORE_CACHE_SIZE > 0:
+            from World.store_cache import CachedWorldStore
+
+            store = CachedWorldStore(store, max_entries=STORE_CACHE_SIZE)
+        _STORE_INSTANCE = store
     return _STORE_INSTANCE
+
+
+def set_world_store(store: Optional[WorldKnowledgeStore]) -> None:
+    """
+    Replace the process-wide store (e.g. one built with an offline embedding
+    function). Passing None makes the next get_world_store() build the default.
+    """
+    global _STORE_INSTANCE
+    _STORE_INSTANCE = store
+
+
+@contextmanager
+def scoped_world_store(store: WorldKnowledgeStore) -> Iterator[WorldKnowledgeStore]:
+    """
+    Make get_world_store() return `store` within this context only. LangGraph
+    runs nodes in a copy of the caller's context, so a graph invoked inside
+    the block sees it while other threads keep the process-wide store.
+    """
+    token = _STORE_OVERRIDE.set(store)
+    try:
+        yield store
+    finally:
+        _STORE_OVERRIDE.reset(token)
@@ -0,0 +1,98 @@
+"""
+Result cache in front of the world knowledge store.
+
+Semantic searches and entity fact lookups are memoized in a bounded LRU, the
+same way CachedGraphStore fronts the graph backend. World facts are loaded
+once per store, so entries stay valid until the store is replaced or the
+cache is cleared.
+"""
+
+import threading
+import time
+from typing import Dict, Hashable, List
+
+from utils.lru import LRUCache, is_missing
+
+
+class CachedWorldStore:
+    def __init__(self, store, max_entries: int = 4096):
+        self.store = store
+        self._cache = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._miss_seconds = 0.0
+        self._hit_seconds = 0.0
+
+    def __getattr__(self, name: str):
+        return getattr(self.store, name)
+
+    def _cached(self, key: Hashable, loader):
+        started = time.perf_counter()
+        value = self._cache.get(key)
+        if not is_missing(value):
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.hits += 1
+                self._hit_seconds += elapsed
+            return value
+
+        value = loader()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.misses += 1
+            self._miss_seconds += elapsed
+        self._cache.put(key, value)
+        return value
+
+    def search(self, query: str, n_results: int = 5) -> List[Dict[str, str]]:
+        hits = self._cached(
+            ("search", query, n_results), lambda: tuple(self.store.search(query, n_results=n_results))
+        )
+        return list(hits)
+
+    def search_many(self, queries: List[str], n_results: int = 5) -> List[List[Dict[str, str]]]:
+        """
+        Cached queries are answered locally; the rest go to the store in one
+        search_many call.
+        """
+        results: List[List[Dict[str, str]]] = [[] for _ in queries]
+        missing = []
+        for idx, query in enumerate(queries):
+            hits = self._cache.get(("search", query, n_results))
+            if is_missing(hits):
+                missing.append(idx)
+            else:
+                results[idx] = list(hits)
+        with self._lock:
+            self.hits += len(queries) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            fetched = self.store.search_many([queries[idx] for idx in missing], n_results=n_results)
+            for idx, hits in zip(missing, fetched):
+                self._cache.put(("search", queries[idx], n_results), tuple(hits))
+                results[idx] = list(hits)
+        return results
+
+    def facts_for_entity(self, entity_id: str, limit: int = 3) -> List[Dict[str, str]]:
+        facts = self._cached(
+            ("facts", entity_id, limit), lambda: tuple(self.store.facts_for_entity(entity_id, limit=limit))
+        )
+        return list(facts)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss = self._miss_seconds / self.misses if self.misses else 0.0
+            avg_hit = self._hit_seconds / self.hits if self.hits else 0.0
+            return {
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self._cache.evictions,
+                "saved_ms": max(0.0, avg_miss - avg_hit) * self.hits * 1000.0,
+            }
@@ -0,0 +1,260 @@
+"""
+Synthetic world generator for scale testing.
+
+Writes entities.json, edges.json and world_facts.json in the same format as
+World/data, at any size (10^3 to 10^7 entities), streamed so the world never
+has to fit in memory:
+
+  - types follow ENTITY_TYPE_WEIGHTS (mostly people and places, as in the
+    seed world); names are unique and built from syllables, with 0-3
+    aliases per entity (ALIAS_COUNT_WEIGHTS) such as a first name, a title
+    or the name without "The"
+  - edges pick their source uniformly and their target with a skew toward
+    a few hub entities (target = size * u ** hub_skew), so degrees are
+    heavy-tailed; the edge type follows the source and target types
+  - each entity gets a geometric number of facts (mean facts_per_entity)
+
+Entity i is "ent_{i}", and its type and name depend only on i and the seed
+(synthetic_entity_type, synthetic_entity_name), so benchmarks can pick
+query ids and names without reading the files back.
+
+    python -m World.synthetic /tmp/world_1e5 --entities 100000
+"""
+
+import argparse
+import os
+import random
+from typing import Dict, Iterator, List, Tuple
+
+from utils.json_stream import write_json_array
+
+
+ENTITY_TYPE_WEIGHTS: List[Tuple[str, float]] = [
+    ("person", 0.50),
+    ("location", 0.20),
+    ("faction", 0.10),
+    ("item", 0.08),
+    ("ship", 0.07),
+    ("route", 0.05),
+]
+# P(0, 1, 2, 3 aliases)
+ALIAS_COUNT_WEIGHTS = [0.35, 0.40, 0.20, 0.05]
+
+# Edge types by (source type, target type); other pairs are CONNECTS
+EDGE_TYPES: Dict[Tuple[str, str], List[str]] = {
+    ("person", "person"): ["KINSHIP", "ALLY_OF", "RIVAL_OF"],
+    ("person", "location"): ["LOCATED_IN", "OWNS"],
+    ("person", "faction"): ["MEMBER_OF"],
+    ("person", "item"): ["OWNS"],
+    ("person", "ship"): ["OWNS", "SAILS_ON"],
+    ("location", "location"): ["LOCATED_IN"],
+    ("faction", "location"): ["OPERATES_IN"],
+    ("faction", "faction"): ["ALLY_OF", "RIVAL_OF"],
+    ("ship", "route"): ["SAILS"],
+    ("ship", "location"): ["DOCKED_AT"],
+    ("route", "location"): ["CONNECTS"],
+    ("item", "location"): ["LOCATED_IN"],
+}
+
+SYLLABLES = [
+    "al", "bar", "cor", "dun", "el", "fen", "gar", "hal", "is", "jor", "kel", "lor", "mar", "nor", "or", "pel",
+    "quin", "ros", "sal", "tor", "ul", "val", "wen", "xan", "yor", "zan", "bri", "cal", "dra", "eth", "fal", "gwen",
+    "hel", "ith", "kar", "lun", "mor", "nes", "ost", "pra", "rim", "sev", "tal", "ur", "ves", "wyn", "ael", "bel",
+    "cyr", "dor", "esk", "fir", "gol", "har", "ivo", "kas", "lyn", "mir", "nym", "oth", "ryn", "sil", "thr", "vor",
+]
+SURNAMES = ["Vale", "Thorne", "Blackwood", "Ashford", "Marsh", "Holloway", "Reed", "Stone", "Harrow", "Quill"]
+TITLES = ["Captain", "Master", "Old", "Sister", "Brother"]
+PLACE_SUFFIXES = ["Harbor", "Keep", "Hollow", "Market", "Quay", "Watch", "Crossing", "Reach"]
+FACTION_SUFFIXES = ["Guild", "Company", "Circle", "Watch", "Brotherhood"]
+ITEM_SUFFIXES = ["Lantern", "Compass", "Blade", "Ledger", "Charm"]
+TRADES = ["smith", "fisher", "merchant", "sailor", "herbalist", "guard", "scribe", "innkeeper", "smuggler", "cartographer"]
+TRAITS = ["gruff", "careful", "curious", "stubborn", "cheerful", "secretive", "loyal", "ambitious", "quiet", "reckless"]
+GOODS = ["salt", "timber", "spices", "silk", "iron", "herbs", "maps", "rum", "wool", "pearls"]
+
+FACT_TEMPLATES: Dict[str, List[Tuple[str, str]]] = {
+    "person": [
+        ("biography", "{name} is a {trait} {trade} who has lived near {place} for years."),
+        ("rumor", "People say {name} owes money to a {trade} from {place}."),
+        ("backstory", "{name} learned the {trade} trade young and never left {place}."),
+    ],
+    "location": [
+        ("overview", "{name} is known for its {goods} trade and {trait} locals."),
+        ("history", "{name} was rebuilt after a fire destroyed the old {goods} warehouses."),
+    ],
+    "faction": [
+        ("overview", "{name} controls much of the {goods} trade around {place}."),
+        ("rumor", "{name} is said to pay {trade}s to keep quiet."),
+    ],
+    "item": [
+        ("overview", "{name} was forged for a {trade} from {place}."),
+    ],
+    "ship": [
+        ("overview", "{name} carries {goods} and is crewed by {trait} sailors."),
+        ("rumor", "{name} was seen near {place} flying no colors."),
+    ],
+    "route": [
+        ("overview", "{name} is the main road for {goods} heading to {place}."),
+    ],
+}
+
+
+def _hash(index: int, seed: int, salt: int) -> float:
+    """
+    Deterministic uniform value in [0, 1) for an entity index.
+    """
+    value = (index + 1) * 2654435761 + seed * 40503 + salt * 97531
+    value = (value ^ (value >> 13)) * 1274126177
+    return ((value ^ (value >> 16)) & 0xFFFFFFFF) / 4294967296.0
+
+
+def _pick(weights: List[Tuple[str, float]], draw: float) -> str:
+    for value, weight in weights:
+        if draw < weight:
+            return value
+        draw -= weight
+    return weights[-1][0]
+
+
+def synthetic_entity_type(index: int, seed: int = 0) -> str:
+    return _pick(ENTITY_TYPE_WEIGHTS, _hash(index, seed, 1))
+
+
+def _word(index: int) -> str:
+    # Bijective base-len(SYLLABLES): every index gets a different word
+    parts = []
+    value = index + 1
+    while value:
+        value -= 1
+        parts.append(SYLLABLES[value % len(SYLLABLES)])
+        value //= len(SYLLABLES)
+    return "".join(parts).capitalize()
+
+
+def synthetic_entity_name(index: int, seed: int = 0) -> str:
+    entity_type = synthetic_entity_type(index, seed)
+    word = _word(index)
+    if entity_type == "person":
+        return f"{word} {SURNAMES[index % len(SURNAMES)]}"
+    if entity_type == "location":
+        return f"{word} {PLACE_SUFFIXES[index % len(PLACE_SUFFIXES)]}"
+    if entity_type == "faction":
+        return f"The {word} {FACTION_SUFFIXES[index % len(FACTION_SUFFIXES)]}"
+    if entity_type == "item":
+        return f"The {word} {ITEM_SUFFIXES[index % len(ITEM_SUFFIXES)]}"
+    if entity_type == "ship":
+        return f"The {word}"
+    return f"{word} Road"
+
+
+def _aliases(index: int, name: str, entity_type: str, seed: int) -> List[str]:
+    count = int(_pick([(str(n), w) for n, w in enumerate(ALIAS_COUNT_WEIGHTS)], _hash(index, seed, 2)))
+    candidates = []
+    if name.startswith("The "):
+        candidates.append(name[4:])
+    first = name.split(" ", 1)[0]
+    if entity_type == "person":
+        candidates.extend([first, f"{TITLES[index % len(TITLES)]} {first}"])
+    else:
+        candidates.append(f"Old {first}" if first != "The" else name.split(" ")[1])
+    candidates.append(f"{_word(index)}-{entity_type}")
+    return candidates[:count]
+
+
+def iter_entities(size: int, seed: int = 0) -> Iterator[Dict]:
+    for index in range(size):
+        entity_type = synthetic_entity_type(index, seed)
+        name = synthetic_entity_name(index, seed)
+        yield {
+            "id": f"ent_{index}",
+            "name": name,
+            "type": entity_type,
+            "aliases": _aliases(index, name, entity_type, seed),
+            "description": f"A {TRAITS[index % len(TRAITS)]} {entity_type} of the synthetic world.",
+            "tags": [entity_type, TRAITS[(index // len(TRAITS)) % len(TRAITS)]],
+        }
+
+
+def iter_edges(size: int, avg_degree: float = 4.0, hub_skew: float = 2.0, seed: int = 0) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    for idx in range(int(size * avg_degree / 2)):
+        source = rng.randrange(size)
+        target = int(size * rng.random() ** hub_skew)
+        if source == target:
+            continue
+        edge_types = EDGE_TYPES.get(
+            (synthetic_entity_type(source, seed), synthetic_entity_type(target, seed)), ["CONNECTS"]
+        )
+        yield {
+            "id": f"edge_{idx}",
+            "type": edge_types[idx % len(edge_types)],
+            "source_id": f"ent_{source}",
+            "target_id": f"ent_{target}",
+            "properties": {},
+        }
+
+
+def iter_facts(size: int, facts_per_entity: float = 1.6, seed: int = 0) -> Iterator[Dict]:
+    rng = random.Random(seed + 1)
+    # Geometric count per entity with the requested mean
+    stop = 1.0 / (1.0 + facts_per_entity)
+    fact_number = 0
+    for index in range(size):
+        entity_type = synthetic_entity_type(index, seed)
+        templates = FACT_TEMPLATES[entity_type]
+        name = synthetic_entity_name(index, seed)
+        while rng.random() >= stop:
+            fact_type, template = templates[rng.randrange(len(templates))]
+            fact_number += 1
+            yield {
+                "id": f"fact_{fact_number}",
+                "entity_id": f"ent_{index}",
+                "type": fact_type,
+                "text": template.format(
+                    name=name,
+                    trait=rng.choice(TRAITS),
+                    trade=rng.choice(TRADES),
+                    goods=rng.choice(GOODS),
+                    place=synthetic_entity_name(rng.randrange(size), seed),
+                ),
+                "source": "synthetic",
+                "tags": [entity_type, fact_type],
+            }
+
+
+def write_synthetic_world(
+    directory: str,
+    size: int,
+    avg_degree: float = 4.0,
+    facts_per_entity: float = 1.6,
+    hub_skew: float = 2.0,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """
+    Write entities.json, edges.json and world_facts.json for a world of
+    `size` entities into `directory`. Returns the item counts.
+    """
+    os.makedirs(directory, exist_ok=True)
+    return {
+        "entities": write_json_array(os.path.join(directory, "entities.json"), "entities", iter_entities(size, seed)),
+        "edges": write_json_array(
+            os.path.join(directory, "edges.json"), "edges", iter_edges(size, avg_degree, hub_skew, seed)
+        ),
+        "facts": write_json_array(
+            os.path.join(directory, "world_facts.json"), "facts", iter_facts(size, facts_per_entity, seed)
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic world of the given size")
+    parser.add_argument("directory")
+    parser.add_argument("--entities", type=int, default=10000)
+    parser.add_argument("--avg-degree", type=float, default=4.0)
+    parser.add_argument("--facts-per-entity", type=float, default=1.6)
+    parser.add_argument("--hub-skew", type=float, default=2.0, help="Higher: more edges end at a few hubs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    counts = write_synthetic_world(
+        args.directory, args.entities, args.avg_degree, args.facts_per_entity, args.hub_skew, args.seed
+    )
+    print(f"Wrote {counts['entities']} entities, {counts['edges']} edges, {counts['facts']} facts to {args.directory}")
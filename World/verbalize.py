@@ -0,0 +1,201 @@
+"""
+Pre-rendered text for graph facts.
+
+Edges and entity properties are turned into prompt sentences once per world
+version instead of on every turn. Each sentence is stored under a stable fact
+ID so it can be served by ID and cited:
+  - edges use their edge ID (e.g. "edge_aldric_owns_crooked_tavern")
+  - entity properties use "<entity_id>.<property>" (e.g. "ent_aldric.age")
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from World.graph_store import GraphEdge, GraphEntity, get_world_graph
+
+
+NPC_PROFILE_KEYS = ["age", "location", "profession", "traits", "description"]
+
+
+def property_fact_id(entity_id: str, key: str) -> str:
+    return f"{entity_id}.{key}"
+
+
+def _value_text(value: object) -> str:
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+
+def _is_empty(value: object) -> bool:
+    return value in (None, "", [], {})
+
+
+class FactVerbalizer:
+    """
+    Renders and memoizes graph facts for one graph store.
+
+    Backends that keep the whole world in memory are rendered eagerly when the
+    world (version) is first seen; other backends are rendered lazily per
+    edge/entity and memoized until the version changes.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._lock = threading.RLock()
+        self._version: Optional[int] = None
+        self._texts: Dict[str, str] = {}
+        self._entity_fact_ids: Dict[str, List[str]] = {}
+        self._profiles: Dict[str, str] = {}
+
+    def _sync(self) -> None:
+        version_fn = getattr(self.graph, "world_version", None)
+        version = version_fn() if version_fn else 0
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self._texts = {}
+            self._entity_fact_ids = {}
+            self._profiles = {}
+            self._version = version
+            self._prime()
+
+    def _prime(self) -> None:
+        entities = getattr(self.graph, "entities", None)
+        edges = getattr(self.graph, "edges", None)
+        if not isinstance(entities, dict) or not isinstance(edges, list):
+            return
+        for entity in entities.values():
+            self._render_entity(entity)
+        # Names come from the entities already in hand; going through
+        # get_entity would fill the graph cache with the whole world.
+        for edge in edges:
+            self._render_edge(edge, entities)
+
+    def _entity_name(self, entity_id: str, entities: Optional[Dict[str, GraphEntity]] = None) -> str:
+        entity = entities.get(entity_id) if entities is not None else self.graph.get_entity(entity_id)
+        return entity.name if entity else entity_id
+
+    def _render_edge(self, edge: GraphEdge, entities: Optional[Dict[str, GraphEntity]] = None) -> str:
+        source_name = self._entity_name(edge.source_id, entities)
+        target_name = self._entity_name(edge.target_id, entities)
+        relation = edge.type.lower().replace("_", " ")
+        props = edge.properties
+        if props:
+            prop_text = ", ".join(f"{key}={value}" for key, value in props.items())
+            text = f"{source_name} {relation} {target_name} ({prop_text})"
+        else:
+            text = f"{source_name} {relation} {target_name}"
+        self._texts[edge.edge_id] = text
+        return text
+
+    def _render_entity(self, entity: GraphEntity) -> List[str]:
+        fact_ids = []
+        props = dict(entity.properties or {})
+        if entity.description:
+            props.setdefault("description", entity.description)
+        for key, value in props.items():
+            if _is_empty(value):
+                continue
+            fact_id = property_fact_id(entity.entity_id, key)
+            self._texts[fact_id] = f"{entity.name} {key} {_value_text(value)}"
+            fact_ids.append(fact_id)
+        self._entity_fact_ids[entity.entity_id] = fact_ids
+        return fact_ids
+
+    def edge_fact(self, edge: GraphEdge) -> Dict[str, str]:
+        self._sync()
+        text = self._texts.get(edge.edge_id)
+        if text is None:
+            with self._lock:
+                text = self._render_edge(edge)
+        return {"id": edge.edge_id, "text": text}
+
+    def path_fact(self, path: List[GraphEdge]) -> Dict[str, str]:
+        """
+        One fact for a whole connecting path, built from its edge sentences.
+        """
+        steps = [self.edge_fact(edge)["text"] for edge in path]
+        return {
+            "id": "path:" + "+".join(edge.edge_id for edge in path),
+            "text": "; ".join(steps),
+        }
+
+    def entity_facts(
+        self,
+        entity: GraphEntity,
+        keys: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Property facts for an entity, optionally restricted to `keys` (in order).
+        """
+        self._sync()
+        fact_ids = self._entity_fact_ids.get(entity.entity_id)
+        if fact_ids is None:
+            with self._lock:
+                fact_ids = self._render_entity(entity)
+        if keys is not None:
+            available = set(fact_ids)
+            fact_ids = [
+                property_fact_id(entity.entity_id, key)
+                for key in keys
+                if property_fact_id(entity.entity_id, key) in available
+            ]
+        texts = self._texts
+        return [
+            {"id": fact_id, "text": texts[fact_id]} for fact_id in fact_ids if fact_id in texts
+        ]
+
+    def fact_text(self, fact_id: str) -> Optional[str]:
+        """
+        Serve a previously rendered fact by its ID.
+        """
+        self._sync()
+        return self._texts.get(fact_id)
+
+    def npc_profile(self, entity: GraphEntity) -> str:
+        """
+        Character profile block used in the NPC system prompt.
+        """
+        self._sync()
+        profile = self._profiles.get(entity.entity_id)
+        if profile is not None:
+            return profile
+
+        properties = entity.properties or {}
+        lines = [f"Character Profile: {entity.name}"]
+        age = properties.get("age", "")
+        location = properties.get("location", "")
+        profession = properties.get("profession", "")
+        traits = properties.get("traits", [])
+        childhood = properties.get("childhood_backstory", "")
+        adult = properties.get("adult_backstory", "")
+        if age:
+            lines.append(f"\nAge: {age}")
+        if location:
+            lines.append(f"Location: {location}")
+        if profession:
+            lines.append(f"Profession: {profession}")
+        if traits:
+            lines.append(f"Traits: {_value_text(traits)}")
+        if childhood:
+            lines.append(f"\nChildhood Backstory:\n{childhood}")
+        if adult:
+            lines.append(f"\nAdult Backstory:\n{adult}")
+
+        profile = "\n".join(lines)
+        with self._lock:
+            self._profiles[entity.entity_id] = profile
+        return profile
+
+
+_VERBALIZER_INSTANCE: Optional[FactVerbalizer] = None
+
+
+def get_fact_verbalizer() -> FactVerbalizer:
+    global _VERBALIZER_INSTANCE
+    if _VERBALIZER_INSTANCE is None:
+        _VERBALIZER_INSTANCE = FactVerbalizer(get_world_graph())
+    return _VERBALIZER_INSTANCE
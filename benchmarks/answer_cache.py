@@ -0,0 +1,128 @@
+"""
+Answer cache: repeated questions to the same NPC with the cache off, exact
+only, and exact + similarity.
+
+Players ask Aldric questions drawn from a skewed (Zipf-like) distribution
+over a fixed set of questions, each asked in one of a few wordings. The LLM
+is StandInLLMProvider and the stores add fixed per-call latencies, as in
+benchmarks.turn_latency. Reports turn latency, LLM calls per turn, the hit
+rates, and how many similarity hits reused the answer to a *different*
+question (should be 0; raise --similarity if not).
+
+Usage:
+    python -m benchmarks.answer_cache --turns 300 --similarity 0.9
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from benchmarks.support import percentile
+from benchmarks.turn_latency import install_stand_ins
+from Dialogue.answer_cache import AnswerCache, normalize_question, set_answer_cache
+from Dialogue.dialogue_graph import create_dialogue_graph, initial_dialogue_state, invoke_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.llm.provider import LLMProvider
+
+
+QUESTIONS = [
+    ["Who owns the Crooked Tavern?", "who owns the crooked tavern", "Who owns the Crooked Tavern, then?"],
+    ["Where is Dawnwatch Lighthouse?", "Where is the Dawnwatch Lighthouse?", "where's Dawnwatch Lighthouse"],
+    ["What does the Lantern Guild do?", "What does the Lantern Guild do exactly?", "what does the lantern guild do"],
+    ["Tell me about Captain Voss.", "Tell me about Captain Voss!", "Can you tell me about Captain Voss?"],
+    ["How is Rowan related to Aldric?", "How is Rowan related to Aldric", "how is rowan related to aldric?"],
+    ["Tell me about the Whisper Market.", "Tell me about the Whisper Market please.", "tell me about whisper market"],
+    ["Who is Mira?", "Who is Mira", "who's Mira?"],
+    ["What is the Ironwatch?", "What is the Ironwatch", "What's the Ironwatch?"],
+]
+
+
+def ask_sequence(turns: int, seed: int) -> List[int]:
+    """
+    (question index, wording index) pairs flattened as q * 10 + w;
+    question i is asked with weight 1 / (i + 1).
+    """
+    rng = random.Random(seed)
+    weights = [1.0 / (idx + 1) for idx in range(len(QUESTIONS))]
+    asks = []
+    for _ in range(turns):
+        question = rng.choices(range(len(QUESTIONS)), weights)[0]
+        asks.append(question * 10 + rng.randrange(len(QUESTIONS[question])))
+    return asks
+
+
+def run_mode(graph_app, npc: NPC, asks: List[int], cache) -> Dict[str, float]:
+    set_answer_cache(cache)
+    canonical = {
+        normalize_question(wording): question
+        for question, wordings in enumerate(QUESTIONS)
+        for wording in wordings
+    }
+    provider = LLMProvider.get_provider()
+    calls_before = provider.calls
+    samples = []
+    hits = {"exact": 0, "similar": 0}
+    wrong_reuse = 0
+    for ask in asks:
+        question, wording = divmod(ask, 10)
+        started = time.perf_counter()
+        result = invoke_dialogue_turn(graph_app, initial_dialogue_state(npc, QUESTIONS[question][wording]))
+        samples.append((time.perf_counter() - started) * 1000.0)
+        cache_state = result.get("answer_cache", {})
+        if cache_state.get("hit"):
+            hits[cache_state["match"]] += 1
+            if canonical.get(cache_state["cached_question"]) != question:
+                wrong_reuse += 1
+    set_answer_cache(None)
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "llm_calls_per_turn": (provider.calls - calls_before) / len(asks),
+        "exact_hit_rate": hits["exact"] / len(asks),
+        "similar_hit_rate": hits["similar"] / len(asks),
+        "wrong_reuse": wrong_reuse,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Answer cache benchmark")
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--similarity", type=float, default=0.9, help="Similarity threshold for the similar mode")
+    parser.add_argument("--router-ms", type=float, default=30.0)
+    parser.add_argument("--answer-ms", type=float, default=150.0)
+    parser.add_argument("--search-ms", type=float, default=20.0)
+    parser.add_argument("--facts-ms", type=float, default=2.0)
+    parser.add_argument("--graph-ms", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    install_stand_ins(args)
+    graph_app = create_dialogue_graph()
+    npc = NPC(entity_id="ent_aldric", name="Aldric")
+    asks = ask_sequence(args.turns, args.seed)
+    results = {
+        "off": run_mode(graph_app, npc, asks, None),
+        "exact": run_mode(graph_app, npc, asks, AnswerCache(similarity_threshold=0.0)),
+        "similar": run_mode(graph_app, npc, asks, AnswerCache(similarity_threshold=args.similarity)),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, row in results.items():
+        print(
+            f"{name:<8} mean={row['mean_ms']:>6.1f}ms p50={row['p50_ms']:>6.1f}ms p95={row['p95_ms']:>6.1f}ms "
+            f"llm/turn={row['llm_calls_per_turn']:.2f} exact={row['exact_hit_rate']:.0%} "
+            f"similar={row['similar_hit_rate']:.0%} wrong_reuse={row['wrong_reuse']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Crowd-scene turns: run_dialogue_turns vs one run_dialogue_turn per NPC.
+
+Each tick, every NPC in the crowd answers the same player message (a crowd
+scene); with --mixed each NPC gets one of the sample messages instead. The
+batch runs routing once per distinct message, sends the tick's semantic
+searches as one search_many, and fetches entity / neighbor facts once, then
+runs the turns concurrently. The LLM is StandInLLMProvider and the store adds
+fixed per-call latencies, as in benchmarks.turn_latency.
+
+Usage:
+    python -m benchmarks.batch_turns --npcs 24 --ticks 5 --concurrency 1,8,24
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Dict, List
+
+from benchmarks.support import SAMPLE_MESSAGES, percentile
+from benchmarks.turn_latency import install_stand_ins
+from Dialogue.batch import TurnRequest, run_dialogue_turns
+from Dialogue.dialogue_graph import create_dialogue_graph, run_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.llm.provider import LLMProvider
+from World.store import get_world_store
+
+
+CROWD = [
+    ("ent_aldric", "Aldric"),
+    ("ent_rowan", "Rowan"),
+    ("ent_mira", "Mira"),
+    ("ent_captain_voss", "Captain Voss"),
+]
+
+
+def tick_requests(npcs: List[NPC], tick: int, mixed: bool) -> List[TurnRequest]:
+    if mixed:
+        return [
+            TurnRequest(npc, SAMPLE_MESSAGES[(tick + idx) % len(SAMPLE_MESSAGES)]) for idx, npc in enumerate(npcs)
+        ]
+    message = SAMPLE_MESSAGES[tick % len(SAMPLE_MESSAGES)]
+    return [TurnRequest(npc, message) for npc in npcs]
+
+
+def measure(run, ticks: List[List[TurnRequest]]) -> Dict[str, float]:
+    provider = LLMProvider.get_provider()
+    store = get_world_store()
+    llm_before = provider.calls
+    store_before = sum(store.calls.values())
+    tick_ms = []
+    for requests in ticks:
+        started = time.perf_counter()
+        run(requests)
+        tick_ms.append((time.perf_counter() - started) * 1000.0)
+    turns = sum(len(requests) for requests in ticks)
+    return {
+        "tick_p50_ms": percentile(tick_ms, 0.50),
+        "tick_max_ms": max(tick_ms),
+        "turns_per_s": turns / (sum(tick_ms) / 1000.0),
+        "llm_calls_per_turn": (provider.calls - llm_before) / turns,
+        "store_calls_per_turn": (sum(store.calls.values()) - store_before) / turns,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batched crowd-scene turn benchmark")
+    parser.add_argument("--npcs", type=int, default=24)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--concurrency", default="1,8,24")
+    parser.add_argument("--mixed", action="store_true", help="Different message per NPC")
+    parser.add_argument("--router-ms", type=float, default=30.0, help="Stand-in latency per router call")
+    parser.add_argument("--answer-ms", type=float, default=150.0, help="Stand-in latency per answer call")
+    parser.add_argument("--search-ms", type=float, default=20.0, help="Added latency per store search call")
+    parser.add_argument("--facts-ms", type=float, default=2.0, help="Added latency per facts_for_entity")
+    parser.add_argument("--graph-ms", type=float, default=1.0, help="Added latency per graph store call")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    install_stand_ins(args)
+    graph = create_dialogue_graph()
+    npcs = [NPC(*CROWD[idx % len(CROWD)]) for idx in range(args.npcs)]
+    ticks = [tick_requests(npcs, tick, args.mixed) for tick in range(args.ticks)]
+    run_dialogue_turns(graph, tick_requests(npcs[: len(CROWD)], 0, True), len(CROWD))  # warm-up
+
+    results = {
+        "sequential": measure(
+            lambda requests: [run_dialogue_turn(graph, request.npc, request.user_input) for request in requests],
+            ticks,
+        )
+    }
+    for concurrency in [int(value) for value in args.concurrency.split(",") if value]:
+        results[f"batch x{concurrency}"] = measure(
+            lambda requests: run_dialogue_turns(graph, requests, max_concurrency=concurrency), ticks
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, row in results.items():
+        print(
+            f"{name:<12} tick_p50={row['tick_p50_ms']:>7.0f}ms tick_max={row['tick_max_ms']:>7.0f}ms "
+            f"{row['turns_per_s']:>6.1f} turns/s llm/turn={row['llm_calls_per_turn']:.2f} "
+            f"store/turn={row['store_calls_per_turn']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Trace-driven benchmark: a scripted conversation set, replayed offline.
+
+Record the conversation set once with tracing on, against the configured
+LLM (or --stand-in for a fixture without any API); every LLM call's prompt
+digest, response and duration lands in the trace's turn_spans events.
+Replay then runs the same conversations through run_dialogue_turn with
+ReplayLLMProvider serving the recorded responses, so it needs no network
+and the prompts, retrieval and answers are the same on every run.
+
+The world store is the offline one (hashing embeddings) in both modes, so
+replayed prompts match the recorded ones. Conversation memory summarizes
+extractively and in the foreground, and the answer cache is off.
+
+Reports p50/p95 turn latency, per-node (and LLM / vector / graph-store)
+span timings, replay hits and misses, and a digest of every response. The
+--out file (sorted keys, rounded values) is meant to be diffed between
+commits: a changed responses_sha or new replay misses mean the prompts or
+answers changed, not just the timings.
+
+Usage:
+    python -m benchmarks.bench --record bench-trace --stand-in
+    python -m benchmarks.bench --replay bench-trace/trace.jsonl --latency recorded --out before.json
+    python main.py --bench bench-trace/trace.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from benchmarks.support import StandInLLMProvider, build_offline_world_store, percentile
+from Dialogue.answer_cache import set_answer_cache
+from Dialogue.dialogue_graph import create_dialogue_graph, initial_dialogue_state, invoke_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.llm.provider import LLMProvider
+from Dialogue.llm.replay import ReplayLatency, ReplayLLMProvider
+from Dialogue.memory import ConversationMemory, ConversationTurn
+from Dialogue.trace import disable_trace, enable_trace, flush_trace
+from utils.ids import text_digest
+from utils.spans import reset_spans, span_summary
+from World.graph_store import set_world_graph
+from World.store import set_world_store
+
+
+DEFAULT_CONVERSATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bench_conversations.json")
+
+
+def load_conversations(path: str = DEFAULT_CONVERSATIONS) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["conversations"]
+
+
+def extractive_summarizer(npc_name: str, previous_summary: str, turns: List[ConversationTurn]) -> str:
+    """
+    Deterministic stand-in for the LLM summarizer (no LLM call, so nothing
+    to record or replay).
+    """
+    questions = "; ".join(turn.user for turn in turns)
+    return f"{previous_summary} Earlier the player asked: {questions}.".strip()
+
+
+def prepare_world() -> None:
+    """
+    The offline world store, a fresh in-memory graph and no answer cache,
+    as in every bench run.
+    """
+    set_world_store(build_offline_world_store())
+    set_world_graph(None)
+    set_answer_cache(None)
+
+
+def run_conversations(conversations: List[Dict[str, Any]], repeat: int = 1) -> Dict[str, Any]:
+    """
+    Run the conversation set `repeat` times through the dialogue graph.
+    Turn latencies, turn paths and the responses digest are returned; span
+    timings are in utils.spans (reset here first).
+    """
+    graph_app = create_dialogue_graph()
+    reset_spans()
+    latencies: List[float] = []
+    paths: Counter = Counter()
+    responses: List[str] = []
+    for _ in range(repeat):
+        for conversation in conversations:
+            npc = NPC(**conversation["npc"])
+            memory = ConversationMemory(npc.name, summarizer=extractive_summarizer, background=False)
+            for message in conversation["messages"]:
+                started = time.perf_counter()
+                result = invoke_dialogue_turn(graph_app, initial_dialogue_state(npc, message, memory), memory)
+                latencies.append((time.perf_counter() - started) * 1000.0)
+                paths[result.get("turn_path") or "full"] += 1
+                responses.append(result["formatted_response"])
+    return {
+        "turns": len(latencies),
+        "latencies_ms": latencies,
+        "turn_paths": dict(sorted(paths.items())),
+        "responses_sha": text_digest("\n".join(responses)),
+    }
+
+
+def record(conversations: List[Dict[str, Any]], trace_dir: str, stand_in: bool, stand_in_ms: float) -> str:
+    """
+    Run the conversation set once with every turn traced; returns the trace path.
+    """
+    prepare_world()
+    if stand_in:
+        LLMProvider.set_provider(StandInLLMProvider(latency_ms=stand_in_ms, answer_latency_ms=4 * stand_in_ms))
+    os.makedirs(trace_dir, exist_ok=True)
+    enable_trace(trace_dir, 1, 0)
+    try:
+        run_conversations(conversations)
+        flush_trace()
+    finally:
+        disable_trace()
+    return os.path.join(trace_dir, "trace.jsonl")
+
+
+def replay(
+    conversations: List[Dict[str, Any]],
+    trace_path: str,
+    latency: Optional[ReplayLatency] = None,
+    repeat: int = 1,
+    strict: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run the conversation set against responses recorded in `trace_path`.
+    Unrecorded prompts get a stand-in answer and count as misses, or raise
+    with `strict`.
+    """
+    prepare_world()
+    provider = ReplayLLMProvider.from_trace(trace_path, latency, fallback=None if strict else StandInLLMProvider())
+    LLMProvider.set_provider(provider)
+    try:
+        run = run_conversations(conversations, repeat)
+    finally:
+        LLMProvider.set_provider(None)
+    latencies = run.pop("latencies_ms")
+    return {
+        **run,
+        "conversations": len(conversations) * repeat,
+        "turn_latency": {
+            "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "max_ms": max(latencies, default=0.0),
+        },
+        "spans": {
+            name: {key: stats[key] for key in ("count", "mean_ms", "p50_ms", "p95_ms")}
+            for name, stats in span_summary().items()
+        },
+        "replay": provider.stats(),
+    }
+
+
+def _rounded(value: Any) -> Any:
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {key: _rounded(item) for key, item in value.items()}
+    return value
+
+
+def format_report(results: Dict[str, Any]) -> str:
+    latency = results["turn_latency"]
+    replayed = results["replay"]
+    lines = [
+        f"turns={results['turns']} conversations={results['conversations']} "
+        f"p50={latency['p50_ms']:.1f}ms p95={latency['p95_ms']:.1f}ms mean={latency['mean_ms']:.1f}ms "
+        f"max={latency['max_ms']:.1f}ms",
+        "paths " + " ".join(f"{path}={count}" for path, count in results["turn_paths"].items()),
+        f"replay hits={replayed['hits']} misses={replayed['misses']} recorded_prompts={replayed['prompts']} "
+        f"responses_sha={results['responses_sha']}",
+    ]
+    for name, stats in results["spans"].items():
+        lines.append(
+            f"{name:<36} calls={stats['count']:>4} p50={stats['p50_ms']:>8.2f}ms "
+            f"p95={stats['p95_ms']:>8.2f}ms mean={stats['mean_ms']:>8.2f}ms"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a scripted conversation set against recorded LLM responses")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--record", metavar="TRACE_DIR", help="Run the set with every turn traced into TRACE_DIR")
+    mode.add_argument("--replay", metavar="TRACE", help="Replay the set against the LLM calls recorded in TRACE")
+    parser.add_argument("--conversations", default=DEFAULT_CONVERSATIONS)
+    parser.add_argument("--stand-in", action="store_true", help="Record against StandInLLMProvider (no API)")
+    parser.add_argument("--stand-in-ms", type=float, default=50.0, help="Stand-in router latency (answers take 4x)")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the set this many times")
+    parser.add_argument(
+        "--latency",
+        choices=("none", "recorded", "model"),
+        default="recorded",
+        help="Replay latency: none, the recorded call durations, or base + per-token costs",
+    )
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for recorded durations")
+    parser.add_argument("--base-ms", type=float, default=200.0, help="Model latency per call")
+    parser.add_argument("--ms-per-prompt-token", type=float, default=0.05)
+    parser.add_argument("--ms-per-completion-token", type=float, default=15.0)
+    parser.add_argument("--strict", action="store_true", help="Fail on a prompt with no recorded response")
+    parser.add_argument("--out", help="Also write the results here as diffable JSON")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    conversations = load_conversations(args.conversations)
+    if args.record:
+        trace_path = record(conversations, args.record, args.stand_in, args.stand_in_ms)
+        print(f"Recorded {sum(len(c['messages']) for c in conversations)} turns to {trace_path}")
+        return
+
+    if args.latency == "recorded":
+        latency = ReplayLatency(recorded=True, scale=args.latency_scale)
+    elif args.latency == "model":
+        latency = ReplayLatency(
+            base_ms=args.base_ms,
+            ms_per_prompt_token=args.ms_per_prompt_token,
+            ms_per_completion_token=args.ms_per_completion_token,
+        )
+    else:
+        latency = ReplayLatency()
+    results = _rounded(replay(conversations, args.replay, latency, args.repeat, args.strict))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return
+    print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
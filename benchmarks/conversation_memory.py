@@ -0,0 +1,97 @@
+"""
+Prompt size over a long scripted session: ConversationMemory vs raw history.
+
+Plays the same scripted conversation through the dialogue graph twice:
+  - raw: the old behaviour, one history string that grows every turn
+  - memory: ConversationMemory (recent turns verbatim, older turns summarized
+    in the background)
+and reports the answer-prompt token count and turn latency at checkpoints.
+The LLM is StandInLLMProvider with a per-character prompt cost, so longer
+prompts also answer more slowly.
+
+Usage:
+    python -m benchmarks.conversation_memory --turns 200
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Dict, List
+
+from benchmarks.support import SAMPLE_MESSAGES
+from benchmarks.turn_latency import install_stand_ins
+from Dialogue.dialogue_graph import create_dialogue_graph, run_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.llm.provider import LLMProvider
+from Dialogue.memory import ConversationMemory
+from Dialogue.tokens import count_tokens
+
+
+def scripted_message(turn: int) -> str:
+    message = SAMPLE_MESSAGES[turn % len(SAMPLE_MESSAGES)]
+    return f"{message} (turn {turn})" if turn >= len(SAMPLE_MESSAGES) else message
+
+
+def run_session(graph, npc: NPC, turns: int, use_memory: bool) -> List[Dict[str, float]]:
+    provider = LLMProvider.get_provider()
+    memory = ConversationMemory(npc_name=npc.name)
+    history = ""
+    rows = []
+    for turn in range(turns):
+        message = scripted_message(turn)
+        started = time.perf_counter()
+        if use_memory:
+            run_dialogue_turn(graph, npc, message, memory)
+        else:
+            response = run_dialogue_turn(graph, npc, message, history)
+            history += f"Human: {message}\n{npc.name}: {response}\n\n"
+        elapsed = (time.perf_counter() - started) * 1000.0
+        rows.append(
+            {
+                "turn": turn + 1,
+                "prompt_tokens": count_tokens(provider.last_answer_prompt),
+                "latency_ms": elapsed,
+            }
+        )
+    memory.wait()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Conversation memory prompt-size benchmark")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--router-ms", type=float, default=0.0)
+    parser.add_argument("--answer-ms", type=float, default=5.0)
+    parser.add_argument("--ms-per-1k-chars", type=float, default=2.0, help="Stand-in prompt cost")
+    parser.add_argument("--search-ms", type=float, default=0.0)
+    parser.add_argument("--facts-ms", type=float, default=0.0)
+    parser.add_argument("--graph-ms", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    install_stand_ins(args)
+    graph = create_dialogue_graph()
+    npc = NPC(name="Aldric", entity_id="ent_aldric")
+    results = {
+        "raw": run_session(graph, npc, args.turns, use_memory=False),
+        "memory": run_session(graph, npc, args.turns, use_memory=True),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    checkpoints = sorted({1, 10, 25, 50, 100, 150, args.turns} & set(range(1, args.turns + 1)))
+    print(f"{'turn':>6} {'raw tokens':>11} {'raw ms':>8} {'memory tokens':>14} {'memory ms':>10}")
+    for turn in checkpoints:
+        raw = results["raw"][turn - 1]
+        memory = results["memory"][turn - 1]
+        print(
+            f"{turn:>6} {raw['prompt_tokens']:>11} {raw['latency_ms']:>8.1f} "
+            f"{memory['prompt_tokens']:>14} {memory['latency_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Turn latency against an SLO with and without turn deadlines.
+
+Each scenario makes one dependency slow: router LLM calls that sometimes
+stall (--spike-share of them take --spike-ms longer), answer calls that
+stall the same way, or a graph backend with --slow-graph-ms per call. Every
+scenario is run with deadlines off and with a DeadlinePolicy scaled to
+--slo-ms (the deadline is 95% of the SLO, leaving time to format and return
+the reply), and reports p50 / p99 / max turn latency, the share of turns
+over the SLO, and the degradations taken.
+
+Usage:
+    python -m benchmarks.deadline --turns 60 --slo-ms 600
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.support import SAMPLE_MESSAGES, LatencyProxy, StandInLLMProvider, build_offline_world_store, percentile
+from benchmarks.turn_latency import GRAPH_METHODS
+from Dialogue.deadline import DeadlinePolicy, set_deadline_policy
+from Dialogue.dialogue_graph import create_dialogue_graph, initial_dialogue_state, invoke_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.llm.provider import LLMProvider
+from Dialogue.memory import ConversationMemory
+from World.graph_store import get_world_graph, set_world_graph
+from World.store import set_world_store
+
+
+SCENARIOS = ("healthy", "slow_router", "slow_answer", "slow_graph")
+
+
+class SpikyLLMProvider(StandInLLMProvider):
+    """
+    StandInLLMProvider where `spike_share` of the router or answer calls
+    (per `spike_on`) stall for an extra `spike_ms`.
+    """
+
+    def __init__(self, spike_on: str, spike_share: float, spike_ms: float, seed: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.spike_on = spike_on
+        self.spike_share = spike_share
+        self.spike_ms = spike_ms
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        is_router = prompt.startswith(("You are a query router", "You are a graph routing assistant"))
+        is_summary = prompt.startswith("You maintain a running summary")
+        target = (self.spike_on == "router" and is_router) or (
+            self.spike_on == "answer" and not is_router and not is_summary
+        )
+        if target:
+            with self._rng_lock:
+                spike = self._rng.random() < self.spike_share
+            if spike:
+                time.sleep(self.spike_ms / 1000.0)
+        return super().generate(prompt)
+
+
+def install_scenario(scenario: str, base_graph, args: argparse.Namespace) -> None:
+    spike_on = {"slow_router": "router", "slow_answer": "answer"}.get(scenario, "")
+    LLMProvider.set_provider(
+        SpikyLLMProvider(
+            spike_on,
+            args.spike_share,
+            args.spike_ms,
+            latency_ms=args.router_ms,
+            answer_latency_ms=args.answer_ms,
+        )
+    )
+    graph_ms = args.slow_graph_ms if scenario == "slow_graph" else args.graph_ms
+    set_world_graph(LatencyProxy(base_graph, {name: graph_ms for name in GRAPH_METHODS}))
+
+
+def run_scenario(graph_app, npc: NPC, args: argparse.Namespace) -> Dict[str, object]:
+    memory = ConversationMemory()
+    samples: List[float] = []
+    degradations: Counter = Counter()
+    degraded_turns = 0
+    for idx in range(args.turns):
+        message = SAMPLE_MESSAGES[idx % len(SAMPLE_MESSAGES)]
+        started = time.perf_counter()
+        result = invoke_dialogue_turn(graph_app, initial_dialogue_state(npc, message, memory), memory)
+        samples.append((time.perf_counter() - started) * 1000.0)
+        degradations.update(result.get("degradations", []))
+        degraded_turns += bool(result.get("degradations"))
+    return {
+        "p50_ms": percentile(samples, 0.50),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": max(samples),
+        "over_slo": sum(sample > args.slo_ms for sample in samples) / len(samples),
+        "degraded_turns": degraded_turns / len(samples),
+        "degradations": dict(degradations.most_common()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Turn deadline / degradation benchmark")
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--slo-ms", type=float, default=600.0, help="Turn latency SLO (deadline = 95%% of it)")
+    parser.add_argument("--router-ms", type=float, default=40.0)
+    parser.add_argument("--answer-ms", type=float, default=120.0)
+    parser.add_argument("--graph-ms", type=float, default=2.0)
+    parser.add_argument("--search-ms", type=float, default=10.0)
+    parser.add_argument("--spike-share", type=float, default=0.2, help="Share of targeted LLM calls that stall")
+    parser.add_argument("--spike-ms", type=float, default=1500.0, help="Extra latency of a stalled call")
+    parser.add_argument("--slow-graph-ms", type=float, default=120.0, help="Per-call graph latency (slow_graph)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    set_world_store(LatencyProxy(build_offline_world_store(), {"search": args.search_ms}))
+    base_graph = get_world_graph()
+    graph_app = create_dialogue_graph()
+    npc = NPC(entity_id="ent_aldric", name="Aldric")
+    # Same proportions as the config defaults (8000ms turn, 3000ms answer reserve, ...).
+    turn_ms = args.slo_ms * 0.95
+    policy = DeadlinePolicy(
+        turn_ms=turn_ms,
+        answer_reserve_ms=turn_ms * 0.375,
+        router_ms=turn_ms * 0.1875,
+        graph_router_ms=turn_ms * 0.125,
+        retrieval_ms=turn_ms * 0.0375,
+    )
+
+    results: Dict[str, Dict[str, object]] = {}
+    for scenario in [name for name in args.scenarios.split(",") if name]:
+        for label, scenario_policy in (("no_deadline", DeadlinePolicy(turn_ms=0)), ("deadline", policy)):
+            install_scenario(scenario, base_graph, args)
+            set_deadline_policy(scenario_policy)
+            results[f"{scenario}/{label}"] = run_scenario(graph_app, npc, args)
+    set_deadline_policy(None)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, row in results.items():
+        print(
+            f"{name:<24} p50={row['p50_ms']:>6.0f}ms p99={row['p99_ms']:>6.0f}ms max={row['max_ms']:>6.0f}ms "
+            f"over_slo={row['over_slo']:>4.0%} degraded={row['degraded_turns']:>4.0%} {row['degradations']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
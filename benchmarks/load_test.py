@@ -0,0 +1,192 @@
+"""
+Load test for the dialogue server (`python main.py --serve`).
+
+Starts the server in-process on a free port with the benchmark stand-ins
+(StandInLLMProvider, offline world store, optional store latencies) and
+drives N simulated players against it over HTTP. Each player opens a
+session with one of the NPCs, plays `--turns` turns, then closes it.
+Reports client-side turn latency (p50/p95/p99) and throughput per player
+count. With --url the players target an already running server instead
+(and whatever LLM it is configured with).
+
+Usage:
+    python -m benchmarks.load_test --players 1,10,50 --turns 10
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --players 20
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from benchmarks.support import SAMPLE_MESSAGES, percentile
+from benchmarks.turn_latency import install_stand_ins
+from Dialogue.server import create_dialogue_server
+
+
+NPC_IDS = ["ent_aldric", "ent_rowan", "ent_mira", "ent_captain_voss"]
+
+
+class DialogueClient:
+    def __init__(self, host: str, port: int, timeout: float = 120.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            payload = json.dumps(body).encode("utf-8") if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload is not None else {}
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read() or b"{}")
+        finally:
+            connection.close()
+
+    def stream(self, path: str, body: Dict[str, Any]) -> Tuple[float, List[str]]:
+        """
+        POST an SSE turn; returns (ms to the first event, event names).
+        """
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        started = time.perf_counter()
+        first_event_ms = 0.0
+        events = []
+        try:
+            connection.request(
+                "POST", path, body=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+            )
+            response = connection.getresponse()
+            for line in response:
+                if line.startswith(b"event: "):
+                    if not events:
+                        first_event_ms = (time.perf_counter() - started) * 1000.0
+                    events.append(line[7:].strip().decode("utf-8"))
+        finally:
+            connection.close()
+        return first_event_ms, events
+
+
+def play(client: DialogueClient, player: int, turns: int, stream: bool, think_ms: float, results: Dict[str, list]) -> None:
+    try:
+        play_session(client, player, turns, stream, think_ms, results)
+    except OSError as exc:
+        results["errors"].append(f"player {player}: {exc}")
+
+
+def play_session(
+    client: DialogueClient, player: int, turns: int, stream: bool, think_ms: float, results: Dict[str, list]
+) -> None:
+    status, session = client.request("POST", "/sessions", {"entity_id": NPC_IDS[player % len(NPC_IDS)]})
+    if status != 201:
+        results["errors"].append(f"create: {status} {session}")
+        return
+    session_id = session["session_id"]
+    for turn in range(turns):
+        message = SAMPLE_MESSAGES[(player + turn) % len(SAMPLE_MESSAGES)]
+        started = time.perf_counter()
+        if stream:
+            first_event_ms, events = client.stream(f"/sessions/{session_id}/turn/stream", {"message": message})
+            ok = bool(events) and events[-1] == "done"
+            if ok:
+                results["first_event_ms"].append(first_event_ms)
+        else:
+            status, body = client.request("POST", f"/sessions/{session_id}/turn", {"message": message})
+            ok = status == 200
+        elapsed = (time.perf_counter() - started) * 1000.0
+        if ok:
+            results["latency_ms"].append(elapsed)
+        else:
+            results["errors"].append(f"turn {turn}: {body if not stream else events}")
+        if think_ms:
+            time.sleep(think_ms / 1000.0)
+    client.request("DELETE", f"/sessions/{session_id}")
+
+
+def run_load(client: DialogueClient, players: int, turns: int, stream: bool, think_ms: float) -> Dict[str, Any]:
+    results: Dict[str, list] = {"latency_ms": [], "first_event_ms": [], "errors": []}
+    threads = [
+        threading.Thread(target=play, args=(client, player, turns, stream, think_ms, results))
+        for player in range(players)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    samples = results["latency_ms"]
+    row = {
+        "players": players,
+        "turns": len(samples),
+        "errors": len(results["errors"]),
+        "wall_s": wall,
+        "throughput_tps": len(samples) / wall if wall else 0.0,
+        "mean_ms": statistics.mean(samples) if samples else 0.0,
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+    }
+    if stream:
+        row["first_event_p50_ms"] = percentile(results["first_event_ms"], 0.50)
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dialogue server load test")
+    parser.add_argument("--players", default="1,10,50", help="Comma-separated concurrent player counts")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per player")
+    parser.add_argument("--stream", action="store_true", help="Use the SSE streaming turn endpoint")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between a player's turns")
+    parser.add_argument("--url", default="", help="Target a running server instead of starting one")
+    parser.add_argument("--router-ms", type=float, default=30.0, help="Stand-in latency per router call")
+    parser.add_argument("--answer-ms", type=float, default=150.0, help="Stand-in latency per answer call")
+    parser.add_argument("--search-ms", type=float, default=10.0, help="Added latency per store.search")
+    parser.add_argument("--facts-ms", type=float, default=2.0, help="Added latency per facts_for_entity")
+    parser.add_argument("--graph-ms", type=float, default=1.0, help="Added latency per graph store call")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    server = None
+    if args.url:
+        target = urlparse(args.url)
+        client = DialogueClient(target.hostname or "127.0.0.1", target.port or 80)
+    else:
+        install_stand_ins(args)
+        server = create_dialogue_server("127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = DialogueClient("127.0.0.1", server.server_address[1])
+        run_load(client, 1, len(SAMPLE_MESSAGES), args.stream, 0.0)  # warm-up
+
+    results = []
+    for players in [int(value) for value in args.players.split(",") if value]:
+        results.append(run_load(client, players, args.turns, args.stream, args.think_ms))
+
+    if server is not None:
+        server.shutdown()
+        server.manager.stop()
+        server.server_close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for row in results:
+        line = (
+            f"players={row['players']:<4} turns={row['turns']:<5} errors={row['errors']:<3} "
+            f"p50={row['p50_ms']:.0f}ms p95={row['p95_ms']:.0f}ms p99={row['p99_ms']:.0f}ms "
+            f"throughput={row['throughput_tps']:.1f} turns/s"
+        )
+        if "first_event_p50_ms" in row:
+            line += f" first_event_p50={row['first_event_p50_ms']:.0f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+NPC context resolution cost with many NPCs.
+
+Simulates turns spread over a large NPC population with skewed popularity
+(a few NPCs get most of the traffic) and measures the per-turn cost of
+resolving NPC context (entity lookup, profile, system prompt, node facts,
+location) for several NPCContextCache sizes. Size 0 is the uncached
+behaviour. Graph calls get an added latency to model a networked backend.
+
+Usage:
+    python -m benchmarks.npc_context --npcs 5000 --turns 20000 --graph-ms 0.5
+"""
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.path_queries import write_random_world
+from benchmarks.support import LatencyProxy, percentile
+from Dialogue.entities.npc import NPC
+from Dialogue.entities.npc_context import NPCContextCache
+from World.graph_cache import CachedGraphStore
+from World.graph_store import InMemoryGraphStore, set_world_graph
+from World.verbalize import get_fact_verbalizer
+
+
+def run_cache_size(npcs: List[NPC], order: List[int], max_entries: int) -> Dict[str, float]:
+    cache = NPCContextCache(max_entries=max_entries)
+    for npc in npcs:
+        npc.context_cache = cache
+    samples = []
+    for index in order:
+        started = time.perf_counter()
+        npcs[index].context()  # load_npc_context
+        npcs[index].context()  # route_query (location)
+        samples.append((time.perf_counter() - started) * 1e6)
+    stats = cache.stats()
+    return {
+        "cache_size": max_entries,
+        "mean_us": statistics.mean(samples),
+        "p95_us": percentile(samples, 0.95),
+        "hit_rate": stats["hit_rate"],
+        "evictions": stats["evictions"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="NPC context cache benchmark")
+    parser.add_argument("--npcs", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=20000)
+    parser.add_argument("--cache-sizes", default="0,256,1024,8192")
+    parser.add_argument("--graph-ms", type=float, default=0.5, help="Added latency per graph call")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of NPC popularity")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        entities_path, edges_path = write_random_world(tmp, args.npcs, 2.0, seed=3)
+        backend = InMemoryGraphStore(entities_path, edges_path)
+    # Latency sits under the traversal cache, as it would for Neo4j.
+    slow = LatencyProxy(backend, {"get_entity": args.graph_ms, "get_entity_by_name": args.graph_ms})
+    set_world_graph(CachedGraphStore(slow, max_entries=0))
+    get_fact_verbalizer().fact_text("")  # render the world once, outside the timings
+
+    npcs = [NPC(entity_id=f"ent_{idx}", name=f"Entity {idx}") for idx in range(args.npcs)]
+    weights = [1.0 / (rank + 1) ** args.skew for rank in range(args.npcs)]
+    order = random.Random(9).choices(range(args.npcs), weights=weights, k=args.turns)
+
+    results = [
+        run_cache_size(npcs, order, int(size))
+        for size in args.cache_sizes.split(",")
+        if size
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"npcs={args.npcs} turns={args.turns} graph_ms={args.graph_ms}")
+    for row in results:
+        print(
+            f"  cache_size={row['cache_size']:<6} per-turn mean={row['mean_us']:.1f}us "
+            f"p95={row['p95_us']:.1f}us hit_rate={row['hit_rate']:.1%} evictions={row['evictions']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark find_paths against naive neighborhood expansion.
+
+Builds random world graphs of increasing size, then for random entity pairs
+compares:
+  - find_paths (bidirectional BFS, stops when the two searches meet)
+  - naive expansion: grow the neighborhood of the first entity one layer at
+    a time, fetching every edge, until the second entity shows up
+
+Usage:
+    python -m benchmarks.path_queries --sizes 1000,10000,100000 --pairs 200
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from utils.json_stream import write_json_array
+from World.graph_store import InMemoryGraphStore
+from World.synthetic import iter_edges, iter_entities
+
+
+def write_random_world(directory: str, size: int, avg_degree: float, seed: int) -> Tuple[str, str]:
+    """
+    Entities and edges of a synthetic world (see World.synthetic); returns their paths.
+    """
+    entities_path = os.path.join(directory, "entities.json")
+    edges_path = os.path.join(directory, "edges.json")
+    write_json_array(entities_path, "entities", iter_entities(size, seed))
+    write_json_array(edges_path, "edges", iter_edges(size, avg_degree, seed=seed))
+    return entities_path, edges_path
+
+
+def naive_expansion(graph: InMemoryGraphStore, source_id: str, target_id: str, max_depth: int) -> Tuple[int, int]:
+    """
+    Returns (hops to target or -1, edges fetched).
+    """
+    visited = {source_id}
+    frontier = [source_id]
+    fetched = 0
+    for depth in range(1, max_depth + 1):
+        adjacency = graph._undirected_adjacency(frontier)
+        next_frontier = []
+        found = False
+        for pairs in adjacency.values():
+            fetched += len(pairs)
+            for neighbor_id, _edge in pairs:
+                if neighbor_id == target_id:
+                    found = True
+                if neighbor_id not in visited:
+                    visited.add(neighbor_id)
+                    next_frontier.append(neighbor_id)
+        if found:
+            return depth, fetched
+        frontier = next_frontier
+    return -1, fetched
+
+
+def run_size(size: int, pairs: int, avg_degree: float, max_depth: int, k: int, seed: int) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        entities_path, edges_path = write_random_world(tmp, size, avg_degree, seed)
+        graph = InMemoryGraphStore(entities_path, edges_path)
+
+    rng = random.Random(seed + 1)
+    queries = [(f"ent_{rng.randrange(size)}", f"ent_{rng.randrange(size)}") for _ in range(pairs)]
+
+    path_times: List[float] = []
+    naive_times: List[float] = []
+    naive_fetched: List[int] = []
+    mismatches = 0
+    connected = 0
+    for source_id, target_id in queries:
+        started = time.perf_counter()
+        paths = graph.find_paths(source_id, target_id, max_depth=max_depth, k=k)
+        path_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        hops, fetched = naive_expansion(graph, source_id, target_id, max_depth)
+        naive_times.append(time.perf_counter() - started)
+        naive_fetched.append(fetched)
+
+        path_hops = len(paths[0]) if paths else -1
+        if source_id != target_id and path_hops != hops:
+            mismatches += 1
+        if paths:
+            connected += 1
+
+    path_mean = statistics.mean(path_times)
+    naive_mean = statistics.mean(naive_times)
+    return {
+        "entities": size,
+        "edges": len(graph.edges),
+        "pairs": pairs,
+        "connected_pairs": connected,
+        "find_paths_mean_ms": path_mean * 1000.0,
+        "find_paths_p95_ms": sorted(path_times)[int(0.95 * (len(path_times) - 1))] * 1000.0,
+        "naive_mean_ms": naive_mean * 1000.0,
+        "naive_p95_ms": sorted(naive_times)[int(0.95 * (len(naive_times) - 1))] * 1000.0,
+        "naive_edges_fetched_mean": statistics.mean(naive_fetched),
+        "speedup": naive_mean / path_mean if path_mean else 0.0,
+        "hop_mismatches": mismatches,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="find_paths vs naive expansion benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--avg-degree", type=float, default=4.0)
+    parser.add_argument("--max-depth", type=int, default=4)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(",") if value]:
+        result = run_size(size, args.pairs, args.avg_degree, args.max_depth, args.k, args.seed)
+        results.append(result)
+        if not args.json:
+            print(
+                f"entities={result['entities']:>8} edges={result['edges']:>8} "
+                f"find_paths={result['find_paths_mean_ms']:.3f}ms "
+                f"naive={result['naive_mean_ms']:.3f}ms "
+                f"(fetched {result['naive_edges_fetched_mean']:.0f} edges) "
+                f"speedup={result['speedup']:.1f}x mismatches={result['hop_mismatches']}"
+            )
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Next-turn latency with and without speculative prefetch.
+
+Plays scripted conversations where most follow-ups ask about something the
+previous answer mentioned (--follow-up of them; the rest pick a random
+entity), with --read-ms of player reading time between turns. The stores
+sit behind their caches with per-call latencies in front of the backends
+(a networked graph DB and vector DB, and a slow embedding model), and the
+caches are cleared before each conversation, so every conversation starts
+cold. Reports latency of the follow-up turns and the cache hit rates those
+turns saw, plus the backend calls each follow-up turn still had to make
+(a steadier signal than a few milliseconds of latency).
+
+Usage:
+    python -m benchmarks.prefetch --conversations 10 --turns 6
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.support import LatencyProxy, StandInLLMProvider, build_offline_world_store, percentile
+from benchmarks.turn_latency import GRAPH_METHODS
+from Dialogue.dialogue_graph import create_dialogue_graph, initial_dialogue_state, invoke_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.llm.provider import LLMProvider
+from Dialogue.prefetch import Prefetcher
+from World.graph_cache import CachedGraphStore
+from World.graph_store import get_world_graph, set_world_graph
+from World.store import set_world_store
+from World.store_cache import CachedWorldStore
+
+
+TEMPLATES = ["Tell me about {name}.", "Who owns {name}?", "Where is {name}?", "What do you know of {name}?"]
+
+
+def install_cold_stores(args: argparse.Namespace):
+    LLMProvider.set_provider(StandInLLMProvider(latency_ms=args.router_ms, answer_latency_ms=args.answer_ms))
+    graph_backend = get_world_graph()
+    graph_backend = getattr(graph_backend, "backend", graph_backend)
+    graph = CachedGraphStore(LatencyProxy(graph_backend, {name: args.graph_ms for name in GRAPH_METHODS}))
+    set_world_graph(graph)
+    vector_store = build_offline_world_store(embed_delay_ms=args.embed_ms)
+    store = CachedWorldStore(
+        LatencyProxy(
+            vector_store,
+            {"search": args.search_ms, "search_many": args.search_ms, "facts_for_entity": args.facts_ms},
+        )
+    )
+    set_world_store(store)
+    return graph, store, vector_store
+
+
+def hit_counts(graph, store) -> Dict[str, int]:
+    graph_stats, store_stats = graph.stats(), store.stats()
+    return {
+        "graph_hits": graph_stats["hits"] + graph_stats["derived_hits"],
+        "graph_lookups": graph_stats["hits"] + graph_stats["misses"],
+        "store_hits": store_stats["hits"],
+        "store_lookups": store_stats["hits"] + store_stats["misses"],
+    }
+
+
+def backend_calls(graph, store) -> int:
+    return sum(graph.backend.calls.values()) + sum(store.store.calls.values())
+
+
+def play(graph_app, graph, store, npc: NPC, seed: int, args, prefetcher, names: List[str]) -> Tuple[List[float], int]:
+    """
+    (follow-up turn latencies, backend calls made during follow-up turns)
+    """
+    rng = random.Random(seed)
+    subject = rng.choice(names)
+    follow_up_ms = []
+    follow_up_calls = 0
+    for turn in range(args.turns):
+        message = rng.choice(TEMPLATES).format(name=subject)
+        calls_before = backend_calls(graph, store)
+        started = time.perf_counter()
+        result = invoke_dialogue_turn(graph_app, initial_dialogue_state(npc, message), "", prefetcher)
+        if turn > 0:
+            follow_up_ms.append((time.perf_counter() - started) * 1000.0)
+            follow_up_calls += backend_calls(graph, store) - calls_before
+        mentioned = [name for name in result.get("recent_entities", []) if name != subject]
+        if mentioned and rng.random() < args.follow_up:
+            subject = rng.choice(mentioned)
+        else:
+            subject = rng.choice(names)
+        time.sleep(args.read_ms / 1000.0)
+    return follow_up_ms, follow_up_calls
+
+
+def run_mode(graph_app, graph, store, vector_store, args, use_prefetch: bool, names: List[str]) -> Dict[str, float]:
+    npc = NPC(entity_id="ent_aldric", name="Aldric")
+    prefetcher = Prefetcher(cpu_budget_ms=args.cpu_budget_ms) if use_prefetch else None
+    samples: List[float] = []
+    calls = 0
+    totals = {"graph_hits": 0, "graph_lookups": 0, "store_hits": 0, "store_lookups": 0}
+    for conversation in range(args.conversations):
+        graph.invalidate()
+        store.clear()
+        vector_store.clear_query_embeddings()
+        before = hit_counts(graph, store)
+        turn_ms, turn_calls = play(graph_app, graph, store, npc, conversation, args, prefetcher, names)
+        samples.extend(turn_ms)
+        calls += turn_calls
+        after = hit_counts(graph, store)
+        for key in totals:
+            totals[key] += after[key] - before[key]
+    row = {
+        "follow_up_turns": len(samples),
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "backend_calls_per_turn": calls / max(1, len(samples)),
+        "graph_hit_rate": totals["graph_hits"] / max(1, totals["graph_lookups"]),
+        "store_hit_rate": totals["store_hits"] / max(1, totals["store_lookups"]),
+    }
+    if prefetcher is not None:
+        row["prefetch"] = prefetcher.stats()
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Speculative prefetch benchmark")
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--follow-up", type=float, default=0.7, help="Share of turns about a mentioned entity")
+    parser.add_argument("--read-ms", type=float, default=300.0, help="Player reading time between turns")
+    parser.add_argument("--cpu-budget-ms", type=float, default=25.0)
+    parser.add_argument("--router-ms", type=float, default=20.0)
+    parser.add_argument("--answer-ms", type=float, default=60.0)
+    parser.add_argument("--graph-ms", type=float, default=8.0, help="Added latency per graph backend call")
+    parser.add_argument("--search-ms", type=float, default=15.0, help="Added latency per vector store search")
+    parser.add_argument("--facts-ms", type=float, default=3.0, help="Added latency per facts_for_entity")
+    parser.add_argument("--embed-ms", type=float, default=10.0, help="Added latency per embedding call")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    graph, store, vector_store = install_cold_stores(args)
+    names = [entity.name for entity in vector_store.entities.values()]
+    graph_app = create_dialogue_graph()
+    results = {
+        "no_prefetch": run_mode(graph_app, graph, store, vector_store, args, False, names),
+        "prefetch": run_mode(graph_app, graph, store, vector_store, args, True, names),
+    }
+    baseline = results["no_prefetch"]["mean_ms"]
+    results["saved_ms_per_turn"] = baseline - results["prefetch"]["mean_ms"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name in ("no_prefetch", "prefetch"):
+        row = results[name]
+        print(
+            f"{name:<12} follow-up turns={row['follow_up_turns']} mean={row['mean_ms']:.1f}ms "
+            f"p50={row['p50_ms']:.1f}ms p95={row['p95_ms']:.1f}ms backend_calls/turn={row['backend_calls_per_turn']:.2f} "
+            f"graph_hit={row['graph_hit_rate']:.0%} store_hit={row['store_hit_rate']:.0%}"
+        )
+    print(f"prefetch stats: {results['prefetch']['prefetch']}")
+    print(f"next-turn latency saved: {results['saved_ms_per_turn']:.1f}ms per follow-up turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Prompt size and build cost for densely connected NPCs.
+
+Builds prompts for increasingly large retrieval results, graph facts and
+histories (as a heavily connected NPC deep into a session would produce) and
+reports the prompt tokens the old unbounded concatenation would send next to
+the budgeted build_prompt output, plus the time build_prompt takes.
+
+Usage:
+    python -m benchmarks.prompt_budget --facts 10,100,1000
+"""
+
+import argparse
+import json
+import time
+from typing import Dict
+
+from Dialogue.entities.npc import NPC
+from Dialogue.nodes.prompt import build_prompt
+from Dialogue.tokens import count_tokens
+
+
+def make_state(facts: int) -> Dict[str, object]:
+    return {
+        "npc": NPC(entity_id="ent_aldric", name="Aldric"),
+        "user_input": "Who in this town can I trust?",
+        "conversation_history": "".join(
+            f"Human: Tell me about person {idx}.\nAldric: Person {idx} runs a stall by the docks "
+            f"and owes money to half the harbor.\n\n"
+            for idx in range(facts // 2)
+        ),
+        "system_prompt": "You are Aldric, the tavern keeper of Port Valor.\n",
+        "retrieval_results": [
+            {"id": f"fact_{idx}", "text": f"Person {idx} was seen near the Salt Road with a sealed letter."}
+            for idx in range(facts)
+        ],
+        "graph_facts": [
+            {"id": f"edge_{idx}", "text": f"Aldric knows person {idx} (since=year {idx % 40})"}
+            for idx in range(facts)
+        ],
+        "npc_node_facts": [{"id": "ent_aldric.age", "text": "Aldric age 45"}],
+    }
+
+
+def unbounded_tokens(state: Dict[str, object]) -> int:
+    """
+    Tokens of the prompt as it was built before budgeting: every section
+    concatenated in full.
+    """
+    facts = "\n".join(f"- ({fact['id']}) {fact['text']}" for fact in state["retrieval_results"])
+    graph = "\n".join(
+        f"- ({fact['id']}) {fact['text']}" for fact in state["npc_node_facts"] + state["graph_facts"]
+    )
+    prompt = (
+        f"{state['system_prompt']}\n\nWORLD FACTS:\n{facts}\n\nGRAPH FACTS:\n{graph}"
+        f"\n\n{state['conversation_history']}\nHuman: {state['user_input']}\nAI:"
+    )
+    return count_tokens(prompt)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Budgeted prompt size benchmark")
+    parser.add_argument("--facts", default="10,100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for facts in [int(value) for value in args.facts.split(",") if value]:
+        state = make_state(facts)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            update = build_prompt(state)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0 / args.repeat
+        budget = update["prompt_budget"]
+        results.append(
+            {
+                "facts": facts,
+                "unbounded_tokens": unbounded_tokens(state),
+                "prompt_tokens": budget["prompt_tokens"],
+                "budget": budget["total"],
+                "build_ms": elapsed_ms,
+                "dropped": {name: row["dropped"] for name, row in budget["sections"].items()},
+            }
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for row in results:
+        print(
+            f"facts={row['facts']:<6} unbounded~{row['unbounded_tokens']:<7} "
+            f"budgeted={row['prompt_tokens']:<5} (budget {row['budget']}) "
+            f"build={row['build_ms']:.1f}ms dropped={row['dropped']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Retrieval quality and cost for each retrieval setting.
+
+benchmarks/data/retrieval_eval.json lists questions with the router output
+they should get (intent, entities, subject, graph intent and edge types)
+and the fact and edge ids a good answer needs. Routing is stubbed with
+those specs, so only retrieval varies: for every combination of the
+settings given (semantic k, subject k, entity facts, neighbor facts; see
+Dialogue.retrieval_settings) and every embedding function, each question
+runs through retrieve_graph_knowledge, retrieve_vector_knowledge and
+expand_neighbor_facts, and the results are scored:
+
+  - recall@k: share of the expected ids among the first k retrieved, and
+    recall: among everything retrieved (what reaches the prompt)
+  - mrr: mean reciprocal rank of the first expected id
+  - prompt_tokens: tokens of the WORLD FACTS and GRAPH FACTS lines
+  - latency: the three nodes, per question
+
+Retrieved ids are ranked in prompt order: retrieval_results, then
+graph_facts; a path fact counts for each edge on the path. With
+--recall-target, the cheapest setting (fewest prompt tokens) that meets it
+is reported.
+
+The hashing embeddings need no model; `--embeddings default` uses Chroma's
+default model (downloaded on first use).
+
+Usage:
+    python -m benchmarks.retrieval_eval --recall-target 0.8
+    python -m benchmarks.retrieval_eval --semantic-k 3,5 --entity-facts 2,3 --out retrieval.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+from benchmarks.support import HashingEmbeddingFunction, percentile
+from Dialogue.entities.npc import NPC
+from Dialogue.graph_router_models import GraphQuerySpec
+from Dialogue.nodes.graph_retrieval import retrieve_graph_knowledge
+from Dialogue.nodes.vector_retrieval import expand_neighbor_facts, retrieve_vector_knowledge
+from Dialogue.retrieval_settings import RetrievalSettings, set_retrieval_settings
+from Dialogue.router_models import QuerySpec
+from Dialogue.tokens import count_tokens
+from World.graph_store import InMemoryGraphStore, set_world_graph
+from World.store import WorldKnowledgeStore, set_world_store
+
+
+DEFAULT_EVAL_SET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "retrieval_eval.json")
+WORLD_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "World", "data")
+EMBEDDINGS = {
+    "hashing": HashingEmbeddingFunction,
+    "default": DefaultEmbeddingFunction,
+}
+
+
+def load_eval_set(path: str = DEFAULT_EVAL_SET) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def question_state(npc: NPC, item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The state the retrieval nodes see for a question, with the labeled
+    router output in place of routing. No deadline.
+    """
+    query_spec = QuerySpec.model_validate(
+        {
+            "intent": item["intent"],
+            "query_text": item["question"],
+            "entities": [{"name": name} for name in item.get("entities", [])],
+            "subject_entity": item.get("subject_entity", ""),
+            "location_bias": {"mode": "NONE"},
+        }
+    )
+    graph_spec = GraphQuerySpec.model_validate(
+        {"graph_intent": item.get("graph_intent", "NONE"), "edge_types": item.get("edge_types", [])}
+    )
+    return {
+        "npc": npc,
+        "user_input": item["question"],
+        "query_spec": query_spec.model_dump(),
+        "graph_query_spec": graph_spec.model_dump(),
+        "deadline": 0.0,
+        "degradations": [],
+    }
+
+
+def retrieve(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the retrieval nodes as the graph does (both branches, then the join).
+    """
+    state = {**state, **retrieve_graph_knowledge(state)}
+    state = {**state, **retrieve_vector_knowledge(state)}
+    return {**state, **expand_neighbor_facts(state)}
+
+
+def ranked_ids(state: Dict[str, Any]) -> List[List[str]]:
+    """
+    Ids per retrieved fact, in prompt order; a path fact holds its edge ids.
+    """
+    ranked = []
+    for fact in list(state.get("retrieval_results", [])) + list(state.get("graph_facts", [])):
+        fact_id = fact.get("id", "")
+        if fact_id.startswith("path:"):
+            ranked.append(fact_id[len("path:") :].split("+"))
+        else:
+            ranked.append([fact_id])
+    return ranked
+
+
+def prompt_tokens(state: Dict[str, Any]) -> int:
+    lines = [
+        f"- ({fact.get('id', 'unknown')}) {fact.get('text', '')}"
+        for fact in list(state.get("retrieval_results", [])) + list(state.get("graph_facts", []))
+    ]
+    return count_tokens("\n".join(lines))
+
+
+def score(ranked: List[List[str]], expected: List[str], k_values: List[int]) -> Dict[str, float]:
+    expected_ids = set(expected)
+    scores: Dict[str, float] = {}
+    for k in k_values:
+        found = {fact_id for ids in ranked[:k] for fact_id in ids}
+        scores[f"recall@{k}"] = len(found & expected_ids) / len(expected_ids)
+    found = {fact_id for ids in ranked for fact_id in ids}
+    scores["recall"] = len(found & expected_ids) / len(expected_ids)
+    scores["mrr"] = next(
+        (1.0 / rank for rank, ids in enumerate(ranked, start=1) if expected_ids.intersection(ids)), 0.0
+    )
+    return scores
+
+
+def evaluate(
+    store: WorldKnowledgeStore,
+    eval_set: Dict[str, Any],
+    settings: RetrievalSettings,
+    k_values: List[int],
+) -> Dict[str, Any]:
+    """
+    Score one retrieval setting over the eval set. The store's query
+    embedding cache is cleared first so every setting pays for its searches.
+    """
+    npc = NPC(**eval_set["npc"])
+    questions = eval_set["questions"]
+    set_retrieval_settings(settings)
+    store.clear_query_embeddings()
+    totals: Dict[str, float] = {}
+    latencies: List[float] = []
+    tokens: List[int] = []
+    missed: Dict[str, List[str]] = {}
+    try:
+        for item in questions:
+            started = time.perf_counter()
+            state = retrieve(question_state(npc, item))
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            ranked = ranked_ids(state)
+            for name, value in score(ranked, item["expected"], k_values).items():
+                totals[name] = totals.get(name, 0.0) + value
+            tokens.append(prompt_tokens(state))
+            found = {fact_id for ids in ranked for fact_id in ids}
+            missing = [fact_id for fact_id in item["expected"] if fact_id not in found]
+            if missing:
+                missed[item["id"]] = missing
+    finally:
+        set_retrieval_settings(None)
+    return {
+        "settings": {
+            "semantic_k": settings.semantic_k,
+            "subject_semantic_k": settings.subject_semantic_k,
+            "entity_facts": settings.entity_facts,
+            "neighbor_facts": settings.neighbor_facts,
+        },
+        **{name: total / len(questions) for name, total in totals.items()},
+        "prompt_tokens": sum(tokens) / len(tokens),
+        "latency": {
+            "mean_ms": sum(latencies) / len(latencies),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+        },
+        "missed": missed,
+    }
+
+
+def build_store(embedding: str, persist_dir: str) -> WorldKnowledgeStore:
+    store = WorldKnowledgeStore(
+        os.path.join(WORLD_DATA_DIR, "world_facts.json"), persist_dir, embedding_function=EMBEDDINGS[embedding]()
+    )
+    store.build_index(reset=True)
+    return store
+
+
+def cheapest(results: List[Dict[str, Any]], recall_target: float, metric: str) -> Optional[Dict[str, Any]]:
+    meeting = [result for result in results if result[metric] >= recall_target]
+    return min(meeting, key=lambda result: (result["prompt_tokens"], result["latency"]["mean_ms"]), default=None)
+
+
+def _ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def _format_row(result: Dict[str, Any], k_values: List[int]) -> str:
+    settings = result["settings"]
+    recalls = " ".join(f"r@{k}={result[f'recall@{k}']:.2f}" for k in k_values)
+    return (
+        f"{result['embedding']:<8} sem={settings['semantic_k']} subj={settings['subject_semantic_k']} "
+        f"ent={settings['entity_facts']} nbr={settings['neighbor_facts']}  {recalls} "
+        f"recall={result['recall']:.2f} mrr={result['mrr']:.2f} tokens={result['prompt_tokens']:.0f} "
+        f"p50={result['latency']['p50_ms']:.2f}ms p95={result['latency']['p95_ms']:.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Retrieval recall, MRR, prompt tokens and latency per setting")
+    parser.add_argument("--eval-set", default=DEFAULT_EVAL_SET)
+    parser.add_argument("--semantic-k", default="2,5,8", help="Semantic hits per query")
+    parser.add_argument("--subject-k", default="1,2,4", help="Semantic hits for a one-subject question")
+    parser.add_argument("--entity-facts", default="1,3,5", help="Facts per named entity")
+    parser.add_argument("--neighbor-facts", default="0,2", help="Facts per graph neighbor")
+    parser.add_argument("--embeddings", default="hashing", help=f"Comma-separated: {', '.join(EMBEDDINGS)}")
+    parser.add_argument("--k", default="1,3,5,10", help="Cutoffs for recall@k")
+    parser.add_argument("--recall-target", type=float, help="Report the cheapest setting with at least this recall")
+    parser.add_argument("--target-metric", default="recall", help="Metric the target applies to (e.g. recall@5)")
+    parser.add_argument("--out", help="Also write the results here as JSON")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    eval_set = load_eval_set(args.eval_set)
+    k_values = _ints(args.k)
+    grid = [
+        RetrievalSettings(semantic_k=semantic_k, subject_semantic_k=subject_k, entity_facts=entity, neighbor_facts=neighbor)
+        for semantic_k, subject_k, entity, neighbor in itertools.product(
+            _ints(args.semantic_k), _ints(args.subject_k), _ints(args.entity_facts), _ints(args.neighbor_facts)
+        )
+    ]
+    set_world_graph(
+        InMemoryGraphStore(os.path.join(WORLD_DATA_DIR, "entities.json"), os.path.join(WORLD_DATA_DIR, "edges.json"))
+    )
+    results = []
+    try:
+        for embedding in [name for name in args.embeddings.split(",") if name]:
+            with tempfile.TemporaryDirectory(prefix="retrieval_eval_") as persist_dir:
+                store = build_store(embedding, persist_dir)
+                set_world_store(store)
+                for settings in grid:
+                    results.append({"embedding": embedding, **evaluate(store, eval_set, settings, k_values)})
+    finally:
+        set_world_store(None)
+        set_world_graph(None)
+
+    best = cheapest(results, args.recall_target, args.target_metric) if args.recall_target is not None else None
+    output = {"questions": len(eval_set["questions"]), "results": results, "cheapest": best}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+            f.write("\n")
+    if args.json:
+        print(json.dumps(output, indent=2))
+        return
+    print(f"questions={output['questions']} settings={len(results)}")
+    for result in results:
+        print(_format_row(result, k_values))
+    if args.recall_target is not None:
+        if best is None:
+            print(f"no setting reaches {args.target_metric} >= {args.recall_target}")
+        else:
+            print(f"cheapest with {args.target_metric} >= {args.recall_target}:")
+            print(_format_row(best, k_values))
+            for question_id, missing in best["missed"].items():
+                print(f"  missed {question_id}: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
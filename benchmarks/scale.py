@@ -0,0 +1,219 @@
+"""
+Scale benchmark: the world stores against synthetic worlds of growing size.
+
+For each size a world is generated with World.synthetic (entities, edges
+and facts with realistic type, alias and degree distributions), then each
+store is measured in a fresh subprocess so RSS and caches are not shared:
+
+  graph (InMemoryGraphStore)
+    - load_s, rss_mb
+    - get_neighbors at depth 1 and 2 for random entities, and depth 1 for
+      the ten biggest hubs
+  store (WorldKnowledgeStore, hashing embeddings, scratch Chroma dir)
+    - load_s and rss_mb after loading the JSON
+    - build_index_s and facts_per_s
+    - search, resolve_entity_ids and facts_for_entity latency
+    - rss_mb at the end
+
+Indexing is the slow part, so the store is skipped above --max-store-size.
+Results go to stdout and, with --out, to a JSON file to keep per commit.
+
+Usage:
+    python -m benchmarks.scale --sizes 1000,10000,100000 --out scale.json
+    python -m benchmarks.scale --sizes 1000000,10000000 --max-store-size 0 --data-dir /tmp/worlds
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.sqlite_backend import _latency, peak_rss_mb
+from benchmarks.support import HashingEmbeddingFunction
+from World.graph_store import InMemoryGraphStore
+from World.store import WorldKnowledgeStore
+from World.synthetic import synthetic_entity_name, write_synthetic_world
+
+
+WORLD_SEED = 3
+HUB_QUERIES = 10
+
+
+def _query_indexes(size: int, queries: int) -> List[int]:
+    rng = random.Random(17)
+    return [rng.randrange(size) for _ in range(queries)]
+
+
+def run_graph_worker(world_dir: str, size: int, queries: int) -> Dict[str, object]:
+    started = time.perf_counter()
+    graph = InMemoryGraphStore(os.path.join(world_dir, "entities.json"), os.path.join(world_dir, "edges.json"))
+    graph.world_version()
+    load_seconds = time.perf_counter() - started
+    rss_after_load = peak_rss_mb()
+
+    ids = [f"ent_{index}" for index in _query_indexes(size, queries)]
+    # Edge targets skew toward low ids, so the first entities are the hubs
+    hubs = [f"ent_{index}" for index in range(min(HUB_QUERIES, size))]
+    return {
+        "load_s": load_seconds,
+        "rss_after_load_mb": rss_after_load,
+        "get_neighbors_d1": _latency(lambda entity_id: graph.get_neighbors(entity_id, depth=1), ids),
+        "get_neighbors_d2": _latency(lambda entity_id: graph.get_neighbors(entity_id, depth=2), ids),
+        "get_neighbors_hub_d1": _latency(lambda entity_id: graph.get_neighbors(entity_id, depth=1), hubs),
+        "rss_mb": peak_rss_mb(),
+    }
+
+
+def run_store_worker(world_dir: str, size: int, queries: int) -> Dict[str, object]:
+    persist_dir = tempfile.mkdtemp(prefix="scale_chroma_")
+    try:
+        started = time.perf_counter()
+        store = WorldKnowledgeStore(
+            os.path.join(world_dir, "world_facts.json"), persist_dir, embedding_function=HashingEmbeddingFunction()
+        )
+        load_seconds = time.perf_counter() - started
+        rss_after_load = peak_rss_mb()
+
+        started = time.perf_counter()
+        store.build_index(reset=True)
+        build_seconds = time.perf_counter() - started
+
+        indexes = _query_indexes(size, queries)
+        names = [synthetic_entity_name(index, WORLD_SEED) for index in indexes]
+        ids = [f"ent_{index}" for index in indexes]
+        return {
+            "load_s": load_seconds,
+            "rss_after_load_mb": rss_after_load,
+            "build_index_s": build_seconds,
+            "facts_per_s": len(store.facts) / build_seconds if build_seconds else 0.0,
+            "search": _latency(lambda name: store.search(f"What do you know about {name}?"), names),
+            "resolve_entity_ids": _latency(lambda name: store.resolve_entity_ids([name, "nobody at all"]), names),
+            "facts_for_entity": _latency(store.facts_for_entity, ids),
+            "rss_mb": peak_rss_mb(),
+        }
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+def _run_worker(worker: str, world_dir: str, size: int, queries: int) -> Dict[str, object]:
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.scale",
+            "--worker",
+            worker,
+            "--data-dir",
+            world_dir,
+            "--sizes",
+            str(size),
+            "--queries",
+            str(queries),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def run_size(size: int, world_dir: str, queries: int, store_queries: int, run_store: bool) -> Dict[str, object]:
+    """
+    Generate the world into `world_dir` (unless it is already there) and measure both stores.
+    """
+    counts_path = os.path.join(world_dir, "counts.json")
+    generate_seconds: Optional[float] = None
+    if os.path.exists(counts_path):
+        with open(counts_path, "r", encoding="utf-8") as f:
+            counts = json.load(f)
+    else:
+        started = time.perf_counter()
+        counts = write_synthetic_world(world_dir, size, seed=WORLD_SEED)
+        generate_seconds = time.perf_counter() - started
+        with open(counts_path, "w", encoding="utf-8") as f:
+            json.dump(counts, f)
+
+    return {
+        **counts,
+        "generate_s": generate_seconds,
+        "files_mb": {
+            name: os.path.getsize(os.path.join(world_dir, name)) / 1e6
+            for name in ("entities.json", "edges.json", "world_facts.json")
+        },
+        "graph": _run_worker("graph", world_dir, size, queries),
+        "store": _run_worker("store", world_dir, size, store_queries) if run_store else None,
+    }
+
+
+def _print_result(result: Dict[str, object]) -> None:
+    print(f"entities={result['entities']} edges={result['edges']} facts={result['facts']}")
+    graph = result["graph"]
+    print(
+        f"  graph  load={graph['load_s']:.2f}s rss={graph['rss_mb']:.0f}MB "
+        f"neighbors_d1={graph['get_neighbors_d1']['mean_us']:.1f}us "
+        f"neighbors_d2={graph['get_neighbors_d2']['mean_us']:.1f}us "
+        f"hub_d1={graph['get_neighbors_hub_d1']['mean_us']:.1f}us"
+    )
+    store = result["store"]
+    if store is None:
+        print("  store  skipped (above --max-store-size)")
+        return
+    print(
+        f"  store  load={store['load_s']:.2f}s index={store['build_index_s']:.2f}s "
+        f"({store['facts_per_s']:.0f} facts/s) rss={store['rss_mb']:.0f}MB "
+        f"search={store['search']['mean_us'] / 1000:.2f}ms "
+        f"resolve={store['resolve_entity_ids']['mean_us'] / 1000:.2f}ms "
+        f"facts_for_entity={store['facts_for_entity']['mean_us'] / 1000:.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="World store benchmark on synthetic worlds")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=1000, help="Graph queries per size")
+    parser.add_argument("--store-queries", type=int, default=100, help="Store queries per size")
+    parser.add_argument("--max-store-size", type=int, default=100000, help="Skip the store above this many entities")
+    parser.add_argument("--data-dir", help="Keep generated worlds here (and reuse them) instead of a temp dir")
+    parser.add_argument("--out", help="Also write the results here as JSON")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--worker", choices=["graph", "store"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker = run_graph_worker if args.worker == "graph" else run_store_worker
+        print(json.dumps(worker(args.data_dir, int(args.sizes), args.queries)))
+        return
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="scale_worlds_")
+    all_results = []
+    try:
+        for size in [int(value) for value in args.sizes.split(",") if value]:
+            result = run_size(
+                size,
+                os.path.join(data_dir, f"world_{size}"),
+                args.queries,
+                args.store_queries,
+                size <= args.max_store_size,
+            )
+            all_results.append(result)
+            if not args.json:
+                _print_result(result)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"seed": WORLD_SEED, "results": all_results}, f, indent=2)
+            f.write("\n")
+    if args.json:
+        print(json.dumps(all_results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Compare the SQLite graph backend with the in-memory store.
+
+For each world size a random world is generated, the SQLite file is built,
+and each backend is measured in a fresh subprocess (so RSS is not shared):
+  - startup: time to construct the store
+  - rss_mb: peak resident set size of the process after startup and queries
+  - get_entity / get_entity_by_name / get_neighbors(depth 1 and 2) latency
+
+Usage:
+    python -m benchmarks.sqlite_backend --sizes 10000,100000,1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.path_queries import write_random_world
+from World.graph_store import InMemoryGraphStore, SqliteGraphStore, build_sqlite_graph
+from World.synthetic import synthetic_entity_name
+
+
+# Seed of the generated world; the workers derive entity names from it
+WORLD_SEED = 5
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak RSS of this process. ru_maxrss survives exec, so a worker would
+    report the parent's peak; VmHWM belongs to the current address space.
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _latency(fn: Callable[[str], object], ids: List[str]) -> Dict[str, float]:
+    samples = []
+    for entity_id in ids:
+        started = time.perf_counter()
+        fn(entity_id)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "mean_us": statistics.mean(samples) * 1e6,
+        "p95_us": samples[int(0.95 * (len(samples) - 1))] * 1e6,
+    }
+
+
+def run_worker(backend: str, entities_path: str, edges_path: str, db_path: str, size: int, queries: int) -> Dict[str, object]:
+    started = time.perf_counter()
+    if backend == "memory":
+        store = InMemoryGraphStore(entities_path, edges_path)
+    else:
+        store = SqliteGraphStore(db_path)
+        store.world_version()
+    startup = time.perf_counter() - started
+
+    rng = random.Random(11)
+    ids = [f"ent_{rng.randrange(size)}" for _ in range(queries)]
+    names = [synthetic_entity_name(int(entity_id.split("_", 1)[1]), seed=WORLD_SEED) for entity_id in ids]
+    name_iter = iter(names)
+    result = {
+        "backend": backend,
+        "startup_s": startup,
+        "get_entity": _latency(store.get_entity, ids),
+        "get_entity_by_name": _latency(lambda _id: store.get_entity_by_name(next(name_iter)), ids),
+        "get_neighbors_d1": _latency(lambda entity_id: store.get_neighbors(entity_id, depth=1), ids),
+        "get_neighbors_d2": _latency(lambda entity_id: store.get_neighbors(entity_id, depth=2), ids),
+    }
+    result["rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_size(size: int, avg_degree: float, queries: int) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        entities_path, edges_path = write_random_world(tmp, size, avg_degree, seed=WORLD_SEED)
+        db_path = os.path.join(tmp, "graph.sqlite3")
+        started = time.perf_counter()
+        build_sqlite_graph(db_path, entities_path, edges_path)
+        build_seconds = time.perf_counter() - started
+
+        results = {"entities": size, "sqlite_build_s": build_seconds, "sqlite_file_mb": os.path.getsize(db_path) / 1e6}
+        for backend in ("memory", "sqlite"):
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.sqlite_backend",
+                    "--worker",
+                    backend,
+                    "--entities-path",
+                    entities_path,
+                    "--edges-path",
+                    edges_path,
+                    "--db-path",
+                    db_path,
+                    "--sizes",
+                    str(size),
+                    "--queries",
+                    str(queries),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results[backend] = json.loads(output)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite vs in-memory graph backend benchmark")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--avg-degree", type=float, default=4.0)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--worker", choices=["memory", "sqlite"], help=argparse.SUPPRESS)
+    parser.add_argument("--entities-path", help=argparse.SUPPRESS)
+    parser.add_argument("--edges-path", help=argparse.SUPPRESS)
+    parser.add_argument("--db-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(
+            args.worker, args.entities_path, args.edges_path, args.db_path, int(args.sizes), args.queries
+        )
+        print(json.dumps(result))
+        return
+
+    all_results = []
+    for size in [int(value) for value in args.sizes.split(",") if value]:
+        result = run_size(size, args.avg_degree, args.queries)
+        all_results.append(result)
+        if args.json:
+            continue
+        print(
+            f"entities={size} sqlite build={result['sqlite_build_s']:.2f}s "
+            f"file={result['sqlite_file_mb']:.1f}MB"
+        )
+        for backend in ("memory", "sqlite"):
+            row = result[backend]
+            print(
+                f"  {backend:<7} startup={row['startup_s'] * 1000:.1f}ms rss={row['rss_mb']:.1f}MB "
+                f"get_entity={row['get_entity']['mean_us']:.1f}us "
+                f"by_name={row['get_entity_by_name']['mean_us']:.1f}us "
+                f"neighbors_d1={row['get_neighbors_d1']['mean_us']:.1f}us "
+                f"neighbors_d2={row['get_neighbors_d2']['mean_us']:.1f}us"
+            )
+    if args.json:
+        print(json.dumps(all_results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
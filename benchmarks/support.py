@@ -0,0 +1,253 @@
+"""
+Offline stand-ins shared by the dialogue benchmarks.
+
+  - StandInLLMProvider answers router, graph-router and NPC prompts locally
+    with a fixed latency, so a turn exercises every node without an API key.
+  - HashingEmbeddingFunction embeds text by hashing tokens, so a Chroma
+    collection can be built and queried without downloading a model.
+  - LatencyProxy adds a delay to selected methods of any object, to model a
+    networked store (Neo4j, a hosted vector DB) in front of a local one.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from Dialogue.llm.provider import BaseLLMProvider
+from World.store import WorldKnowledgeStore
+
+
+SAMPLE_MESSAGES = [
+    "Hello there!",
+    "Who owns the Crooked Tavern?",
+    "Tell me about Aldric.",
+    "How is Rowan related to Aldric?",
+    "Where is Dawnwatch Lighthouse?",
+    "What does the Lantern Guild do?",
+    "Have you heard any news from the Whisper Market lately?",
+    "What is the connection between Captain Voss and the Ironwatch?",
+    "Thanks, have a good evening.",
+    "Where does the Blackkeel sail?",
+]
+
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|greetings|thanks|thank you|good (morning|evening|day)|bye|farewell)\b",
+    re.IGNORECASE,
+)
+RELATIONSHIP_PATTERN = re.compile(
+    r"\b(related|relationship|connection|between|sister|brother|uncle|father|mother|family)\b",
+    re.IGNORECASE,
+)
+OWNERSHIP_PATTERN = re.compile(r"\b(own|owns|owner|owned)\b", re.IGNORECASE)
+LOCATION_PATTERN = re.compile(r"\b(where|located|sail|find)\b", re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _field(prompt: str, name: str) -> str:
+    match = re.search(rf"^{name}: (.*)$", prompt, re.MULTILINE)
+    return match.group(1).strip() if match else ""
+
+
+def _known_names(prompt: str) -> List[str]:
+    names = []
+    for key in ("KNOWN_ORGS", "KNOWN_LOCATIONS", "KNOWN_NPCS", "KNOWN_ITEMS"):
+        names.extend(name.strip() for name in _field(prompt, key).split(";") if name.strip())
+    return names
+
+
+def _mentioned(text: str, names: Iterable[str]) -> List[str]:
+    lowered = text.lower()
+    found = []
+    for name in names:
+        bare = re.sub(r"^the ", "", name.lower())
+        if bare and bare in lowered and name not in found:
+            found.append(name)
+    return found
+
+
+class StandInLLMProvider(BaseLLMProvider):
+    """
+    Deterministic local replacement for the configured LLM.
+
+    Router prompts get a QuerySpec built from keyword rules and the KNOWN_*
+    hints in the prompt; graph-router prompts get a matching GraphQuerySpec;
+    memory summary prompts get the player's questions appended to the
+    previous summary; anything else gets a short in-character reply. Each call sleeps for
+    `latency_ms` plus `ms_per_1k_chars` per thousand prompt characters.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        answer_latency_ms: Optional[float] = None,
+        ms_per_1k_chars: float = 0.0,
+    ):
+        self.latency_ms = latency_ms
+        self.answer_latency_ms = latency_ms if answer_latency_ms is None else answer_latency_ms
+        self.ms_per_1k_chars = ms_per_1k_chars
+        self.calls = 0
+        self.last_answer_prompt = ""
+
+    def _sleep(self, base_ms: float, prompt: str) -> None:
+        delay = base_ms + self.ms_per_1k_chars * len(prompt) / 1000.0
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if prompt.startswith("You are a query router"):
+            self._sleep(self.latency_ms, prompt)
+            return self._route(prompt)
+        if prompt.startswith("You are a graph routing assistant"):
+            self._sleep(self.latency_ms, prompt)
+            return self._graph_route(prompt)
+        if prompt.startswith("You maintain a running summary"):
+            self._sleep(self.latency_ms, prompt)
+            return self._summarize(prompt)
+        self.last_answer_prompt = prompt
+        self._sleep(self.answer_latency_ms, prompt)
+        return "Aye, I've heard a thing or two about that. Ask around the harbor if you want more."
+
+    def _route(self, prompt: str) -> str:
+        message = _field(prompt, "USER_MESSAGE")
+        entities = _mentioned(message, _known_names(prompt))
+        if GREETING_PATTERN.search(message) and not entities:
+            intent, needs_retrieval = "SMALLTALK", False
+        elif RELATIONSHIP_PATTERN.search(message) or OWNERSHIP_PATTERN.search(message):
+            intent, needs_retrieval = "ASK_RELATIONSHIP", True
+        elif LOCATION_PATTERN.search(message):
+            intent, needs_retrieval = "ASK_LOCATION", True
+        else:
+            intent, needs_retrieval = "ASK_ENTITY_FACTS", True
+        spec = {
+            "intent": intent,
+            "query_text": message,
+            "entities": [{"name": name, "type": "UNKNOWN"} for name in entities],
+            "needs_retrieval": needs_retrieval,
+            "subject_entity": entities[0] if entities else "",
+            "relationship_term": "",
+            "time_window_days": 0,
+            "time_constraint_text": "",
+            "location_bias": {"mode": "NEAR_NPC", "location_name": ""},
+            "answer_format": "NORMAL",
+            "history_independent": needs_retrieval and bool(entities),
+        }
+        return json.dumps(spec)
+
+    def _summarize(self, prompt: str) -> str:
+        previous = prompt.split("CURRENT SUMMARY:\n", 1)[-1].split("\n\nNEW EXCHANGES:", 1)[0]
+        questions = re.findall(r"^Human: (.*)$", prompt, re.MULTILINE)
+        summary = "" if previous == "None." else previous
+        return f"{summary} The player asked: {'; '.join(questions)}.".strip()
+
+    def _graph_route(self, prompt: str) -> str:
+        message = _field(prompt, "USER_MESSAGE")
+        if OWNERSHIP_PATTERN.search(message):
+            spec = {"graph_intent": "OWNERSHIP", "edge_types": ["OWNS", "OWNED"]}
+        elif RELATIONSHIP_PATTERN.search(message):
+            spec = {"graph_intent": "RELATIONSHIP", "edge_types": ["KINSHIP"]}
+        elif LOCATION_PATTERN.search(message):
+            spec = {"graph_intent": "LOCATION", "edge_types": ["LOCATED_IN"]}
+        else:
+            spec = {"graph_intent": "NONE", "edge_types": []}
+        spec["reason"] = "stand-in"
+        return json.dumps(spec)
+
+
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Bag-of-words embedding via the hashing trick (no model download).
+    `delay_ms` per call models the cost of a real embedding model.
+    """
+
+    def __init__(self, dimensions: int = 256, delay_ms: float = 0.0):
+        self.dimensions = dimensions
+        self.delay_ms = delay_ms
+
+    def __call__(self, input: Documents) -> Embeddings:
+        if self.delay_ms > 0:
+            time.sleep(self.delay_ms / 1000.0)
+        vectors = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                digest = hashlib.md5(token.encode("utf-8")).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dimensions
+                vector[index] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            vectors.append([value / norm for value in vector])
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "hashing-benchmark"
+
+    def get_config(self) -> Dict[str, object]:
+        return {"dimensions": self.dimensions, "delay_ms": self.delay_ms}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, object]) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(**config)
+
+
+def build_offline_world_store(
+    embed_delay_ms: float = 0.0,
+    persist_dir: Optional[str] = None,
+) -> WorldKnowledgeStore:
+    """
+    WorldKnowledgeStore over the real world data, indexed into a scratch
+    Chroma directory with HashingEmbeddingFunction.
+    """
+    base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "World", "data")
+    persist_dir = persist_dir or tempfile.mkdtemp(prefix="world_chroma_")
+    store = WorldKnowledgeStore(
+        os.path.join(base_dir, "world_facts.json"),
+        persist_dir,
+        embedding_function=HashingEmbeddingFunction(delay_ms=embed_delay_ms),
+    )
+    store.build_index(reset=True)
+    return store
+
+
+class LatencyProxy:
+    """
+    Forwards every attribute to `target`, sleeping `delays_ms[name]` before
+    calling the listed methods.
+    """
+
+    def __init__(self, target, delays_ms: Dict[str, float]):
+        self._target = target
+        self._delays = {name: ms / 1000.0 for name, ms in delays_ms.items() if ms > 0}
+        # Calls per delayed method (the round trips a networked store would see)
+        self.calls: Counter = Counter()
+        self._calls_lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        delay = self._delays.get(name)
+        if delay is None or not callable(attr):
+            return attr
+
+        def delayed(*args, **kwargs):
+            with self._calls_lock:
+                self.calls[name] += 1
+            time.sleep(delay)
+            return attr(*args, **kwargs)
+
+        return delayed
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[int(fraction * (len(ordered) - 1))]
@@ -0,0 +1,243 @@
+"""
+Tracing overhead on turn latency.
+
+Runs the same turns with tracing off, with the old synchronous writer
+(full state, serialize + open/append/close under a lock on the request
+path), with the async TraceSink writing full snapshots, and with the async
+delta-encoded TraceSink tracing every turn, 1 in --sample-every turns, and
+only turns slower than --slow-ms. With --viewers N, the delta writer is run
+once more with N live viewer clients following /stream. Besides turn
+latency, reports the trace bytes and the serialization CPU (ms of thread
+time) per traced turn, and for viewers the push lag (event recorded ->
+received by the client).
+
+The LLM is StandInLLMProvider and the stores add fixed per-call latencies,
+as in benchmarks.turn_latency; keep them small so the tracing cost is not
+lost in them. Modes are interleaved over --rounds to spread drift, and the
+overhead is the mean turn latency over the "off" mode.
+
+Usage:
+    python -m benchmarks.trace_overhead --turns 40 --rounds 3
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.support import SAMPLE_MESSAGES, percentile
+from benchmarks.turn_latency import install_stand_ins
+from Dialogue.dialogue_graph import create_dialogue_graph, run_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.live_viewer import start_trace_server
+from Dialogue.memory import ConversationMemory
+from Dialogue.trace import TraceSink, disable_trace, enable_trace, flush_trace, serialize_state, trace_stats
+
+
+class SyncTraceSink:
+    """
+    The previous trace writer, kept here as the baseline: every event is
+    serialized and appended (open, write, close) under a lock by the node.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.written = 0
+        self.bytes_written = 0
+        self.cpu_ms = 0.0
+        open(path, "w", encoding="utf-8").close()
+
+    def submit(self, node_name: str, turn_id: str, timestamp: float, state: Optional[Dict], fields: Optional[Dict] = None) -> bool:
+        cpu_started = time.thread_time()
+        event = {"id": 0, "turn_id": turn_id, "timestamp": timestamp, "node": node_name}
+        event.update({"state": serialize_state(state)} if state is not None else fields or {})
+        with self._lock:
+            event["id"] = self._next_id
+            self._next_id += 1
+            line = json.dumps(event) + "\n"
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.written += 1
+            self.bytes_written += len(line)
+            self.cpu_ms += (time.thread_time() - cpu_started) * 1000.0
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        return None
+
+    def events_since(self, event_id: int) -> Tuple[List, int, int]:
+        return [], event_id, 0
+
+    def get_event(self, event_id: int) -> None:
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "submitted": self.written,
+            "written": self.written,
+            "dropped": 0,
+            "queued": 0,
+            "rotations": 0,
+            "bytes_written": self.bytes_written,
+            "cpu_ms": self.cpu_ms,
+        }
+
+
+class FullSnapshotTraceSink(TraceSink):
+    """
+    The async writer without delta encoding: every event holds the full state.
+    """
+
+    def encode(self, turn_id: str, state: Dict) -> Dict:
+        return {"keyframe": True, "delta": serialize_state(state)}
+
+
+class ViewerClient:
+    """
+    Follows the live viewer's /stream on a thread, recording the push lag
+    of every trace event it receives.
+    """
+
+    def __init__(self, port: int):
+        self.lags_ms: List[float] = []
+        self._sock = socket.create_connection(("127.0.0.1", port))
+        self._sock.sendall(b"GET /stream HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n")
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self) -> None:
+        try:
+            for line in self._sock.makefile("rb"):
+                if line.startswith(b"data: {"):
+                    self.lags_ms.append((time.time() - json.loads(line[6:])["timestamp"]) * 1000.0)
+        except (OSError, ValueError):
+            return
+
+    def stop(self) -> None:
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        self._thread.join(1.0)
+
+
+def run_turns(graph_app, npc: NPC, turns: int) -> List[float]:
+    memory = ConversationMemory()
+    samples = []
+    for idx in range(turns):
+        started = time.perf_counter()
+        run_dialogue_turn(graph_app, npc, SAMPLE_MESSAGES[idx % len(SAMPLE_MESSAGES)], memory)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Trace writer overhead benchmark")
+    parser.add_argument("--turns", type=int, default=40, help="Turns per mode per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--sample-every", type=int, default=10)
+    parser.add_argument("--slow-ms", type=float, default=60.0, help="Threshold for the slow-turns-only mode")
+    parser.add_argument("--router-ms", type=float, default=5.0)
+    parser.add_argument("--answer-ms", type=float, default=20.0)
+    parser.add_argument("--search-ms", type=float, default=2.0)
+    parser.add_argument("--facts-ms", type=float, default=0.5)
+    parser.add_argument("--graph-ms", type=float, default=0.2)
+    parser.add_argument("--viewers", type=int, default=0, help="Live viewer clients for the viewers mode (0 = skip)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    install_stand_ins(args)
+    graph_app = create_dialogue_graph()
+    npc = NPC(entity_id="ent_aldric", name="Aldric")
+    trace_dir = tempfile.mkdtemp(prefix="trace-bench-")
+    trace_path = os.path.join(trace_dir, "trace.jsonl")
+    modes = {
+        "off": None,
+        "sync": lambda: enable_trace(trace_dir, 1, 0, sink=SyncTraceSink(trace_path)),
+        "async_full": lambda: enable_trace(trace_dir, 1, 0, sink=FullSnapshotTraceSink(trace_path)),
+        "async": lambda: enable_trace(trace_dir, 1, 0, sink=TraceSink(trace_path)),
+        f"async_1in{args.sample_every}": lambda: enable_trace(trace_dir, args.sample_every, 0),
+        "async_slow_only": lambda: enable_trace(trace_dir, 0, args.slow_ms),
+    }
+    viewers: List[ViewerClient] = []
+    lags_ms: List[float] = []
+    if args.viewers > 0:
+        port = start_trace_server(port=0).server_address[1]
+
+        def enable_with_viewers() -> None:
+            enable_trace(trace_dir, 1, 0)
+            viewers.extend(ViewerClient(port) for _ in range(args.viewers))
+
+        modes[f"async_{args.viewers}viewers"] = enable_with_viewers
+
+    run_turns(graph_app, npc, 5)
+    samples: Dict[str, List[float]] = {name: [] for name in modes}
+    events: Dict[str, int] = {name: 0 for name in modes}
+    traced_turns: Dict[str, int] = {name: 0 for name in modes}
+    trace_bytes: Dict[str, float] = {name: 0.0 for name in modes}
+    writer_cpu_ms: Dict[str, float] = {name: 0.0 for name in modes}
+    for _ in range(args.rounds):
+        for name, enable in modes.items():
+            if enable is not None:
+                enable()
+            samples[name].extend(run_turns(graph_app, npc, args.turns))
+            if enable is not None:
+                flush_trace()
+                stats = trace_stats()
+                events[name] += stats["submitted"]
+                trace_bytes[name] += stats["bytes_written"]
+                writer_cpu_ms[name] += stats["cpu_ms"]
+                traced_turns[name] += len({json.loads(line)["turn_id"] for line in open(trace_path, encoding="utf-8")})
+                time.sleep(0.1)
+                for viewer in viewers:
+                    viewer.stop()
+                    lags_ms.extend(viewer.lags_ms)
+                viewers.clear()
+                disable_trace()
+
+    baseline = statistics.mean(samples["off"])
+    results = {
+        name: {
+            "mean_ms": statistics.mean(values),
+            "p50_ms": percentile(values, 0.50),
+            "p95_ms": percentile(values, 0.95),
+            "overhead_ms": statistics.mean(values) - baseline,
+            "events_per_turn": events[name] / len(values),
+            "kb_per_traced_turn": trace_bytes[name] / 1024.0 / max(1, traced_turns[name]),
+            "cpu_ms_per_traced_turn": writer_cpu_ms[name] / max(1, traced_turns[name]),
+        }
+        for name, values in samples.items()
+    }
+
+    if lags_ms:
+        results[f"async_{args.viewers}viewers"].update(
+            {"push_lag_p50_ms": percentile(lags_ms, 0.50), "push_lag_p95_ms": percentile(lags_ms, 0.95)}
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, row in results.items():
+        print(
+            f"{name:<16} mean={row['mean_ms']:>6.2f}ms p50={row['p50_ms']:>6.2f}ms p95={row['p95_ms']:>6.2f}ms "
+            f"overhead={row['overhead_ms']:>+6.2f}ms events/turn={row['events_per_turn']:.1f} "
+            f"kb/traced_turn={row['kb_per_traced_turn']:.1f} cpu/traced_turn={row['cpu_ms_per_traced_turn']:.2f}ms"
+            + (f" push_lag p50={row['push_lag_p50_ms']:.1f}ms p95={row['push_lag_p95_ms']:.1f}ms" if "push_lag_p50_ms" in row else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
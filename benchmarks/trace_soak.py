@@ -0,0 +1,155 @@
+"""
+Trace soak: memory over millions of trace events.
+
+Pushes synthetic turns (nine node events each, a few keys changing per
+node, as in a real turn) through record_trace and the async TraceSink while
+polling get_events_since like the live viewer, and samples the process RSS
+along the way. The trace file is rotated at --file-mb so the disk stays
+bounded too. Once the in-memory buffer has filled (the first checkpoint),
+RSS should stay flat; the growth from there to the end is reported.
+
+Usage:
+    python -m benchmarks.trace_soak --events 2000000
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+from typing import Dict, List
+
+from Dialogue.trace import (
+    TraceSink,
+    disable_trace,
+    enable_trace,
+    end_trace_turn,
+    flush_trace,
+    get_events_since,
+    new_trace_turn,
+    record_trace,
+    trace_stats,
+)
+
+
+NODES = (
+    "lookup_cached_answer",
+    "load_npc_context",
+    "route_query",
+    "retrieve_graph_knowledge",
+    "retrieve_vector_knowledge",
+    "expand_neighbor_facts",
+    "build_prompt",
+    "call_llm",
+    "format_response",
+)
+
+
+def rss_mb() -> float:
+    """
+    Current resident set size; falls back to the peak where /proc is missing.
+    """
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def turn_states(turn: int) -> List[Dict[str, object]]:
+    """
+    The state each node of a synthetic turn records.
+    """
+    state: Dict[str, object] = {
+        "turn_id": new_trace_turn(),
+        "user_input": f"Who owns the Crooked Tavern? ({turn})",
+        "conversation_history": "Player: Hello!\nAldric: Well met, traveler." * 4,
+        "system_prompt": "You are Aldric, the innkeeper of Crooked Tavern. " * 8,
+        "retrieval_results": [],
+        "full_prompt": "",
+        "raw_response": "",
+    }
+    states = []
+    for index, node in enumerate(NODES):
+        update: Dict[str, object] = {"turn_path": "full"}
+        if node == "retrieve_vector_knowledge":
+            update["retrieval_results"] = [{"id": f"fact_{turn}_{k}", "text": f"Fact {k} about the tavern."} for k in range(5)]
+        elif node == "build_prompt":
+            update["full_prompt"] = f"{state['system_prompt']}\n{state['conversation_history']}\n{state['user_input']}"
+        elif node == "call_llm":
+            update["raw_response"] = f"Mira owns it, and has since the flood. ({turn}/{index})"
+        state = {**state, **update}
+        states.append(state)
+    return states
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Trace memory soak test")
+    parser.add_argument("--events", type=int, default=2_000_000)
+    parser.add_argument("--checkpoints", type=int, default=10)
+    parser.add_argument("--poll-every", type=int, default=2000, help="Events between live viewer polls")
+    parser.add_argument("--file-mb", type=float, default=16.0, help="Trace file rotation size")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    trace_dir = tempfile.mkdtemp(prefix="trace-soak-")
+    sink = TraceSink(os.path.join(trace_dir, "trace.jsonl"), max_bytes=int(args.file_mb * 1024 * 1024), backups=1)
+    enable_trace(trace_dir, 1, 0, sink=sink)
+
+    checkpoint_every = max(1, args.events // args.checkpoints)
+    samples = []
+    last_seen = 0
+    missed = 0
+    recorded = 0
+    turn = 0
+    started = time.perf_counter()
+    while recorded < args.events:
+        for node, state in zip(NODES, turn_states(turn)):
+            record_trace(node, state)
+            recorded += 1
+            if recorded % args.poll_every == 0:
+                flush_trace()
+                _events, last_seen, skipped = get_events_since(last_seen)
+                missed += skipped
+            if recorded % checkpoint_every == 0:
+                flush_trace()
+                samples.append({"events": recorded, "rss_mb": rss_mb(), **trace_stats()})
+        end_trace_turn(state["turn_id"], 0.0)
+        turn += 1
+    flush_trace()
+    elapsed = time.perf_counter() - started
+    stats = trace_stats()
+    disable_trace()
+
+    steady = samples[0]["rss_mb"] if samples else 0.0
+    results = {
+        "events": recorded,
+        "events_per_second": recorded / elapsed,
+        "rss_after_first_checkpoint_mb": steady,
+        "rss_final_mb": samples[-1]["rss_mb"] if samples else 0.0,
+        "rss_growth_mb": (samples[-1]["rss_mb"] - steady) if samples else 0.0,
+        "dropped": stats["dropped"],
+        "viewer_missed": missed,
+        "rotations": stats["rotations"],
+        "checkpoints": samples,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for sample in samples:
+        print(
+            f"events={sample['events']:>9} rss={sample['rss_mb']:>7.1f}MB buffered={sample['buffered']:>6} "
+            f"buffered_mb={sample['buffered_bytes'] / (1024 * 1024):>5.1f} rotations={sample['rotations']}"
+        )
+    print(
+        f"{recorded} events in {elapsed:.0f}s ({results['events_per_second']:.0f}/s), "
+        f"RSS growth after the first checkpoint: {results['rss_growth_mb']:+.1f}MB, "
+        f"dropped={stats['dropped']} viewer_missed={missed}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Turn latency: parallel retrieval fan-out vs the old sequential chain.
+
+Both pipelines use the same node functions. The sequential variant wires
+them as a strict chain (route_query -> graph -> vector -> join); the parallel
+variant is create_dialogue_graph(). The LLM is StandInLLMProvider and the
+stores add fixed per-call latencies, modelling a networked vector DB and
+graph DB, so the numbers reflect graph structure rather than API jitter.
+
+Usage:
+    python -m benchmarks.turn_latency --turns 50 --search-ms 40 --graph-ms 5
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import time
+from typing import Dict, List
+
+from langgraph.graph import END, START, StateGraph
+
+from benchmarks.support import (
+    SAMPLE_MESSAGES,
+    LatencyProxy,
+    StandInLLMProvider,
+    build_offline_world_store,
+    percentile,
+)
+from Dialogue.dialogue_graph import create_dialogue_graph, run_dialogue_turn
+from Dialogue.entities.npc import NPC
+from Dialogue.llm.provider import LLMProvider
+from Dialogue.nodes.context import load_npc_context
+from Dialogue.nodes.format import format_response
+from Dialogue.nodes.graph_retrieval import retrieve_graph_knowledge
+from Dialogue.nodes.llm import call_llm
+from Dialogue.nodes.prompt import build_prompt
+from Dialogue.nodes.routing import route_user_query
+from Dialogue.nodes.vector_retrieval import expand_neighbor_facts, retrieve_vector_knowledge
+from Dialogue.state import DialogueState
+from World.graph_store import get_world_graph, set_world_graph
+from World.store import set_world_store
+
+
+GRAPH_METHODS = ("get_entity", "get_entity_by_name", "get_edges", "get_neighbors", "find_paths")
+
+
+def create_sequential_graph():
+    """
+    The pre-fan-out wiring, kept here as the baseline.
+    """
+    graph = StateGraph(DialogueState)
+    graph.add_node("load_npc", load_npc_context)
+    graph.add_node("route_query", route_user_query)
+    graph.add_node("retrieve_graph_knowledge", retrieve_graph_knowledge)
+    graph.add_node("retrieve_vector_knowledge", retrieve_vector_knowledge)
+    graph.add_node("expand_neighbor_facts", expand_neighbor_facts)
+    graph.add_node("build_prompt", build_prompt)
+    graph.add_node("call_llm", call_llm)
+    graph.add_node("format_response", format_response)
+    graph.add_edge(START, "load_npc")
+    graph.add_edge("load_npc", "route_query")
+    graph.add_edge("route_query", "retrieve_graph_knowledge")
+    graph.add_edge("retrieve_graph_knowledge", "retrieve_vector_knowledge")
+    graph.add_edge("retrieve_vector_knowledge", "expand_neighbor_facts")
+    graph.add_edge("expand_neighbor_facts", "build_prompt")
+    graph.add_edge("build_prompt", "call_llm")
+    graph.add_edge("call_llm", "format_response")
+    graph.add_edge("format_response", END)
+    return graph.compile()
+
+
+def install_stand_ins(args: argparse.Namespace) -> None:
+    LLMProvider.set_provider(
+        StandInLLMProvider(
+            latency_ms=args.router_ms,
+            answer_latency_ms=args.answer_ms,
+            ms_per_1k_chars=getattr(args, "ms_per_1k_chars", 0.0),
+        )
+    )
+    store = build_offline_world_store()
+    set_world_store(
+        LatencyProxy(
+            store,
+            {"search": args.search_ms, "search_many": args.search_ms, "facts_for_entity": args.facts_ms},
+        )
+    )
+    graph = get_world_graph()
+    set_world_graph(LatencyProxy(graph, {name: args.graph_ms for name in GRAPH_METHODS}))
+
+
+def time_turns(graph, npc: NPC, turns: int) -> List[float]:
+    samples = []
+    for idx in range(turns):
+        message = SAMPLE_MESSAGES[idx % len(SAMPLE_MESSAGES)]
+        started = time.perf_counter()
+        run_dialogue_turn(graph, npc, message)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parallel vs sequential retrieval turn latency")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--router-ms", type=float, default=0.0, help="Stand-in latency per router call")
+    parser.add_argument("--answer-ms", type=float, default=0.0, help="Stand-in latency per answer call")
+    parser.add_argument("--search-ms", type=float, default=40.0, help="Added latency per store.search")
+    parser.add_argument("--facts-ms", type=float, default=2.0, help="Added latency per facts_for_entity")
+    parser.add_argument("--graph-ms", type=float, default=5.0, help="Added latency per graph store call")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    install_stand_ins(args)
+    npc = NPC(name="Aldric", entity_id="ent_aldric")
+    pipelines = {
+        "sequential": create_sequential_graph(),
+        "parallel": create_dialogue_graph(),
+    }
+    for graph in pipelines.values():
+        time_turns(graph, npc, len(SAMPLE_MESSAGES))  # warm-up
+
+    results = {name: summarize(time_turns(graph, npc, args.turns)) for name, graph in pipelines.items()}
+    sequential = results["sequential"]["mean_ms"]
+    parallel = results["parallel"]["mean_ms"]
+    results["improvement_pct"] = (sequential - parallel) / sequential * 100.0 if sequential else 0.0
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name in pipelines:
+        row = results[name]
+        print(
+            f"{name:<10} mean={row['mean_ms']:.1f}ms p50={row['p50_ms']:.1f}ms "
+            f"p95={row['p95_ms']:.1f}ms"
+        )
+    print(f"turn latency improvement: {results['improvement_pct']:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Turn latency per turn path (light / vector / full).
+
+Runs the sample messages through the routed dialogue graph and through the
+previous unconditional wiring (every turn runs both retrieval branches and
+the full prompt), grouping each turn by the path the router chose. The LLM
+is StandInLLMProvider with a per-call latency plus a per-character prompt
+cost, so shorter prompts answer faster as they would with a real model.
+
+Usage:
+    python -m benchmarks.turn_paths --turns 60
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import time
+from typing import Dict, List
+
+from langgraph.graph import END, START, StateGraph
+
+from benchmarks.support import SAMPLE_MESSAGES, percentile
+from benchmarks.turn_latency import install_stand_ins
+from Dialogue.dialogue_graph import create_dialogue_graph, initial_dialogue_state
+from Dialogue.entities.npc import NPC
+from Dialogue.nodes.context import load_npc_context
+from Dialogue.nodes.format import format_response
+from Dialogue.nodes.graph_retrieval import retrieve_graph_knowledge
+from Dialogue.nodes.llm import call_llm
+from Dialogue.nodes.prompt import build_prompt
+from Dialogue.nodes.routing import route_user_query
+from Dialogue.nodes.vector_retrieval import expand_neighbor_facts, retrieve_vector_knowledge
+from Dialogue.state import DialogueState
+
+
+def create_unconditional_graph():
+    """
+    The wiring before conditional routing: every turn runs every node.
+    """
+    graph = StateGraph(DialogueState)
+    graph.add_node("load_npc", load_npc_context)
+    graph.add_node("route_query", route_user_query)
+    graph.add_node("retrieve_graph_knowledge", retrieve_graph_knowledge)
+    graph.add_node("retrieve_vector_knowledge", retrieve_vector_knowledge)
+    graph.add_node("expand_neighbor_facts", expand_neighbor_facts)
+    graph.add_node("build_prompt", build_prompt)
+    graph.add_node("call_llm", call_llm)
+    graph.add_node("format_response", format_response)
+    graph.add_edge(START, "load_npc")
+    graph.add_edge("load_npc", "route_query")
+    graph.add_edge("route_query", "retrieve_graph_knowledge")
+    graph.add_edge("route_query", "retrieve_vector_knowledge")
+    graph.add_edge(["retrieve_graph_knowledge", "retrieve_vector_knowledge"], "expand_neighbor_facts")
+    graph.add_edge("expand_neighbor_facts", "build_prompt")
+    graph.add_edge("build_prompt", "call_llm")
+    graph.add_edge("call_llm", "format_response")
+    graph.add_edge("format_response", END)
+    return graph.compile()
+
+
+def time_by_path(graph, npc: NPC, turns: int) -> Dict[str, Dict[str, List[float]]]:
+    latencies: Dict[str, List[float]] = {}
+    prompt_chars: Dict[str, List[float]] = {}
+    for idx in range(turns):
+        message = SAMPLE_MESSAGES[idx % len(SAMPLE_MESSAGES)]
+        started = time.perf_counter()
+        result = graph.invoke(initial_dialogue_state(npc, message))
+        elapsed = (time.perf_counter() - started) * 1000.0
+        latencies.setdefault(result["turn_path"], []).append(elapsed)
+        prompt_chars.setdefault(result["turn_path"], []).append(len(result["full_prompt"]))
+    return {"latency": latencies, "prompt_chars": prompt_chars}
+
+
+def summarize(samples: List[float], chars: List[float]) -> Dict[str, float]:
+    return {
+        "turns": len(samples),
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "max_ms": max(samples),
+        "prompt_chars": statistics.mean(chars),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Turn latency per turn path")
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--router-ms", type=float, default=20.0, help="Stand-in latency per router call")
+    parser.add_argument("--answer-ms", type=float, default=60.0, help="Stand-in latency per answer call")
+    parser.add_argument("--ms-per-1k-chars", type=float, default=10.0, help="Stand-in prompt cost")
+    parser.add_argument("--search-ms", type=float, default=40.0, help="Added latency per store.search")
+    parser.add_argument("--facts-ms", type=float, default=2.0, help="Added latency per facts_for_entity")
+    parser.add_argument("--graph-ms", type=float, default=5.0, help="Added latency per graph store call")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    install_stand_ins(args)
+    npc = NPC(name="Aldric", entity_id="ent_aldric")
+    pipelines = {
+        "unconditional": create_unconditional_graph(),
+        "routed": create_dialogue_graph(),
+    }
+    results = {}
+    for name, graph in pipelines.items():
+        time_by_path(graph, npc, len(SAMPLE_MESSAGES))  # warm-up
+        timed = time_by_path(graph, npc, args.turns)
+        results[name] = {
+            path: summarize(samples, timed["prompt_chars"][path])
+            for path, samples in sorted(timed["latency"].items())
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, paths in results.items():
+        print(name)
+        for path, row in paths.items():
+            print(
+                f"  {path:<7} turns={row['turns']:<4} mean={row['mean_ms']:.1f}ms "
+                f"p50={row['p50_ms']:.1f}ms p95={row['p95_ms']:.1f}ms max={row['max_ms']:.1f}ms "
+                f"prompt={row['prompt_chars']:.0f} chars"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -13,10 +13,149 @@ GCP_PROJECT_ID = "worlddialoguesystem"
 LMSTUDIO_HOST = "localhost"
 LMSTUDIO_PORT = 1234
 LMSTUDIO_MODEL = "default"  # Model name to use (check LM Studio UI for available models)
+# Upper bound on one LM Studio request; a turn deadline (below) usually cuts it shorter
+LMSTUDIO_TIMEOUT_SECONDS = 60
+
+# ===== LLM Cost =====
+# USD per million prompt / completion tokens, for the per-turn cost in traces and metrics (gemini-2.0-flash list price)
+LLM_PROMPT_COST_PER_MTOK = 0.10
+LLM_COMPLETION_COST_PER_MTOK = 0.40
 
 # ===== Graph Backend Configuration =====
-# Options: "memory" | "neo4j"
+# Options: "memory" | "neo4j" | "sqlite"
 GRAPH_BACKEND = "memory"
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "neo4jpassword"
+# SQLite graph file; empty means World/data/world_graph.sqlite3 (built from the JSON on first use)
+SQLITE_GRAPH_PATH = ""
+
+# ===== Graph Cache Configuration =====
+# Max cached traversal/entity lookups in front of the graph backend (0 disables)
+GRAPH_CACHE_SIZE = 4096
+# How often (seconds) the cache re-reads the world version from Neo4j
+GRAPH_CACHE_VERSION_CHECK_SECONDS = 5.0
+
+# ===== World Store Cache =====
+# Max cached semantic searches / entity fact lookups in front of the vector store (0 disables)
+STORE_CACHE_SIZE = 4096
+# Max cached query embeddings; a repeated or prefetched query text skips the embedding model
+QUERY_EMBEDDING_CACHE_SIZE = 2048
+
+# ===== NPC Context Cache =====
+# Max NPCs whose resolved entity, system prompt and node facts are kept between turns
+NPC_CONTEXT_CACHE_SIZE = 1024
+
+# ===== Retrieval =====
+# Semantic hits per query; a question about one subject leans on its entity facts and gets fewer
+RETRIEVAL_SEMANTIC_K = 5
+RETRIEVAL_SUBJECT_SEMANTIC_K = 2
+# Facts per entity the query names, and per graph neighbor
+RETRIEVAL_ENTITY_FACTS = 3
+RETRIEVAL_NEIGHBOR_FACTS = 2
+
+# ===== Graph Path Queries =====
+# Used when a question names two entities (e.g. "How is Aldric connected to the Iron Guard?")
+GRAPH_PATH_MAX_DEPTH = 4
+GRAPH_PATH_LIMIT = 3
+
+# ===== Conversation Memory =====
+# Most recent turns kept verbatim in the prompt; older turns are folded into a summary
+MEMORY_VERBATIM_TURNS = 6
+# Folded turns are summarized in batches of this many, in the background
+MEMORY_SUMMARY_BATCH = 4
+# Upper bound on the rolling summary length
+MEMORY_SUMMARY_MAX_TOKENS = 200
+
+# ===== Prompt Budget =====
+# Total prompt size in tokens; the system prompt is always kept, the sections share the rest
+PROMPT_TOKEN_BUDGET = 4096
+# Share of the remaining budget per section; lowest-ranked items are dropped first
+PROMPT_BUDGET_SHARES = {
+    "world_facts": 0.35,
+    "graph_facts": 0.25,
+    "history": 0.30,
+    "user_input": 0.10,
+}
+
+# ===== Token Counting =====
+# Path to a Hugging Face tokenizer.json for exact counts; empty estimates 4 characters per token
+TOKENIZER_PATH = ""
+
+# ===== Dialogue Server =====
+# Address for `python main.py --serve`
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+# Sessions with no turn for this long are closed (their NPC and history are dropped)
+SESSION_IDLE_SECONDS = 900
+# Cap on open sessions; creating one past the cap evicts the least recently active
+MAX_SESSIONS = 1000
+
+# ===== Prefetch =====
+# Warm the caches for the last turn's entities while the player reads the reply
+PREFETCH_ENABLED = False
+# CPU time (thread time, ms) one prefetch may use before it stops
+PREFETCH_CPU_BUDGET_MS = 25.0
+# Max entities warmed per prefetch (recent entities first, then graph neighbors)
+PREFETCH_MAX_ENTITIES = 8
+
+# ===== Turn Deadline =====
+# End-to-end budget per turn (ms), a little under the p99 turn latency SLO (0 disables deadlines)
+TURN_DEADLINE_MS = 8000
+# Time kept back for the answer LLM call; routing and retrieval never use it
+DEADLINE_ANSWER_RESERVE_MS = 3000
+# Spare time (past the reserve) the LLM router needs; with less, the keyword router is used
+DEADLINE_ROUTER_MS = 1500
+# Spare time the graph router needs; with less, edge types come from keywords
+DEADLINE_GRAPH_ROUTER_MS = 1000
+# Spare time below which retrieval shrinks k and skips path search and neighbor facts
+DEADLINE_RETRIEVAL_MS = 300
+# Semantic hits and facts per entity once k is shrunk
+DEADLINE_SHRUNK_K = 1
+# History blocks (the summary or one turn each) kept once the answer reserve itself is being used
+DEADLINE_HISTORY_BLOCKS = 2
+# NPC reply when the answer call does not finish before the deadline
+DEADLINE_FALLBACK_RESPONSE = "Hm. Give me a moment, my thoughts are elsewhere."
+
+# ===== Answer Cache =====
+# Serve repeated questions to the same NPC from earlier answers (skips routing, retrieval and the LLM)
+ANSWER_CACHE_ENABLED = False
+# Max cached answers, across all NPCs
+ANSWER_CACHE_SIZE = 10000
+# Cached answers older than this are not served (0 keeps them until evicted or the world changes)
+ANSWER_CACHE_TTL_SECONDS = 3600
+# Min cosine similarity for a differently-worded question to reuse an answer (0 = exact matches only)
+ANSWER_CACHE_SIMILARITY = 0.95
+
+# ===== Tracing =====
+# Directory for trace.jsonl (written when tracing is on: --trace / --live-viewer)
+TRACE_DIR = "trace"
+# Trace events waiting for the writer thread; past this, new events are dropped (and counted)
+TRACE_QUEUE_SIZE = 10000
+# Max events the writer thread writes per flush
+TRACE_BATCH_SIZE = 256
+# trace.jsonl is rotated to trace.jsonl.1 (.2, ...) past this size (0 never rotates)
+TRACE_MAX_BYTES = 50 * 1024 * 1024
+# Rotated trace files kept
+TRACE_BACKUPS = 3
+# Recent trace events kept in memory for the live viewer, by count and by serialized size
+TRACE_BUFFER_EVENTS = 10000
+TRACE_BUFFER_BYTES = 32 * 1024 * 1024
+# Trace 1 in N turns (1 traces every turn)
+TRACE_SAMPLE_EVERY_N = 1
+# Also trace every turn at least this slow (ms), sampled or not (0 = off; with N = 1 and this set, only slow turns)
+TRACE_SLOW_TURN_MS = 0
+
+# ===== Profiling =====
+# Directory for per-turn profile reports (written when profiling is on: --profile)
+PROFILE_DIR = "profiles"
+# Profile 1 in N turns (0: only turns slower than PROFILE_SLOW_TURN_MS)
+PROFILE_SAMPLE_EVERY_N = 100
+# Also keep the profile of every turn at least this slow (ms, 0 = off); every turn is then profiled, only slow ones written
+PROFILE_SLOW_TURN_MS = 0
+# Also record allocations with tracemalloc (costs more than cProfile alone)
+PROFILE_MEMORY = True
+# Functions and allocation sites listed in each report
+PROFILE_TOP_N = 30
+# Reports kept in PROFILE_DIR; past this the oldest written by this process are deleted (0 keeps all)
+PROFILE_MAX_REPORTS = 200
@@ -5,7 +5,21 @@ Sets up and runs an interactive NPC dialogue session using LangGraph.
 
 import argparse
 import logging
+from typing import Dict
 
+from config import (
+    ANSWER_CACHE_ENABLED,
+    PREFETCH_ENABLED,
+    PROFILE_DIR,
+    PROFILE_SAMPLE_EVERY_N,
+    PROFILE_SLOW_TURN_MS,
+    SERVER_HOST,
+    SERVER_PORT,
+    TRACE_DIR,
+    TRACE_SAMPLE_EVERY_N,
+    TRACE_SLOW_TURN_MS,
+)
+from Dialogue.answer_cache import AnswerCache, get_answer_cache, set_answer_cache
 from Dialogue.entities.npc import NPC
 from Dialogue.dialogue_graph import (
     create_dialogue_graph,
@@ -13,7 +27,16 @@ from Dialogue.dialogue_graph import (
     run_dialogue_turn,
 )
 from Dialogue.live_viewer import start_trace_server
-from Dialogue.trace import enable_trace
+from Dialogue.memory import ConversationMemory
+from Dialogue.metrics import degradation_summary, turn_latency_summary
+from Dialogue.prefetch import Prefetcher
+from Dialogue.profiling import enable_profiling, flush_profiles, profiling_enabled, profiling_stats
+from Dialogue.server import create_dialogue_server
+from Dialogue.sessions import SessionManager
+from Dialogue.trace import enable_trace, trace_enabled, trace_stats
+from World.graph_store import get_world_graph
+from World.store import get_world_store
+from utils.spans import LLM, span_summary, span_totals
 
 
 def create_sample_npc() -> NPC:
@@ -48,7 +71,81 @@ def main():
         default=8765,
         help="Port for the live trace viewer",
     )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help=f"Write node-level trace events to {TRACE_DIR}/trace.jsonl",
+    )
+    parser.add_argument(
+        "--trace-sample",
+        type=int,
+        default=TRACE_SAMPLE_EVERY_N,
+        help="Trace 1 in N turns (0: only turns slower than --trace-slow-ms)",
+    )
+    parser.add_argument(
+        "--trace-slow-ms",
+        type=float,
+        default=TRACE_SLOW_TURN_MS,
+        help="Also trace every turn at least this slow (ms, 0 = off)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Write cProfile / tracemalloc reports of sampled turns to {PROFILE_DIR}/, named by trace turn id",
+    )
+    parser.add_argument(
+        "--profile-sample",
+        type=int,
+        default=PROFILE_SAMPLE_EVERY_N,
+        help="Profile 1 in N turns (0: only turns slower than --profile-slow-ms)",
+    )
+    parser.add_argument(
+        "--profile-slow-ms",
+        type=float,
+        default=PROFILE_SLOW_TURN_MS,
+        help="Also keep the profile of every turn at least this slow (ms, 0 = off; profiles every turn)",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        default=PREFETCH_ENABLED,
+        help="Warm retrieval caches for likely follow-ups between turns",
+    )
+    parser.add_argument(
+        "--answer-cache",
+        action="store_true",
+        default=ANSWER_CACHE_ENABLED,
+        help="Answer repeated questions from the answer cache",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the multi-session HTTP/WebSocket dialogue server instead of the CLI",
+    )
+    parser.add_argument(
+        "--host",
+        default=SERVER_HOST,
+        help="Host for --serve",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=SERVER_PORT,
+        help="Port for --serve",
+    )
+    parser.add_argument(
+        "--bench",
+        metavar="TRACE",
+        help="Replay the benchmark conversation set against the LLM responses recorded in TRACE "
+        "(no network; record one with `python -m benchmarks.bench --record`) and print timings",
+    )
     args = parser.parse_args()
+    if args.bench:
+        # Imported here so a normal start does not load the benchmark package
+        from benchmarks.bench import main as run_bench
+
+        run_bench(["--replay", args.bench])
+        return
     logging.basicConfig(level=logging.INFO, format="%(message)s")
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("httpcore").setLevel(logging.WARNING)
@@ -61,11 +158,20 @@ def main():
         print("\n[Dialogue Graph - Mermaid]")
         print(mermaid)
         print()
+    if args.trace or args.live_viewer:
+        enable_trace(TRACE_DIR, args.trace_sample, args.trace_slow_ms)
+        print(f"[Trace] Writing trace to {TRACE_DIR}/trace.jsonl\n")
+    if args.profile:
+        enable_profiling(PROFILE_DIR, args.profile_sample, args.profile_slow_ms)
+        print(f"[Profile] Writing turn profiles to {PROFILE_DIR}/\n")
     if args.live_viewer:
-        enable_trace()
         start_trace_server(port=args.live_viewer_port)
-        print(f"[Live Viewer] http://127.0.0.1:{args.live_viewer_port}")
-        print("[Live Viewer] Writing trace to trace/trace.jsonl\n")
+        print(f"[Live Viewer] http://127.0.0.1:{args.live_viewer_port}\n")
+    if args.answer_cache and get_answer_cache() is None:
+        set_answer_cache(AnswerCache())
+    if args.serve:
+        serve(args.host, args.port, args.prefetch)
+        return
     print("=" * 60)
     print("World Dialogue System - NPC Chat Session")
     print("=" * 60)
@@ -81,8 +187,9 @@ def main():
     # Create the dialogue graph (stateless, reusable)
     graph = create_dialogue_graph()
     
-    # Track conversation history
-    conversation_history = ""
+    # Track conversation history (recent turns verbatim, older turns summarized)
+    memory = ConversationMemory(npc_name=npc.name)
+    prefetcher = Prefetcher() if args.prefetch else None
     
     # Main conversation loop
     while True:
@@ -97,16 +204,13 @@ def main():
                 break
             
             if user_input.lower() == "clear":
-                conversation_history = ""
+                memory.clear()
                 print("[Conversation history cleared]")
                 continue
             
-            # Run dialogue turn through the graph
-            response = run_dialogue_turn(graph, npc, user_input, conversation_history)
+            # Run dialogue turn through the graph (appends the turn to memory)
+            response = run_dialogue_turn(graph, npc, user_input, memory, prefetcher=prefetcher)
             print(f"\n{npc.name}: {response}\n")
-            
-            # Update conversation history for next turn
-            conversation_history += f"Human: {user_input}\n{npc.name}: {response}\n\n"
         
         except KeyboardInterrupt:
             print("\n\nSession interrupted. Goodbye!")
@@ -115,6 +219,116 @@ def main():
             print(f"Error: {e}")
             print("Please try again.\n")
 
+    print_cache_stats()
+    print_turn_latency()
+    print_memory_stats(memory)
+    if prefetcher is not None:
+        print_prefetch_stats(prefetcher)
+
+
+def serve(host: str, port: int, prefetch: bool = False) -> None:
+    """Serve dialogue sessions over HTTP/WebSocket until interrupted."""
+    server = create_dialogue_server(host, port, SessionManager(prefetch=prefetch))
+    print(f"[Dialogue Server] http://{host}:{server.server_address[1]}")
+    print("[Dialogue Server] POST /sessions to start a session (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.manager.stop()
+        server.server_close()
+    print_cache_stats()
+    print_turn_latency()
+
+
+def print_cache_stats() -> None:
+    """Print graph, store and answer cache hit rates, and trace and profile writer counts, for the session."""
+    graph = get_world_graph()
+    if hasattr(graph, "stats"):
+        stats = graph.stats()
+        print(
+            f"[Graph Cache] hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={stats['hit_rate']:.1%} saved={stats['saved_ms']:.1f}ms "
+            f"invalidations={stats['invalidations']}"
+        )
+    store = get_world_store()
+    if hasattr(store, "stats"):
+        stats = store.stats()
+        print(
+            f"[Store Cache] hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={stats['hit_rate']:.1%} saved={stats['saved_ms']:.1f}ms"
+        )
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        stats = answer_cache.stats()
+        print(
+            f"[Answer Cache] exact={stats['exact_hits']} similar={stats['similar_hits']} "
+            f"misses={stats['misses']} hit_rate={stats['hit_rate']:.1%} entries={stats['entries']}"
+        )
+    if trace_enabled():
+        stats = trace_stats()
+        print(
+            f"[Trace] written={stats['written']} dropped={stats['dropped']} "
+            f"queued={stats['queued']} rotations={stats['rotations']}"
+        )
+    if profiling_enabled():
+        flush_profiles()
+        stats = profiling_stats()
+        print(
+            f"[Profile] profiled={stats['profiled']} written={stats['written']} "
+            f"discarded={stats['discarded']} dir={stats['dir']}"
+        )
+
+
+def print_turn_latency() -> None:
+    """Print the turn latency distribution for each turn path, span timings, LLM tokens and deadline degradations."""
+    for turn_path, stats in turn_latency_summary().items():
+        print(
+            f"[Turn Latency] {turn_path}: turns={stats['count']} "
+            f"p50={stats['p50_ms']:.0f}ms p95={stats['p95_ms']:.0f}ms max={stats['max_ms']:.0f}ms"
+        )
+    for name, stats in span_summary().items():
+        print(
+            f"[Span] {name}: calls={stats['count']} "
+            f"p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms max={stats['max_ms']:.2f}ms"
+        )
+    llm_totals: Dict[str, Dict[str, float]] = {}
+    for (kind, name, attr), total in span_totals().items():
+        if kind == LLM:
+            llm_totals.setdefault(name, {})[attr] = total
+    for name, totals in llm_totals.items():
+        timing = ""
+        if "server_ms" in totals:
+            timing = f" server={totals['server_ms']:.0f}ms network={totals.get('network_ms', 0):.0f}ms"
+        print(
+            f"[LLM Tokens] {name}: prompt={totals.get('prompt_tokens', 0):.0f} "
+            f"completion={totals.get('completion_tokens', 0):.0f}{timing} cost=${totals.get('cost_usd', 0):.4f}"
+        )
+    degradations = degradation_summary()
+    if degradations["turns"]:
+        taken = " ".join(f"{name}={count}" for name, count in degradations.items() if name != "turns")
+        print(f"[Deadline] degraded turns={degradations['turns']} {taken}")
+
+
+def print_prefetch_stats(prefetcher: Prefetcher) -> None:
+    """Print how much prefetch work ran between turns."""
+    stats = prefetcher.stats()
+    print(
+        f"[Prefetch] scheduled={stats['scheduled']} completed={stats['completed']} "
+        f"cancelled={stats['cancelled']} over_budget={stats['over_budget']} "
+        f"warmed={stats['warmed']} cpu={stats['cpu_ms']:.1f}ms"
+    )
+
+
+def print_memory_stats(memory: ConversationMemory) -> None:
+    """Print conversation memory size in tokens."""
+    counts = memory.token_counts()
+    print(
+        f"[Memory] turns={counts['turns']} summarized={counts['summarized_turns']} "
+        f"history_tokens={counts['history_tokens']} (summary={counts['summary_tokens']})"
+    )
+
 
 if __name__ == "__main__":
     main()
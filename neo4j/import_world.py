@@ -1,66 +1,331 @@
+"""
+Bulk importer for loading the JSON world data into Neo4j.
+
+Entities and edges are streamed from disk in fixed-size chunks. Each chunk is
+written in its own UNWIND transaction by a pool of worker sessions, and edges
+are created with one relationship type per edge type (OWNS, LOCATED_IN, ...).
+Finished chunks are recorded in a checkpoint file so an interrupted import
+only loads the chunks that are still missing when it is re-run.
+"""
+
+import argparse
 import json
 import os
-from typing import Dict, List
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 from neo4j import GraphDatabase
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.json_stream import iter_json_array  # noqa: E402
+from World.graph_store import REL_TYPE_PATTERN  # noqa: E402
+
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+
+def iter_chunks(items: Iterator[Dict], size: int) -> Iterator[Tuple[int, List[Dict]]]:
+    chunk: List[Dict] = []
+    index = 0
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield index, chunk
+            index += 1
+            chunk = []
+    if chunk:
+        yield index, chunk
+
+
+def entity_row(raw: Dict) -> Dict:
+    props = {key: value for key, value in raw.items() if key != "id"}
+    return {"id": raw["id"], "props": props}
+
+
+def edge_row(raw: Dict) -> Dict:
+    return {
+        "id": raw["id"],
+        "source_id": raw["source_id"],
+        "target_id": raw["target_id"],
+        "properties_json": json.dumps(raw.get("properties", {})),
+    }
+
 
-def load_json(path: str) -> Dict:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def group_edges_by_type(edges: List[Dict]) -> Dict[str, List[Dict]]:
+    grouped: Dict[str, List[Dict]] = {}
+    for raw in edges:
+        rel_type = str(raw.get("type", "RELATED_TO")).strip().upper()
+        if not REL_TYPE_PATTERN.match(rel_type):
+            raise ValueError(f"Edge {raw.get('id')} has an invalid relationship type: {rel_type!r}")
+        grouped.setdefault(rel_type, []).append(edge_row(raw))
+    return grouped
 
 
-def load_entities(session, entities: List[Dict]) -> None:
-    session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (e:Entity) REQUIRE e.id IS UNIQUE")
-    session.run(
+def write_entities(tx, rows: List[Dict]) -> None:
+    tx.run(
         """
-        UNWIND $entities AS e
+        UNWIND $rows AS e
         MERGE (n:Entity {id: e.id})
         SET n += e.props
         """,
-        entities=entities,
-    )
+        rows=rows,
+    ).consume()
 
 
-def load_edges(session, edges: List[Dict]) -> None:
-    session.run("CREATE CONSTRAINT IF NOT EXISTS FOR ()-[r:REL]-() REQUIRE r.id IS UNIQUE")
-    session.run(
-        """
-        UNWIND $edges AS r
-        MATCH (a:Entity {id: r.source_id})
-        MATCH (b:Entity {id: r.target_id})
-        MERGE (a)-[rel:REL {id: r.id}]->(b)
-        SET rel.type = r.type,
-            rel.properties_json = r.properties_json
-        """,
-        edges=edges,
-    )
+def write_edges(tx, grouped: Dict[str, List[Dict]]) -> None:
+    # Relationship types cannot be parameterised, so each type gets its own
+    # statement; the names were validated against REL_TYPE_PATTERN.
+    for rel_type, rows in grouped.items():
+        tx.run(
+            f"""
+            UNWIND $rows AS r
+            MATCH (a:Entity {{id: r.source_id}})
+            MATCH (b:Entity {{id: r.target_id}})
+            MERGE (a)-[rel:`{rel_type}` {{id: r.id}}]->(b)
+            SET rel.properties_json = r.properties_json
+            """,
+            rows=rows,
+        ).consume()
+
+
+class ImportCheckpoint:
+    """
+    Records which chunks of which source have been committed.
+
+    The checkpoint is only honoured when the source files and the batch size
+    match the run that wrote it; otherwise chunk boundaries would differ.
+    """
+
+    def __init__(self, path: str, fingerprint: Dict[str, object], restart: bool = False):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.completed: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+        if not restart:
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("fingerprint") != self.fingerprint:
+            print("[Import] Source data or batch size changed; ignoring old checkpoint.")
+            return
+        self.completed = {
+            phase: set(indexes) for phase, indexes in payload.get("completed", {}).items()
+        }
+
+    def is_done(self, phase: str, index: int) -> bool:
+        with self._lock:
+            return index in self.completed.get(phase, set())
+
+    def mark_done(self, phase: str, index: int) -> None:
+        with self._lock:
+            self.completed.setdefault(phase, set()).add(index)
+            payload = {
+                "fingerprint": self.fingerprint,
+                "completed": {
+                    phase_name: sorted(indexes) for phase_name, indexes in self.completed.items()
+                },
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+
+
+class ImportProgress:
+    def __init__(self, phase: str):
+        self.phase = phase
+        self.rows = 0
+        self.chunks = 0
+        self.skipped_chunks = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def chunk_done(self, index: int, rows: int) -> None:
+        with self._lock:
+            self.rows += rows
+            self.chunks += 1
+            elapsed = max(time.perf_counter() - self.started, 1e-9)
+            print(
+                f"[Import] {self.phase}: chunk {index} committed "
+                f"({self.rows} rows, {self.rows / elapsed:.1f} rows/s)"
+            )
+
+    def chunk_skipped(self) -> None:
+        with self._lock:
+            self.skipped_chunks += 1
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        return (
+            f"{self.phase}: {self.rows} rows in {self.chunks} chunks "
+            f"({self.skipped_chunks} already loaded) in {elapsed:.2f}s, {rate:.1f} rows/s"
+        )
+
+
+def file_fingerprint(paths: List[str], batch_size: int) -> Dict[str, object]:
+    files = {}
+    for path in paths:
+        stat = os.stat(path)
+        files[os.path.basename(path)] = [stat.st_size, stat.st_mtime_ns]
+    return {"batch_size": batch_size, "files": files}
+
+
+def run_phase(
+    driver,
+    phase: str,
+    chunks: Iterator[Tuple[int, List[Dict]]],
+    prepare: Callable[[List[Dict]], object],
+    write: Callable,
+    row_count: Callable[[object], int],
+    checkpoint: ImportCheckpoint,
+    workers: int,
+    database: Optional[str] = None,
+) -> ImportProgress:
+    progress = ImportProgress(phase)
+
+    def load_chunk(index: int, payload: object) -> None:
+        with driver.session(database=database) as session:
+            session.execute_write(write, payload)
+        checkpoint.mark_done(phase, index)
+        progress.chunk_done(index, row_count(payload))
+
+    # Keep at most a couple of chunks per worker in flight so the reader
+    # never gets far ahead of the database.
+    max_in_flight = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for index, chunk in chunks:
+            if checkpoint.is_done(phase, index):
+                progress.chunk_skipped()
+                continue
+            payload = prepare(chunk)
+            pending.add(pool.submit(load_chunk, index, payload))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+        for future in pending:
+            future.result()
+
+    print(f"[Import] {progress.summary()}")
+    return progress
 
 
 def main() -> None:
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    entities_path = os.path.join(base_dir, "..", "World", "data", "entities.json")
-    edges_path = os.path.join(base_dir, "..", "World", "data", "edges.json")
+    data_dir = os.path.join(base_dir, "..", "World", "data")
+
+    parser = argparse.ArgumentParser(description="Import the world graph into Neo4j")
+    parser.add_argument("--entities", default=os.path.join(data_dir, "entities.json"))
+    parser.add_argument("--edges", default=os.path.join(data_dir, "edges.json"))
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=int(os.getenv("NEO4J_IMPORT_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+        help="Rows per UNWIND transaction",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("NEO4J_IMPORT_WORKERS", DEFAULT_WORKERS)),
+        help="Number of parallel writer sessions",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=os.path.join(base_dir, ".import_checkpoint.json"),
+        help="Path of the resumable checkpoint file",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore any existing checkpoint and load every chunk",
+    )
+    args = parser.parse_args()
+    if args.batch_size <= 0 or args.workers <= 0:
+        parser.error("--batch-size and --workers must be positive")
 
     uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
     user = os.getenv("NEO4J_USER", "neo4j")
     password = os.getenv("NEO4J_PASSWORD", "neo4jpassword")
 
-    entities = load_json(entities_path).get("entities", [])
-    for entity in entities:
-        props = {key: value for key, value in entity.items() if key != "id"}
-        entity["props"] = props
-    edges = load_json(edges_path).get("edges", [])
-    for edge in edges:
-        edge["properties_json"] = json.dumps(edge.get("properties", {}))
+    checkpoint = ImportCheckpoint(
+        args.checkpoint,
+        file_fingerprint([args.entities, args.edges], args.batch_size),
+        restart=args.restart,
+    )
 
     driver = GraphDatabase.driver(uri, auth=(user, password))
-    with driver.session() as session:
-        load_entities(session, entities)
-        load_edges(session, edges)
-    driver.close()
+    try:
+        with driver.session() as session:
+            session.run(
+                "CREATE CONSTRAINT IF NOT EXISTS FOR (e:Entity) REQUIRE e.id IS UNIQUE"
+            ).consume()
 
-    print(f"Imported {len(entities)} entities and {len(edges)} edges into Neo4j.")
+        entity_progress = run_phase(
+            driver,
+            "entities",
+            iter_chunks(iter_json_array(args.entities, "entities"), args.batch_size),
+            prepare=lambda chunk: [entity_row(raw) for raw in chunk],
+            write=write_entities,
+            row_count=len,
+            checkpoint=checkpoint,
+            workers=args.workers,
+        )
+
+        known_rel_types: Set[str] = set()
+
+        def prepare_edges(chunk: List[Dict]) -> Dict[str, List[Dict]]:
+            grouped = group_edges_by_type(chunk)
+            new_types = set(grouped) - known_rel_types
+            if new_types:
+                # Schema changes cannot share a transaction with writes, so the
+                # per-type uniqueness constraints are created up front.
+                with driver.session() as session:
+                    for rel_type in sorted(new_types):
+                        session.run(
+                            f"CREATE CONSTRAINT IF NOT EXISTS FOR ()-[r:`{rel_type}`]-() "
+                            "REQUIRE r.id IS UNIQUE"
+                        ).consume()
+                known_rel_types.update(new_types)
+            return grouped
+
+        edge_progress = run_phase(
+            driver,
+            "edges",
+            iter_chunks(iter_json_array(args.edges, "edges"), args.batch_size),
+            prepare=prepare_edges,
+            write=write_edges,
+            row_count=lambda grouped: sum(len(rows) for rows in grouped.values()),
+            checkpoint=checkpoint,
+            workers=args.workers,
+        )
+        if entity_progress.rows or edge_progress.rows:
+            # Running graph caches compare this version to decide whether
+            # their cached traversals are still valid.
+            with driver.session() as session:
+                session.run(
+                    """
+                    MERGE (m:WorldMeta {id: 'world'})
+                    SET m.version = coalesce(m.version, 0) + 1,
+                        m.updated_at = timestamp()
+                    """
+                ).consume()
+    finally:
+        driver.close()
+
+    print(
+        f"Imported {entity_progress.rows} entities and {edge_progress.rows} edges into Neo4j."
+    )
 
 
 if __name__ == "__main__":
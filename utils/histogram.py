@@ -0,0 +1,90 @@
+"""
+Fixed-bucket latency histogram, shared by turn metrics (Dialogue.metrics)
+and timing spans (utils.spans).
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+# Upper bucket bounds in milliseconds; the last bucket is unbounded.
+DEFAULT_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds.
+
+    Percentiles are estimated by linear interpolation inside the bucket that
+    contains the requested rank, clamped to the observed min/max.
+    """
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.bounds = sorted(buckets_ms or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, value_ms: float) -> None:
+        index = bisect.bisect_left(self.bounds, value_ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += value_ms
+            self.min_ms = min(self.min_ms, value_ms)
+            self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, fraction: float) -> float:
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = fraction * self.count
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                if not bucket_count or seen + bucket_count < rank:
+                    seen += bucket_count
+                    continue
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max_ms
+                lower = max(lower, self.min_ms)
+                upper = min(upper, self.max_ms)
+                position = (rank - seen) / bucket_count
+                return lower + (upper - lower) * position
+            return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "min_ms": self.min_ms if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+        }
+
+    def buckets(self) -> List[Dict[str, object]]:
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in self.bounds] + [f">{self.bounds[-1]}ms"]
+            return [
+                {"bucket": label, "count": count}
+                for label, count in zip(labels, self.counts)
+            ]
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """
+        (upper bound, count of values <= it) per bucket, ending with
+        (inf, count): the Prometheus histogram layout.
+        """
+        with self._lock:
+            bounds = list(self.bounds) + [float("inf")]
+            total = 0
+            rows = []
+            for bound, bucket_count in zip(bounds, self.counts):
+                total += bucket_count
+                rows.append((bound, total))
+            return rows
@@ -1 +1,10 @@
-# simple ID helpers
\ No newline at end of file
+# simple ID helpers
+import hashlib
+
+
+def text_digest(text: str, length: int = 16) -> str:
+    """
+    Short stable id for a text (hex SHA-256 prefix), e.g. to key recorded
+    LLM responses by prompt.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:length]
@@ -0,0 +1,75 @@
+import json
+from typing import Dict, Iterable, Iterator
+
+
+READ_BLOCK_SIZE = 1 << 16
+WRITE_BATCH_ITEMS = 1000
+
+
+def iter_json_array(path: str, key: str, block_size: int = READ_BLOCK_SIZE) -> Iterator[Dict]:
+    """
+    Yield the items of the top-level array `key` without loading the whole file.
+
+    The files look like {"entities": [...]}; the reader seeks to the opening
+    bracket of the array and then decodes one item at a time from a rolling
+    buffer.
+    """
+    decoder = json.JSONDecoder()
+    marker = f'"{key}"'
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        while True:
+            idx = buffer.find(marker)
+            if idx != -1:
+                bracket = buffer.find("[", idx + len(marker))
+                if bracket != -1:
+                    buffer = buffer[bracket + 1 :]
+                    break
+            block = f.read(block_size)
+            if not block:
+                return
+            buffer += block
+
+        pos = 0
+        eof = False
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ","):
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                block = f.read(block_size)
+                if not block:
+                    eof = True
+                buffer = buffer[pos:] + block
+                pos = 0
+                continue
+            yield item
+            pos = end
+            if pos > block_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+
+def write_json_array(path: str, key: str, items: Iterable[Dict], batch_items: int = WRITE_BATCH_ITEMS) -> int:
+    """
+    Write {"key": [...]} from an iterable, one item per line, without
+    holding the array in memory. Returns the number of items written.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'{{"{key}": [\n')
+        lines = []
+        for item in items:
+            lines.append(("  " if count == 0 else ",\n  ") + json.dumps(item))
+            count += 1
+            if len(lines) >= batch_items:
+                f.write("".join(lines))
+                lines = []
+        f.write("".join(lines))
+        f.write("\n]}\n")
+    return count
@@ -0,0 +1,177 @@
+"""
+Timing spans for dialogue turns.
+
+A span times one unit of work: a graph node, an LLM call, a vector search
+or a graph-store query. Every finished span is recorded into a latency
+histogram per (kind, name), and numeric span attributes (e.g. token counts)
+are summed per (kind, name). Inside collect_spans() (one per turn) spans are
+also kept in order of start, with their parent, so a turn can be drawn as a
+waterfall. Parents come from a context variable, so work done inside a node
+(including on the threads LangGraph fans out to) nests under it.
+"""
+
+import functools
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.histogram import LatencyHistogram
+
+
+# Spans are often well under a millisecond (cached graph lookups)
+SPAN_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+NODE = "node"
+LLM = "llm"
+VECTOR = "vector"
+GRAPH = "graph"
+
+_SPAN_IDS = itertools.count(1)
+_HISTOGRAMS: Dict[Tuple[str, str], LatencyHistogram] = {}
+_TOTALS: Dict[Tuple[str, str, str], float] = {}
+_METRICS_LOCK = threading.Lock()
+
+
+class TurnSpans:
+    """
+    Spans finished during one turn, with times relative to its start.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def waterfall(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted(self.spans, key=lambda span: span["start_ms"])
+
+
+_CURRENT_TURN: ContextVar[Optional[TurnSpans]] = ContextVar("current_turn_spans", default=None)
+_CURRENT_SPAN: ContextVar[Optional[Tuple[int, str]]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def collect_spans(turn: Optional[TurnSpans] = None) -> Iterator[TurnSpans]:
+    """
+    Collect the spans of one turn (everything run inside the block). Pass
+    the same TurnSpans again to add to it, e.g. once per step of a
+    generator, which must not hold the context open across its yields.
+    """
+    turn = turn if turn is not None else TurnSpans()
+    token = _CURRENT_TURN.set(turn)
+    try:
+        yield turn
+    finally:
+        _CURRENT_TURN.reset(token)
+
+
+def current_span_name() -> str:
+    """
+    Name of the innermost open span ("" outside any), e.g. the node an LLM
+    call is made from.
+    """
+    current = _CURRENT_SPAN.get()
+    return current[1] if current else ""
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time the block as a span. The yielded dict is the span's attributes;
+    add to it inside the block (e.g. token counts once they are known).
+    """
+    span_id = next(_SPAN_IDS)
+    parent = _CURRENT_SPAN.get()
+    token = _CURRENT_SPAN.set((span_id, name))
+    started = time.perf_counter()
+    error = False
+    try:
+        yield attrs
+    except BaseException:
+        error = True
+        raise
+    finally:
+        finished = time.perf_counter()
+        _CURRENT_SPAN.reset(token)
+        duration_ms = (finished - started) * 1000.0
+        _record(kind, name, duration_ms, attrs)
+        turn = _CURRENT_TURN.get()
+        if turn is not None:
+            turn.add(
+                {
+                    "id": span_id,
+                    "parent": parent[0] if parent else None,
+                    "kind": kind,
+                    "name": name,
+                    "start_ms": (started - turn.started) * 1000.0,
+                    "duration_ms": duration_ms,
+                    "error": error,
+                    "attrs": attrs,
+                }
+            )
+
+
+def traced(kind: str, name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorator: run every call of the function in a span (named after the
+    function unless `name` is given).
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(kind, span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def _record(kind: str, name: str, duration_ms: float, attrs: Dict[str, Any]) -> None:
+    key = (kind, name)
+    with _METRICS_LOCK:
+        histogram = _HISTOGRAMS.get(key)
+        if histogram is None:
+            histogram = _HISTOGRAMS[key] = LatencyHistogram(SPAN_BUCKETS_MS)
+        for attr, value in attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                total_key = (kind, name, attr)
+                _TOTALS[total_key] = _TOTALS.get(total_key, 0) + value
+    histogram.record(duration_ms)
+
+
+def span_histograms() -> Dict[Tuple[str, str], LatencyHistogram]:
+    with _METRICS_LOCK:
+        return dict(sorted(_HISTOGRAMS.items()))
+
+
+def span_totals() -> Dict[Tuple[str, str, str], float]:
+    """
+    Sums of numeric span attributes, keyed (kind, name, attribute).
+    """
+    with _METRICS_LOCK:
+        return dict(sorted(_TOTALS.items()))
+
+
+def span_summary() -> Dict[str, Dict[str, float]]:
+    """
+    Latency distribution per "kind/name", e.g. {"llm/call_llm": {"p50_ms": ...}}.
+    """
+    return {f"{kind}/{name}": histogram.summary() for (kind, name), histogram in span_histograms().items()}
+
+
+def reset_spans() -> None:
+    with _METRICS_LOCK:
+        _HISTOGRAMS.clear()
+        _TOTALS.clear()